@@ -0,0 +1,110 @@
+#!/usr/bin/python
+
+################################################################################
+# thegame.benchmark_concurrency.py                                             #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module runs a stress benchmark of the thread-safe mode of the mass      #
+# functions from sensors generator: several threads get evidence from the      #
+# same generator while another one keeps reloading the model. The throughput   #
+# only scales with the number of threads if the work releases the GIL (e.g. on #
+# a free-threaded build of Python).                                            #
+################################################################################
+
+
+if __name__ == '__main__':
+    #Gory imports, honestly, who cares?
+    import sys
+    import os
+    PACKAGE_PARENT = '..'
+    SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+    sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+
+    from thegame.construction.fromsensors import *
+    import threading
+    import time
+
+    print(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format(os.path.basename(__file__)) + "*\n" +
+        "*" * 80
+    )
+
+    model_path = os.path.join(SCRIPT_DIR, "..", "thegame.tests", "Resources", "BeliefsFromSensors", "optionTest")
+    model_format = DiscreteMassFunctionsFromSensorsGenerator.ModelFormat.custom_directory
+    sensor_types = ["tempo", "tempoFusion", "tempoVariation", "variation"]
+    nb_sensors = 2000
+    nb_rounds = 5
+    thread_counts = [1, 2, 4, 8]
+
+    f = open("Results - concurrency.txt", "w")
+    f.write(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format("Thread-safe generator stress benchmark") + "*\n" +
+        "*" * 80 + "\n\n" +
+        "Nb sensors: " + str(nb_sensors) + ", nb rounds: " + str(nb_rounds) + "\n\n"
+    )
+
+    def run(nb_threads, compact, reload):
+        """
+        Gets the evidence of all the sensors nb_rounds times, the sensors being split
+        between nb_threads threads. Returns the number of evidence per second and the
+        longest time a single call to get_evidence() took.
+        """
+        generator = DiscreteMassFunctionsFromSensorsGenerator(compact_state=compact, thread_safe=True)
+        generator.load_model(model_path, model_format)
+        names = ["S" + str(i) for i in range(nb_sensors)]
+        for i, name in enumerate(names):
+            generator.add_sensor(sensor_types[i % len(sensor_types)], name)
+
+        longest = [0] * nb_threads
+        def reader(index):
+            mine = names[index::nb_threads]
+            for r in range(nb_rounds):
+                for i, name in enumerate(mine):
+                    start = time.perf_counter()
+                    generator.get_evidence((name, 100 + (r * 37 + i) % 400))
+                    longest[index] = max(longest[index], time.perf_counter() - start)
+
+        stop = threading.Event()
+        def reloader():
+            while not stop.is_set():
+                generator.reload_model(model_path, model_format)
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(nb_threads)]
+        background = threading.Thread(target=reloader)
+        start = time.perf_counter()
+        if reload:
+            background.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        if reload:
+            background.join()
+        return nb_sensors * nb_rounds / elapsed, max(longest)
+
+    for compact in [False, True]:
+        for reload in [False, True]:
+            s = ("Compact state" if compact else "Classic state") + (", model reloaded continuously:" if reload else ":")
+            print(s)
+            f.write(s + "\n")
+            reference = None
+            for nb_threads in thread_counts:
+                throughput, longest = run(nb_threads, compact, reload)
+                if reference == None:
+                    reference = throughput
+                s = "{:>3} thread(s): {:>10.0f} evidence/s (x{:.2f}), longest call: {:.1f}µs".format(
+                    nb_threads, throughput, throughput / reference, longest * 1000000)
+                print(s)
+                f.write(s + "\n")
+            s = "- " * 40
+            print(s)
+            f.write(s + "\n")
+
+    f.close()
@@ -37,20 +37,16 @@ if __name__ == '__main__':
         "*" * 80 + "\n" +
         "*" + "{:^78}".format("Element/DiscreteElement benchmark") + "*\n" +
         "*" * 80 + "\n\n" +
-        "Nb iterations tested: " + str(nb_iterations) + "\n\n"
+        "Max nb iterations per repeat: " + str(nb_iterations) + "\n\n"
     )
 
-    s = "CONSTRUCTORS:"
-    print(s)
-    f.write(s + "\n")
+    section("CONSTRUCTORS:", f)
     
     s = "- " * 40
     print(s)
     f.write(s + "\n")
 
-    s = "Empty set creation:"
-    print(s)
-    f.write(s + "\n")
+    section("Empty set creation:", f)
     
     time_function(nb_iterations, DiscreteElement, 2, 0, timeout=timeout, file=f)
     time_function(nb_iterations, DiscreteElement, 10, 0, timeout=timeout, file=f)
@@ -62,9 +58,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Empty set creation (unsafe):"
-    print(s)
-    f.write(s + "\n")
+    section("Empty set creation (unsafe):", f)
     
     time_function(nb_iterations, DiscreteElement.factory_constructor_unsafe, 2, 0, timeout=timeout, file=f)
     time_function(nb_iterations, DiscreteElement.factory_constructor_unsafe, 10, 0, timeout=timeout, file=f)
@@ -76,9 +70,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Empty set creation (from string):"
-    print(s)
-    f.write(s + "\n")
+    section("Empty set creation (from string):", f)
     
     s1 = "0"*2
     s2 = "0"*10
@@ -95,9 +87,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Complete set creation:"
-    print(s)
-    f.write(s + "\n")
+    section("Complete set creation:", f)
     
     n1 = 2**2-1
     n2 = 2**10-1
@@ -114,9 +104,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Complete set creation (unsafe):"
-    print(s)
-    f.write(s + "\n")
+    section("Complete set creation (unsafe):", f)
     
     time_function(nb_iterations, DiscreteElement.factory_constructor_unsafe, 2, n1, timeout=timeout, file=f)
     time_function(nb_iterations, DiscreteElement.factory_constructor_unsafe, 10, n2, timeout=timeout, file=f)
@@ -128,9 +116,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Complete set creation (from string):"
-    print(s)
-    f.write(s + "\n")
+    section("Complete set creation (from string):", f)
 
     s1 = "1"*2
     s2 = "1"*10
@@ -147,9 +133,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Any element creation:"
-    print(s)
-    f.write(s + "\n")
+    section("Any element creation:", f)
 
     time_function(nb_iterations, DiscreteElement, 2, 1, timeout=timeout, file=f)
     time_function(nb_iterations, DiscreteElement, 10, 123, timeout=timeout, file=f)
@@ -161,9 +145,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Any element creation (unsafe):"
-    print(s)
-    f.write(s + "\n")
+    section("Any element creation (unsafe):", f)
 
     time_function(nb_iterations, DiscreteElement.factory_constructor_unsafe, 2, 1, timeout=timeout, file=f)
     time_function(nb_iterations, DiscreteElement.factory_constructor_unsafe, 10, 123, timeout=timeout, file=f)
@@ -175,9 +157,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Any element creation (from string):"
-    print(s)
-    f.write(s + "\n")
+    section("Any element creation (from string):", f)
 
     e1 = str(DiscreteElement(2, 1))
     e2 = str(DiscreteElement(10, 123))
@@ -194,9 +174,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "PROPERTIES:"
-    print(s)
-    f.write(s + "\n")
+    section("PROPERTIES:", f)
 
     #Get some elements to work on:
     e1 = DiscreteElement(2, 1)
@@ -209,9 +187,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Cardinal (" + str(nb_iterations) + " times on the same object):" 
-    print(s)
-    f.write(s + "\n")
+    section("Cardinal (" + str(nb_iterations) + " times on the same object):", f)
 
     s = format_time("size2.cardinal", time_property(nb_iterations, e1, "cardinal", timeout=timeout), nb_iterations, timeout)
     print(s)
@@ -239,9 +215,7 @@ if __name__ == '__main__':
     e4 = DiscreteElement(1000, 1234567)
     e5 = DiscreteElement(10000, 123456789)
 
-    s = "Cardinal (once on each object):" 
-    print(s)
-    f.write(s + "\n")
+    section("Cardinal (once on each object):", f)
 
     s = format_time("size2.cardinal", time_property(nb_iterations, e1, "cardinal", timeout=timeout, bounded_copy=True), nb_iterations, timeout)
     print(s)
@@ -263,9 +237,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "SET-THEORETIC OPERATIONS:"
-    print(s)
-    f.write(s + "\n")
+    section("SET-THEORETIC OPERATIONS:", f)
     
     #Get some elements to work on:
     e1 = DiscreteElement(2, 1)
@@ -283,9 +255,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Get the opposite:"
-    print(s)
-    f.write(s + "\n")
+    section("Get the opposite:", f)
 
     s = format_time("size2.opposite()", time_function(nb_iterations, e1.opposite, verbose=False, timeout=timeout), nb_iterations, timeout)
     print(s)
@@ -307,9 +277,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Get the conjunction:"
-    print(s)
-    f.write(s + "\n")
+    section("Get the conjunction:", f)
 
     s = format_time("size2.conjunction(size2)", time_function(nb_iterations, e1.conjunction, eA, verbose=False, timeout=timeout), nb_iterations, timeout)
     print(s)
@@ -331,9 +299,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Get the conjunction (unsafe):"
-    print(s)
-    f.write(s + "\n")
+    section("Get the conjunction (unsafe):", f)
 
     s = format_time("size2.conjunction_unsafe(size2)", time_function(nb_iterations, e1.conjunction_unsafe, eA, verbose=False, timeout=timeout), nb_iterations, timeout)
     print(s)
@@ -355,9 +321,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Get the disjunction:"
-    print(s)
-    f.write(s + "\n")
+    section("Get the disjunction:", f)
 
     s = format_time("size2.disjunction(size2)", time_function(nb_iterations, e1.disjunction, eA, verbose=False, timeout=timeout), nb_iterations, timeout)
     print(s)
@@ -379,9 +343,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Get the disjunction (unsafe):"
-    print(s)
-    f.write(s + "\n")
+    section("Get the disjunction (unsafe):", f)
 
     s = format_time("size2.disjunction_unsafe(size2)", time_function(nb_iterations, e1.disjunction_unsafe, eA, verbose=False, timeout=timeout), nb_iterations, timeout)
     print(s)
@@ -403,9 +365,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Is complete?:"
-    print(s)
-    f.write(s + "\n")
+    section("Is complete?:", f)
 
     s = format_time("size2.is_complete()", time_function(nb_iterations, e1.is_complete, verbose=False, timeout=timeout), nb_iterations, timeout)
     print(s)
@@ -427,17 +387,13 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "UTILITIES:"
-    print(s)
-    f.write(s + "\n")
+    section("UTILITIES:", f)
 
     s = "- " * 40
     print(s)
     f.write(s + "\n")
 
-    s = "str():"
-    print(s)
-    f.write(s + "\n")
+    section("str():", f)
 
     e1 = DiscreteElement.get_complete_element(2)
     e2 = DiscreteElement.get_complete_element(10)
@@ -461,4 +417,5 @@ if __name__ == '__main__':
     f.write(s + "\n")
     
     f.close()
+    save_results("Results - element.json")
 
@@ -42,17 +42,13 @@ if __name__ == '__main__':
     )
 
     
-    s = "CONSTRUCTORS:"
-    print(s)
-    f.write(s + "\n")
+    section("CONSTRUCTORS:", f)
     
     s = "- " * 40
     print(s)
     f.write(s + "\n")
 
-    s = "Empty mass function:"
-    print(s)
-    f.write(s + "\n")
+    section("Empty mass function:", f)
     time_function(nb_iterations, MassFunction, timeout=timeout, file=f)
     time_function(nb_iterations, MassFunction.factory_constructor_unsafe, timeout=timeout, file=f)
 
@@ -117,9 +113,7 @@ if __name__ == '__main__':
     
     nb_iterations = 100
 
-    s = "Classic mass functions construction:"
-    print(s)
-    f.write(s + "\n")
+    section("Classic mass functions construction:", f)
     for smallSet in smallSets:
         s = format_time("size 3, focals " + str(round(1/smallSet[0][1])), time_function(nb_iterations, MassFunction, *smallSet, timeout=timeout, verbose=False), nb_iterations, timeout)
         print(s)
@@ -145,9 +139,7 @@ if __name__ == '__main__':
 
     nb_iterations = 1000
     
-    s = "Classic mass functions construction (unsafe):"
-    print(s)
-    f.write(s + "\n")
+    section("Classic mass functions construction (unsafe):", f)
     for smallSet in smallSets:
         s = format_time("size 3, focals " + str(round(1/smallSet[0][1])), time_function(nb_iterations, MassFunction.factory_constructor_unsafe, *smallSet, timeout=timeout, verbose=False), nb_iterations, timeout)
         print(s)
@@ -173,17 +165,13 @@ if __name__ == '__main__':
 
     nb_iterations = 1000
 
-    s = "DECISION MAKING:"
-    print(s)
-    f.write(s + "\n")
+    section("DECISION MAKING:", f)
 
     s = "- " * 40
     print(s)
     f.write(s + "\n")
 
-    s = "Access mass:"
-    print(s)
-    f.write(s + "\n")
+    section("Access mass:", f)
     for smallSet in smallSets:
         #Get one element in the set, one outside the set:
         element_in = random.sample(smallSet, 1)[0][0]
@@ -249,9 +237,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Access belief:"
-    print(s)
-    f.write(s + "\n")
+    section("Access belief:", f)
     for smallSet in smallSets:
         #Get one element in the set, one outside the set:
         element_in = random.sample(smallSet, 1)[0][0]
@@ -317,9 +303,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Access betP:"
-    print(s)
-    f.write(s + "\n")
+    section("Access betP:", f)
     for smallSet in smallSets:
         #Get one element in the set, one outside the set:
         element_in = random.sample(smallSet, 1)[0][0]
@@ -385,9 +369,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Access plausibility:"
-    print(s)
-    f.write(s + "\n")
+    section("Access plausibility:", f)
     for smallSet in smallSets:
         #Get one element in the set, one outside the set:
         element_in = random.sample(smallSet, 1)[0][0]
@@ -453,9 +435,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Access commonality:"
-    print(s)
-    f.write(s + "\n")
+    section("Access commonality:", f)
     for smallSet in smallSets:
         #Get one element in the set, one outside the set:
         element_in = random.sample(smallSet, 1)[0][0]
@@ -523,9 +503,7 @@ if __name__ == '__main__':
 
     nb_iterations = 1000
 
-    s = "Get the minima:"
-    print(s)
-    f.write(s + "\n")
+    section("Get the minima:", f)
     for smallSet in smallSets:
         #Build a mass function:
         m = MassFunction(*smallSet)
@@ -675,9 +653,7 @@ if __name__ == '__main__':
 
     nb_iterations = 100
 
-    s = "Get the maxima:"
-    print(s)
-    f.write(s + "\n")
+    section("Get the maxima:", f)
     for smallSet in smallSets:
         #Build a mass function:
         m = MassFunction(*smallSet)
@@ -827,17 +803,13 @@ if __name__ == '__main__':
     
     nb_iterations = 1000
 
-    s = "CHARACTERISATION:"
-    print(s)
-    f.write(s + "\n")
+    section("CHARACTERISATION:", f)
 
     s = "- " * 40
     print(s)
     f.write(s + "\n")
 
-    s = "Specificity:"
-    print(s)
-    f.write(s + "\n")
+    section("Specificity:", f)
 
     for smallSet in smallSets:
         #Build a mass function:
@@ -871,9 +843,7 @@ if __name__ == '__main__':
     ########################################################################################################################################################################################################
     ########################################################################################################################################################################################################
 
-    s = "Non-specificity:"
-    print(s)
-    f.write(s + "\n")
+    section("Non-specificity:", f)
 
     for smallSet in smallSets:
         #Build a mass function:
@@ -907,9 +877,7 @@ if __name__ == '__main__':
     ########################################################################################################################################################################################################
     ########################################################################################################################################################################################################
 
-    s = "Discrepancy:"
-    print(s)
-    f.write(s + "\n")
+    section("Discrepancy:", f)
 
     for smallSet in smallSets:
         #Build a mass function:
@@ -945,17 +913,13 @@ if __name__ == '__main__':
 
     nb_iterations = 1000
 
-    s = "DISCOUNTING:"
-    print(s)
-    f.write(s + "\n")
+    section("DISCOUNTING:", f)
 
     s = "- " * 40
     print(s)
     f.write(s + "\n")
 
-    s = "Discounting:"
-    print(s)
-    f.write(s + "\n")
+    section("Discounting:", f)
 
     for smallSet in smallSets:
         #Build a mass function:
@@ -989,9 +953,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Weakening:"
-    print(s)
-    f.write(s + "\n")
+    section("Weakening:", f)
 
     for smallSet in smallSets:
         #Build a mass function:
@@ -1027,17 +989,13 @@ if __name__ == '__main__':
 
     nb_iterations = 100
 
-    s = "DISTANCES:"
-    print(s)
-    f.write(s + "\n")
+    section("DISTANCES:", f)
 
     s = "- " * 40
     print(s)
     f.write(s + "\n")
 
-    s = "Distance:"
-    print(s)
-    f.write(s + "\n")
+    section("Distance:", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -1109,9 +1067,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
 
-    s = "Distance (unsafe):"
-    print(s)
-    f.write(s + "\n")
+    section("Distance (unsafe):", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -1185,17 +1141,13 @@ if __name__ == '__main__':
 
     nb_iterations = 100
 
-    s = "COMBINATIONS:"
-    print(s)
-    f.write(s + "\n")
+    section("COMBINATIONS:", f)
 
     s = "- " * 40
     print(s)
     f.write(s + "\n")
 
-    s = "Smets:"
-    print(s)
-    f.write(s + "\n")
+    section("Smets:", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -1266,9 +1218,7 @@ if __name__ == '__main__':
     ########################################################################################################################################################################################################
     ########################################################################################################################################################################################################
 
-    s = "Smets (unsafe):"
-    print(s)
-    f.write(s + "\n")
+    section("Smets (unsafe):", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -1341,9 +1291,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
     
-    s = "Dempster:"
-    print(s)
-    f.write(s + "\n")
+    section("Dempster:", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -1416,9 +1364,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
     
-    s = "Dempster (unsafe):"
-    print(s)
-    f.write(s + "\n")
+    section("Dempster (unsafe):", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -1490,9 +1436,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
     
-    s = "Disjunctive:"
-    print(s)
-    f.write(s + "\n")
+    section("Disjunctive:", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -1564,9 +1508,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
     
-    s = "Disjunctive (unsafe):"
-    print(s)
-    f.write(s + "\n")
+    section("Disjunctive (unsafe):", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -1638,9 +1580,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
     
-    s = "Yager:"
-    print(s)
-    f.write(s + "\n")
+    section("Yager:", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -1712,9 +1652,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
     
-    s = "Yager (unsafe):"
-    print(s)
-    f.write(s + "\n")
+    section("Yager (unsafe):", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -1786,9 +1724,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
     
-    s = "Average:"
-    print(s)
-    f.write(s + "\n")
+    section("Average:", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -1860,9 +1796,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
     
-    s = "Average (unsafe):"
-    print(s)
-    f.write(s + "\n")
+    section("Average (unsafe):", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -1934,9 +1868,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
     
-    s = "Dubois Prade:"
-    print(s)
-    f.write(s + "\n")
+    section("Dubois Prade:", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -2008,9 +1940,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
     
-    s = "Dubois Prade (unsafe):"
-    print(s)
-    f.write(s + "\n")
+    section("Dubois Prade (unsafe):", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -2082,9 +2012,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
     
-    s = "Murphy:"
-    print(s)
-    f.write(s + "\n")
+    section("Murphy:", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -2156,9 +2084,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
     
-    s = "Murphy (unsafe):"
-    print(s)
-    f.write(s + "\n")
+    section("Murphy (unsafe):", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -2230,9 +2156,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
     
-    s = "Chen:"
-    print(s)
-    f.write(s + "\n")
+    section("Chen:", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -2304,9 +2228,7 @@ if __name__ == '__main__':
     print(s)
     f.write(s + "\n")
     
-    s = "Chen (unsafe):"
-    print(s)
-    f.write(s + "\n")
+    section("Chen (unsafe):", f)
     for number in numberOfElements:
         if number <= len(smallElements):
             m1 = MassFunction(*[(x, 1.0/number) for x in random.sample(smallElements, number)])
@@ -2375,6 +2297,7 @@ if __name__ == '__main__':
     ########################################################################################################################################################################################################
     
     f.close()
+    save_results("Results - massfunction.json")
 
 
 
@@ -0,0 +1,120 @@
+#!/usr/bin/python
+
+################################################################################
+# thegame.benchmark_memory.py                                                  #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module measures the memory used by the library with tracemalloc: the   #
+# size of elements and mass functions, and the peak of the memory allocated by #
+# the rules of combination, the distance and the loading of models. Results    #
+# are saved in JSON, to be compared like the timings:                          #
+#   python -m thegame.benchmark compare base.json new.json                     #
+################################################################################
+
+
+if __name__ == '__main__':
+    #Gory imports, honestly, who cares?
+    import sys
+    import os
+    PACKAGE_PARENT = '..'
+    SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+    sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+
+    from thegame.element import *
+    from thegame.massfunction import *
+    from thegame.construction.fromsensors import DiscreteMassFunctionsFromSensorsGenerator
+    from thegame.construction.frombeliefs import DiscreteMassFunctionsFromBeliefsGenerator
+    from thegame.construction.fromrandomness import RandomDiscreteMassFunctionsGenerator
+    from thegame.benchmark.memory import MemoryRunner
+
+    print(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format(os.path.basename(__file__)) + "*\n" +
+        "*" * 80
+    )
+
+    frame_sizes = [4, 16, 64, 256]
+    focal_counts = [1, 4, 16, 64, 256]
+    default_size = 16
+    resources = os.path.join(SCRIPT_DIR, "..", "thegame.tests", "Resources")
+
+    combinations = ["smets", "dempster", "disjunctive", "yager", "dubois_prade", "average", "murphy", "chen"]
+
+    f = open("Results - memory.txt", "w")
+    f.write(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format("Memory benchmarks") + "*\n" +
+        "*" * 80 + "\n\n"
+    )
+    runner = MemoryRunner(file=f)
+
+    def sources(size, nb_focals, nb_sources):
+        """
+        Gets reproducible random mass functions.
+        """
+        generator = RandomDiscreteMassFunctionsGenerator(size, cache=False, seed=size * 1000 + nb_focals)
+        return [generator.build_evidence(nb_focals) for _ in range(nb_sources)]
+
+    def section(title):
+        runner.group = title
+        s = "- " * 40 + "\n" + title
+        print(s)
+        f.write(s + "\n")
+
+    def load(generator_class, path, model_format):
+        generator = generator_class()
+        generator.load_model(path, model_format)
+        return generator
+
+    # *************
+    # Object sizes:
+    # *************
+    section("Object sizes:")
+    for size in frame_sizes:
+        runner.measure("DiscreteElement(" + str(size) + ", ...)", DiscreteElement, size, (1 << size) - 2,
+                       params={"n": size})
+    for nb_intervals in [1, 4, 16, 64]:
+        runner.measure("IntervalElement(" + str(nb_intervals) + " intervals)", IntervalElement,
+                       *[(2 * i, 2 * i + 1) for i in range(nb_intervals)], params={"intervals": nb_intervals})
+    for nb_focals in focal_counts:
+        focals = list(sources(default_size, nb_focals, 1)[0].focals.items())
+        runner.measure("MassFunction(" + str(nb_focals) + " focals)", MassFunction, *focals,
+                       params={"n": default_size, "focals": nb_focals})
+    for size in frame_sizes[1:]:
+        focals = list(sources(size, 64, 1)[0].focals.items())
+        runner.measure("MassFunction(64 focals, n=" + str(size) + ")", MassFunction, *focals,
+                       params={"n": size, "focals": 64})
+
+    # *************
+    # Combinations:
+    # *************
+    section("Combinations (frame size " + str(default_size) + "):")
+    for nb_focals, nb_sources in [(8, 2), (8, 3), (32, 2)]:
+        mfs = sources(default_size, nb_focals, nb_sources)
+        case = " (" + str(nb_focals) + " focals, " + str(nb_sources) + " sources)"
+        params = {"n": default_size, "focals": nb_focals, "sources": nb_sources}
+        for rule in combinations:
+            runner.measure("combination_" + rule + case, getattr(MassFunction, "combination_" + rule), *mfs,
+                           params=params)
+        runner.measure("distance" + case, MassFunction.distance, *mfs, params=params)
+
+    # ***************
+    # Loading models:
+    # ***************
+    section("Loading models:")
+    Format = DiscreteMassFunctionsFromSensorsGenerator.ModelFormat
+    runner.measure("FromSensors.load_model(XML)", load, DiscreteMassFunctionsFromSensorsGenerator,
+                   os.path.join(resources, "BeliefsFromSensors", "XML", "BFS-load.xml"), Format.XML)
+    runner.measure("FromSensors.load_model(directory)", load, DiscreteMassFunctionsFromSensorsGenerator,
+                   os.path.join(resources, "BeliefsFromSensors", "optionTest"), Format.custom_directory)
+    Format = DiscreteMassFunctionsFromBeliefsGenerator.ModelFormat
+    runner.measure("FromBeliefs.load_model(XML)", load, DiscreteMassFunctionsFromBeliefsGenerator,
+                   os.path.join(resources, "BeliefsFromBeliefs", "XML", "BFB-load.xml"), Format.XML)
+    runner.measure("FromBeliefs.load_model(directory)", load, DiscreteMassFunctionsFromBeliefsGenerator,
+                   os.path.join(resources, "BeliefsFromBeliefs", "Sleeping"), Format.custom_directory)
+
+    f.close()
+    runner.save("Results - memory.json")
@@ -0,0 +1,153 @@
+#!/usr/bin/python
+
+################################################################################
+# thegame.benchmark_pipeline.py                                                #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module runs an end-to-end benchmark of the construction pipeline as it  #
+# runs in a smart home: a synthetic time series of measurements from many      #
+# sensors is replayed through the mass functions from sensors generator, the   #
+# evidence of all the sensors is fused, and the fusion is transferred to       #
+# another frame with the mass functions from beliefs generator. It reports the #
+# throughput, the latency percentiles and the time spent in each stage.        #
+################################################################################
+
+
+if __name__ == '__main__':
+    #Gory imports, honestly, who cares?
+    import sys
+    import os
+    PACKAGE_PARENT = '..'
+    SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+    sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+
+    from thegame.construction.fromsensors import DiscreteMassFunctionsFromSensorsGenerator, IncrementalFusion
+    from thegame.construction.frombeliefs import DiscreteMassFunctionsFromBeliefsGenerator
+    from thegame.benchmark.harness import Measurement, Runner, format_ns
+    import random
+    import time
+
+    print(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format(os.path.basename(__file__)) + "*\n" +
+        "*" * 80
+    )
+
+    resources = os.path.join(SCRIPT_DIR, "..", "thegame.tests", "Resources")
+    sensors_path = os.path.join(resources, "BeliefsFromSensors", "optionTest")
+    beliefs_path = os.path.join(resources, "BeliefsFromBeliefs", "XML", "BFB-load.xml")
+    sensor_types = ["tempo", "tempoFusion", "tempoVariation", "variation"]
+    sensor_counts = [4, 16, 64, 256]
+    nb_events = 20000
+    batch = 500 #Number of events per timing in the JSON results
+    stages = ["sensors", "fusion", "beliefs"]
+
+    f = open("Results - pipeline.txt", "w")
+    f.write(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format("Smart home replay: sensors -> fusion -> beliefs") + "*\n" +
+        "*" * 80 + "\n\n" +
+        "Nb events: " + str(nb_events) + "\n\n"
+    )
+    results = []
+
+    def percentile(values, p):
+        """
+        Gets a percentile of sorted values (nearest rank).
+        """
+        return values[min(len(values) - 1, int(p * len(values)))]
+
+    def build_pipeline(nb_sensors, compact):
+        """
+        Loads the models and registers the sensors. The mapping of the beliefs model is
+        defined on the postures, it is reused on the frame of the sensors (both have
+        three states) to get whether the inhabitant is sleeping.
+        """
+        sensors = DiscreteMassFunctionsFromSensorsGenerator(compact_state=compact)
+        sensors.load_model(sensors_path, DiscreteMassFunctionsFromSensorsGenerator.ModelFormat.custom_directory)
+        names = ["S" + str(i) for i in range(nb_sensors)]
+        for i, name in enumerate(names):
+            sensors.add_sensor(sensor_types[i % len(sensor_types)], name)
+        beliefs = DiscreteMassFunctionsFromBeliefsGenerator()
+        beliefs.load_model(beliefs_path, DiscreteMassFunctionsFromBeliefsGenerator.ModelFormat.XML)
+        mapping = beliefs.get_mapping("Posture")
+        mapping.frame_name = sensors.frame_name
+        mapping.ref_list = sensors.ref_list
+        beliefs.mappings = {sensors.frame_name: mapping}
+        return sensors, IncrementalFusion(), beliefs, names
+
+    def build_events(names, seed=42):
+        """
+        Builds a reproducible time series: each sensor follows a random walk in the range
+        of the models and the sensors report in a random order.
+        """
+        generator = random.Random(seed)
+        values = dict((name, generator.uniform(100, 500)) for name in names)
+        events = []
+        for _ in range(nb_events):
+            name = generator.choice(names)
+            values[name] = min(550, max(50, values[name] + generator.gauss(0, 20)))
+            events.append((name, values[name]))
+        return events
+
+    def replay(sensors, fusion, beliefs, events):
+        """
+        Replays the events one by one and times each stage of each event.
+        """
+        frame_name = sensors.frame_name
+        timer = time.perf_counter_ns
+        timings = dict((stage, []) for stage in stages)
+        for event in events:
+            t0 = timer()
+            evidence = sensors.get_evidence(event)[event[0]]
+            t1 = timer()
+            fusion.update(event[0], evidence)
+            fused = fusion.get_evidence()
+            t2 = timer()
+            beliefs.get_evidence((frame_name, fused))
+            t3 = timer()
+            timings["sensors"].append(t1 - t0)
+            timings["fusion"].append(t2 - t1)
+            timings["beliefs"].append(t3 - t2)
+        return timings
+
+    for compact in [False, True]:
+        s = "Compact state:" if compact else "Classic state:"
+        print(s)
+        f.write(s + "\n")
+        for nb_sensors in sensor_counts:
+            sensors, fusion, beliefs, names = build_pipeline(nb_sensors, compact)
+            events = build_events(names)
+            start = time.perf_counter_ns()
+            timings = replay(sensors, fusion, beliefs, events)
+            elapsed = time.perf_counter_ns() - start
+            latencies = sorted(a + b + c for a, b, c in zip(*[timings[stage] for stage in stages]))
+            total = sum(latencies)
+
+            s = "{:>4} sensors: {:>8.0f} events/s, latency p50 {:>10} p99 {:>10} max {:>10} |".format(
+                nb_sensors, nb_events / (elapsed / 1e9), format_ns(percentile(latencies, 0.5)),
+                format_ns(percentile(latencies, 0.99)), format_ns(latencies[-1]))
+            for stage in stages:
+                s += " {} {:.0%}".format(stage, sum(timings[stage]) / total)
+            print(s)
+            f.write(s + "\n")
+
+            #Mean time per event of each batch, to compare runs like the other benchmarks:
+            group = ("Compact" if compact else "Classic") + " state, " + str(nb_sensors) + " sensors"
+            params = {"sensors": nb_sensors, "compact": compact, "events": nb_events}
+            series = [("end-to-end", [a + b + c for a, b, c in zip(*[timings[stage] for stage in stages])])]
+            series += [(stage, timings[stage]) for stage in stages]
+            for name, values in series:
+                times = [sum(values[i:i + batch]) / batch for i in range(0, len(values) - batch + 1, batch)]
+                results.append(Measurement(name, params, batch, times, group=group))
+        s = "- " * 40
+        print(s)
+        f.write(s + "\n")
+
+    f.close()
+    runner = Runner(verbose=False)
+    runner.results = results
+    runner.save("Results - pipeline.json")
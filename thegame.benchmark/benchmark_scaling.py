@@ -0,0 +1,129 @@
+#!/usr/bin/python
+
+################################################################################
+# thegame.benchmark_scaling.py                                                 #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module runs scaling sweeps of the mass function operations: every rule  #
+# of combination, the distance, bel/pl/q/betP and the constructors are         #
+# measured for increasing frame sizes, numbers of focal elements and numbers   #
+# of sources, and an empirical complexity is fitted on each sweep. This shows  #
+# where each operation falls off a cliff, to pick rules and sizes wisely.      #
+################################################################################
+
+
+if __name__ == '__main__':
+    #Gory imports, honestly, who cares?
+    import sys
+    import os
+    PACKAGE_PARENT = '..'
+    SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+    sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+
+    from thegame.massfunction import *
+    from thegame.construction.fromrandomness import RandomDiscreteMassFunctionsGenerator
+    from thegame.benchmark.harness import Runner
+    from thegame.benchmark.sweep import sweep, write_csv
+
+    print(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format(os.path.basename(__file__)) + "*\n" +
+        "*" * 80
+    )
+
+    frame_sizes = [4, 8, 16, 32, 64, 128, 256]
+    focal_counts = [2, 4, 8, 16, 32, 64, 128, 256]
+    source_counts = [2, 3, 4, 5, 6, 8]
+    default_size = 16
+    default_focals = 8
+    max_time = 0.5 #Stop a sweep once a call takes longer than that (in seconds)
+
+    combinations = ["smets", "dempster", "disjunctive", "yager", "dubois_prade", "average", "murphy", "chen"]
+    queries = ["bel", "pl", "q", "betP"]
+
+    f = open("Results - scaling.txt", "w")
+    f.write(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format("Scaling sweeps") + "*\n" +
+        "*" * 80 + "\n\n" +
+        "Default frame size: " + str(default_size) + ", default nb focals: " + str(default_focals) + "\n\n"
+    )
+    runner = Runner(repeats=5, min_time=0.01, verbose=False)
+    results = []
+
+    def sources(size, nb_focals, nb_sources):
+        """
+        Gets reproducible random mass functions (the same ones for every operation).
+        """
+        generator = RandomDiscreteMassFunctionsGenerator(size, cache=False, seed=size * 1000 + nb_focals,
+                                                         structure=RandomDiscreteMassFunctionsGenerator.Structure.unstructured)
+        return [generator.build_evidence(nb_focals) for _ in range(nb_sources)]
+
+    def run(title, name, parameter, values, build, params):
+        runner.group = title
+        result = sweep(runner, name, parameter, values, build, params, max_time)
+        results.append(result)
+        print(result)
+        f.write(str(result) + "\n")
+
+    def section(title):
+        s = "- " * 40 + "\n" + title
+        print(s)
+        f.write(s + "\n")
+
+    # ***************
+    # Frame size (n):
+    # ***************
+    title = "Frame size (" + str(default_focals) + " focals, 2 sources):"
+    section(title)
+    for rule in combinations:
+        run(title, "combination_" + rule, "n", frame_sizes,
+            lambda n, rule=rule: (getattr(MassFunction, "combination_" + rule), sources(n, default_focals, 2)),
+            {"focals": default_focals, "sources": 2})
+    run(title, "distance", "n", frame_sizes,
+        lambda n: (MassFunction.distance, sources(n, default_focals, 2)), {"focals": default_focals, "sources": 2})
+    for query in queries:
+        run(title, query, "n", frame_sizes,
+            lambda n, query=query: (getattr(MassFunction, query), [sources(n, default_focals, 1)[0], sources(n, 1, 1)[0].focals.popitem()[0]]),
+            {"focals": default_focals})
+
+    # *************************
+    # Number of focal elements:
+    # *************************
+    title = "Number of focal elements (frame size " + str(default_size) + ", 2 sources):"
+    section(title)
+    for rule in combinations:
+        run(title, "combination_" + rule, "focals", focal_counts,
+            lambda k, rule=rule: (getattr(MassFunction, "combination_" + rule), sources(default_size, k, 2)),
+            {"n": default_size, "sources": 2})
+    run(title, "distance", "focals", focal_counts,
+        lambda k: (MassFunction.distance, sources(default_size, k, 2)), {"n": default_size, "sources": 2})
+    for query in queries:
+        run(title, query, "focals", focal_counts,
+            lambda k, query=query: (getattr(MassFunction, query), [sources(default_size, k, 1)[0], sources(default_size, 1, 1)[0].focals.popitem()[0]]),
+            {"n": default_size})
+    run(title, "MassFunction(*focals)", "focals", focal_counts,
+        lambda k: (MassFunction, list(sources(default_size, k, 1)[0].focals.items())), {"n": default_size})
+    run(title, "MassFunction.factory_constructor_unsafe(*focals)", "focals", focal_counts,
+        lambda k: (MassFunction.factory_constructor_unsafe, list(sources(default_size, k, 1)[0].focals.items())), {"n": default_size})
+
+    # ******************
+    # Number of sources:
+    # ******************
+    title = "Number of sources (frame size " + str(default_size) + ", " + str(default_focals) + " focals):"
+    section(title)
+    for rule in combinations:
+        run(title, "combination_" + rule, "sources", source_counts,
+            lambda s, rule=rule: (getattr(MassFunction, "combination_" + rule), sources(default_size, default_focals, s)),
+            {"n": default_size, "focals": default_focals})
+    run(title, "distance", "sources", source_counts,
+        lambda s: (MassFunction.distance, sources(default_size, default_focals, s)), {"n": default_size, "focals": default_focals})
+
+    f.close()
+    g = open("Results - scaling.csv", "w", newline="")
+    write_csv(g, results)
+    g.close()
+    runner.save("Results - scaling.json")
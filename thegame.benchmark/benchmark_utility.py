@@ -6,102 +6,113 @@
 #          Bastien.Pietropaoli@gmail.com                                       #
 # ---------------------------------------------------------------------------- #
 # This module provides some functions to better handle benchmarks for this     #
-# library. Nothing fancy, just some nice methods.                              #
+# library. Nothing fancy, just some nice methods on top of the harness of      #
+# thegame.benchmark.harness: every measurement is calibrated, repeated and     #
+# kept in ``runner`` so that the results can also be saved in JSON.            #
+# Set the environment variable THEGAME_PROFILE to "cprofile" or "sampling" to  #
+# profile every case too (in THEGAME_PROFILE_DIR, "profiles" by default).      #
 ################################################################################
 
+from thegame.benchmark import harness
+
 import time
 import copy
-
-from multiprocessing import Process, Queue
+import os
 
 ################################################################################
 ################################################################################
 ################################################################################
 
-# *********************************
-# Methods to call within processes:
-# *********************************
-
-def __execute(queue, nb_iterations, function, *args):
-    """
-    Executes the provided function nb_iterations times and
-    pushes the time it took into the queue.
+# The runner gathering all the measurements of a benchmark script:
+runner = harness.Runner(isolate=True, verbose=False, profile=os.environ.get("THEGAME_PROFILE") or None,
+                        profile_dir=os.environ.get("THEGAME_PROFILE_DIR", "profiles"))
 
-    Args:
-        queue (Queue): The queue to push the result in.
-        nb_iterations (int): The number of times the function should be called.
-        function (func.): The function to call.
-        args (whatever): The arguments for the function to call.
-    """
-    try:
-        start = time.clock()
-        for i in range(nb_iterations):
-            function(*args)
-        queue.put(time.clock() - start)
-    except Exception as e:
-        queue.put(e)
+# The current section of the benchmark script:
+__sections = {"category": "", "unlabelled": None}
 
+################################################################################
+################################################################################
 ################################################################################
 
-def __execute_multiple(queue, functions, *args):
+# *****************
+# Internal helpers:
+# *****************
+
+def __call_name(function, args):
     """
-    Executes the provided functions exactly once each. They'll all be called
-    with the same provided arguments. This is to be used with bounded methods
-    on multiple copies of the provided object. Pushes the time it took into the
-    queue.
+    Gets the name of a call as written in the results.
 
     Args:
-        queue (Queue): The queue to push the result in.
-        functions (list[func]): The functions to call.
-        args: The arguments for the functons to call.
+        function (func): The called function.
+        args (whatever): The arguments of the call.
+    Returns:
+        str -- The name of the call.
     """
-    try:
-        start = time.clock()
-        for function in functions:
-            function(*args)
-        queue.put(time.clock() - start)
-    except Exception as e:
-        queue.put(e)
+    s = function.__name__ + "("
+    for arg in args:
+        arg = str(arg)
+        s += (arg if len(arg) <= 40 else arg[:20] + "...(" + str(len(arg)) + " chars)") + ", "
+    return s[:-2] + ")" if len(args) > 0 else s + ")"
 
 ################################################################################
 
-def __access_property(queue, nb_iterations, obj, property_name):
+def __copies_timer(obj, access):
     """
-    Accesses the provided property nb_iterations times and
-    pushes the time it took into the queue.
+    Builds a timer calling ``access`` once on each one of ``loops`` deep copies of the
+    object, the copies being made before starting the clock.
 
     Args:
-        queue (Queue): The queue to push the result in.
-        nb_iterations (int): The number of times the property should be accessed.
-        obj (object): The object on which the property should be accessed.
-        property_name (str): The name of the property to access.
+        obj (object): The object to copy.
+        access (func): The function to call on each copy.
+    Returns:
+        func -- The timer.
     """
-    try:
-        start = time.clock()
-        for i in range(nb_iterations):
-            getattr(obj, property_name)
-        queue.put(time.clock() - start)
-    except Exception as e:
-        queue.put(e)
+    def timer(loops):
+        objects = [copy.deepcopy(obj) for _ in range(loops)]
+        start = time.perf_counter_ns()
+        for o in objects:
+            access(o)
+        return time.perf_counter_ns() - start
+    return timer
 
 ################################################################################
 
-def __access_property_multiple(queue, objects, property_name):
+def __measure(nb_iterations, name, timer, timeout, isolate, verbose, file):
     """
-    Accesses the provided property once on every object provided in objects.
+    Measures a case with the shared runner and converts the result to the number of
+    seconds ``nb_iterations`` calls take.
 
     Args:
-        queue (Queue): The queue to push the result in.
-        objects (list[object]): The objects on which the property should be accessed.
-        property_name (str): The name of the property to access.
+        nb_iterations (int): The maximum number of calls per repeat.
+        name (str): The name of the case.
+        timer (func): The timer of the case.
+        timeout (float): The timeout of the case.
+        isolate (bool): If the case should run in its own process.
+        verbose (bool): If set to ``True``, prints results in the console.
+        file (file): An open file to write results in.
+    Returns:
+        float -- The number of seconds nb_iterations calls take (median of the repeats),
+        -1 if it timed out, -2 if the process crashed.
     """
-    try:
-        start = time.clock()
-        for obj in objects:
-            getattr(obj, property_name)
-        queue.put(time.clock() - start)
-    except Exception as e:
-        queue.put(e)
+    runner.max_loops = nb_iterations
+    runner.timeout = timeout
+    measurement = runner.run(name, timer, isolate=isolate)
+    if measurement.status == "timeout":
+        result = -1
+    elif measurement.status == "crashed":
+        result = -2
+    else:
+        result = measurement.median * nb_iterations / 1e9
+
+    #Results that are not printed here are labelled by the next call to format_time():
+    __sections["unlabelled"] = measurement if not verbose and file == None else None
+    if verbose or file != None:
+        s = format_time(name, result, nb_iterations, timeout)
+        if verbose:
+            print(s)
+        if file != None:
+            file.write(s + "\n")
+    return result
 
 ################################################################################
 ################################################################################
@@ -111,10 +122,46 @@ def __access_property_multiple(queue, objects, property_name):
 # Methods to call in benchmarks:
 # ******************************
 
+def section(title, file=None):
+    """
+    Starts a new section of the benchmark: prints its title and groups the next
+    measurements under it. Titles in capital letters start a category, the other
+    ones a section of the current category.
+
+    Args:
+        title (str): The title of the section.
+        file (file): An open file to write the title in.
+    """
+    print(title)
+    if file != None:
+        file.write(title + "\n")
+    name = title.strip().rstrip(":")
+    if name.isupper():
+        __sections["category"] = name
+        runner.group = name
+    else:
+        runner.group = __sections["category"] + " / " + name if __sections["category"] != "" else name
+
+################################################################################
+
+def save_results(path):
+    """
+    Saves all the measurements taken so far in a JSON file (see
+    ``thegame.benchmark.harness.Runner.save()``).
+
+    Args:
+        path (str): The path to the JSON file.
+    """
+    runner.save(path)
+
+################################################################################
+
 def format_time(function_name, time, nb_iterations, timeout):
     """
     Provides a nicely formatted string given a function name, a time of execution
-    and the number of iterations.
+    and the number of iterations. If the last measurement was taken without
+    printing it (``verbose=False``), it is labelled with the given function name
+    in the JSON results.
 
     Args:
         function_name (str): The name of the function that was executed.
@@ -124,6 +171,10 @@ def format_time(function_name, time, nb_iterations, timeout):
     Returns:
         str -- A nicely formatted string to print the time the execution took.
     """
+    if __sections["unlabelled"] != None:
+        __sections["unlabelled"].name = function_name
+        __sections["unlabelled"] = None
+
     s = function_name
     if time == -1:
         s = ("{:<50}".format(s if len(s) <= 50 else s[0:36] + "...)") +
@@ -140,173 +191,91 @@ def format_time(function_name, time, nb_iterations, timeout):
 
 def time_function(nb_iterations, function, *args, timeout=30, bounded_copy=False, verbose=True, file=None):
     """
-    Returns the number of seconds it took to execute the provided function X
-    number of times. If put to verbose, prints the time it takes for the
-    function to be executed once, in microseconds. There is a default timeout
-    of 30s. An open file can be provided to write the results as well.
+    Returns the number of seconds it takes to execute the provided function X
+    number of times. The function is run in another process, warmed up, its
+    number of loops per repeat is calibrated (up to nb_iterations) and it is
+    timed several times: the median time per call is used. If put to verbose,
+    prints the time it takes for the function to be executed once, in
+    microseconds. There is a default timeout of 30s. An open file can be
+    provided to write the results as well.
 
     Args:
         nb_iterations (int): The number of times the function should be
-            executed.
+            executed (at most per repeat).
         function (func): The function to execute.
         args (whatever): The arguments to pass the the function to benchmark.
         timeout (int): The maximum time for the execution before it times out.
             If set to 0 or a negative number, there will be no timeout for tests.
         bounded_copy (bool): If set to ``True``, function must be a method bounded
             to an object, then the object to which it is bounded will be copied
-            nb_iterations times (yep, this is a lot) and the method will be called
+            for each call (out of the timed loop) and the method will be called
             once on each object.
         verbose (bool): If set to ``True``, prints results in the console.
         file (file): An open file to write results in.
     Returns:
         float -- The number of seconds the execution took, -1 if it timed out.
     """
-    #Executing the function in another process to be able to time it out.
-    #The queue is used to gather the time of execution.
-    queue = Queue()
     if bounded_copy:
-        functions = []
-        obj = function.__self__  #Get the instance to which the function is bounded
         name = function.__name__ #Get the name of the function
-        for i in range(nb_iterations):
-            functions.append(getattr(copy.deepcopy(obj), name)) #Get the method and bound it to a deep copy
-        p = Process(target=__execute_multiple, args=((queue, functions) + args))
-    else:
-        p = Process(target=__execute, args=((queue, nb_iterations, function) + args))
-    p.start()
-    if timeout > 0:
-        p.join(timeout)
-    else:
-        p.join()
-
-    result = -1
-    if p.is_alive():
-        p.terminate()
-        p.join()
+        timer = __copies_timer(function.__self__, lambda o: getattr(o, name)(*args))
     else:
-        if not queue.empty():
-            result = queue.get(False)
-            if isinstance(result, Exception):
-                raise result
-        else:
-            result = -2
-    
-    if verbose or file != None:
-        s = function.__name__ + "("
-        for arg in args:
-            s += str(arg) + ", "
-        s = s[:-2] + ")" if len(args) > 0 else s + ")"
-        s = format_time(s, result, nb_iterations, timeout)
-        if verbose:
-            print(s)
-        if file != None:
-            file.write(s + "\n")
-
-    return result
+        timer = harness.loop_timer(function, *args)
+    return __measure(nb_iterations, __call_name(function, args), timer, timeout, True, verbose, file)
 
 ################################################################################
 
 def time_function_cannot_be_pickled(nb_iterations, function, *args, bounded_copy=False, verbose=True, file=None):
     """
-    Returns the number of seconds it took to execute the provided function X
+    Returns the number of seconds it takes to execute the provided function X
     number of times. This is specific for methods that cannot be pickled (because
-    of decorators for instance...). Thus, no timeout can be applied. Just pray it
-    won't take too long. An open file can be provided to write the results as well.
+    of decorators for instance...) thus they are run in the current process and
+    no timeout can be applied. Just pray it won't take too long. An open file can
+    be provided to write the results as well.
 
     Args:
         nb_iterations (int): The number of times the function should be
-            executed.
+            executed (at most per repeat).
         function (func): The function to execute.
         args (whatever): The arguments to pass the the function to benchmark.
         bounded_copy (bool): If set to ``True``, function must be a method bounded
             to an object, then the object to which it is bounded will be copied
-            nb_iterations times (yep, this is a lot) and the method will be called
+            for each call (out of the timed loop) and the method will be called
             once on each object.
         verbose (bool): If set to ``True``, prints results in the console.
         file (file): An open file to write results in.
     Returns:
-        float -- The number of seconds the execution took, -1 if it timed out.
+        float -- The number of seconds the execution took.
     """
-    #Executing the function in another process to be able to time it out.
-    #The queue is used to gather the time of execution.
-    queue = Queue()
     if bounded_copy:
-        functions = []
-        obj = function.__self__  #Get the instance to which the function is bounded
         name = function.__name__ #Get the name of the function
-        for i in range(nb_iterations):
-            functions.append(getattr(copy.deepcopy(obj), name)) #Get the method and bound it to a deep copy
-        start = time.time()
-        for function in functions:
-            function(*args)
-        result = time.time() - start
+        timer = __copies_timer(function.__self__, lambda o: getattr(o, name)(*args))
     else:
-        start = time.time()
-        for i in range(nb_iterations):
-            function(*args)
-        result = time.time() - start
-    
-    if verbose or file != None:
-        s = function.__name__ + "("
-        for arg in args:
-            s += str(arg) + ", "
-        s = s[:-2] + ")" if len(args) > 0 else s + ")"
-        s = format_time(s, result, nb_iterations, timeout)
-        if verbose:
-            print(s)
-        if file != None:
-            file.write(s + "\n")
-
-    return result
+        timer = harness.loop_timer(function, *args)
+    return __measure(nb_iterations, __call_name(function, args), timer, 0, False, verbose, file)
 
 ################################################################################
 
 def time_property(nb_iterations, obj, property_name, timeout=30, bounded_copy=False):
     """
-    Returns the number of seconds it took to access the given property X
-    number of times. If put to verbose, prints the time it takes for the
-    function to be executed once, in microseconds. There is a default timeout
-    of 30s. An open file can be provided to write the results as well.
+    Returns the number of seconds it takes to access the given property X
+    number of times (see ``time_function()``). There is a default timeout of 30s.
 
     Args:
         nb_iterations (int): The number of times the function should be
-            executed.
+            executed (at most per repeat).
         obj (object): The object on which the property should be accessed.
         property_name (str): The name of the property to access.
         timeout (int): The maximum time for the execution before it times out.
             If set to 0 or a negative number, there will be no timeout for tests.
         bounded_copy (bool): If set to ``True`` then the object will be copied
-            nb_iterations times (yep, this is a lot) and the property will be accessed
+            for each access (out of the timed loop) and the property will be accessed
             once on each object.
     Returns:
         float -- The number of seconds the execution took, -1 if it timed out.
     """
-    #Executing the function in another process to be able to time it out.
-    #The queue is used to gather the time of execution.
-    queue = Queue()
     if bounded_copy:
-        objects = []
-        for i in range(nb_iterations):
-            objects.append(copy.deepcopy(obj))
-        p = Process(target=__access_property_multiple, args=(queue, objects, property_name))
-    else:
-        p = Process(target=__access_property, args=(queue, nb_iterations, obj, property_name))
-    p.start()
-    if timeout > 0:
-        p.join(timeout)
+        timer = __copies_timer(obj, lambda o: getattr(o, property_name))
     else:
-        p.join()
-
-    result = -1
-    if p.is_alive():
-        p.terminate()
-        p.join()
-    else:
-        if not queue.empty():
-            result = queue.get(False)
-            if isinstance(result, Exception):
-                raise result
-        else:
-            result = -2
-
-    return result
+        timer = harness.loop_timer(getattr, obj, property_name)
+    name = type(obj).__name__ + "." + property_name
+    return __measure(nb_iterations, name, timer, timeout, True, False, None)
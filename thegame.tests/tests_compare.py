@@ -0,0 +1,100 @@
+#!/usr/bin/python
+
+################################################################################
+# thegame.tests_compare.py                                                     #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module only provides a main that executes short tests to check that     #
+# methods of benchmark/compare.py provide expected results.                    #
+################################################################################
+
+###############
+# MAIN: TESTS #
+###############
+
+if __name__ == '__main__':
+    import tests_utility
+    import sys
+    import os
+    PACKAGE_PARENT = '..'
+    SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+    sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+    import thegame
+    from thegame.benchmark.harness import Measurement, Runner
+    from thegame.benchmark.compare import *
+    import tempfile
+    import shutil
+
+    print(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format(os.path.basename(__file__)) + "*\n" +
+        "*" * 80
+    )
+
+    # A dictionary with function names as keys and a list of calls that failed for each one of them
+    # in the form ("call_that_failed()", "reason", exception if there's one (can be None))
+    failed = {}
+
+    ###############################
+    # TESTS: compare / Comparison #
+    ###############################
+
+    function = "compare(base, new, threshold, confidence) / main(argv)"
+    print("Test of " + function + " ...")
+
+    noisy = [100, 102, 98, 101, 99, 103, 97]
+    base = [
+        Measurement("stable", times=noisy, group="A"),
+        Measurement("slower", times=noisy, group="A"),
+        Measurement("faster", times=noisy, group="A"),
+        Measurement("gone", times=noisy),
+        Measurement("broken", times=noisy),
+    ]
+    new = [
+        Measurement("stable", times=[t + 1 for t in noisy], group="A"),
+        Measurement("slower", times=[t * 1.5 for t in noisy], group="A"),
+        Measurement("faster", times=[t / 2 for t in noisy], group="A"),
+        Measurement("added", times=noisy),
+        Measurement("broken", status="timeout"),
+    ]
+    comparisons, unmatched = compare(base, new)
+    verdicts = dict((c.name, c.verdict) for c in comparisons)
+    slower = [c for c in comparisons if c.name == "slower"][0]
+
+    temporary = tempfile.mkdtemp()
+    def save(measurements, name):
+        return tests_utility.save_results(Runner(verbose=False), measurements, os.path.join(temporary, name))
+    base_path, new_path, same_path = save(base, "base.json"), save(new, "new.json"), save(base[:3], "same.json")
+    def run(*argv):
+        return tests_utility.run_quietly(main, list(argv))
+    history = os.path.join(temporary, "history")
+    stored = store(base_path, history)
+
+    tests = [
+        ({"stable": "unchanged", "slower": "regression", "faster": "improvement"}, lambda: verdicts),
+        (["gone", "added"],                  lambda: unmatched),
+        (True,                               lambda: abs(slower.speedup - 2 / 3) < 1e-9),
+        (True,                               lambda: slower.interval[0] <= slower.speedup <= slower.interval[1]),
+        (comparisons[1].interval,            lambda: compare(base, new)[0][1].interval),
+        ("unchanged",                        lambda: compare(base, new, threshold=0.6)[0][1].verdict),
+        (1,                                  run, "compare", base_path, new_path),
+        (0,                                  run, "compare", base_path, same_path),
+        (0,                                  run, "compare", base_path, new_path, "--threshold", "0.6"),
+        ([stored],                           list_history, history),
+        (True,                               lambda: "_thegame-" + thegame.__version__ + "_" in os.path.basename(stored)),
+        ([],                                 list_history, os.path.join(temporary, "nope")),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    shutil.rmtree(temporary)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    ################################################################################
+    print('\n')
+    tests_utility.browse_failures(failed)
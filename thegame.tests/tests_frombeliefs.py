@@ -0,0 +1,261 @@
+#!/usr/bin/python
+
+################################################################################
+# thegame.tests_frombeliefs.py                                                 #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module only provides a main that executes short tests to check that     #
+# methods of construction/frombeliefs.py provide expected results.             #
+################################################################################
+
+###############
+# MAIN: TESTS #
+###############
+
+if __name__ == '__main__':
+    import tests_utility
+    import sys
+    import os
+    PACKAGE_PARENT = '..'
+    SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+    sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+    from thegame.element import DiscreteElement
+    from thegame.massfunction import MassFunction
+    from thegame.construction.frombeliefs import *
+
+    print(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format(os.path.basename(__file__)) + "*\n" +
+        "*" * 80
+    )
+
+    # A dictionary with function names as keys and a list of calls that failed for each one of them
+    # in the form ("call_that_failed()", "reason", exception if there's one (can be None))
+    failed = {}
+
+    RESOURCES = os.path.join(SCRIPT_DIR, "Resources", "BeliefsFromBeliefs")
+    Format = DiscreteMassFunctionsFromBeliefsGenerator.ModelFormat
+
+    generator = DiscreteMassFunctionsFromBeliefsGenerator()
+    generator.load_model(os.path.join(RESOURCES, "XML", "BFB-load.xml"), Format.XML)
+    mapping = generator.mappings["Posture"]
+    sub = mapping.ref_list
+    lying    = DiscreteElement.factory_from_ref_list(sub, "LyingDown")
+    standing = DiscreteElement.factory_from_ref_list(sub, "Standing")
+    seated   = DiscreteElement.factory_from_ref_list(sub, "Seated")
+    yes    = DiscreteElement.factory_from_ref_list(generator.ref_list, "yes")
+    no     = DiscreteElement.factory_from_ref_list(generator.ref_list, "no")
+    yes_no = DiscreteElement.factory_from_ref_list(generator.ref_list, "yes", "no")
+    empty  = DiscreteElement(2)
+
+    ####################################
+    # TESTS: DiscreteEvidentialMapping #
+    ####################################
+
+    function = "DiscreteEvidentialMapping.get_evidence(self, mass_function) / get_evidence_batch(self, mass_functions)"
+    print("Test of " + function + " ...")
+
+    m1 = MassFunction((lying, 0.5), (standing, 0.3), (DiscreteElement(3), 0.2))
+    m2 = MassFunction((seated, 1.0))
+    transferred = MassFunction((yes, 0.35), (yes_no, 0.1), (no, 0.35), (empty, 0.2))
+    added = DiscreteEvidentialMapping("Posture", sub, DiscreteMappingVector(lying, (yes, 1.0)))
+    added.get_evidence(MassFunction((lying, 1.0)))
+    added.add_vector(DiscreteMappingVector(seated, (no, 1.0)))
+
+    tests = [
+        (transferred,                                  mapping.get_evidence, m1),
+        (MassFunction((yes, 0.1), (yes_no, 0.2), (no, 0.7)), mapping.get_evidence, m2),
+        ([transferred, mapping.get_evidence(m2), transferred], mapping.get_evidence_batch, [m1, m2, m1]),
+        ([],                                           mapping.get_evidence_batch, []),
+        ({"Posture": transferred, "Nope": None},       generator.get_evidence, ("Posture", m1), ("Nope", m1)),
+        ([mapping.get_evidence(m2)],                   generator.get_evidence_batch, "Posture", [m2]),
+        (MassFunction((no, 1.0)),                      added.get_evidence, MassFunction((seated, 1.0))),
+        (True,                                         lambda: mapping.compile() is mapping.compile()),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    tests = [
+        (KeyError, added.get_evidence, MassFunction((standing, 1.0))),
+        (KeyError, generator.get_evidence_batch, "Nope", [m1]),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    print("--------------------------------------------------------------------------------")
+
+    #################################
+    # TESTS: EvidentialMappingChain #
+    #################################
+
+    function = "DiscreteEvidentialMapping.compose(*mappings) / EvidentialMappingChain.get_evidence(self, mass_function)"
+    print("Test of " + function + " ...")
+
+    def alarm_generator(ref_list):
+        alarm = DiscreteMassFunctionsFromBeliefsGenerator("Alarm")
+        alarm.ref_list = ["on", "off"]
+        on, off = DiscreteElement(2, 1), DiscreteElement(2, 2)
+        y, n = (DiscreteElement.factory_from_ref_list(ref_list, state) for state in ("yes", "no"))
+        alarm.mappings["Sleeping"] = DiscreteEvidentialMapping("Sleeping", ref_list,
+            DiscreteMappingVector(y,                   (on, 0.9), (DiscreteElement(2, 3), 0.1)),
+            DiscreteMappingVector(n,                   (off, 1.0)),
+            DiscreteMappingVector(y.union(n),          (DiscreteElement(2, 3), 1.0)),
+        )
+        return alarm
+
+    alarm = alarm_generator(["yes", "no"])
+    chain = EvidentialMappingChain((generator, "Posture"), (alarm, "Sleeping"))
+    composed = DiscreteEvidentialMapping.compose(mapping, alarm.mappings["Sleeping"])
+    two_steps = lambda m: alarm.mappings["Sleeping"].get_evidence(mapping.get_evidence(m))
+    results = [chain.get_evidence(m1), chain.get_evidence(m2)]
+    nb_before_reload = chain.nb_compositions
+    generator.load_model(os.path.join(RESOURCES, "XML", "BFB-load.xml"), Format.XML)
+    after_reload = chain.get_evidence(m1)
+    nb_after_reload = chain.nb_compositions
+    alarm.mappings["Sleeping"].add_vector(DiscreteMappingVector(DiscreteElement(2), (DiscreteElement(2), 1.0)))
+    chain.get_evidence(m1)
+    swapped = EvidentialMappingChain((generator, "Posture"), (alarm_generator(["no", "yes"]), "Sleeping"))
+
+    tests = [
+        (True,                                    composed.is_valid),
+        (1,                                       lambda: nb_before_reload),
+        ([two_steps(m1), two_steps(m2)],          lambda: results),
+        (two_steps(m1),                           composed.get_evidence, m1),
+        ([two_steps(m1), two_steps(m2)],          chain.get_evidence_batch, [m1, m2]),
+        (two_steps(m1),                           lambda: after_reload),
+        (2,                                       lambda: nb_after_reload),
+        (3,                                       lambda: chain.nb_compositions),
+        (mapping.get_evidence(m2),                DiscreteEvidentialMapping.compose(mapping).get_evidence, m2),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    tests = [
+        (ValueError,                DiscreteEvidentialMapping.compose),
+        (ValueError,                EvidentialMappingChain),
+        (IncompatibleMappingsError, swapped.get_mapping),
+        (IncompatibleMappingsError, DiscreteEvidentialMapping.compose, mapping, mapping),
+        (KeyError,                  EvidentialMappingChain((generator, "Nope")).get_mapping),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    print("--------------------------------------------------------------------------------")
+
+    ##############################
+    # TESTS: Sparse/lazy mapping #
+    ##############################
+
+    function = "DiscreteEvidentialMapping.derive(self, element_from) / DiscreteMassFunctionsFromBeliefsGenerator.get_mapping(self, frame_name)"
+    print("Test of " + function + " ...")
+
+    Derivation = DiscreteEvidentialMapping.Derivation
+    atoms = (
+        DiscreteMappingVector(lying,    (yes, 0.7), (yes_no, 0.3)),
+        DiscreteMappingVector(standing, (no, 1.0)),
+        DiscreteMappingVector(seated,   (yes, 0.5), (no, 0.5)),
+    )
+    sparse = DiscreteEvidentialMapping("Posture", sub, *atoms, derivation=Derivation.disjunctive, max_derived=2)
+    unions = DiscreteEvidentialMapping("Posture", sub, *atoms, derivation=Derivation.union)
+    explicit = DiscreteEvidentialMapping("Posture", sub, *(atoms + (
+        DiscreteMappingVector(lying.union(standing), (yes_no, 1.0)),
+        DiscreteMappingVector(lying.union(seated),   (yes, 0.35), (yes_no, 0.65)),
+    )))
+    m3 = MassFunction((lying.union(standing), 0.4), (lying.union(seated), 0.6))
+    sparse.get_evidence(MassFunction((DiscreteElement(3, 7), 1.0)))
+    sparse.get_evidence(m3)
+    incomplete = DiscreteEvidentialMapping("Posture", sub, *atoms[:2], derivation=Derivation.disjunctive)
+    sparse_generator = DiscreteMassFunctionsFromBeliefsGenerator()
+    sparse_generator.ref_list = generator.ref_list
+    sparse_generator.mappings["Posture"] = sparse
+    sparse_chain = EvidentialMappingChain((sparse_generator, "Posture"), (alarm, "Sleeping"))
+    composed = DiscreteEvidentialMapping.compose(sparse, alarm.mappings["Sleeping"])
+
+    lazy_xml = DiscreteMassFunctionsFromBeliefsGenerator()
+    lazy_xml.load_model(os.path.join(RESOURCES, "XML", "BFB-load.xml"), Format.XML, lazy=True)
+    lazy_dir = DiscreteMassFunctionsFromBeliefsGenerator()
+    lazy_dir.load_model(os.path.join(RESOURCES, "Sleeping"), Format.custom_directory, lazy=True)
+    names_before = (list(lazy_xml.mappings), lazy_xml.get_mapping_names())
+    eager_dir = DiscreteMassFunctionsFromBeliefsGenerator()
+    eager_dir.load_model(os.path.join(RESOURCES, "Sleeping"), Format.custom_directory)
+
+    #Several mappings, non-ASCII characters before them and malformed models:
+    import tempfile
+    import shutil
+    temporary = tempfile.mkdtemp()
+    f = open(os.path.join(RESOURCES, "XML", "BFB-load.xml"), encoding="utf-8")
+    source = f.read()
+    f.close()
+    block = source[source.index("<evidential-mapping>"):source.index("</evidential-mapping>") + len("</evidential-mapping>")]
+    several_path = os.path.join(temporary, "several.xml")
+    f = open(several_path, "w", encoding="utf-8")
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n' + source.replace(block, block.replace('"Posture"', '"Pösture"') + "\n" + block))
+    f.close()
+    lazy_several = DiscreteMassFunctionsFromBeliefsGenerator()
+    lazy_several.load_model(several_path, Format.XML, lazy=True)
+    eager_several = DiscreteMassFunctionsFromBeliefsGenerator()
+    eager_several.load_model(several_path, Format.XML)
+    malformed_path = os.path.join(temporary, "malformed.xml")
+    f = open(malformed_path, "w")
+    f.write("<model></model>")
+    f.close()
+    no_values = os.path.join(temporary, "Sleeping")
+    shutil.copytree(os.path.join(RESOURCES, "Sleeping"), no_values)
+    os.remove(os.path.join(no_values, "Posture", "values"))
+    lazy_no_values = DiscreteMassFunctionsFromBeliefsGenerator()
+    lazy_no_values.load_model(no_values, Format.custom_directory, lazy=True)
+
+    tests = [
+        (explicit.get_evidence(m3),               sparse.get_evidence, m3),
+        (2,                                       lambda: len(sparse.compile().derived)),
+        (MassFunction((yes_no, 1.0)),             unions.get_evidence, MassFunction((lying.union(seated), 1.0))),
+        (True,                                    sparse.is_valid),
+        (False,                                   incomplete.is_valid),
+        (False,                                   explicit.is_valid),
+        (True,                                    composed.is_valid),
+        (alarm.mappings["Sleeping"].get_evidence(explicit.get_evidence(m3)), composed.get_evidence, m3),
+        (composed.get_evidence(m3),               sparse_chain.get_evidence, m3),
+        (([], ["Posture"]),                       lambda: names_before),
+        (mapping.get_evidence(m1),                lambda: lazy_xml.get_mapping("Posture").get_evidence(m1)),
+        (["Posture"],                             lambda: list(lazy_xml.mappings)),
+        ({"Posture": eager_dir.mappings["Posture"].get_evidence(m1)}, lazy_dir.get_evidence, ("Posture", m1)),
+        (True,                                    lazy_dir.is_valid),
+        ((eager_several.frame_name, eager_several.ref_list), lambda: (lazy_several.frame_name, lazy_several.ref_list)),
+        (["Pösture", "Posture"],                  lazy_several.get_mapping_names),
+        (mapping.get_evidence(m1),                lambda: lazy_several.get_mapping("Posture").get_evidence(m1)),
+        (eager_several.mappings["Pösture"].ref_list, lambda: lazy_several.get_mapping("Pösture").ref_list),
+        (True,                                    lazy_several.is_valid),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    tests = [
+        (KeyError,   incomplete.get_evidence, MassFunction((lying.union(seated), 1.0))),
+        (KeyError,   explicit.get_evidence, MassFunction((standing.union(seated), 1.0))),
+        (KeyError,   lazy_xml.get_mapping, "Nope"),
+        (ValueError, lambda: DiscreteEvidentialMapping("Posture", sub, max_derived=0)),
+        (InvalidBeliefsFromBeliefsModelError, DiscreteMassFunctionsFromBeliefsGenerator().load_model, malformed_path, Format.XML),
+        (InvalidBeliefsFromBeliefsModelError, lambda: DiscreteMassFunctionsFromBeliefsGenerator().load_model(malformed_path, Format.XML, lazy=True)),
+        (MissingInformationError, DiscreteMassFunctionsFromBeliefsGenerator().load_model, no_values, Format.custom_directory),
+        (MissingInformationError, DiscreteMassFunctionsFromBeliefsGenerator().load_model, os.path.join(no_values, "Posture"), Format.custom_directory),
+        (MissingInformationError, lazy_no_values.get_mapping, "Posture"),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    shutil.rmtree(temporary)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    ################################################################################
+    print('\n')
+    tests_utility.browse_failures(failed)
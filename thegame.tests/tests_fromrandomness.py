@@ -0,0 +1,170 @@
+#!/usr/bin/python
+
+################################################################################
+# thegame.tests_fromrandomness.py                                              #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module only provides a main that executes short tests to check that     #
+# methods of construction/fromrandomness.py provide expected results.          #
+################################################################################
+
+###############
+# MAIN: TESTS #
+###############
+
+if __name__ == '__main__':
+    import tests_utility
+    import sys
+    import os
+    PACKAGE_PARENT = '..'
+    SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+    sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+    from thegame.construction.fromrandomness import *
+    import io
+
+    print(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format(os.path.basename(__file__)) + "*\n" +
+        "*" * 80
+    )
+
+    # A dictionary with function names as keys and a list of calls that failed for each one of them
+    # in the form ("call_that_failed()", "reason", exception if there's one (can be None))
+    failed = {}
+
+    Distribution = RandomDiscreteMassFunctionsGenerator.MassDistribution
+    Structure = RandomDiscreteMassFunctionsGenerator.Structure
+
+    ###############################################
+    # TESTS: RandomDiscreteMassFunctionsGenerator #
+    ###############################################
+
+    function = "RandomDiscreteMassFunctionsGenerator.build_evidence(self, nb_focals) / build_many(self, count, nb_focals)"
+    print("Test of " + function + " ...")
+
+    def stream(seed, nb_states=32, **kwargs):
+        generator = RandomDiscreteMassFunctionsGenerator(nb_states, cache=False, seed=seed, **kwargs)
+        return [generator.build_evidence(5) for _ in range(10)]
+
+    def valid(mass_functions, nb_states, nb_focals):
+        return all(
+            len(m.focals) == nb_focals and m.has_valid_sum() and
+            all(e.size == nb_states and 0 <= e._number < 2**nb_states for e in m.focals)
+            for m in mass_functions
+        )
+
+    cached = RandomDiscreteMassFunctionsGenerator(3, seed=1)
+    huge = RandomDiscreteMassFunctionsGenerator(100, cache=False, seed=1)
+    huge_cached = RandomDiscreteMassFunctionsGenerator(200, seed=1)
+    first, second = cached.build_evidence(8), cached.build_evidence(8)
+    packed = RandomDiscreteMassFunctionsGenerator(40, cache=False, seed=7, distribution=Distribution.dirichlet).build_many(100, 6)
+    unpacked = RandomDiscreteMassFunctionsGenerator(40, cache=False, seed=7, distribution=Distribution.dirichlet)
+    unpacked = [unpacked.build_evidence(6) for _ in range(100)]
+
+    tests = [
+        (stream(42),                                   stream, 42),
+        (False,                                        lambda: stream(42) == stream(43)),
+        (True,                                         lambda: valid(stream(1), 32, 5)),
+        (True,                                         lambda: valid(stream(1, distribution=Distribution.dirichlet, concentration=0.1), 32, 5)),
+        (True,                                         lambda: valid(stream(1, distribution=Distribution.stick_breaking), 32, 5)),
+        (True,                                         lambda: valid([cached.build_evidence(8)], 3, 8)),
+        (True,                                         lambda: valid([huge.build_evidence(50)], 100, 50)),
+        (True,                                         lambda: valid([huge_cached.build_evidence(50)], 200, 50)),
+        (set(id(e) for e in first.focals),             lambda: set(id(e) for e in second.focals)),
+        (RandomDiscreteMassFunctionsGenerator(32, False, 9).build_evidence(5), RandomDiscreteMassFunctionsGenerator(32, True, 9).build_evidence, 5),
+        (50,                                           lambda: len(set(huge.draw_numbers(50)))),
+        (100,                                          lambda: len(packed)),
+        (600,                                          lambda: len(packed.masses)),
+        (unpacked,                                     lambda: list(packed)),
+        (unpacked[-1],                                 lambda: packed[-1]),
+        (list,                                         lambda: type(RandomDiscreteMassFunctionsGenerator(70, False).build_many(1, 1).numbers)),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    tests = [
+        (ValueError, RandomDiscreteMassFunctionsGenerator, 0),
+        (ValueError, RandomDiscreteMassFunctionsGenerator, 3, True, None, Distribution.dirichlet, 0),
+        (ValueError, cached.build_evidence, 9),
+        (ValueError, cached.build_many, 10, 0),
+        (IndexError, packed.__getitem__, 100),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    print("--------------------------------------------------------------------------------")
+
+    ######################################
+    # TESTS: Structured random workloads #
+    ######################################
+
+    function = "RandomDiscreteMassFunctionsGenerator.build_sources(self, nb_sources, nb_focals, conflict) / write_many(self, file, count, nb_focals)"
+    print("Test of " + function + " ...")
+
+    def structured(structure, nb_focals, nb_states=12):
+        generator = RandomDiscreteMassFunctionsGenerator(nb_states, cache=False, seed=3, structure=structure, additivity=2)
+        return [generator.build_evidence(nb_focals) for _ in range(20)]
+
+    def nested(m):
+        focals = sorted(m.focals, key=lambda e: bin(e._number).count("1"))
+        return all(a._number & b._number == a._number for a, b in zip(focals, focals[1:]))
+
+    def conflict(level, structure=Structure.unstructured):
+        generator = RandomDiscreteMassFunctionsGenerator(12, cache=False, seed=5, structure=structure)
+        m1, m2 = generator.build_sources(2, 2, level)
+        combined = m1.combination_smets_unsafe(m2)
+        return sum(v for e, v in combined.focals.items() if e.is_empty())
+
+    generator = RandomDiscreteMassFunctionsGenerator(40, cache=False, seed=9, structure=Structure.consonant)
+    f = io.StringIO()
+    generator.write_many(f, 5, 3)
+    generator.write_many(f, 5, 3, nb_sources=3, conflict=0.5)
+    f.seek(0)
+    records = list(RandomDiscreteMassFunctionsGenerator.read_many(f))
+    f.seek(0)
+    nb_lines = len(f.getvalue().splitlines())
+    generator = RandomDiscreteMassFunctionsGenerator(40, cache=False, seed=9, structure=Structure.consonant)
+    expected = [generator.build_evidence(3) for _ in range(5)]
+
+    tests = [
+        (True,          lambda: all(len(m.focals) == 5 and all(bin(e._number).count("1") == 1 for e in m.focals) for m in structured(Structure.bayesian, 5))),
+        (True,          lambda: all(len(m.focals) == 6 and nested(m) for m in structured(Structure.consonant, 6))),
+        (True,          lambda: all(any(e._number == 2**12 - 1 for e in m.focals) and len(m.focals) == 2 for m in structured(Structure.simple_support, 2))),
+        (True,          lambda: all(len(m.focals) == 30 and all(0 < bin(e._number).count("1") <= 2 for e in m.focals) for m in structured(Structure.k_additive, 30))),
+        (True,          lambda: all(m.has_valid_sum() for m in structured(Structure.k_additive, 3, 100))),
+        (0,             conflict, 0),
+        (1,             lambda: round(conflict(1), 6)),
+        (True,          lambda: 0 < conflict(0.5) < 1),
+        (0,             conflict, 0, Structure.bayesian),
+        (1,             lambda: round(conflict(1, Structure.consonant), 6)),
+        (True,          lambda: all(m.has_valid_sum() for m in RandomDiscreteMassFunctionsGenerator(12, seed=1).build_sources(5, 4, 0.3))),
+        (12,            lambda: nb_lines),
+        ([1] * 5 + [3] * 5, lambda: [len(record) for record in records]),
+        (expected,      lambda: [record[0] for record in records[:5]]),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    tests = [
+        (ValueError, structured, Structure.bayesian, 13),
+        (ValueError, structured, Structure.simple_support, 3),
+        (ValueError, structured, Structure.k_additive, 79),
+        (ValueError, RandomDiscreteMassFunctionsGenerator(12).build_sources, 2, 2, 1.5),
+        (ValueError, RandomDiscreteMassFunctionsGenerator(3).build_sources, 3, 1, 0.5),
+        (ValueError, lambda: list(RandomDiscreteMassFunctionsGenerator.read_many(io.StringIO("1:1.0\n")))),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    ################################################################################
+    print('\n')
+    tests_utility.browse_failures(failed)
@@ -0,0 +1,975 @@
+#!/usr/bin/python
+
+################################################################################
+# thegame.tests_fromsensors.py                                                 #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module only provides a main that executes short tests to check that     #
+# methods of construction/fromsensors.py provide expected results.             #
+################################################################################
+
+###############
+# MAIN: TESTS #
+###############
+
+if __name__ == '__main__':
+    import tests_utility
+    import sys
+    import os
+    PACKAGE_PARENT = '..'
+    SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+    sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+    from thegame.element import DiscreteElement
+    from thegame.massfunction import MassFunction
+    from thegame import massfunction
+    from thegame.construction import fromsensors
+    from thegame.construction.fromsensors import *
+
+    print(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format(os.path.basename(__file__)) + "*\n" +
+        "*" * 80
+    )
+
+    # A dictionary with function names as keys and a list of calls that failed for each one of them
+    # in the form ("call_that_failed()", "reason", exception if there's one (can be None))
+    failed = {}
+
+    RESOURCES = os.path.join(SCRIPT_DIR, "Resources", "BeliefsFromSensors")
+    ref_list = ["A", "B", "C"]
+    a  = DiscreteElement.factory_from_ref_list(ref_list, "A")
+    b  = DiscreteElement.factory_from_ref_list(ref_list, "B")
+    ab = DiscreteElement.factory_from_ref_list(ref_list, "A", "B")
+
+    def build_model(sensor_type="S"):
+        return DiscreteSensorModel(sensor_type,
+                                   DiscreteSensorFocalBelief(a,  (0, 1.0), (10, 0.0)),
+                                   DiscreteSensorFocalBelief(b,  (0, 0.0), (10, 0.5)),
+                                   DiscreteSensorFocalBelief(ab, (0, 0.0), (10, 0.5)))
+
+    Option = DiscreteSensorModelOption.Option
+
+    ######################################
+    # TESTS: DiscreteSensorFocalBelief   #
+    ######################################
+
+    function = "DiscreteSensorFocalBelief.get_mass(self, sensor_measure)"
+    print("Test of " + function + " ...")
+
+    focal = DiscreteSensorFocalBelief(a, (20, 0.5), (0, 1.0), (10, 0.0))
+
+    tests = [
+        (1.0,  focal.get_mass, -5),
+        (1.0,  focal.get_mass, 0),
+        (0.5,  focal.get_mass, 5),
+        (0.0,  focal.get_mass, 10),
+        (0.25, focal.get_mass, 15),
+        (0.5,  focal.get_mass, 20),
+        (0.5,  focal.get_mass, 100),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    nbTests = len(tests)
+
+    tests = [
+        (DuplicateValueError,  focal.add_point, 10, 0.2),
+        (EmptyFocalModelError, DiscreteSensorFocalBelief(a).get_mass, 5),
+    ]
+    errors = tests_utility.exception_test(tests, False)
+    if len(errors) != 0:
+        if function in failed:
+            failed[function].extend(errors)
+        else:
+            failed[function] = errors
+    nbFailed += len(errors)
+    nbTests += len(tests)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+    print("--------------------------------------------------------------------------------")
+
+    ################################
+    # TESTS: DiscreteSensorModel   #
+    ################################
+
+    function = "DiscreteSensorModel.get_evidence(self, sensor_measurement)"
+    print("Test of " + function + " ...")
+
+    model = build_model()
+
+    tests = [
+        (MassFunction((a, 1.0), (b, 0.0), (ab, 0.0)),      model.get_evidence, 0),
+        (MassFunction((a, 0.5), (b, 0.25), (ab, 0.25)),    model.get_evidence, 5),
+        (MassFunction((a, 0.0), (b, 0.5), (ab, 0.5)),      model.get_evidence, 42),
+        (MassFunction((DiscreteElement(3, 7), 1)),         model.get_evidence, None),
+        (True,                                             model.is_valid),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    if len(errors) != 0:
+        failed[function] = errors
+    print("... done: %i/%i tests were successful!" % (len(tests)-len(errors), len(tests)))
+    print("--------------------------------------------------------------------------------")
+
+    function = "DiscreteSensorModel.add_option(self, option)"
+    print("Test of " + function + " ...")
+
+    model = build_model()
+    model.add_option(DiscreteSensorModelOption(Option.variation, 1))
+    model.add_option(DiscreteSensorModelOption(Option.temporisation_fusion, 10))
+
+    tests = [
+        (DuplicateOptionError,     model.add_option, DiscreteSensorModelOption(Option.variation, 2)),
+        (IncompatibleOptionsError, model.add_option, DiscreteSensorModelOption(Option.temporisation_specificity, 10)),
+        (UnknownOptionType,        DiscreteSensorModelOption, "variation", 2),
+    ]
+    errors = tests_utility.exception_test(tests, False)
+    if len(errors) != 0:
+        failed[function] = errors
+    print("... done: %i/%i tests were successful!" % (len(tests)-len(errors), len(tests)))
+    print("--------------------------------------------------------------------------------")
+
+    function = "DiscreteSensorModel.enable_cache(self, max_size, quantisation_step)"
+    print("Test of " + function + " ...")
+
+    model = build_model()
+    model.enable_cache(max_size=2)
+    first = model.get_evidence(5)
+    model.get_evidence(5)
+    model.get_evidence(0)
+    model.get_evidence(10) #Evicts 5
+
+    quantised = build_model()
+    quantised.enable_cache(quantisation_step=5)
+
+    def is_shared(model, m1, m2):
+        return model.get_evidence(m1) is model.get_evidence(m2)
+
+    tests = [
+        (MassFunction((a, 0.5), (b, 0.25), (ab, 0.25)),   lambda: first),
+        (massfunction.ImmutableMassFunction,             type, first),
+        ({"size": 2, "max_size": 2, "hits": 1, "misses": 3,
+          "evictions": 1, "hit_rate": 0.25},              model.cache.statistics),
+        (True,                                            is_shared, model, 10, 10),
+        (False,                                           is_shared, model, 5, 0),
+        (True,                                            is_shared, quantised, 4, 6),
+        (MassFunction((a, 0.5), (b, 0.25), (ab, 0.25)),   quantised.get_evidence, 6.5),
+        (MassFunction((DiscreteElement(3, 7), 1)),        quantised.get_evidence, None),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    nbTests = len(tests)
+
+    tests = [
+        (massfunction.ImmutableMassFunctionError, first.add_mass, (a, 0.1)),
+        (massfunction.ImmutableMassFunctionError, first.normalise),
+        (ValueError,                              model.enable_cache, 0),
+        (ValueError,                              model.enable_cache, 10, -1),
+    ]
+    errors = tests_utility.exception_test(tests, False)
+    if len(errors) != 0:
+        if function in failed:
+            failed[function].extend(errors)
+        else:
+            failed[function] = errors
+    nbFailed += len(errors)
+    nbTests += len(tests)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+    print("--------------------------------------------------------------------------------")
+
+    ###################################
+    # TESTS: DiscreteSensorModelData  #
+    ###################################
+
+    function = "DiscreteSensorModelData.compile_pipeline(self)"
+    print("Test of " + function + " ...")
+
+    def stage_names(data):
+        return [stage.__name__ for stage in data.pipeline]
+
+    def median_filter():
+        window = []
+        def median_filter(sensor_measurement, evidence):
+            window.append(sensor_measurement)
+            del window[:-3]
+            return sorted(window)[len(window) // 2], evidence
+        return median_filter
+
+    def hysteresis():
+        def hysteresis(sensor_measurement, evidence):
+            return sensor_measurement, evidence
+        return hysteresis
+
+    model = build_model()
+    plain = DiscreteSensorModelData("s0", model)
+    model.add_option(DiscreteSensorModelOption(Option.temporisation_fusion, 10))
+    model.add_option(DiscreteSensorModelOption(Option.variation, 1))
+    model.add_stage(hysteresis)
+    model.add_stage(median_filter, before_projection=True)
+    data = DiscreteSensorModelData("s1", model)
+
+    tests = [
+        (["project"],                                            stage_names, plain),
+        (["median_filter", "apply_variation", "project",
+          "hysteresis", "apply_temporisation_fusion"],           stage_names, data),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    if len(errors) != 0:
+        failed[function] = errors
+    print("... done: %i/%i tests were successful!" % (len(tests)-len(errors), len(tests)))
+    print("--------------------------------------------------------------------------------")
+
+    function = "DiscreteSensorModelData.get_evidence(self, sensor_measurement)"
+    print("Test of " + function + " ...")
+
+    model = build_model()
+    model.add_option(DiscreteSensorModelOption(Option.variation, 1))
+    variation = DiscreteSensorModelData("s", model)
+
+    model = build_model()
+    model.add_stage(median_filter, before_projection=True)
+    filtered = DiscreteSensorModelData("s", model)
+
+    tests = [
+        (MassFunction((DiscreteElement(3, 7), 1)),      variation.get_evidence, 3),
+        (MassFunction((a, 0.5), (b, 0.25), (ab, 0.25)), variation.get_evidence, 8),
+        (MassFunction((a, 1.0), (b, 0.0), (ab, 0.0)),   variation.get_evidence, 8),
+        (MassFunction((a, 1.0), (b, 0.0), (ab, 0.0)),   filtered.get_evidence,  0),
+        (MassFunction((a, 1.0), (b, 0.0), (ab, 0.0)),   filtered.get_evidence,  0),
+        (MassFunction((a, 1.0), (b, 0.0), (ab, 0.0)),   filtered.get_evidence,  100),
+        (MassFunction((a, 0.5), (b, 0.25), (ab, 0.25)), filtered.get_evidence,  5),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    if len(errors) != 0:
+        failed[function] = errors
+    print("... done: %i/%i tests were successful!" % (len(tests)-len(errors), len(tests)))
+    print("--------------------------------------------------------------------------------")
+
+    ###################################################
+    # TESTS: DiscreteMassFunctionsFromSensorsGenerator #
+    ###################################################
+
+    function = "DiscreteMassFunctionsFromSensorsGenerator.load_model(self, path, model_format)"
+    print("Test of " + function + " ...")
+
+    xml_generator = DiscreteMassFunctionsFromSensorsGenerator()
+    dir_generator = DiscreteMassFunctionsFromSensorsGenerator()
+    Format = DiscreteMassFunctionsFromSensorsGenerator.ModelFormat
+    import tempfile
+    malformed = tempfile.NamedTemporaryFile("w", suffix=".xml", delete=False)
+    malformed.write("<model></model>")
+    malformed.close()
+
+    tests = [
+        (None,       xml_generator.load_model, os.path.join(RESOURCES, "XML", "BFS-load.xml"), Format.XML),
+        (None,       dir_generator.load_model, os.path.join(RESOURCES, "test"),                 Format.custom_directory),
+        (ValueError, dir_generator.load_model, os.path.join(RESOURCES, "nothing"),              Format.custom_directory),
+        (ValueError, dir_generator.load_model, os.path.join(RESOURCES, "test"),                 Format.XML),
+        (InvalidBeliefsFromSensorsModelError, DiscreteMassFunctionsFromSensorsGenerator().load_model, malformed.name, Format.XML),
+    ]
+    errors = tests_utility.exception_test(tests, False)
+    os.remove(malformed.name)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    nbTests = len(tests)
+
+    tests = [
+        (["S1Set", "S3Set", "S4Set"],     sorted, xml_generator.sensor_models),
+        (["S1", "S2", "S3", "S4"],        sorted, xml_generator.current_sensors),
+        (["S1", "S2", "S3", "S4", "S5"],  sorted, dir_generator.sensor_models),
+        (True,                            xml_generator.is_valid),
+        (True,                            dir_generator.is_valid),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    if len(errors) != 0:
+        if function in failed:
+            failed[function].extend(errors)
+        else:
+            failed[function] = errors
+    nbFailed += len(errors)
+    nbTests += len(tests)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+    print("--------------------------------------------------------------------------------")
+
+    function = "DiscreteMassFunctionsFromSensorsGenerator.get_evidence(self, *sensor_measurements)"
+    print("Test of " + function + " ...")
+
+    ref = xml_generator.ref_list
+    A  = DiscreteElement.factory_from_ref_list(ref, "A")
+    B  = DiscreteElement.factory_from_ref_list(ref, "B")
+    C  = DiscreteElement.factory_from_ref_list(ref, "C")
+    AB = DiscreteElement.factory_from_ref_list(ref, "A", "B")
+    xml_generator.add_sensor("S1Set", "S5")
+
+    def evidence_of(generator, sensor_name, value):
+        return generator.get_evidence((sensor_name, value))[sensor_name]
+
+    tests = [
+        (MassFunction((A, 0.125), (B, 0.625), (C, 0.175), (AB, 0.075)), evidence_of, xml_generator, "S1", 150),
+        (MassFunction((A, 0.125), (B, 0.625), (C, 0.175), (AB, 0.075)), evidence_of, xml_generator, "S5", 150),
+        (None,                                                           evidence_of, xml_generator, "S9", 150),
+        ({"S1": None},                                                   DiscreteMassFunctionsFromSensorsGenerator().get_evidence, ("S1", 5)),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    nbTests = len(tests)
+
+    tests = [
+        (ValueError, xml_generator.add_sensor, "S1Set", "S5"),
+        (ValueError, xml_generator.add_sensor, "Nope",  "S6"),
+    ]
+    errors = tests_utility.exception_test(tests, False)
+    if len(errors) != 0:
+        if function in failed:
+            failed[function].extend(errors)
+        else:
+            failed[function] = errors
+    nbFailed += len(errors)
+    nbTests += len(tests)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    print("--------------------------------------------------------------------------------")
+
+    function = "IncrementalFusion / DiscreteMassFunctionsFromSensorsGenerator.get_fused_evidence(self, *sensor_measurements)"
+    print("Test of " + function + " ...")
+
+    AC = DiscreteElement.factory_from_ref_list(ref, "A", "C")
+    Omega = A.get_compatible_complete_element()
+    Combination = MassFunction.Combination
+    sources = [
+        MassFunction((A, 0.5), (AB, 0.3), (Omega, 0.2)),
+        MassFunction((B, 0.4), (AB, 0.4), (Omega, 0.2)),
+        MassFunction((AC, 0.6), (Omega, 0.4)),
+        MassFunction((A, 0.2), (C, 0.3), (Omega, 0.5)),
+        MassFunction((AB, 0.7), (Omega, 0.3)),
+    ]
+
+    def fuse(rule, updates, removed=()):
+        fusion = IncrementalFusion(rule)
+        for i in range(len(sources)):
+            fusion.update(i, sources[i])
+        fusion.get_evidence()
+        for i, m in updates:
+            fusion.update(i, m)
+        for i in removed:
+            fusion.remove(i)
+        return fusion.get_evidence()
+
+    def full(rule, updates, removed=()):
+        current = dict(enumerate(sources))
+        current.update(dict(updates))
+        for i in removed:
+            del current[i]
+        current = [current[i] for i in sorted(current)]
+        return current[0].combination(rule, *current[1:])
+
+    tests = []
+    for rule in [Combination.Dempster, Combination.Smets, Combination.Disjunctive, Combination.Yager]:
+        for updates, removed in [([], ()), ([(3, sources[1])], ()), ([(0, sources[4]), (5, sources[2])], (2,))]:
+            tests.append((full(rule, updates, removed), fuse, rule, updates, removed))
+    tests.extend([
+        (None, IncrementalFusion().get_evidence),
+        (0,    len, IncrementalFusion()),
+    ])
+    errors = tests_utility.expected_output_test(tests, False)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    nbTests = len(tests)
+
+    xml_generator.enable_fusion(Combination.Dempster)
+    s1 = evidence_of(xml_generator, "S1", 150)
+    s2 = evidence_of(xml_generator, "S2", 60)
+    fused = [xml_generator.get_fused_evidence(), xml_generator.get_fused_evidence(("S9", 5))]
+    xml_generator.remove_sensor("S2")
+    fused.append(xml_generator.get_fused_evidence())
+    tests = [
+        (s1.combination(Combination.Dempster, s2), lambda i: fused[i], 0),
+        (s1.combination(Combination.Dempster, s2), lambda i: fused[i], 1),
+        (s1,                                       lambda i: fused[i], 2),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests += len(tests)
+    xml_generator.disable_fusion()
+    tests = [
+        (MissingInformationError, xml_generator.get_fused_evidence),
+        (ValueError,              IncrementalFusion, "Dempster"),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    if len(errors) != 0:
+        if function in failed:
+            failed[function].extend(errors)
+        else:
+            failed[function] = errors
+    nbFailed += len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    print("--------------------------------------------------------------------------------")
+
+    function = "ShardedDiscreteMassFunctionsFromSensorsGenerator.get_evidence(self, *sensor_measurements)"
+    print("Test of " + function + " ...")
+
+    single = DiscreteMassFunctionsFromSensorsGenerator()
+    single.load_model(os.path.join(RESOURCES, "XML", "BFS-load.xml"), Format.XML)
+    with ShardedDiscreteMassFunctionsFromSensorsGenerator(nb_shards=3) as sharded:
+        sharded.load_model(os.path.join(RESOURCES, "XML", "BFS-load.xml"), Format.XML)
+        for i in range(5, 12):
+            single.add_sensor("S1Set", "S" + str(i))
+            sharded.add_sensor("S1Set", "S" + str(i))
+        sharded.remove_sensor("S7")
+        single.remove_sensor("S7")
+        pruned = DiscreteMassFunctionsFromSensorsGenerator()
+        pruned.load_model(os.path.join(RESOURCES, "XML", "BFS-load.xml"), Format.XML)
+        pruned.remove_sensors("S1", "S3", "Nope")
+        measurements = [("S" + str(i), 20 * i) for i in range(13)]
+        results = [sharded.get_evidence(*measurements), sharded.get_evidence(*measurements[5:])]
+        tests = [
+            (single.get_evidence(*measurements),      lambda i: results[i], 0),
+            (single.get_evidence(*measurements[5:]),  lambda i: results[i], 1),
+            ([m[0] for m in measurements],            lambda: list(results[0])),
+            (["S1Set", "S3Set", "S4Set"],             lambda: sharded.sensor_models),
+            (10,                                      lambda: len(sharded.current_sensors)),
+            ({"S2", "S4"},                            pruned.get_sensor_names),
+            (sharded.get_shard("S7"),                 sharded.get_shard, "S7"),
+            ({"S1", "S2", "S3", "S4"},                lambda: set(n for n in sharded.current_sensors if int(n[1:]) < 5)),
+        ]
+        errors = tests_utility.expected_output_test(tests, False)
+        nbTests = len(tests)
+        tests = [
+            (ValueError, sharded.add_sensor, "S1Set", "S5"),
+            (ValueError, sharded.add_sensor, "Nope",  "S20"),
+        ]
+        errors.extend(tests_utility.exception_test(tests, False))
+        nbTests += len(tests)
+    tests = [
+        (ValueError, ShardedDiscreteMassFunctionsFromSensorsGenerator, "", 0),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    print("--------------------------------------------------------------------------------")
+
+    function = "CompactSensorModelData / SensorStateStore"
+    print("Test of " + function + " ...")
+
+    class FakeClock:
+        now = 1000.0
+        @staticmethod
+        def time():
+            return FakeClock.now
+    real_time, fromsensors.time = fromsensors.time, FakeClock
+
+    def replay(compact):
+        generator = DiscreteMassFunctionsFromSensorsGenerator(compact_state=compact)
+        generator.load_model(os.path.join(RESOURCES, "optionTest"), Format.custom_directory)
+        for model in ["tempo", "tempoFusion", "tempoVariation", "variation"]:
+            for i in range(3):
+                generator.add_sensor(model, model + str(i))
+        generator.remove_sensor("tempo1")
+        generator.add_sensor("tempo", "tempo3")
+        results = []
+        FakeClock.now = 1000.0
+        for step, value in enumerate([150, 150, None, 420, 260, None, None, 310, 130, 480]):
+            FakeClock.now += 0.3 * (step % 3 + 1)
+            if step == 6:
+                generator.reset_model("tempoFusion2")
+            measurements = [(name, value if value == None else value + 7 * i)
+                            for i, name in enumerate(sorted(generator.current_sensors))]
+            evidence = generator.get_evidence(*measurements)
+            results.extend(str(evidence[name]) for name in sorted(evidence))
+        return results
+
+    classic = replay(False)
+    compact = replay(True)
+    fromsensors.time = real_time
+
+    tests = [(classic[i], lambda i: compact[i], i) for i in range(len(classic))]
+    tests.append((len(classic), len, compact))
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+
+    import tracemalloc
+    def state_size(compact):
+        generator = DiscreteMassFunctionsFromSensorsGenerator(compact_state=compact)
+        generator.load_model(os.path.join(RESOURCES, "optionTest"), Format.custom_directory)
+        tracemalloc.start()
+        for i in range(2000):
+            generator.add_sensor("tempoFusion", "S" + str(i))
+            generator.get_evidence(("S" + str(i), 150 + i % 200))
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return size
+    classic_size = state_size(False)
+    compact_size = state_size(True)
+    tests = [(True, lambda: compact_size * 5 < classic_size)]
+    errors.extend(tests_utility.expected_output_test(tests, False))
+    nbTests += len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    print("--------------------------------------------------------------------------------")
+
+    function = "DiscreteMassFunctionsFromSensorsGenerator.load_compiled_model(self, path, model_format, compiled_path=None, recompile=True)"
+    print("Test of " + function + " ...")
+
+    import tempfile
+    import shutil
+    temporary = tempfile.mkdtemp()
+    shutil.copytree(os.path.join(RESOURCES, "optionTest"), os.path.join(temporary, "optionTest"))
+    shutil.copy(os.path.join(RESOURCES, "XML", "BFS-load.xml"), temporary)
+    directory_path = os.path.join(temporary, "optionTest")
+    xml_path = os.path.join(temporary, "BFS-load.xml")
+
+    def describe(generator):
+        return (generator.frame_name, generator.ref_list, sorted(generator.current_sensors),
+                sorted((t, [str(o) for o in m.options], sorted((str(f.element), f.points) for f in m.focals))
+                       for t, m in generator.sensor_models.items()))
+
+    def load_compiled(path, model_format, **kwargs):
+        generator = DiscreteMassFunctionsFromSensorsGenerator()
+        used = generator.load_compiled_model(path, model_format, **kwargs)
+        return used, describe(generator)
+
+    def load(path, model_format):
+        generator = DiscreteMassFunctionsFromSensorsGenerator()
+        generator.load_model(path, model_format)
+        return describe(generator)
+
+    tests = []
+    for path, model_format in [(directory_path, Format.custom_directory), (xml_path, Format.XML)]:
+        tests.extend([
+            ((False, load(path, model_format)), load_compiled, path, model_format),
+            ((True,  load(path, model_format)), load_compiled, path, model_format),
+        ])
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+
+    #Same content, different modification time:
+    os.utime(xml_path, (0, 0))
+    used_after_touch = load_compiled(xml_path, Format.XML)[0]
+    def stamp_of(path):
+        with open(path + ".tgc", "rb") as f:
+            f.seek(len(DiscreteMassFunctionsFromSensorsGenerator.COMPILED_MAGIC) + 2)
+            return f.read(32)
+    refreshed_stamp = stamp_of(xml_path) == DiscreteMassFunctionsFromSensorsGenerator.get_model_stamps(xml_path)[0]
+    #Modified content:
+    with open(os.path.join(directory_path, "tempo", "options"), "w") as f:
+        f.write("1 option\ntempo-specificity 5\n")
+    not_recompiled = load_compiled(directory_path, Format.custom_directory, recompile=False)
+    recompiled = load_compiled(directory_path, Format.custom_directory)
+    #Other version of the format:
+    with open(xml_path + ".tgc", "r+b") as f:
+        f.seek(len(DiscreteMassFunctionsFromSensorsGenerator.COMPILED_MAGIC))
+        f.write(b"\xff\xff")
+    tests = [
+        (True,                                      lambda: used_after_touch),
+        (True,                                      lambda: refreshed_stamp),
+        ((False, load(directory_path, Format.custom_directory)), lambda: not_recompiled),
+        ((False, load(directory_path, Format.custom_directory)), lambda: recompiled),
+        (True,  lambda: load_compiled(directory_path, Format.custom_directory)[0]),
+        (False, lambda: load_compiled(xml_path, Format.XML)[0]),
+        (True,  lambda: load_compiled(xml_path, Format.XML)[0]),
+        (xml_path + ".tgc", DiscreteMassFunctionsFromSensorsGenerator.get_compiled_path, xml_path),
+    ]
+    errors.extend(tests_utility.expected_output_test(tests, False))
+    nbTests += len(tests)
+    tests = [
+        (ValueError, DiscreteMassFunctionsFromSensorsGenerator.compile_model, os.path.join(temporary, "nothing"), Format.XML),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    shutil.rmtree(temporary)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    print("--------------------------------------------------------------------------------")
+
+    function = "DiscreteMassFunctionsFromSensorsGenerator.reload_model(self, path, model_format, use_compiled=False)"
+    print("Test of " + function + " ...")
+
+    temporary = tempfile.mkdtemp()
+    shutil.copytree(os.path.join(RESOURCES, "optionTest"), os.path.join(temporary, "optionTest"))
+    directory_path = os.path.join(temporary, "optionTest")
+    real_time, fromsensors.time = fromsensors.time, FakeClock
+
+    def history(compact):
+        FakeClock.now = 1000.0
+        generator = DiscreteMassFunctionsFromSensorsGenerator(compact_state=compact)
+        generator.load_model(directory_path, Format.custom_directory)
+        for sensor_type in ["tempo", "tempoFusion", "variation"]:
+            generator.add_sensor(sensor_type, sensor_type + "-S")
+        for value in [150, 420, 260]:
+            FakeClock.now += 0.4
+            generator.get_evidence(("tempo-S", value), ("tempoFusion-S", value), ("variation-S", value))
+        return generator
+
+    def next_evidence(generator):
+        FakeClock.now = 1001.7
+        evidence = generator.get_evidence(("tempo-S", None), ("tempoFusion-S", None), ("variation-S", 300))
+        return dict((name, str(m)) for name, m in evidence.items())
+
+    references = [next_evidence(history(False)), next_evidence(history(True))]
+    generators = [history(False), history(True)]
+    resets = [history(False), history(True)]
+    with open(os.path.join(directory_path, "tempoFusion", "Bea.txt"), "w") as f:
+        f.write("1 element\nBea\n2 points\n100 0.5\n500 0.5")
+    with open(os.path.join(directory_path, "tempo", "options"), "w") as f:
+        f.write("1 option\ntempo-specificity 3\n")
+    os.makedirs(os.path.join(directory_path, "extra"))
+    with open(os.path.join(directory_path, "extra", "Aka.txt"), "w") as f:
+        f.write("1 element\nAka\n1 points\n100 0.5")
+    shutil.rmtree(os.path.join(directory_path, "tempoVariation"))
+    summaries = [g.reload_model(directory_path, Format.custom_directory) for g in generators]
+    for g in resets:
+        g.load_model(directory_path, Format.custom_directory)
+    results = [next_evidence(g) for g in generators]
+    reset_results = [next_evidence(g) for g in resets]
+    fromsensors.time = real_time
+
+    summary = {"added": ["extra"], "removed": ["tempoVariation"], "changed": ["tempo", "tempoFusion"], "unchanged": ["variation"]}
+    tests = []
+    for i in range(2):
+        tests.extend([
+            (summary,                             lambda i: dict((k, sorted(v)) for k, v in summaries[i].items()), i),
+            (references[i]["tempoFusion-S"],      lambda i: results[i]["tempoFusion-S"], i),
+            (references[i]["variation-S"],        lambda i: results[i]["variation-S"], i),
+            (True,                                lambda i: references[i]["tempo-S"] != results[i]["tempo-S"], i),
+            (True,                                lambda i: references[i]["tempoFusion-S"] != reset_results[i]["tempoFusion-S"], i),
+            (True,                                lambda i: generators[i].sensor_models["variation"] is generators[i].current_sensors["variation-S"].model, i),
+        ])
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+
+    watched = DiscreteMassFunctionsFromSensorsGenerator()
+    watched.load_model(directory_path, Format.custom_directory)
+    watcher = ModelWatcher(watched, directory_path, Format.custom_directory)
+    first_check = watcher.check()
+    with open(os.path.join(directory_path, "variation", "options"), "w") as f:
+        f.write("1 option\nvariation 3\n")
+    second_check = watcher.check()
+    tests = [
+        (None,          lambda: first_check),
+        (["variation"], lambda: second_check["changed"]),
+        (None,          watcher.check),
+    ]
+    errors.extend(tests_utility.expected_output_test(tests, False))
+    nbTests += len(tests)
+    shutil.rmtree(temporary)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    print("--------------------------------------------------------------------------------")
+
+    function = "DiscreteMassFunctionsFromSensorsGenerator.snapshot(self, path, incremental=True) / restore(self, path)"
+    print("Test of " + function + " ...")
+
+    temporary = tempfile.mkdtemp()
+    snapshot_path = os.path.join(temporary, "state.snap")
+    model_path = os.path.join(RESOURCES, "optionTest")
+    real_time, fromsensors.time = fromsensors.time, FakeClock
+
+    def registered(compact):
+        generator = DiscreteMassFunctionsFromSensorsGenerator(compact_state=compact)
+        generator.load_model(model_path, Format.custom_directory)
+        for sensor_type in ["tempo", "tempoFusion", "tempoVariation", "variation"]:
+            for i in range(2):
+                generator.add_sensor(sensor_type, sensor_type + str(i))
+        return generator
+
+    def feed(generator, values):
+        for value in values:
+            FakeClock.now += 0.4
+            generator.get_evidence(*[(name, value) for name in sorted(generator.current_sensors)])
+
+    def next_evidence(generator):
+        FakeClock.now = 1002.0
+        evidence = generator.get_evidence(*[(name, 280) for name in sorted(generator.current_sensors)])
+        return dict((name, str(m)) for name, m in evidence.items())
+
+    tests = []
+    for compact_before, compact_after in [(False, False), (True, True), (False, True), (True, False)]:
+        FakeClock.now = 1000.0
+        original = registered(compact_before)
+        feed(original, [150, 420])
+        written = [original.snapshot(snapshot_path)]
+        feed(original, [260])
+        original.get_evidence(("tempo0", 330), ("variation1", None))
+        written.append(original.snapshot(snapshot_path))
+        original.remove_sensor("tempoFusion1")
+        written.append(original.snapshot(snapshot_path))
+        written.append(original.snapshot(snapshot_path))
+        #A frame partially written:
+        with open(snapshot_path, "ab") as f:
+            f.write(b"SNAP\xff\x00\x00\x00garbage")
+        restored = registered(compact_after)
+        nb_restored = restored.restore(snapshot_path)
+        fresh = registered(compact_after)
+        expected = next_evidence(original)
+        results = next_evidence(restored)
+        fresh_results = next_evidence(fresh)
+        tests.extend([
+            ([8, 8, 1, 0], lambda w: w, written),
+            (7,            lambda n: n, nb_restored),
+            (dict((k, v) for k, v in expected.items()), lambda r: dict((k, v) for k, v in r.items() if k != "tempoFusion1"), results),
+            (True,         lambda f, e: f["variation0"] != e["variation0"], fresh_results, expected),
+        ])
+    fromsensors.time = real_time
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+
+    tests = [
+        (InvalidBeliefsFromSensorsModelError, DiscreteMassFunctionsFromSensorsGenerator().restore, os.path.join(RESOURCES, "XML", "BFS-load.xml")),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    shutil.rmtree(temporary)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    print("--------------------------------------------------------------------------------")
+
+    function = "AsyncSensorEvidenceStream"
+    print("Test of " + function + " ...")
+
+    import asyncio
+
+    readings = [("S1", 150, 0.0), ("S2", 60, 0.1), ("S1", 200, 0.2), ("S1", 300, 1.0), ("S2", 70, 1.05), ("S9", 5, 3.0)]
+
+    async def source(items, error=None):
+        for item in items:
+            yield item
+        if error != None:
+            raise error
+
+    def consume(generator, items, error=None, **kwargs):
+        async def run():
+            stream = AsyncSensorEvidenceStream(generator, source(items, error), **kwargs)
+            ticks = [tick async for tick in stream]
+            return ticks, (stream.nb_readings, stream.nb_coalesced, stream.nb_ticks)
+        return asyncio.run(run())
+
+    def stream_generator():
+        generator = DiscreteMassFunctionsFromSensorsGenerator()
+        generator.load_model(os.path.join(RESOURCES, "XML", "BFS-load.xml"), Format.XML)
+        return generator
+
+    reference = stream_generator()
+    expected = [
+        (0.2,  reference.get_evidence(("S1", 200), ("S2", 60))),
+        (1.05, reference.get_evidence(("S1", 300), ("S2", 70))),
+        (3.0,  reference.get_evidence(("S9", 5))),
+    ]
+    ticks, counters = consume(stream_generator(), readings, tick=0.5)
+    fused_ticks, fused_counters = consume(stream_generator(), readings, tick=0.5, fused=True)
+    slow_ticks, slow_counters = consume(stream_generator(), readings, max_queue_size=1)
+    s1 = reference.get_evidence(("S1", 300))["S1"]
+    s2 = reference.get_evidence(("S2", 70))["S2"]
+    tests = [
+        (expected,                                     lambda: ticks),
+        ((6, 1, 3),                                    lambda: counters),
+        (s1.combination(Combination.Dempster, s2),     lambda: fused_ticks[1][1]),
+        (str(fused_ticks[1][1]),                       lambda: str(fused_ticks[2][1])),
+        (6,                                            lambda: slow_counters[0]),
+        (reference.get_evidence(("S9", 5)),            lambda: slow_ticks[-1][1]),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    tests = [
+        (KeyError,   consume, stream_generator(), readings, KeyError("broker")),
+        (ValueError, AsyncSensorEvidenceStream, reference, source([]), -1),
+        (ValueError, AsyncSensorEvidenceStream, reference, source([]), 0, 0),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    print("--------------------------------------------------------------------------------")
+
+    function = "DiscreteMassFunctionsFromSensorsGenerator(thread_safe=True)"
+    print("Test of " + function + " ...")
+
+    import threading
+
+    temporary = tempfile.mkdtemp()
+    shutil.copytree(os.path.join(RESOURCES, "optionTest"), os.path.join(temporary, "optionTest"))
+    directory_path = os.path.join(temporary, "optionTest")
+    errors_in_threads = []
+    tests = []
+    for compact in [False, True]:
+        generator = DiscreteMassFunctionsFromSensorsGenerator(compact_state=compact, thread_safe=True)
+        generator.load_model(directory_path, Format.custom_directory)
+        generator.enable_fusion(Combination.Disjunctive)
+        names = ["S" + str(i) for i in range(40)]
+        types = ["tempo", "tempoFusion", "tempoVariation", "variation"]
+        for i, name in enumerate(names):
+            generator.add_sensor(types[i % 4], name)
+        counts = [0] * 4
+
+        def reader(index):
+            try:
+                for step in range(150):
+                    evidence = generator.get_evidence(*[(name, 100 + (step * 7 + i) % 400) for i, name in enumerate(names)])
+                    counts[index] += sum(1 for m in evidence.values() if m is not None)
+            except Exception as e:
+                errors_in_threads.append(e)
+
+        def writer():
+            try:
+                for step in range(20):
+                    generator.reload_model(directory_path, Format.custom_directory)
+                    generator.remove_sensor("S0")
+                    generator.add_sensor("tempo", "S0")
+                    generator.reset_model("S1")
+                    generator.get_fused_evidence()
+                    generator.load_model(directory_path, Format.custom_directory)
+            except Exception as e:
+                errors_in_threads.append(e)
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(4)]
+        threads.append(threading.Thread(target=writer))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        tests.extend([
+            ([],                         lambda: errors_in_threads),
+            (len(names),                 lambda: len(generator.current_sensors)),
+            (True,                       lambda: all(c > 0 for c in counts)),
+            (True,                       lambda: isinstance(generator.get_evidence(("S5", 150))["S5"], MassFunction)),
+        ])
+
+    #Incremental snapshots taken while the sensors are modified should not miss any of them:
+    generator = DiscreteMassFunctionsFromSensorsGenerator(thread_safe=True)
+    generator.load_model(directory_path, Format.custom_directory)
+    for i, name in enumerate(names):
+        generator.add_sensor(types[i % 4], name)
+    snapshot_path = os.path.join(temporary, "state")
+    generator.snapshot(snapshot_path, incremental=False)
+    done = threading.Event()
+
+    def snapshotter():
+        while not done.is_set():
+            generator.snapshot(snapshot_path)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(4)]
+    snapshot_thread = threading.Thread(target=snapshotter)
+    snapshot_thread.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+    snapshot_thread.join()
+    generator.snapshot(snapshot_path)
+    restored = DiscreteMassFunctionsFromSensorsGenerator()
+    restored.load_model(directory_path, Format.custom_directory)
+    for i, name in enumerate(names):
+        restored.add_sensor(types[i % 4], name)
+    restored.restore(snapshot_path)
+    tests.extend([
+        ([],                             lambda: errors_in_threads),
+        ([generator.current_sensors[n].get_state() for n in names], lambda: [restored.current_sensors[n].get_state() for n in names]),
+    ])
+
+    #The locks of the sensors should not outlive them (nor be created for unknown sensors):
+    shrinking = DiscreteMassFunctionsFromSensorsGenerator(thread_safe=True)
+    shrinking.load_model(directory_path, Format.custom_directory)
+    for i, name in enumerate(names):
+        shrinking.add_sensor(types[i % 4], name)
+    locks = shrinking._DiscreteMassFunctionsFromSensorsGenerator__sensor_locks
+    shrinking.get_evidence(*[(name, 150) for name in names + ["unknown" + str(i) for i in range(100)]])
+    shrinking.reset_model("unknown0")
+    nb_locks = len(locks)
+    shrinking.remove_sensors(*names[10:])
+    shrinking.reload_model(directory_path, Format.custom_directory)
+    tests.extend([
+        (len(names),                     lambda: nb_locks),
+        (set(names[:10]),                lambda: set(locks)),
+        ({"unknown0": None},             lambda: shrinking.get_evidence(("unknown0", 150))),
+        (True,                           lambda: isinstance(shrinking.get_evidence(("S5", 150))["S5"], MassFunction)),
+    ])
+    shutil.rmtree(temporary)
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    print("--------------------------------------------------------------------------------")
+
+    function = "DiscreteSensorModel.factory_from_table(sensor_type, sensor_measures, masses) / is_valid(self)"
+    print("Test of " + function + " ...")
+
+    table = DiscreteSensorModel.factory_from_table("S", [10, 0], {a: [0.0, 1.0], b: [0.5, 0.0], ab: [0.5, 0.0]})
+    bulk = DiscreteSensorFocalBelief.factory_from_arrays(a, [20, 0, 10], [0.5, 1.0, 0.0])
+    atomic = DiscreteSensorFocalBelief(a, (0, 1.0))
+    try:
+        atomic.add_points((5, 0.5), (0, 0.2))
+    except DuplicateValueError:
+        pass
+    invalid = DiscreteSensorModel("S",
+                                  DiscreteSensorFocalBelief(a, (0, 1.0), (10, 0.0)),
+                                  DiscreteSensorFocalBelief(b, (0, 0.0), (5, 0.1), (10, 1.0)))
+    negative = DiscreteSensorModel("S",
+                                   DiscreteSensorFocalBelief(a, (0, 1.2), (10, 1.0)),
+                                   DiscreteSensorFocalBelief(b, (0, -0.2), (10, 0.0)))
+    generator = DiscreteMassFunctionsFromSensorsGenerator()
+    generator.load_model(os.path.join(RESOURCES, "optionTest"), Format.custom_directory)
+    def reference_is_valid(model):
+        values = set(point[0] for focal in model.focals for point in focal.points)
+        return all(model.get_evidence(v).is_valid() for v in values)
+    tests = [
+        (True,                                           lambda: table.is_equivalent(build_model())),
+        (focal.points,                                   lambda: bulk.points),
+        ([(0, 1.0)],                                     lambda: atomic.points),
+        (([0, 5, 10], [[1.0, 0.5, 0.0], [0.0, 0.1, 1.0]]), lambda: (lambda t: (t[0], [list(c) for c in t[1]]))(invalid.compile_breakpoints())),
+        (True,                                           table.is_valid),
+        (False,                                          invalid.is_valid),
+        (False,                                          negative.is_valid),
+        (True,                                           DiscreteSensorModel("S").is_valid),
+        ([reference_is_valid(m) for m in generator.sensor_models.values()],
+                                                         lambda: [m.is_valid() for m in generator.sensor_models.values()]),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    tests = [
+        (ValueError,                 DiscreteSensorFocalBelief.factory_from_arrays, a, [0, 1], [1.0]),
+        (DuplicateValueError,        DiscreteSensorFocalBelief.factory_from_arrays, a, [0, 1, 0], [1.0, 0.0, 0.5]),
+        (DuplicateFocalElementError, build_model().add_focals, DiscreteSensorFocalBelief(b, (0, 1.0))),
+        (DuplicateFocalElementError, DiscreteSensorModel("S").add_focals, DiscreteSensorFocalBelief(b, (0, 1.0)), DiscreteSensorFocalBelief(b, (1, 1.0))),
+        (EmptyFocalModelError,       DiscreteSensorModel("S", DiscreteSensorFocalBelief(a, (0, 1.0)), DiscreteSensorFocalBelief(b)).is_valid),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    ################################################################################
+    print('\n')
+    tests_utility.browse_failures(failed)
@@ -0,0 +1,192 @@
+#!/usr/bin/python
+
+################################################################################
+# thegame.tests_fromsensorstraining.py                                         #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module only provides a main that executes short tests to check that     #
+# methods of construction/fromsensorstraining.py provide expected results.     #
+################################################################################
+
+###############
+# MAIN: TESTS #
+###############
+
+if __name__ == '__main__':
+    import tests_utility
+    import sys
+    import os
+    PACKAGE_PARENT = '..'
+    SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+    sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+    from thegame.element import DiscreteElement
+    from thegame.massfunction import MassFunction
+    from thegame.construction.fromsensors import *
+    from thegame.construction.fromsensorstraining import *
+    import tempfile
+    import shutil
+    import random
+
+    print(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format(os.path.basename(__file__)) + "*\n" +
+        "*" * 80
+    )
+
+    # A dictionary with function names as keys and a list of calls that failed for each one of them
+    # in the form ("call_that_failed()", "reason", exception if there's one (can be None))
+    failed = {}
+
+    Format = DiscreteMassFunctionsFromSensorsGenerator.ModelFormat
+
+    #############################
+    # TESTS: StreamingHistogram #
+    #############################
+
+    function = "StreamingHistogram.quantile(self, q) / cdf(self, value) / merge(self, histogram)"
+    print("Test of " + function + " ...")
+
+    values = list(range(10000))
+    random.seed(42)
+    random.shuffle(values)
+    whole = StreamingHistogram(32)
+    whole.update_many(values)
+    halves = StreamingHistogram(32)
+    halves.update_many(values[:5000])
+    other = StreamingHistogram(32)
+    other.update_many(values[5000:])
+    halves.merge(other)
+    discrete = StreamingHistogram(4)
+    discrete.update_many([0, 1] * 5000)
+
+    tests = [
+        (10000,     whole.total),
+        (0,         whole.quantile, 0),
+        (9999,      whole.quantile, 1),
+        (True,      lambda: abs(whole.quantile(0.5) - 5000) < 100),
+        (True,      lambda: abs(whole.cdf(2500) - 2500) < 100),
+        (0.0,       whole.cdf, -1),
+        (10000,     whole.cdf, 20000),
+        (True,      lambda: len(whole.centroids) <= 32),
+        (10000,     halves.total),
+        (True,      lambda: abs(halves.quantile(0.25) - 2500) < 100),
+        ([0.0, 1.0], lambda: list(discrete.centroids)),
+        (None,      StreamingHistogram().quantile, 0.5),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    tests = [
+        (ValueError, StreamingHistogram, 1),
+        (ValueError, whole.quantile, 1.5),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+    print("--------------------------------------------------------------------------------")
+
+    #####################################
+    # TESTS: DiscreteSensorModelTrainer #
+    #####################################
+
+    function = "DiscreteSensorModelTrainer.build_generator(self, frame_name, ref_list, sensors)"
+    print("Test of " + function + " ...")
+
+    rows = []
+    for i in range(4000):
+        rows.append(("lux", random.gauss(100, 10), "Empty"))
+        rows.append(("lux", random.gauss(400, 10), "Occupied"))
+        rows.append(("noise", random.uniform(0, 10), "Empty Occupied"))
+    trainer = DiscreteSensorModelTrainer(nb_breakpoints=5)
+    trainer.update_many(rows)
+    generator = trainer.build_generator("Presence", sensors={"L1": "lux", "N1": "noise"})
+    ref = generator.ref_list
+    empty = DiscreteElement.factory_from_ref_list(ref, "Empty")
+    occupied = DiscreteElement.factory_from_ref_list(ref, "Occupied")
+    both = DiscreteElement.factory_from_ref_list(ref, "Empty", "Occupied")
+    evidence = generator.get_evidence(("L1", 50), ("N1", 5))
+    bright = generator.get_evidence(("L1", 500))["L1"]
+    discounted = DiscreteSensorModelTrainer(nb_breakpoints=5, discount=0.1)
+    discounted.update_many(rows)
+    discounted_model = discounted.fit_model("lux", ref)
+
+    temporary = tempfile.mkdtemp()
+    logs = []
+    for i in range(3):
+        path = os.path.join(temporary, "log" + str(i) + ".csv")
+        f = open(path, "w")
+        f.write("# sensor_type,measurement,label\n")
+        for row in rows[i::3]:
+            f.write("%s,%r,%s\n" % row)
+        f.close()
+        logs.append(path)
+    from_logs = DiscreteSensorModelTrainer(nb_breakpoints=5)
+    from_logs.update_from_logs(logs, nb_processes=2)
+    sequential = DiscreteSensorModelTrainer(nb_breakpoints=5)
+    sequential.update_from_logs(logs, nb_processes=1)
+    def summary(t):
+        return dict((sensor_type, dict((label, (h.total(), list(h.centroids), list(h.counts))) for label, h in histograms.items()))
+                    for sensor_type, histograms in t.histograms.items())
+    #A single log mixing all the sensor types, split in small batches:
+    mixed_log = os.path.join(temporary, "mixed.csv")
+    f = open(mixed_log, "w")
+    for row in rows:
+        f.write("%s,%r,%s\n" % row)
+    f.close()
+    from_mixed_log = DiscreteSensorModelTrainer(nb_breakpoints=5)
+    from_mixed_log.update_from_logs([mixed_log], nb_processes=3, batch_size=100)
+    sequential_mixed_log = DiscreteSensorModelTrainer(nb_breakpoints=5)
+    sequential_mixed_log.update_from_log(mixed_log)
+    generator.save_model(os.path.join(temporary, "fitted.xml"), Format.XML)
+    loaded = DiscreteMassFunctionsFromSensorsGenerator()
+    loaded.load_model(os.path.join(temporary, "fitted.xml"), Format.XML)
+    bad_log = os.path.join(temporary, "bad.csv")
+    f = open(bad_log, "w")
+    f.write("lux,not-a-number,Empty\n")
+    f.close()
+
+    tests = [
+        (["Empty", "Occupied"],                  lambda: ref),
+        (["lux", "noise"],                       lambda: sorted(generator.sensor_models)),
+        (5,                                      lambda: len(generator.sensor_models["lux"].focals[0].points)),
+        (True,                                   generator.is_valid),
+        (MassFunction((empty, 1), (occupied, 0)),    lambda: evidence["L1"]),
+        (MassFunction((empty, 0), (occupied, 1)),    lambda: bright),
+        (MassFunction((both, 1)),                lambda: evidence["N1"]),
+        (True,                                   lambda: MassFunction((empty, 0.9), (occupied, 0), (both, 0.1)) ==
+                                                         discounted_model.get_evidence(0)),
+        (trainer.get_states(),                   from_logs.get_states),
+        (summary(sequential),                    summary, from_logs),
+        (summary(sequential_mixed_log),          summary, from_mixed_log),
+        (12000,                                  lambda: sum(h.total() for h in from_logs.histograms["lux"].values()) +
+                                                         from_logs.histograms["noise"][("Empty", "Occupied")].total()),
+        (True,                                   lambda: all(loaded.sensor_models[t].is_equivalent(m) for t, m in generator.sensor_models.items())),
+        (["L1", "N1"],                           lambda: sorted(loaded.current_sensors)),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    tests = [
+        (ValueError,                          DiscreteSensorModelTrainer, 1),
+        (ValueError,                          DiscreteSensorModelTrainer, 16, 8),
+        (ValueError,                          DiscreteSensorModelTrainer, 16, 256, 2),
+        (MissingInformationError,             trainer.fit_model, "temperature", ref),
+        (ValueError,                          trainer.build_generator, "Presence", ["Empty"]),
+        (InvalidBeliefsFromSensorsModelError, from_logs.update_from_log, bad_log),
+        (InvalidBeliefsFromSensorsModelError, lambda: DiscreteSensorModelTrainer().update_from_logs([logs[0], bad_log], nb_processes=2)),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    shutil.rmtree(temporary)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    ################################################################################
+    print('\n')
+    tests_utility.browse_failures(failed)
@@ -0,0 +1,136 @@
+#!/usr/bin/python
+
+################################################################################
+# thegame.tests_harness.py                                                     #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module only provides a main that executes short tests to check that     #
+# methods of benchmark/harness.py provide expected results.                    #
+################################################################################
+
+###############
+# MAIN: TESTS #
+###############
+
+if __name__ == '__main__':
+    import tests_utility
+    import sys
+    import os
+    PACKAGE_PARENT = '..'
+    SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+    sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+    from thegame.benchmark.harness import *
+    import tempfile
+    import shutil
+    import time
+
+    print(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format(os.path.basename(__file__)) + "*\n" +
+        "*" * 80
+    )
+
+    # A dictionary with function names as keys and a list of calls that failed for each one of them
+    # in the form ("call_that_failed()", "reason", exception if there's one (can be None))
+    failed = {}
+
+    ######################
+    # TESTS: Measurement #
+    ######################
+
+    function = "Measurement.median / quartiles / outliers"
+    print("Test of " + function + " ...")
+
+    m = Measurement("case", times=[10, 11, 12, 13, 14, 15, 100])
+    tests = [
+        (13,              lambda: m.median),
+        (10,              lambda: m.minimum),
+        ((11.5, 14.5),    lambda: m.quartiles),
+        (3.0,             lambda: m.iqr),
+        ([6],             lambda: m.outliers),
+        ([],              lambda: Measurement("case", times=[1, 100, 1]).outliers),
+        (None,            lambda: Measurement("case").median),
+        (m.to_dict(),     lambda: Measurement.factory_from_dict(m.to_dict()).to_dict()),
+        ("1.500µs",       format_ns, 1500),
+        ("12.0ns",        format_ns, 12),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+    print("--------------------------------------------------------------------------------")
+
+    #################
+    # TESTS: Runner #
+    #################
+
+    function = "Runner.run(self, name, timer) / time_function(self, name, function, *args) / save(self, path)"
+    print("Test of " + function + " ...")
+
+    runner = Runner(repeats=3, min_time=0.001, verbose=False)
+    calls = []
+    summed = runner.time_function("sum", sum, range(100), params={"n": 100})
+    fixed = runner.run("fixed", lambda loops: calls.append(loops) or 1000 * loops, loops=5)
+    runner.group = "other"
+    runner.time_function("sum", sum, range(100))
+    runner.time_function("sum", sum, range(100))
+    runner.timeout = 0.5
+    isolated = runner.time_function("isolated", sum, range(100), isolate=True)
+    slow = runner.time_function("slow", time.sleep, 5, isolate=True)
+    temporary = tempfile.mkdtemp()
+    path = os.path.join(temporary, "results.json")
+    runner.save(path)
+    environment, loaded = Runner.load(path)
+    pairs, unmatched = match_cases(loaded[:3], loaded[1:4])
+    #Without forking, a picklable timer runs in a child process, a closure in this one:
+    spawned = Runner(repeats=3, min_time=0.001, verbose=False, isolate=True, start_method="spawn")
+    picklable = spawned.run("abs", abs, loops=5)
+    closure = spawned.time_function("sum", sum, range(100))
+
+    tests = [
+        (3,                                  lambda: len(summed.times)),
+        (True,                               lambda: summed.loops >= 1 and summed.median > 0),
+        ({"n": 100},                         lambda: summed.params),
+        ([1, 5, 5, 5],                       lambda: calls),
+        (1000,                               lambda: fixed.median),
+        ("ok",                               lambda: isolated.status),
+        ("timeout",                          lambda: slow.status),
+        (6,                                  lambda: len(loaded)),
+        (["sum", "fixed", "sum", "sum #2"],  lambda: [m.name for m in loaded[:4]]),
+        (["", "", "other", "other"],         lambda: [m.group for m in loaded[:4]]),
+        (summed.times,                       lambda: loaded[0].times),
+        (True,                               lambda: "python" in environment and "thegame" in environment),
+        (10,                                 lambda: Runner(max_loops=10).calibrate(lambda loops: 0)),
+        (["other / sum #2", "sum"],          lambda: [case_name(m) for m in (loaded[3], loaded[0])]),
+        ([(loaded[1], loaded[1]), (loaded[2], loaded[2])], lambda: pairs),
+        (["sum", "other / sum #2"],          lambda: unmatched),
+        (None,                               lambda: load_results(path)[2]),
+        ([1.0, 1.0, 1.0],                    lambda: picklable.times),
+        ([True, True],                       lambda: [picklable.isolated, isolated.isolated]),
+        (["ok", False],                      lambda: [closure.status, closure.isolated]),
+        (True,                               lambda: loaded[4].isolated),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    tests = [
+        (ValueError,        Runner, 0),
+        (ValueError,        lambda: Runner(start_method="teleport")),
+        (ZeroDivisionError, runner.time_function, "error", lambda: 1 / 0),
+        (ZeroDivisionError, lambda: runner.time_function("error", lambda: 1 / 0, isolate=True)),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    shutil.rmtree(temporary)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    ################################################################################
+    print('\n')
+    tests_utility.browse_failures(failed)
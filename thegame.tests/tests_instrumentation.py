@@ -0,0 +1,158 @@
+#!/usr/bin/python
+
+################################################################################
+# thegame.tests_instrumentation.py                                             #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module only provides a main that executes short tests to check that     #
+# methods of utility/instrumentation.py provide expected results.              #
+################################################################################
+
+###############
+# MAIN: TESTS #
+###############
+
+if __name__ == '__main__':
+    import tests_utility
+    import sys
+    import os
+    PACKAGE_PARENT = '..'
+    SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+    sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+    from thegame.element import DiscreteElement
+    from thegame.massfunction import MassFunction
+    from thegame.construction.fromsensors import EvidenceCache
+    from thegame.construction.frombeliefs import DiscreteMassFunctionsFromBeliefsGenerator
+    from thegame.utility import instrumentation
+
+    print(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format(os.path.basename(__file__)) + "*\n" +
+        "*" * 80
+    )
+
+    # A dictionary with function names as keys and a list of calls that failed for each one of them
+    # in the form ("call_that_failed()", "reason", exception if there's one (can be None))
+    failed = {}
+
+    ###########################
+    # TESTS: measure / counts #
+    ###########################
+
+    function = "measure() / snapshot() / count(name, n) / timer(name)"
+    print("Test of " + function + " ...")
+
+    original = MassFunction.combination_smets
+    a, b, c = DiscreteElement(3, 1), DiscreteElement(3, 2), DiscreteElement(3, 6)
+    m1 = MassFunction((a, 0.5), (b, 0.3), (c, 0.2))
+    m2 = MassFunction((a, 0.6), (c, 0.4))
+    expected = m1.combination_smets(m2)
+    cache = EvidenceCache()
+    beliefs = DiscreteMassFunctionsFromBeliefsGenerator()
+    beliefs.load_model(os.path.join(SCRIPT_DIR, "Resources", "BeliefsFromBeliefs", "XML", "BFB-load.xml"),
+                       DiscreteMassFunctionsFromBeliefsGenerator.ModelFormat.XML)
+    posture = DiscreteElement.factory_from_ref_list(beliefs.get_mapping("Posture").ref_list, "Seated")
+
+    instrumentation.count("ignored")
+    with instrumentation.measure() as stats:
+        combined = m1.combination_smets(m2)
+        DiscreteElement(3, 5)
+        enabled_inside = instrumentation.is_enabled()
+        with instrumentation.measure() as inner:
+            instrumentation.count("events", 3)
+        enabled_after_inner = instrumentation.is_enabled()
+        with instrumentation.timer("stage"):
+            credibility = MassFunction.credibility(m1, m2)
+        cache.get(1)
+        cache.put(1, m1)
+        cache.get(1)
+        beliefs.get_evidence(("Posture", MassFunction((posture, 1))))
+        beliefs.is_valid()
+
+    def failing():
+        with instrumentation.measure():
+            raise KeyError("boom")
+    try:
+        failing()
+    except KeyError:
+        pass
+    instrumentation.enable()
+    with instrumentation.measure():
+        pass
+    enabled_by_user = instrumentation.is_enabled()
+    instrumentation.disable()
+    instrumentation.reset()
+
+    tests = [
+        (True,              lambda: combined == expected),
+        (1,                 lambda: stats["counters"]["combination.calls"]),
+        (6,                 lambda: stats["counters"]["combination.focal_products"]),
+        (len(expected),     lambda: stats["counters"]["combination.focals"]),
+        (True,              lambda: stats["counters"]["elements.allocated"] >= 7),
+        (True,              lambda: stats["counters"]["elements.conjunction"] >= 6),
+        (3,                 lambda: stats["counters"]["events"]),
+        ({"events": 3},     lambda: inner["counters"]),
+        (1,                 lambda: stats["counters"]["cache.evidence.hits"]),
+        (1,                 lambda: stats["counters"]["cache.evidence.misses"]),
+        (False,             lambda: "ignored" in stats["counters"]),
+        (1,                 lambda: stats["timers"]["stage"]["calls"]),
+        (1,                 lambda: stats["timers"]["MassFunction.combination_smets"]["calls"]),
+        (True,              lambda: stats["timers"]["MassFunction.combination_smets"]["total_ns"] > 0),
+        (1,                 lambda: stats["timers"]["MassFunction.credibility"]["calls"]),
+        (MassFunction.credibility(m1, m2), lambda: credibility),
+        (1,                 lambda: stats["timers"]["DiscreteMassFunctionsFromBeliefsGenerator.get_evidence"]["calls"]),
+        (True,              lambda: stats["timers"]["validation"]["calls"] >= 1),
+        (True,              lambda: enabled_inside and enabled_after_inner),
+        (True,              lambda: enabled_by_user),
+        (False,             instrumentation.is_enabled),
+        (True,              lambda: MassFunction.combination_smets is original),
+        ({"enabled": False, "counters": {}, "timers": {}}, instrumentation.snapshot),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+    print("--------------------------------------------------------------------------------")
+
+    ###########################
+    # TESTS: enable / disable #
+    ###########################
+
+    function = "enable() / disable() / reset()"
+    print("Test of " + function + " ...")
+
+    instrumentation.enable()
+    instrumentation.enable()
+    DiscreteElement(3, 1) & DiscreteElement(3, 2)
+    ~DiscreteElement(3, 1)
+    enabled_snapshot = instrumentation.snapshot()
+    instrumentation.disable()
+    DiscreteElement(3, 1)
+    disabled_snapshot = instrumentation.snapshot()
+    instrumentation.reset()
+
+    tests = [
+        (True,              lambda: enabled_snapshot["enabled"]),
+        (1,                 lambda: enabled_snapshot["counters"]["elements.conjunction"]),
+        (1,                 lambda: enabled_snapshot["counters"]["elements.opposite"]),
+        (True,              lambda: enabled_snapshot["counters"]["elements.allocated"] >= 3),
+        (enabled_snapshot["counters"], lambda: disabled_snapshot["counters"]),
+        (False,             lambda: disabled_snapshot["enabled"]),
+        ({},                lambda: instrumentation.snapshot()["counters"]),
+        (True,              lambda: MassFunction.combination_smets is original),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    ################################################################################
+    print('\n')
+    tests_utility.browse_failures(failed)
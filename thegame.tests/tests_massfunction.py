@@ -1458,6 +1458,46 @@ if __name__ == '__main__':
     nbFailed += len(errors)
     nbTests += len(tests)
     print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+    print("--------------------------------------------------------------------------------")
+
+    function = "ImmutableMassFunction"
+    print("Test of " + function + " ...")
+
+    import copy
+    from thegame.massfunction import ImmutableMassFunction
+    m = ImmutableMassFunction.factory_from_mass_function(MassFunction(*validSet1))
+
+    tests = [
+        ("{000:0.1000, 001:0.3000, 010:0.6000}", str, m),
+        (MassFunction,                           type, copy.deepcopy(m)),
+        ("{000:0.1000, 001:0.3000, 010:0.6000}", str, copy.deepcopy(m)),
+        ("{000:0.0900, 001:0.2700, 010:0.5400, 111:0.1000}", str, m.discounting(0.1)),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    nbTests = len(tests)
+
+    tests = [
+        (massfunction.ImmutableMassFunctionError, m.add_mass,          (e1, 0.1)),
+        (massfunction.ImmutableMassFunctionError, m.add_mass_unsafe,   (e1, 0.1)),
+        (massfunction.ImmutableMassFunctionError, m.remove_mass,       (e1, 0.1)),
+        (massfunction.ImmutableMassFunctionError, m.remove_mass_unsafe, (e1, 0.1)),
+        (massfunction.ImmutableMassFunctionError, m.clean),
+        (massfunction.ImmutableMassFunctionError, m.normalise),
+        (massfunction.ImmutableMassFunctionError, m.__setitem__,       e1, 0.1),
+        (None,                                    copy.deepcopy(m).normalise),
+    ]
+    errors = tests_utility.exception_test(tests, False)
+    if len(errors) != 0:
+        if function in failed:
+            failed[function].extend(errors)
+        else:
+            failed[function] = errors
+    nbFailed += len(errors)
+    nbTests += len(tests)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
         
     ################################################################################
     print('\n')
@@ -0,0 +1,154 @@
+#!/usr/bin/python
+
+################################################################################
+# thegame.tests_memory.py                                                      #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module only provides a main that executes short tests to check that     #
+# methods of benchmark/memory.py provide expected results.                     #
+################################################################################
+
+###############
+# MAIN: TESTS #
+###############
+
+if __name__ == '__main__':
+    import tests_utility
+    import sys
+    import os
+    PACKAGE_PARENT = '..'
+    SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+    sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+    from thegame.benchmark.memory import *
+    from thegame.benchmark.harness import Runner
+    from thegame.benchmark.compare import main
+    from thegame.massfunction import MassFunction
+    from thegame.element import DiscreteElement
+    import tracemalloc
+    import tempfile
+    import shutil
+
+    print(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format(os.path.basename(__file__)) + "*\n" +
+        "*" * 80
+    )
+
+    # A dictionary with function names as keys and a list of calls that failed for each one of them
+    # in the form ("call_that_failed()", "reason", exception if there's one (can be None))
+    failed = {}
+
+    #######################
+    # TESTS: MemoryRunner #
+    #######################
+
+    function = "MemoryRunner.measure(self, name, function, *args, params) / save(self, path) / load(path)"
+    print("Test of " + function + " ...")
+
+    runner = MemoryRunner(verbose=False)
+    kept = runner.measure("kept", bytes, 100000, params={"size": 100000})
+    temporary_bytes = runner.measure("temporary", lambda: len(bytes(100000)))
+    nothing = runner.measure("nothing", lambda: None)
+    runner.group = "Mass functions"
+    e1 = DiscreteElement(4, 3)
+    e2 = DiscreteElement(4, 5)
+    m1 = MassFunction((e1, 0.5), (e2, 0.5))
+    m2 = MassFunction((e2, 1))
+    combination = runner.measure("m1 & m2", MassFunction.combination_smets, m1, m2)
+    runner.measure("m1 & m2", MassFunction.combination_smets, m1, m2)
+
+    temporary = tempfile.mkdtemp()
+    path = os.path.join(temporary, "memory.json")
+    runner.save(path)
+    environment, loaded = MemoryRunner.load(path)
+    timings = os.path.join(temporary, "timings.json")
+    Runner(verbose=False).save(timings)
+
+    tests = [
+        (True,                  lambda: 100000 <= kept.size < 101000),
+        (True,                  lambda: kept.peak >= kept.size),
+        (1,                     lambda: kept.blocks),
+        ({"size": 100000},      lambda: kept.params),
+        (True,                  lambda: temporary_bytes.peak >= 100000 and temporary_bytes.size < 1000),
+        (0,                     lambda: nothing.size),
+        (True,                  lambda: combination.size > 0 and combination.blocks > 0),
+        ("Mass functions",      lambda: combination.group),
+        (True,                  lambda: len(combination.top) > 0 and combination.top[0][0].split(":")[0].endswith(".py")),
+        (False,                 tracemalloc.is_tracing),
+        (5,                     lambda: len(loaded)),
+        (["kept", "temporary", "nothing", "m1 & m2", "m1 & m2 #2"], lambda: [m.name for m in loaded]),
+        (kept.to_dict(),        lambda: loaded[0].to_dict()),
+        (True,                  lambda: "python" in environment),
+        (True,                  is_memory_results, path),
+        (False,                 is_memory_results, timings),
+        ("97.66KiB",            format_bytes, 100000),
+        ("512B",                format_bytes, 512),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    tests = [
+        (ValueError,            MemoryRunner, -1),
+        (ValueError,            lambda: MemoryRunner(top=-1)),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+    print("--------------------------------------------------------------------------------")
+
+    ################################
+    # TESTS: compare_memory / main #
+    ################################
+
+    function = "compare_memory(base, new, threshold) / main(argv)"
+    print("Test of " + function + " ...")
+
+    base = [
+        MemoryMeasurement("stable", peak=1000, size=500, blocks=10),
+        MemoryMeasurement("bigger", peak=1000, size=500, blocks=10),
+        MemoryMeasurement("smaller", peak=1000, size=500, blocks=10),
+        MemoryMeasurement("more blocks", peak=1000, size=500, blocks=10),
+        MemoryMeasurement("gone"),
+    ]
+    new = [
+        MemoryMeasurement("stable", peak=1010, size=500, blocks=10),
+        MemoryMeasurement("bigger", peak=2000, size=500, blocks=10),
+        MemoryMeasurement("smaller", peak=500, size=500, blocks=10),
+        MemoryMeasurement("more blocks", peak=1000, size=500, blocks=20),
+        MemoryMeasurement("added"),
+    ]
+    comparisons, unmatched = compare_memory(base, new)
+    verdicts = dict((c.name, c.verdict) for c in comparisons)
+
+    def save(measurements, name):
+        return tests_utility.save_results(MemoryRunner(verbose=False), measurements, os.path.join(temporary, name))
+    base_path, new_path = save(base, "base.json"), save(new, "new.json")
+    def run(*argv):
+        return tests_utility.run_quietly(main, list(argv))
+
+    tests = [
+        ({"stable": "unchanged", "bigger": "regression", "smaller": "improvement", "more blocks": "regression"},
+                                lambda: dict((name, verdict) for name, verdict in verdicts.items() if name != "added")),
+        (["gone", "added"],     lambda: unmatched),
+        (2.0,                   lambda: comparisons[1].ratios["peak"]),
+        ("unchanged",           lambda: compare_memory(base, new, threshold=1.5)[0][1].verdict),
+        ("regression",          lambda: MemoryComparison(MemoryMeasurement("a"), MemoryMeasurement("a", size=1)).verdict),
+        (1,                     run, "compare", base_path, new_path),
+        (0,                     run, "compare", base_path, base_path),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    shutil.rmtree(temporary)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    ################################################################################
+    print('\n')
+    tests_utility.browse_failures(failed)
@@ -0,0 +1,187 @@
+#!/usr/bin/python
+
+################################################################################
+# thegame.tests_profiling.py                                                   #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module only provides a main that executes short tests to check that     #
+# methods of benchmark/profiling.py provide expected results.                  #
+################################################################################
+
+###############
+# MAIN: TESTS #
+###############
+
+if __name__ == '__main__':
+    import tests_utility
+    import sys
+    import os
+    PACKAGE_PARENT = '..'
+    SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+    sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+    from thegame.benchmark.profiling import *
+    from thegame.benchmark.harness import Runner
+    import tempfile
+    import shutil
+    import threading
+    import time
+    import pstats
+
+    print(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format(os.path.basename(__file__)) + "*\n" +
+        "*" * 80
+    )
+
+    # A dictionary with function names as keys and a list of calls that failed for each one of them
+    # in the form ("call_that_failed()", "reason", exception if there's one (can be None))
+    failed = {}
+
+    def inner(n):
+        return sum(i * i for i in range(n))
+
+    def outer(n):
+        return inner(n) + inner(n)
+
+    def busy(duration):
+        end = time.process_time() + duration
+        while time.process_time() < end:
+            outer(1000)
+
+    temporary = tempfile.mkdtemp()
+
+    ###########################
+    # TESTS: CProfileProfiler #
+    ###########################
+
+    function = "CProfileProfiler.start(self) / stop(self) / write(self, path) / collapse_pstats(stats)"
+    print("Test of " + function + " ...")
+
+    profiler = CProfileProfiler()
+    profiler.start()
+    for _ in range(20):
+        outer(1000)
+    profiler.stop()
+    paths = profiler.write(os.path.join(temporary, "cprofile"))
+    stacks = collapse_pstats(profiler.stats)
+    lines = open(paths[1]).read().splitlines()
+    outer_name = frame_name(outer.__code__.co_filename, outer.__code__.co_firstlineno, "outer")
+    inner_name = frame_name(inner.__code__.co_filename, inner.__code__.co_firstlineno, "inner")
+
+    tests = [
+        ([os.path.join(temporary, "cprofile.pstats"), os.path.join(temporary, "cprofile.collapsed")], lambda: paths),
+        (True,              lambda: all(os.path.isfile(path) for path in paths)),
+        (True,              lambda: any(f[2] == "inner" for f in pstats.Stats(paths[0]).stats)),
+        (True,              lambda: len(lines) == len(stacks) and all(l.rsplit(" ", 1)[1].isdigit() for l in lines)),
+        (True,              lambda: any(s.startswith(outer_name + ";" + inner_name) for s in stacks)),
+        (False,             lambda: any(s.startswith(inner_name) for s in stacks)),
+        (False,             lambda: any("_lsprof" in s for s in stacks)),
+        ("f:g (b.py:3)",    frame_name, "/a/b.py", 3, "f;g"),
+        ("<built-in method builtins.len>", frame_name, "~", 0, "<built-in method builtins.len>"),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    tests = [
+        (ValueError,        get_profiler, "gprof"),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+    print("--------------------------------------------------------------------------------")
+
+    ###########################
+    # TESTS: SamplingProfiler #
+    ###########################
+
+    function = "SamplingProfiler.start(self) / stop(self) / write(self, path)"
+    print("Test of " + function + " ...")
+
+    busy_name = frame_name(busy.__code__.co_filename, busy.__code__.co_firstlineno, "busy")
+    sampler = SamplingProfiler(0.002)
+    sampler.start()
+    busy(0.2)
+    sampler.stop()
+    sampled_paths = sampler.write(os.path.join(temporary, "sampling"))
+    sampled_lines = open(sampled_paths[0]).read().splitlines()
+
+    threaded = {}
+    def profile_in_thread():
+        profiler = SamplingProfiler(0.002)
+        profiler.start()
+        busy(0.2)
+        profiler.stop()
+        threaded["stacks"] = profiler.stacks
+    thread = threading.Thread(target=profile_in_thread)
+    thread.start()
+    thread.join()
+
+    tests = [
+        (True,              lambda: sum(sampler.stacks.values()) > 10),
+        (True,              lambda: all(stack[0] == busy_name for stack in sampler.stacks)),
+        (True,              lambda: any(outer_name in stack for stack in sampler.stacks)),
+        ([os.path.join(temporary, "sampling.collapsed")], lambda: sampled_paths),
+        (len(sampler.stacks), lambda: len(sampled_lines)),
+        (True,              lambda: all(l.startswith(busy_name) for l in sampled_lines)),
+        (True,              lambda: sum(threaded["stacks"].values()) > 10),
+        (True,              lambda: all(stack[0] == busy_name for stack in threaded["stacks"])),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    tests = [
+        (ValueError,        SamplingProfiler, 0),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+    print("--------------------------------------------------------------------------------")
+
+    ###########################
+    # TESTS: Runner profiling #
+    ###########################
+
+    function = "Runner(profile, profile_dir, profile_time).run(self, name, timer)"
+    print("Test of " + function + " ...")
+
+    profile_dir = os.path.join(temporary, "profiles")
+    runner = Runner(repeats=3, min_time=0.001, verbose=False, profile="cprofile", profile_dir=profile_dir,
+                    profile_time=0.01)
+    runner.group = "Sums"
+    first = runner.time_function("outer 1000", outer, 1000)
+    second = runner.time_function("outer 1000", outer, 1000)
+    unprofiled = Runner(repeats=3, min_time=0.001, verbose=False).time_function("outer", outer, 10)
+    runner.save(os.path.join(temporary, "results.json"))
+    _, loaded = Runner.load(os.path.join(temporary, "results.json"))
+
+    tests = [
+        ([os.path.join(profile_dir, "0000_Sums_-_outer_1000.pstats"),
+          os.path.join(profile_dir, "0000_Sums_-_outer_1000.collapsed")], lambda: first.profiles),
+        (True,              lambda: all(os.path.isfile(path) for path in first.profiles + second.profiles)),
+        (True,              lambda: second.profiles[0].startswith(os.path.join(profile_dir, "0001_"))),
+        ([],                lambda: unprofiled.profiles),
+        (first.profiles,    lambda: loaded[0].profiles),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    tests = [
+        (ValueError,        lambda: Runner(profile="gprof")),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    shutil.rmtree(temporary)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    ################################################################################
+    print('\n')
+    tests_utility.browse_failures(failed)
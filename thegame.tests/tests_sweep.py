@@ -0,0 +1,109 @@
+#!/usr/bin/python
+
+################################################################################
+# thegame.tests_sweep.py                                                       #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module only provides a main that executes short tests to check that     #
+# methods of benchmark/sweep.py provide expected results.                      #
+################################################################################
+
+###############
+# MAIN: TESTS #
+###############
+
+if __name__ == '__main__':
+    import tests_utility
+    import sys
+    import os
+    PACKAGE_PARENT = '..'
+    SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+    sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+    from thegame.benchmark.harness import Measurement, Runner
+    from thegame.benchmark.sweep import *
+    import io
+    import time
+
+    print(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format(os.path.basename(__file__)) + "*\n" +
+        "*" * 80
+    )
+
+    # A dictionary with function names as keys and a list of calls that failed for each one of them
+    # in the form ("call_that_failed()", "reason", exception if there's one (can be None))
+    failed = {}
+
+    ############################
+    # TESTS: fit / SweepResult #
+    ############################
+
+    function = "fit(xs, ys) / SweepResult(name, parameter, values, measurements)"
+    print("Test of " + function + " ...")
+
+    sizes = [2, 4, 8, 16, 32]
+    cubic = SweepResult("cubic", "n", sizes, [Measurement("c", times=[5 * n**3] * 3) for n in sizes])
+    exponential = SweepResult("exponential", "n", sizes, [Measurement("e", times=[7 * 2**n] * 3) for n in sizes])
+    single = SweepResult("single", "n", [4], [Measurement("s", times=[10] * 3)])
+    def close(a, b):
+        return abs(a - b) < 1e-9
+
+    tests = [
+        ((2.0, 1.0),           fit, [0, 1, 2], [1, 3, 5]),
+        ((None, None),         fit, [1], [1]),
+        ((None, None),         fit, [3, 3], [1, 2]),
+        (True,                 lambda: close(cubic.exponent, 3) and close(cubic.exponent_r2, 1)),
+        ("O(n^3.00)",          lambda: cubic.complexity),
+        (True,                 lambda: close(exponential.base, 2) and close(exponential.base_r2, 1)),
+        ("O(2.00^n)",          lambda: exponential.complexity),
+        (None,                 lambda: single.complexity),
+        (True,                 lambda: str(single).endswith("not enough points")),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+    print("--------------------------------------------------------------------------------")
+
+    ############################
+    # TESTS: sweep / write_csv #
+    ############################
+
+    function = "sweep(runner, name, parameter, values, build, params, max_time) / write_csv(file, results)"
+    print("Test of " + function + " ...")
+
+    runner = Runner(repeats=3, warmup=0, min_time=0.001, verbose=False)
+    full = sweep(runner, "sum", "n", [10, 100, 1000], lambda n: (sum, [range(n)]), {"kind": "range"})
+    cut = sweep(runner, "sleep", "ms", [1, 2, 3, 4], lambda ms: (time.sleep, [ms / 1000]), max_time=0.0015)
+    csv_file = io.StringIO()
+    write_csv(csv_file, [full, cut])
+    lines = csv_file.getvalue().splitlines()
+
+    tests = [
+        ([10, 100, 1000],      lambda: full.values),
+        (False,                lambda: full.truncated),
+        (["sum [n=10]", "sum [n=100]", "sum [n=1000]"], lambda: [m.name for m in full.measurements]),
+        ({"kind": "range", "n": 100}, lambda: full.measurements[1].params),
+        ([1, 2],               lambda: cut.values),
+        (True,                 lambda: cut.truncated),
+        (5,                    lambda: len(runner.results)),
+        ("sweep,parameter,value,status,loops,median_ns,q1_ns,q3_ns,min_ns,exponent,exponent_r2,base,base_r2,complexity",
+                               lambda: lines[0]),
+        (6,                    lambda: len(lines)),
+        (["sum", "n", "10", "ok"], lambda: lines[1].split(",")[:4]),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    ################################################################################
+    print('\n')
+    tests_utility.browse_failures(failed)
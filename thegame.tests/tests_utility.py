@@ -281,6 +281,42 @@ def modifying_method_test(tests, verbose=True):
 
 ################################################################################
 
+def save_results(runner, measurements, path):
+    """
+    Saves measurements in a results file through a runner of the benchmark package
+    (``Runner``, ``MemoryRunner``...), e.g. to test the comparison of results files.
+
+    Args:
+        runner (object): The runner, its results being replaced by the measurements.
+        measurements (list): The measurements to save.
+        path (str): The path to the file.
+    Returns:
+        str -- The path to the file.
+    """
+    runner.results = measurements
+    runner.save(path)
+    return path
+
+################################################################################
+
+def run_quietly(function, *args):
+    """
+    Calls a function without letting it print anything in the console (e.g. a
+    command line tool).
+
+    Args:
+        function (func): The function to call.
+        args (whatever): The arguments to pass to the function.
+    Returns:
+        object -- The value returned by the function.
+    """
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args)
+
+################################################################################
+
 def browse_failures(failures):
     """
     Enables the browsing (in console) of the tests that failed.
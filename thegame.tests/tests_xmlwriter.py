@@ -0,0 +1,128 @@
+#!/usr/bin/python
+
+################################################################################
+# thegame.tests_xmlwriter.py                                                   #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module only provides a main that executes short tests to check that     #
+# methods of utility/xmlwriter.py provide expected results.                    #
+################################################################################
+
+###############
+# MAIN: TESTS #
+###############
+
+if __name__ == '__main__':
+    import tests_utility
+    import sys
+    import os
+    PACKAGE_PARENT = '..'
+    SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+    sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+    from thegame.utility.xmlwriter import *
+    from thegame.utility import prettyxml
+    import xml.etree.ElementTree as ET
+    import io
+
+    print(
+        "*" * 80 + "\n" +
+        "*" + "{:^78}".format(os.path.basename(__file__)) + "*\n" +
+        "*" * 80
+    )
+
+    # A dictionary with function names as keys and a list of calls that failed for each one of them
+    # in the form ("call_that_failed()", "reason", exception if there's one (can be None))
+    failed = {}
+
+    #################
+    # TESTS: Writer #
+    #################
+
+    function = "XMLWriter.start(self, tag, attributes) / data(self, text) / end(self, tag)"
+    print("Test of " + function + " ...")
+
+    def write(*nodes, **kwargs):
+        f = io.StringIO()
+        writer = XMLWriter(f, **kwargs)
+        with writer.node("root", {"name": "R"}):
+            for node in nodes:
+                writer.leaf(*node)
+            with writer.node("empty"):
+                pass
+        writer.close()
+        return f.getvalue()
+
+    root = ET.Element("root", {"name": "R"})
+    frame = ET.SubElement(root, "frame")
+    ET.SubElement(frame, "state").text = "A"
+    ET.SubElement(frame, "state")
+    ET.SubElement(root, "sensors")
+
+    def escaped():
+        f = io.StringIO()
+        XMLWriter(f, xml_declaration=False).leaf("s", {"a": '"<&'}, "x < y & \u00e9")
+        return f.getvalue()
+
+    expected = (
+        "<?xml version='1.0' encoding='us-ascii'?>\n" +
+        '<root name="R">\n' +
+        '    <state>A</state>\n' +
+        '    <point value="1"/>\n' +
+        '    <empty/>\n' +
+        '</root>\n'
+    )
+    tests = [
+        (expected,  write, ("state", None, "A"), ("point", {"value": 1})),
+        ('<root name="R">\n  <empty/>\n</root>\n', lambda: write(xml_declaration=False, indent=2)),
+        ('<s a="&quot;&lt;&amp;">x &lt; y &amp; &#233;</s>\n', escaped),
+        (
+            "<?xml version='1.0' encoding='us-ascii'?>\n" +
+            '<root name="R">\n' +
+            '    <frame>\n' +
+            '        <state>A</state>\n' +
+            '        <state/>\n' +
+            '    </frame>\n' +
+            '    <sensors/>\n' +
+            '</root>\n',
+            prettyxml.pretty_str, root
+        ),
+        (["A", None], lambda: [state.text for state in ET.fromstring(prettyxml.pretty_str(root, xml_declaration=False)).iter("state")]),
+    ]
+    errors = tests_utility.expected_output_test(tests, False)
+    nbTests = len(tests)
+
+    def unbalanced():
+        writer = XMLWriter(io.StringIO())
+        writer.start("root")
+        writer.close()
+
+    def mismatched():
+        writer = XMLWriter(io.StringIO())
+        writer.start("a")
+        writer.end("b")
+
+    def mixed():
+        writer = XMLWriter(io.StringIO())
+        writer.start("root")
+        writer.data("text")
+        writer.start("child")
+
+    tests = [
+        (ValueError, XMLWriter(io.StringIO()).end),
+        (ValueError, mismatched),
+        (ValueError, unbalanced),
+        (ValueError, mixed),
+    ]
+    errors.extend(tests_utility.exception_test(tests, False))
+    nbTests += len(tests)
+    if len(errors) != 0:
+        failed[function] = errors
+    nbFailed = len(errors)
+    print("... done: %i/%i tests were successful!" % (nbTests - nbFailed, nbTests))
+
+    ################################################################################
+    print('\n')
+    tests_utility.browse_failures(failed)
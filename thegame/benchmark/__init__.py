@@ -0,0 +1,7 @@
+__all__ = [
+    "compare",
+    "harness",
+    "memory",
+    "profiling",
+    "sweep"
+]
@@ -0,0 +1,15 @@
+################################################################################
+# thegame.benchmark.__main__.py                                                #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# Entry point of ``python -m thegame.benchmark`` (see compare.py).             #
+################################################################################
+
+import sys
+
+from thegame.benchmark.compare import main
+
+sys.exit(main())
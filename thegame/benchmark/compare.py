@@ -0,0 +1,223 @@
+################################################################################
+# thegame.benchmark.compare.py                                                 #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module compares benchmark results saved by the harness (see harness.py) #
+# (or by the memory runner, see memory.py) and keeps a history of them. It is  #
+# the command line tool of the package:                                        #
+#   python -m thegame.benchmark compare base.json new.json [--threshold 0.05]  #
+#   python -m thegame.benchmark store results.json [--history dir]             #
+#   python -m thegame.benchmark history [--history dir]                        #
+# ---------------------------------------------------------------------------- #
+# Main classes:                                                                #
+#   - Comparison: The comparison of a benchmark case between two runs.         #
+################################################################################
+
+from thegame.benchmark import harness
+from thegame.benchmark import memory
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+
+
+class Comparison:
+    """
+    The comparison of a benchmark case between a base run and a new run. The speedup
+    is the ratio of the median times (above 1 if the new run is faster) and its
+    confidence interval is estimated by bootstrapping the repeats of both runs.
+
+    Attributes:
+        self.group (str): The group of the case.
+        self.name (str): The name of the case.
+        self.base (Measurement): The measurement of the base run.
+        self.new (Measurement): The measurement of the new run.
+        self.speedup (float): The ratio of the median time of the base run over the one of
+            the new run.
+        self.interval (tuple(float, float)): The confidence interval of the speedup.
+        self.verdict (str): "regression" if the new run is slower beyond the threshold
+            with the requested confidence, "improvement" if it is faster beyond the
+            threshold, "unchanged" otherwise.
+    """
+
+    def __init__(self, base, new, threshold=0.05, confidence=0.95, resamples=1000, seed=0):
+        """
+        Compares two measurements of the same case.
+
+        Args:
+            base (Measurement): The measurement of the base run.
+            new (Measurement): The measurement of the new run.
+            threshold (float): The relative change under which the case is considered
+                unchanged (0.05 for 5%).
+            confidence (float): The confidence level of the interval.
+            resamples (int): The number of bootstrap resamples.
+            seed (object): The seed of the bootstrap, so that a comparison is reproducible.
+        """
+        self.group = new.group
+        self.name = new.name
+        self.base = base
+        self.new = new
+        self.speedup = base.median / new.median
+
+        r = random.Random(seed)
+        ratios = sorted(
+            statistics.median(r.choices(base.times, k=len(base.times))) /
+            statistics.median(r.choices(new.times, k=len(new.times)))
+            for _ in range(resamples)
+        )
+        alpha = (1 - confidence) / 2
+        self.interval = (ratios[int(alpha * (resamples - 1))], ratios[int(round((1 - alpha) * (resamples - 1)))])
+
+        if self.interval[1] < 1 / (1 + threshold):
+            self.verdict = "regression"
+        elif self.interval[0] > 1 + threshold:
+            self.verdict = "improvement"
+        else:
+            self.verdict = "unchanged"
+
+    def __str__(self):
+        """
+        Returns a one line summary of the comparison.
+
+        Returns:
+            str -- The case, the median times, the speedup and its interval, the verdict.
+        """
+        name = harness.case_name(self)
+        name = "{:<50}".format(name if len(name) <= 50 else name[0:46] + "...)")
+        return name + ": {:>12} -> {:<12} x{:.3f} [{:.3f}, {:.3f}] {}".format(
+            harness.format_ns(self.base.median), harness.format_ns(self.new.median),
+            self.speedup, self.interval[0], self.interval[1], self.verdict
+        )
+
+
+################################################################################
+################################################################################
+################################################################################
+
+def compare(base, new, threshold=0.05, confidence=0.95, resamples=1000):
+    """
+    Compares the cases of two runs, matching them by group and name. The cases that did
+    not succeed in both runs are not compared.
+
+    Args:
+        base (list[Measurement]): The measurements of the base run.
+        new (list[Measurement]): The measurements of the new run.
+        threshold (float): The relative change under which a case is considered unchanged.
+        confidence (float): The confidence level of the intervals.
+        resamples (int): The number of bootstrap resamples.
+    Returns:
+        tuple(list[Comparison], list[str]) -- The comparisons, in the order of the new run,
+        and the names of the cases found in only one of the runs.
+    """
+    pairs, unmatched = harness.match_cases(base, new)
+    comparisons = [Comparison(b, n, threshold, confidence, resamples) for b, n in pairs
+                   if b.status == "ok" and n.status == "ok"]
+    return comparisons, unmatched
+
+################################################################################
+
+def store(path, history):
+    """
+    Copies a results file into the history directory, under a name tagged with the date,
+    the version of the library and the interpreter of the run.
+
+    Args:
+        path (str): The path to the results file.
+        history (str): The path to the history directory (created if needed).
+    Returns:
+        str -- The path to the stored file.
+    """
+    environment, _ = harness.Runner.load(path)
+    tag = "{}_thegame-{}_{}-{}".format(
+        environment.get("date", "unknown").replace(":", "-"), environment.get("thegame", "unknown"),
+        environment.get("implementation", "unknown"), environment.get("python", "unknown")
+    )
+    os.makedirs(history, exist_ok=True)
+    destination = os.path.join(history, tag + "_" + os.path.basename(path).replace(" ", "_"))
+    shutil.copyfile(path, destination)
+    return destination
+
+################################################################################
+
+def list_history(history):
+    """
+    Lists the runs of the history directory, from the oldest to the newest.
+
+    Args:
+        history (str): The path to the history directory.
+    Returns:
+        list[str] -- The paths to the results files.
+    """
+    if not os.path.isdir(history):
+        return []
+    return [os.path.join(history, f) for f in sorted(os.listdir(history)) if f.endswith(".json")]
+
+################################################################################
+
+def main(argv=None):
+    """
+    The command line tool.
+
+    Args:
+        argv (list[str]): The arguments (None for the ones of the process).
+    Returns:
+        int -- The exit code: 0 if everything went fine, 1 if a regression was found.
+    """
+    parser = argparse.ArgumentParser(prog="python -m thegame.benchmark",
+                                     description="Compares and stores benchmark results.")
+    commands = parser.add_subparsers(dest="command")
+
+    parser_compare = commands.add_parser("compare", help="compare two results files")
+    parser_compare.add_argument("base", help="the results of the reference run")
+    parser_compare.add_argument("new", help="the results of the new run")
+    parser_compare.add_argument("--threshold", type=float, default=0.05,
+                                help="relative slowdown (or memory growth) tolerated (default: 0.05)")
+    parser_compare.add_argument("--confidence", type=float, default=0.95,
+                                help="confidence level of the intervals (default: 0.95)")
+    parser_compare.add_argument("--all", action="store_true", help="also list the unchanged cases")
+
+    parser_store = commands.add_parser("store", help="copy a results file into the history")
+    parser_store.add_argument("results", help="the results file")
+    parser_store.add_argument("--history", default="benchmark-history", help="the history directory")
+
+    parser_history = commands.add_parser("history", help="list the stored runs")
+    parser_history.add_argument("--history", default="benchmark-history", help="the history directory")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        #Memory results (see memory.py) are compared metric by metric, without intervals:
+        runner = memory.MemoryRunner if memory.is_memory_results(args.base) else harness.Runner
+        base_environment, base = runner.load(args.base)
+        new_environment, new = runner.load(args.new)
+        for label, environment in (("base", base_environment), ("new ", new_environment)):
+            print(label + ": thegame " + str(environment.get("thegame")) + ", " + str(environment.get("implementation")) +
+                  " " + str(environment.get("python")) + ", " + str(environment.get("date")))
+        if runner == memory.MemoryRunner:
+            comparisons, unmatched = memory.compare_memory(base, new, args.threshold)
+        else:
+            comparisons, unmatched = compare(base, new, args.threshold, args.confidence)
+        for c in comparisons:
+            if args.all or c.verdict != "unchanged":
+                print(c)
+        counts = dict((v, sum(1 for c in comparisons if c.verdict == v)) for v in ("regression", "improvement", "unchanged"))
+        print("{} case(s) compared: {} regression(s), {} improvement(s), {} unchanged; {} unmatched.".format(
+            len(comparisons), counts["regression"], counts["improvement"], counts["unchanged"], len(unmatched)))
+        return 1 if counts["regression"] > 0 else 0
+
+    if args.command == "store":
+        print(store(args.results, args.history))
+        return 0
+
+    if args.command == "history":
+        for path in list_history(args.history):
+            print(path)
+        return 0
+
+    parser.print_help()
+    return 2
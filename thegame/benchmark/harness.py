@@ -0,0 +1,663 @@
+################################################################################
+# thegame.benchmark.harness.py                                                 #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module contains the benchmark harness of the library: timings with      #
+# time.perf_counter_ns(), warmup, calibrated loop counts, repeated runs,       #
+# robust statistics (median, IQR, min, outliers), optional process isolation,  #
+# optional profiling of each case (see profiling.py) and machine-readable JSON #
+# results. It uses only the standard library.                                  #
+# ---------------------------------------------------------------------------- #
+# Main classes:                                                                #
+#   - Measurement: The timings of a benchmark case and their statistics.       #
+#   - Runner: Runs benchmark cases and gathers their measurements.             #
+################################################################################
+
+import thegame
+from thegame.benchmark import profiling
+
+import json
+import multiprocessing
+import os
+import pickle
+import platform
+import statistics
+import time
+
+
+class Measurement:
+    """
+    The timings of a benchmark case. Each repeat runs the case ``loops`` times in a row
+    and gives one time per call (the time of the batch divided by the number of loops),
+    from which robust statistics are computed.
+
+    Attributes:
+        self.name (str): The name of the benchmark case.
+        self.group (str): The group of the case (e.g. the section of a benchmark
+            script), the pair (group, name) identifying the case.
+        self.params (dict{str:object}): The parameters of the case (e.g. the size of the
+            frame), to group and compare cases.
+        self.loops (int): The number of calls timed together in each repeat.
+        self.times (list[float]): The time per call of each repeat, in nanoseconds.
+        self.status (str): "ok", "timeout" if the case timed out or "crashed" if its
+            process died without any result.
+        self.profiles (list[str]): The paths to the profiles of the case (see
+            ``Runner.profile``), empty if it was not profiled.
+        self.isolated (bool): If the case ran in its own process.
+    """
+
+    def __init__(self, name, params=None, loops=0, times=None, status="ok", group=""):
+        """
+        Builds a measurement.
+
+        Args:
+            name (str): The name of the benchmark case.
+            params (dict{str:object}): The parameters of the case.
+            loops (int): The number of calls timed together in each repeat.
+            times (list[float]): The time per call of each repeat, in nanoseconds.
+            status (str): The status of the measurement.
+            group (str): The group of the case.
+        """
+        self.name = name
+        self.group = group
+        self.params = params if params != None else {}
+        self.loops = loops
+        self.times = times if times != None else []
+        self.status = status
+        self.profiles = []
+        self.isolated = False
+
+    @property
+    def median(self):
+        """float -- The median time per call, in nanoseconds (None without timings)."""
+        return statistics.median(self.times) if len(self.times) > 0 else None
+
+    @property
+    def minimum(self):
+        """float -- The minimum time per call, in nanoseconds (None without timings)."""
+        return min(self.times) if len(self.times) > 0 else None
+
+    @property
+    def quartiles(self):
+        """tuple(float, float) -- The first and third quartiles, in nanoseconds (None
+        without timings)."""
+        if len(self.times) == 0:
+            return None
+        #Linear interpolation between the closest ranks:
+        s = sorted(self.times)
+        quartiles = []
+        for p in (0.25, 0.75):
+            position = p * (len(s) - 1)
+            i = int(position)
+            j = min(i + 1, len(s) - 1)
+            quartiles.append(s[i] + (s[j] - s[i]) * (position - i))
+        return tuple(quartiles)
+
+    @property
+    def iqr(self):
+        """float -- The interquartile range, in nanoseconds (None without timings)."""
+        quartiles = self.quartiles
+        return quartiles[1] - quartiles[0] if quartiles != None else None
+
+    @property
+    def outliers(self):
+        """list[int] -- The indexes of the repeats outside of Tukey's fences (more than
+        1.5 IQR away from the quartiles), e.g. disturbed by the garbage collector or
+        another process."""
+        if len(self.times) < 4:
+            return []
+        q1, q3 = self.quartiles
+        low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+        return [i for i, t in enumerate(self.times) if not low <= t <= high]
+
+    def to_dict(self):
+        """
+        Gets the measurement as a dictionary that can be dumped in JSON.
+
+        Returns:
+            dict -- The measurement and its statistics.
+        """
+        quartiles = self.quartiles
+        return {
+            "name"     : self.name,
+            "group"    : self.group,
+            "params"   : self.params,
+            "status"   : self.status,
+            "loops"    : self.loops,
+            "repeats"  : len(self.times),
+            "times_ns" : self.times,
+            "median_ns": self.median,
+            "min_ns"   : self.minimum,
+            "q1_ns"    : quartiles[0] if quartiles != None else None,
+            "q3_ns"    : quartiles[1] if quartiles != None else None,
+            "iqr_ns"   : self.iqr,
+            "outliers" : self.outliers,
+            "profiles" : self.profiles,
+            "isolated" : self.isolated,
+        }
+
+    @staticmethod
+    def factory_from_dict(d):
+        """
+        Builds a measurement from a dictionary given by ``to_dict()``.
+
+        Args:
+            d (dict): The dictionary.
+        Returns:
+            Measurement -- A new measurement.
+        """
+        measurement = Measurement(d["name"], d.get("params"), d.get("loops", 0), list(d.get("times_ns", [])),
+                                  d.get("status", "ok"), d.get("group", ""))
+        measurement.profiles = list(d.get("profiles", []))
+        measurement.isolated = d.get("isolated", False)
+        return measurement
+
+    def __str__(self):
+        """
+        Returns a one line summary of the measurement.
+
+        Returns:
+            str -- The name of the case, the median time per call, the IQR, the minimum and
+            the number of outliers (or the status of the measurement if it failed).
+        """
+        name = "{:<50}".format(self.name if len(self.name) <= 50 else self.name[0:46] + "...)")
+        if self.status != "ok":
+            return name + ": " + self.status
+        return name + ": {:>12} ± {:<10} (min {}, {} outlier(s))".format(
+            format_ns(self.median), format_ns(self.iqr / 2), format_ns(self.minimum), len(self.outliers)
+        )
+
+
+################################################################################
+################################################################################
+################################################################################
+
+def format_ns(t):
+    """
+    Formats a time given in nanoseconds with a suitable unit.
+
+    Args:
+        t (float): The time in nanoseconds.
+    Returns:
+        str -- The formatted time.
+    """
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("µs", 1e3)):
+        if t >= scale:
+            return "{:.3f}{}".format(t / scale, unit)
+    return "{:.1f}ns".format(t)
+
+################################################################################
+
+def get_environment():
+    """
+    Describes the environment of the benchmarks, to tell results apart.
+
+    Returns:
+        dict{str:str} -- The version of the library, the Python implementation and
+        version, the platform and the date.
+    """
+    return {
+        "thegame"       : thegame.__version__,
+        "implementation": platform.python_implementation(),
+        "python"        : platform.python_version(),
+        "platform"      : platform.platform(),
+        "machine"       : platform.machine(),
+        "date"          : time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+################################################################################
+
+def case_name(measurement):
+    """
+    Gets the full name of a case, as used to match the cases of two runs.
+
+    Args:
+        measurement (Measurement or memory.MemoryMeasurement): The measurement of the case.
+    Returns:
+        str -- "group / name", or the name alone if the case has no group.
+    """
+    return (measurement.group + " / " if measurement.group != "" else "") + measurement.name
+
+################################################################################
+
+def match_cases(base, new):
+    """
+    Matches the cases of two runs by group and name.
+
+    Args:
+        base (list[Measurement]): The measurements of the base run.
+        new (list[Measurement]): The measurements of the new run.
+    Returns:
+        tuple(list[tuple(Measurement, Measurement)], list[str]) -- The pairs of measurements
+        (base, new) of the cases found in both runs, in the order of the new run, and the
+        names of the cases found in only one of the runs.
+    """
+    base_cases = dict((case_name(m), m) for m in base)
+    new_cases = dict((case_name(m), m) for m in new)
+    pairs = [(base_cases[name], m) for name, m in new_cases.items() if name in base_cases]
+    unmatched = [name for name in base_cases if name not in new_cases] + [name for name in new_cases if name not in base_cases]
+    return pairs, unmatched
+
+################################################################################
+
+def results_to_dict(measurements, settings, kind=None):
+    """
+    Gets measurements as a dictionary that can be dumped in JSON. The cases sharing the
+    same group and name are told apart by a suffix " #2", " #3"... in the order in which
+    they were run.
+
+    Args:
+        measurements (list[Measurement]): The measurements (anything with ``to_dict()``,
+            ``group`` and ``name``).
+        settings (dict): The settings of the runner.
+        kind (str): The kind of results (None for timings).
+    Returns:
+        dict -- The kind of results (if any), the environment, the settings and the
+        measurements.
+    """
+    benchmarks = []
+    seen = {}
+    for m in measurements:
+        d = m.to_dict()
+        key = (m.group, m.name)
+        seen[key] = seen.get(key, 0) + 1
+        if seen[key] > 1:
+            d["name"] += " #" + str(seen[key])
+        benchmarks.append(d)
+    d = {} if kind == None else {"kind": kind}
+    d.update({
+        "environment": get_environment(),
+        "settings"   : settings,
+        "benchmarks" : benchmarks,
+    })
+    return d
+
+################################################################################
+
+def save_results(path, results):
+    """
+    Saves results (see ``results_to_dict()``) in a JSON file.
+
+    Args:
+        path (str): The path to the file.
+        results (dict): The results.
+    """
+    f = open(path, "w")
+    json.dump(results, f, indent=1, default=str)
+    f.close()
+
+################################################################################
+
+def load_results(path, factory=None):
+    """
+    Loads results saved with ``save_results()``.
+
+    Args:
+        path (str): The path to the file.
+        factory (func): Builds a measurement from its dictionary
+            (``Measurement.factory_from_dict`` by default).
+    Returns:
+        tuple(dict, list[Measurement], str) -- The environment of the results, the
+        measurements and the kind of results (None for timings).
+    """
+    if factory == None:
+        factory = Measurement.factory_from_dict
+    f = open(path, "r")
+    d = json.load(f)
+    f.close()
+    return d.get("environment", {}), [factory(m) for m in d.get("benchmarks", [])], d.get("kind")
+
+################################################################################
+
+def loop_timer(function, *args):
+    """
+    Builds the timer of a function: the timer calls the function a given number of
+    times and returns the time it took.
+
+    Args:
+        function (func): The function to time.
+        args (whatever): The arguments to pass to the function.
+    Returns:
+        func -- The timer, taking the number of loops and returning nanoseconds.
+    """
+    def timer(loops):
+        r = range(loops)
+        start = time.perf_counter_ns()
+        for _ in r:
+            function(*args)
+        return time.perf_counter_ns() - start
+    return timer
+
+################################################################################
+################################################################################
+################################################################################
+
+class Runner:
+    """
+    Runs benchmark cases and gathers their measurements. A case is run once to warm up
+    (caches, lazy initialisations...), then its loop count is calibrated so that a
+    repeat lasts at least ``min_time`` (as ``timeit`` does: 1, 2, 5, 10, 20, 50...
+    loops), then it is repeated ``repeats`` times.
+
+    With process isolation, each case runs in its own process, thus a case can time out
+    and cannot be disturbed by the memory left by the previous ones. The process is
+    forked where possible, so the case does not have to be picklable. With another start
+    method, a case that cannot be pickled (e.g. a closure) is run in the current process
+    instead, which is recorded in its measurement (see ``Measurement.isolated``).
+
+    With profiling, each case that succeeded is run again under a profiler (in the
+    current process) for at least ``profile_time`` seconds, and its profile is written
+    in ``profile_dir`` (see profiling.py): a pstats file and collapsed stacks with
+    cProfile, collapsed stacks only with the sampling profiler.
+
+    Example:
+        runner = Runner()
+        runner.time_function("union size 100", e1.union, e2, params={"size": 100})
+        runner.save("results.json")
+
+    Attributes:
+        self.repeats (int): The number of timed repeats per case.
+        self.warmup (int): The number of untimed runs of each case before calibrating it.
+        self.min_time (float): The minimum duration of a repeat, in seconds.
+        self.max_loops (int): The maximum number of loops per repeat.
+        self.isolate (bool): If each case should run in its own process.
+        self.timeout (float): The maximum duration of an isolated case, in seconds
+            (0 for no timeout).
+        self.start_method (str): The start method of the isolated processes (see
+            ``multiprocessing``), None for "fork" where available and the default one
+            elsewhere.
+        self.verbose (bool): If the measurements should be printed.
+        self.file (file object): A text file in which to write the measurements (None
+            to skip it).
+        self.profile (str): The profiler to run each case under, "cprofile" or
+            "sampling" (None to skip profiling).
+        self.profile_dir (str): The directory in which the profiles are written.
+        self.profile_time (float): The minimum duration of a profiling run, in seconds.
+        self.group (str): The group given to the next cases.
+        self.results (list[Measurement]): The measurements of the cases run so far.
+    """
+
+    def __init__(self, repeats=7, warmup=1, min_time=0.02, max_loops=10**7, isolate=False, timeout=60,
+                 verbose=True, file=None, profile=None, profile_dir="profiles", profile_time=0.2,
+                 start_method=None):
+        """
+        Builds a runner.
+
+        Args:
+            repeats (int): The number of timed repeats per case.
+            warmup (int): The number of untimed runs of each case before calibrating it.
+            min_time (float): The minimum duration of a repeat, in seconds.
+            max_loops (int): The maximum number of loops per repeat.
+            isolate (bool): If each case should run in its own process.
+            timeout (float): The maximum duration of an isolated case, in seconds (0 for
+                no timeout).
+            verbose (bool): If the measurements should be printed.
+            file (file object): A text file in which to write the measurements.
+            profile (str): The profiler to run each case under ("cprofile", "sampling"
+                or None).
+            profile_dir (str): The directory in which the profiles are written.
+            profile_time (float): The minimum duration of a profiling run, in seconds.
+            start_method (str): The start method of the isolated processes (None for
+                "fork" where available and the default one elsewhere).
+        Raises:
+            ValueError: If the number of repeats or the maximum number of loops is not
+            strictly positive, or if the profiler or the start method is unknown.
+        """
+        if repeats <= 0 or max_loops <= 0:
+            raise ValueError(
+                "repeats: " + str(repeats) + ", max_loops: " + str(max_loops) + "\n" +
+                "A benchmark case should be run at least once!"
+            )
+        self.repeats = repeats
+        self.warmup = warmup
+        self.min_time = min_time
+        self.max_loops = max_loops
+        self.isolate = isolate
+        self.timeout = timeout
+        self.verbose = verbose
+        self.file = file
+        if profile != None:
+            profiling.get_profiler(profile)
+        self.profile = profile
+        self.profile_dir = profile_dir
+        self.profile_time = profile_time
+        if start_method != None and start_method not in multiprocessing.get_all_start_methods():
+            raise ValueError(
+                "start_method: " + str(start_method) + "\n" +
+                "This start method is not available on this platform!"
+            )
+        self.start_method = start_method
+        self.group = ""
+        self.results = []
+
+    def __getstate__(self):
+        """
+        Gets the state of the runner to pickle it (for an isolated case started without
+        forking): the file and the results stay in the current process.
+
+        Returns:
+            dict -- The attributes of the runner, without the file and the results.
+        """
+        state = self.__dict__.copy()
+        state["file"] = None
+        state["results"] = []
+        return state
+
+    ################################################################################
+
+    def calibrate(self, timer):
+        """
+        Finds the number of loops for a repeat to last at least ``min_time``.
+
+        Args:
+            timer (func): The timer of the case (see ``loop_timer()``).
+        Returns:
+            int -- The number of loops.
+        """
+        loops = 1
+        while True:
+            for factor in (1, 2, 5):
+                n = loops * factor
+                if n >= self.max_loops or timer(n) >= self.min_time * 1e9:
+                    return min(n, self.max_loops)
+            loops *= 10
+
+    def run(self, name, timer, params=None, loops=None, isolate=None):
+        """
+        Runs a benchmark case given its timer (the most general way to define a case,
+        e.g. when each call needs a fresh object prepared outside of the timed loop).
+
+        Args:
+            name (str): The name of the case.
+            timer (func): A function taking a number of loops, running the case that many
+                times and returning the time it took in nanoseconds.
+            params (dict{str:object}): The parameters of the case.
+            loops (int): The number of loops per repeat (None to calibrate it).
+            isolate (bool): If the case should run in its own process (None to use the
+                setting of the runner).
+        Returns:
+            Measurement -- The measurement of the case.
+        Raises:
+            Exception: Any exception raised by the case.
+        """
+        if isolate == None:
+            isolate = self.isolate
+        if isolate:
+            context = self.__get_context()
+            #Without forking, the arguments of the process are pickled:
+            if context.get_start_method() != "fork":
+                try:
+                    pickle.dumps((self, timer, params))
+                except (pickle.PicklingError, AttributeError, TypeError):
+                    isolate = False
+        if isolate:
+            queue = context.Queue()
+            p = context.Process(target=_run_isolated, args=(self, queue, name, timer, params, loops))
+            p.start()
+            p.join(self.timeout if self.timeout > 0 else None)
+            if p.is_alive():
+                p.terminate()
+                p.join()
+                measurement = Measurement(name, params, status="timeout", group=self.group)
+            elif queue.empty():
+                measurement = Measurement(name, params, status="crashed", group=self.group)
+            else:
+                result = queue.get(False)
+                if isinstance(result, Exception):
+                    raise result
+                measurement = Measurement.factory_from_dict(result)
+            measurement.isolated = True
+        else:
+            measurement = self._measure(name, timer, params, loops)
+
+        if self.profile != None and measurement.status == "ok":
+            measurement.profiles = self.profile_case(measurement, timer)
+        self.results.append(measurement)
+        if self.verbose:
+            print(measurement)
+        if self.file != None:
+            self.file.write(str(measurement) + "\n")
+        return measurement
+
+    def profile_case(self, measurement, timer):
+        """
+        Runs a case under the profiler of the runner, repeating batches of
+        ``measurement.loops`` calls until ``profile_time`` is reached, and writes its
+        profile in ``profile_dir``. The files are named after the number of the case, its
+        group and its name.
+
+        Args:
+            measurement (Measurement): The measurement of the case.
+            timer (func): The timer of the case.
+        Returns:
+            list[str] -- The paths to the files written.
+        """
+        profiler = profiling.get_profiler(self.profile)
+        loops = max(1, measurement.loops)
+        elapsed = 0
+        profiler.start()
+        try:
+            while True:
+                elapsed += timer(loops)
+                if elapsed >= self.profile_time * 1e9:
+                    break
+        finally:
+            profiler.stop()
+        label = (measurement.group + " - " if measurement.group != "" else "") + measurement.name
+        label = "".join(c if c.isalnum() or c in "._-" else "_" for c in label)[:100]
+        os.makedirs(self.profile_dir, exist_ok=True)
+        return profiler.write(os.path.join(self.profile_dir, "{:04d}_{}".format(len(self.results), label)))
+
+    def time_function(self, name, function, *args, params=None, loops=None, isolate=None):
+        """
+        Runs a benchmark case calling a function with the given arguments.
+
+        Args:
+            name (str): The name of the case.
+            function (func): The function to time.
+            args (whatever): The arguments to pass to the function.
+            params (dict{str:object}): The parameters of the case.
+            loops (int): The number of loops per repeat (None to calibrate it).
+            isolate (bool): If the case should run in its own process (None to use the
+                setting of the runner).
+        Returns:
+            Measurement -- The measurement of the case.
+        """
+        return self.run(name, loop_timer(function, *args), params, loops, isolate)
+
+    ################################################################################
+
+    def to_dict(self):
+        """
+        Gets the results as a dictionary that can be dumped in JSON (see
+        ``results_to_dict()``).
+
+        Returns:
+            dict -- The environment, the settings and the measurements.
+        """
+        return results_to_dict(self.results, {"repeats": self.repeats, "warmup": self.warmup, "min_time": self.min_time,
+                                              "isolate": self.isolate, "profile": self.profile})
+
+    def save(self, path):
+        """
+        Saves the results in a JSON file.
+
+        Args:
+            path (str): The path to the file.
+        """
+        save_results(path, self.to_dict())
+
+    @staticmethod
+    def load(path):
+        """
+        Loads results saved with ``save()``.
+
+        Args:
+            path (str): The path to the file.
+        Returns:
+            tuple(dict, list[Measurement]) -- The environment of the results and the
+            measurements.
+        """
+        return load_results(path)[:2]
+
+    ################################################################################
+
+    def __get_context(self):
+        """
+        Gets the multiprocessing context in which the isolated cases are started.
+
+        Returns:
+            multiprocessing.context.BaseContext -- The context of ``start_method``, the
+            "fork" one if it is None and forking is available, the default one otherwise.
+        """
+        if self.start_method != None:
+            return multiprocessing.get_context(self.start_method)
+        if "fork" in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context("fork")
+        return multiprocessing.get_context()
+
+    def _measure(self, name, timer, params, loops):
+        """
+        Warms up, calibrates and repeats a case in the current process (also called in
+        the child process of an isolated case, see ``_run_isolated()``).
+
+        Args:
+            name (str): The name of the case.
+            timer (func): The timer of the case.
+            params (dict{str:object}): The parameters of the case.
+            loops (int): The number of loops per repeat (None to calibrate it).
+        Returns:
+            Measurement -- The measurement of the case.
+        """
+        for _ in range(self.warmup):
+            timer(1)
+        if loops == None:
+            loops = self.calibrate(timer)
+        times = [timer(loops) / loops for _ in range(self.repeats)]
+        return Measurement(name, params, loops, times, group=self.group)
+
+
+################################################################################
+################################################################################
+################################################################################
+
+def _run_isolated(runner, queue, name, timer, params, loops):
+    """
+    Measures a case in a child process and pushes the result into the queue. It is a
+    function of the module so that it can be pickled whatever the start method.
+
+    Args:
+        runner (Runner): The runner of the case.
+        queue (Queue): The queue to push the result in.
+        name (str): The name of the case.
+        timer (func): The timer of the case.
+        params (dict{str:object}): The parameters of the case.
+        loops (int): The number of loops per repeat (None to calibrate it).
+    """
+    try:
+        queue.put(runner._measure(name, timer, params, loops).to_dict())
+    except Exception as e:
+        queue.put(e)
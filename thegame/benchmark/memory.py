@@ -0,0 +1,368 @@
+################################################################################
+# thegame.benchmark.memory.py                                                  #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module measures memory with tracemalloc: the peak of the memory         #
+# allocated while an operation runs, the memory and the number of blocks its   #
+# result keeps alive, and the lines responsible for them. Results are saved in #
+# JSON like the ones of the harness (see harness.py) and compared with the     #
+# command line tool (see compare.py). It uses only the standard library.       #
+# ---------------------------------------------------------------------------- #
+# Main classes:                                                                #
+#   - MemoryMeasurement: The memory used by a benchmark case.                  #
+#   - MemoryComparison: The comparison of a case between two runs.             #
+#   - MemoryRunner: Runs benchmark cases and gathers their measurements.       #
+################################################################################
+
+from thegame.benchmark import harness
+
+import gc
+import tracemalloc
+
+
+class MemoryMeasurement:
+    """
+    The memory used by a benchmark case. Memory is deterministic enough for a single
+    measurement to be enough: the case is called once beforehand to fill the caches, then
+    once under tracemalloc. All the sizes are in bytes.
+
+    Attributes:
+        self.name (str): The name of the benchmark case.
+        self.group (str): The group of the case, the pair (group, name) identifying it.
+        self.params (dict{str:object}): The parameters of the case.
+        self.peak (int): The peak of the memory allocated during the call (temporary
+            objects included).
+        self.size (int): The memory still allocated after the call, i.e. the size of
+            the result (and of anything else the call kept alive).
+        self.blocks (int): The number of memory blocks still allocated after the call.
+        self.top (list[tuple(str, int, int)]): The lines allocating most of the memory
+            kept alive, as tuples (file:line, size, number of blocks).
+    """
+
+    METRICS = ("peak", "size", "blocks")
+
+    def __init__(self, name, params=None, peak=0, size=0, blocks=0, top=None, group=""):
+        """
+        Builds a measurement.
+
+        Args:
+            name (str): The name of the benchmark case.
+            params (dict{str:object}): The parameters of the case.
+            peak (int): The peak of the memory allocated during the call.
+            size (int): The memory still allocated after the call.
+            blocks (int): The number of memory blocks still allocated after the call.
+            top (list[tuple(str, int, int)]): The lines allocating the memory kept alive.
+            group (str): The group of the case.
+        """
+        self.name = name
+        self.group = group
+        self.params = params if params != None else {}
+        self.peak = peak
+        self.size = size
+        self.blocks = blocks
+        self.top = top if top != None else []
+
+    def to_dict(self):
+        """
+        Gets the measurement as a dictionary that can be dumped in JSON.
+
+        Returns:
+            dict -- The measurement.
+        """
+        return {
+            "name"        : self.name,
+            "group"       : self.group,
+            "params"      : self.params,
+            "peak_bytes"  : self.peak,
+            "size_bytes"  : self.size,
+            "blocks"      : self.blocks,
+            "top"         : [{"line": line, "size_bytes": size, "blocks": blocks} for line, size, blocks in self.top],
+        }
+
+    @staticmethod
+    def factory_from_dict(d):
+        """
+        Builds a measurement from a dictionary given by ``to_dict()``.
+
+        Args:
+            d (dict): The dictionary.
+        Returns:
+            MemoryMeasurement -- A new measurement.
+        """
+        top = [(t["line"], t["size_bytes"], t["blocks"]) for t in d.get("top", [])]
+        return MemoryMeasurement(d["name"], d.get("params"), d.get("peak_bytes", 0), d.get("size_bytes", 0),
+                                 d.get("blocks", 0), top, d.get("group", ""))
+
+    def __str__(self):
+        """
+        Returns a one line summary of the measurement.
+
+        Returns:
+            str -- The name of the case, the peak, the size kept alive and the number of
+            blocks.
+        """
+        name = "{:<50}".format(self.name if len(self.name) <= 50 else self.name[0:46] + "...)")
+        return name + ": peak {:>10}, kept {:>10} in {} block(s)".format(
+            format_bytes(self.peak), format_bytes(self.size), self.blocks
+        )
+
+
+################################################################################
+################################################################################
+################################################################################
+
+class MemoryComparison:
+    """
+    The comparison of a benchmark case between a base run and a new run. Each metric
+    (peak, size, blocks) is compared with a relative threshold: the case is a
+    regression if any of them grew beyond it, an improvement if none grew and one
+    shrank beyond it.
+
+    Attributes:
+        self.name (str): The name of the case (with its group).
+        self.base (MemoryMeasurement): The measurement of the base run.
+        self.new (MemoryMeasurement): The measurement of the new run.
+        self.ratios (dict{str:float}): The ratio new / base of each metric (None if the
+            base is 0 but not the new one).
+        self.verdict (str): "regression", "improvement" or "unchanged".
+    """
+
+    def __init__(self, base, new, threshold=0.05):
+        """
+        Compares two measurements of the same case.
+
+        Args:
+            base (MemoryMeasurement): The measurement of the base run.
+            new (MemoryMeasurement): The measurement of the new run.
+            threshold (float): The relative change under which a metric is considered
+                unchanged.
+        """
+        self.name = (new.group + " / " if new.group != "" else "") + new.name
+        self.base = base
+        self.new = new
+        self.ratios = {}
+        grew = shrank = False
+        for metric in MemoryMeasurement.METRICS:
+            b, n = getattr(base, metric), getattr(new, metric)
+            if b == 0:
+                self.ratios[metric] = 1.0 if n == 0 else None
+                grew = grew or n > 0
+                continue
+            self.ratios[metric] = n / b
+            grew = grew or n / b > 1 + threshold
+            shrank = shrank or n / b < 1 - threshold
+        self.verdict = "regression" if grew else "improvement" if shrank else "unchanged"
+
+    def __str__(self):
+        """
+        Returns a one line summary of the comparison.
+
+        Returns:
+            str -- The name of the case, its peak and size in both runs and the verdict.
+        """
+        name = "{:<50}".format(self.name if len(self.name) <= 50 else self.name[0:46] + "...)")
+        return name + ": peak {:>10} -> {:<10} kept {:>10} -> {:<10} {}".format(
+            format_bytes(self.base.peak), format_bytes(self.new.peak),
+            format_bytes(self.base.size), format_bytes(self.new.size), self.verdict.upper()
+        )
+
+
+################################################################################
+################################################################################
+################################################################################
+
+def format_bytes(size):
+    """
+    Formats a size given in bytes with a suitable unit.
+
+    Args:
+        size (int): The size in bytes.
+    Returns:
+        str -- The formatted size.
+    """
+    for unit, scale in (("GiB", 1 << 30), ("MiB", 1 << 20), ("KiB", 1 << 10)):
+        if abs(size) >= scale:
+            return "{:.2f}{}".format(size / scale, unit)
+    return str(size) + "B"
+
+################################################################################
+
+def is_memory_results(path):
+    """
+    Checks if a results file was saved by a memory runner.
+
+    Args:
+        path (str): The path to the file.
+    Returns:
+        bool -- True if the file contains memory measurements.
+    """
+    return harness.load_results(path, lambda d: None)[2] == "memory"
+
+################################################################################
+
+def compare_memory(base, new, threshold=0.05):
+    """
+    Compares the cases of two memory runs, matching them by group and name.
+
+    Args:
+        base (list[MemoryMeasurement]): The measurements of the base run.
+        new (list[MemoryMeasurement]): The measurements of the new run.
+        threshold (float): The relative change under which a metric is considered
+            unchanged.
+    Returns:
+        tuple(list[MemoryComparison], list[str]) -- The comparisons, in the order of the
+        new run, and the names of the cases found in only one of the runs.
+    """
+    pairs, unmatched = harness.match_cases(base, new)
+    return [MemoryComparison(b, n, threshold) for b, n in pairs], unmatched
+
+
+################################################################################
+################################################################################
+################################################################################
+
+class MemoryRunner:
+    """
+    Runs benchmark cases under tracemalloc and gathers their measurements. The tracing
+    is started (or restarted) for each case, so that only the memory allocated by the
+    case is traced: do not use it while tracemalloc is used for something else. The
+    garbage collector is disabled during the measurements, as in timeit.
+
+    Example:
+        runner = MemoryRunner()
+        runner.group = "Combinations"
+        runner.measure("m1 & m2", MassFunction.combination_smets, m1, m2)
+        runner.save("memory.json")
+
+    Attributes:
+        self.warmup (int): The number of calls before the measurement (filling caches).
+        self.top (int): The number of lines reported for each case.
+        self.verbose (bool): If each measurement should be printed.
+        self.file (file object): A file in which to write the printed measurements too
+            (None for none).
+        self.group (str): The group of the next cases.
+        self.results (list[MemoryMeasurement]): The measurements, in the order of the runs.
+    """
+
+    def __init__(self, warmup=1, top=5, verbose=True, file=None):
+        """
+        Builds a runner.
+
+        Args:
+            warmup (int): The number of calls before the measurement.
+            top (int): The number of lines reported for each case.
+            verbose (bool): If each measurement should be printed.
+            file (file object): A file in which to write the printed measurements too.
+        Raises:
+            ValueError: If warmup or top is negative.
+        """
+        if warmup < 0:
+            raise ValueError(
+                "warmup: " + str(warmup) + "\n" +
+                "The number of warmup calls cannot be negative!"
+            )
+        if top < 0:
+            raise ValueError(
+                "top: " + str(top) + "\n" +
+                "The number of lines reported cannot be negative!"
+            )
+        self.warmup = warmup
+        self.top = top
+        self.verbose = verbose
+        self.file = file
+        self.group = ""
+        self.results = []
+
+    def measure(self, name, function, *args, params=None):
+        """
+        Measures the memory used by a call. The result of the call is kept alive until
+        the end of the measurement, so its size is the memory kept after the call; for
+        a constructor, it is the size of the object built.
+
+        Args:
+            name (str): The name of the case.
+            function (func): The function to call.
+            args (*object): The arguments of the function.
+            params (dict{str:object}): The parameters of the case.
+        Returns:
+            MemoryMeasurement -- The measurement of the case (also added to the results).
+        """
+        for _ in range(self.warmup):
+            function(*args)
+        enabled = gc.isenabled()
+        gc.collect()
+        gc.disable()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        try:
+            #The peak and the snapshots are taken in two different calls, as the
+            #snapshots themselves are traced:
+            tracemalloc.start()
+            start = tracemalloc.get_traced_memory()[0]
+            result = function(*args)
+            peak = tracemalloc.get_traced_memory()[1] - start
+            tracemalloc.stop()
+            del result
+            gc.collect()
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            result = function(*args)
+            after = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+            if enabled:
+                gc.enable()
+
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+        size = sum(d.size_diff for d in diff)
+        blocks = sum(d.count_diff for d in diff)
+        top = [(str(d.traceback[0].filename) + ":" + str(d.traceback[0].lineno), d.size_diff, d.count_diff)
+               for d in diff[:self.top] if d.size_diff > 0]
+        del result
+
+        measurement = MemoryMeasurement(name, params, max(peak, size), size, blocks, top, self.group)
+        self.results.append(measurement)
+        if self.verbose:
+            print(measurement)
+        if self.file != None:
+            self.file.write(str(measurement) + "\n")
+        return measurement
+
+    ################################################################################
+
+    def to_dict(self):
+        """
+        Gets the results as a dictionary that can be dumped in JSON (see
+        ``harness.results_to_dict()``).
+
+        Returns:
+            dict -- The kind of results ("memory"), the environment, the settings and the
+            measurements.
+        """
+        return harness.results_to_dict(self.results, {"warmup": self.warmup, "top": self.top}, "memory")
+
+    def save(self, path):
+        """
+        Saves the results in a JSON file.
+
+        Args:
+            path (str): The path to the file.
+        """
+        harness.save_results(path, self.to_dict())
+
+    @staticmethod
+    def load(path):
+        """
+        Loads results saved with ``save()``.
+
+        Args:
+            path (str): The path to the file.
+        Returns:
+            tuple(dict, list[MemoryMeasurement]) -- The environment of the results and the
+            measurements.
+        """
+        return harness.load_results(path, MemoryMeasurement.factory_from_dict)[:2]
@@ -0,0 +1,307 @@
+################################################################################
+# thegame.benchmark.profiling.py                                               #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module profiles benchmark cases (see harness.py) with either cProfile   #
+# or a sampling profiler, and writes the profiles as pstats files and as       #
+# collapsed stacks ("a;b;c 42" lines), the input format of flame graph tools   #
+# such as flamegraph.pl, speedscope or inferno. It uses only the standard      #
+# library.                                                                     #
+# ---------------------------------------------------------------------------- #
+# Main classes:                                                                #
+#   - CProfileProfiler: Deterministic profiling with cProfile.                 #
+#   - SamplingProfiler: Statistical profiling of the stacks of a thread.       #
+################################################################################
+
+import cProfile
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+
+
+class CProfileProfiler:
+    """
+    A deterministic profiler based on cProfile: every call is recorded, with a noticeable
+    overhead on small functions. cProfile only records the callers of each function, not
+    whole stacks: the collapsed stacks are rebuilt from the call graph, the time of a
+    function being split between its callers in proportion to the time spent in each
+    call (see ``collapse_pstats()``).
+
+    Attributes:
+        self.stats (pstats.Stats): The statistics of the last profiling (None before).
+    """
+
+    """The extensions of the files written by ``write()``."""
+    EXTENSIONS = [".pstats", ".collapsed"]
+
+    def __init__(self):
+        """
+        Builds a profiler.
+        """
+        self.stats = None
+        self.__profile = None
+
+    def start(self):
+        """
+        Starts profiling the current thread.
+        """
+        self.__profile = cProfile.Profile()
+        self.__profile.enable()
+
+    def stop(self):
+        """
+        Stops profiling and computes the statistics.
+        """
+        self.__profile.disable()
+        self.stats = pstats.Stats(self.__profile)
+
+    def write(self, path):
+        """
+        Writes the profile as a pstats file (readable with ``pstats.Stats(path)``,
+        snakeviz...) and as collapsed stacks weighted in microseconds.
+
+        Args:
+            path (str): The path to the files, without extension.
+        Returns:
+            list[str] -- The paths to the files written.
+        """
+        self.stats.dump_stats(path + ".pstats")
+        f = open(path + ".collapsed", "w")
+        write_collapsed(f, collapse_pstats(self.stats))
+        f.close()
+        return [path + extension for extension in CProfileProfiler.EXTENSIONS]
+
+
+################################################################################
+################################################################################
+################################################################################
+
+class SamplingProfiler:
+    """
+    A statistical profiler: the stack of the profiled thread is recorded every
+    ``interval`` seconds. Its overhead does not depend on the number of calls, thus
+    the profile of small hot functions is not distorted, but functions implemented in
+    C do not appear in the stacks (their time goes to their Python caller).
+
+    When possible (on Unix, from the main thread), the stack is sampled by a SIGPROF
+    handler every ``interval`` seconds of CPU time. Otherwise, a background thread
+    samples the stack every ``interval`` seconds of wall time.
+
+    Attributes:
+        self.interval (float): The time between two samples, in seconds.
+        self.stacks (dict{tuple(str):int}): The number of samples of each stack, from
+            the outermost frame to the innermost one.
+    """
+
+    """The extensions of the files written by ``write()``."""
+    EXTENSIONS = [".collapsed"]
+
+    def __init__(self, interval=0.001):
+        """
+        Builds a profiler.
+
+        Args:
+            interval (float): The time between two samples, in seconds.
+        Raises:
+            ValueError: If the interval is not strictly positive.
+        """
+        if interval <= 0:
+            raise ValueError(
+                "interval: " + str(interval) + "\n" +
+                "The time between two samples should be strictly positive!"
+            )
+        self.interval = interval
+        self.stacks = {}
+        self.__root = None
+        self.__thread = None
+        self.__running = False
+        self.__previous_handler = None
+
+    def start(self):
+        """
+        Starts sampling the stack of the current thread. Only the frames called from
+        the caller of ``start()`` are recorded.
+        """
+        self.stacks = {}
+        self.__root = sys._getframe(1)
+        self.__running = True
+        if hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread():
+            self.__previous_handler = signal.signal(signal.SIGPROF, self.__handle_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            target = threading.get_ident()
+            self.__thread = threading.Thread(target=self.__sample_thread, args=(target,), daemon=True)
+            self.__thread.start()
+
+    def stop(self):
+        """
+        Stops sampling.
+        """
+        self.__running = False
+        if self.__thread != None:
+            self.__thread.join()
+            self.__thread = None
+        else:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self.__previous_handler)
+        self.__root = None
+
+    def write(self, path):
+        """
+        Writes the profile as collapsed stacks weighted in number of samples.
+
+        Args:
+            path (str): The path to the file, without extension.
+        Returns:
+            list[str] -- The paths to the files written.
+        """
+        f = open(path + ".collapsed", "w")
+        write_collapsed(f, dict((";".join(stack), count) for stack, count in self.stacks.items()))
+        f.close()
+        return [path + extension for extension in SamplingProfiler.EXTENSIONS]
+
+    def __record(self, frame):
+        """
+        Records the stack of a frame, up to the frame that started the profiler.
+
+        Args:
+            frame (frame): The innermost frame of the stack.
+        """
+        stack = []
+        while frame != None and frame is not self.__root:
+            code = frame.f_code
+            if code is SamplingProfiler.stop.__code__:
+                return #The profiler is being stopped
+            stack.append(frame_name(code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        if frame == None or len(stack) == 0:
+            return #Not in the profiled code (e.g. before start() returned)
+        stack = tuple(reversed(stack))
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def __handle_signal(self, signum, frame):
+        """
+        Records the interrupted stack (SIGPROF handler).
+        """
+        if self.__running:
+            self.__record(frame)
+
+    def __sample_thread(self, target):
+        """
+        Records the stack of the target thread until the profiler is stopped.
+
+        Args:
+            target (int): The identifier of the profiled thread.
+        """
+        while self.__running:
+            time.sleep(self.interval)
+            frame = sys._current_frames().get(target)
+            if frame != None:
+                self.__record(frame)
+
+
+################################################################################
+################################################################################
+################################################################################
+
+def get_profiler(kind, interval=0.001):
+    """
+    Builds a profiler given its name.
+
+    Args:
+        kind (str): "cprofile" or "sampling".
+        interval (float): The time between two samples of the sampling profiler.
+    Returns:
+        CProfileProfiler or SamplingProfiler -- A new profiler.
+    Raises:
+        ValueError: If the kind of profiler is unknown.
+    """
+    if kind == "cprofile":
+        return CProfileProfiler()
+    if kind == "sampling":
+        return SamplingProfiler(interval)
+    raise ValueError(
+        "kind: " + str(kind) + "\n" +
+        "The profiler should be either 'cprofile' or 'sampling'!"
+    )
+
+################################################################################
+
+def frame_name(filename, lineno, name):
+    """
+    Gets the name of a function as written in the collapsed stacks.
+
+    Args:
+        filename (str): The file of the function ("~" for built-in functions).
+        lineno (int): The line of the function.
+        name (str): The name of the function.
+    Returns:
+        str -- "name (file.py:line)", or the name alone for built-in functions.
+    """
+    name = name.replace(";", ":")
+    if filename == "~":
+        return name
+    return name + " (" + os.path.basename(filename).replace(";", ":") + ":" + str(lineno) + ")"
+
+################################################################################
+
+def collapse_pstats(stats, max_depth=64, min_time=1e-6):
+    """
+    Rebuilds collapsed stacks from cProfile statistics. From each root of the call
+    graph, the calls are followed down: the share of a function's time attributed to a
+    path is the time of the calls made from the parent on this path, split in
+    proportion to the time each caller spent in it. Recursive calls are not followed.
+
+    Args:
+        stats (pstats.Stats): The statistics.
+        max_depth (int): The maximum depth of the stacks.
+        min_time (float): The time, in seconds, under which a path is not followed.
+    Returns:
+        dict{str:int} -- The time spent in each stack ("outer;...;inner"), in
+        microseconds.
+    """
+    entries = dict((f, s) for f, s in stats.stats.items() if "_lsprof.Profiler" not in f[2])
+    callees = {}
+    for function, (_, _, _, _, callers) in entries.items():
+        for caller in callers:
+            callees.setdefault(caller, []).append(function)
+    stacks = {}
+
+    def walk(function, path, functions, fraction):
+        _, _, own_time, total_time, _ = entries[function]
+        path = path + [frame_name(*function)]
+        if own_time * fraction > 0:
+            stack = ";".join(path)
+            stacks[stack] = stacks.get(stack, 0) + own_time * fraction * 1e6
+        if len(path) >= max_depth:
+            return
+        for callee in callees.get(function, []):
+            if callee in functions or callee not in entries:
+                continue
+            edge_time = entries[callee][4][function][3] * fraction
+            if edge_time >= min_time and entries[callee][3] > 0:
+                walk(callee, path, functions | {callee}, edge_time / entries[callee][3])
+
+    for function, (_, _, _, _, callers) in entries.items():
+        if len([c for c in callers if c in entries]) == 0:
+            walk(function, [], {function}, 1.0)
+    return dict((stack, int(round(t))) for stack, t in stacks.items() if round(t) > 0)
+
+################################################################################
+
+def write_collapsed(file, stacks):
+    """
+    Writes collapsed stacks, one "outer;...;inner weight" line per stack.
+
+    Args:
+        file (file object): The text file object in which to write.
+        stacks (dict{str:int}): The weight of each stack.
+    """
+    for stack in sorted(stacks):
+        file.write(stack + " " + str(stacks[stack]) + "\n")
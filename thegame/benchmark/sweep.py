@@ -0,0 +1,183 @@
+################################################################################
+# thegame.benchmark.sweep.py                                                   #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module runs parameter sweeps with the harness (see harness.py): a case  #
+# is measured for increasing values of a parameter (frame size, number of      #
+# focal elements, number of sources...) and an empirical complexity is fitted  #
+# on the measurements, to see where an operation falls off a cliff.           #
+# ---------------------------------------------------------------------------- #
+# Main classes:                                                                #
+#   - SweepResult: The measurements of a sweep and their fitted complexity.    #
+################################################################################
+
+from thegame.benchmark import harness
+
+import csv
+import math
+
+
+class SweepResult:
+    """
+    The measurements of a case for increasing values of a parameter, with two fitted
+    models of the median time t as a function of the parameter x:
+    - a power law t = a * x^k (polynomial complexity), fitted on (log x, log t);
+    - an exponential t = a * b^x (exponential complexity), fitted on (x, log t).
+    The model with the best coefficient of determination is the most likely
+    complexity of the operation.
+
+    Attributes:
+        self.name (str): The name of the sweep.
+        self.parameter (str): The name of the swept parameter.
+        self.values (list[float]): The values of the parameter that were measured.
+        self.measurements (list[Measurement]): The measurements, for each value.
+        self.truncated (bool): If the sweep was stopped before its last value because a
+            case exceeded the time limit.
+        self.exponent (float): The exponent k of the power law (None if fewer than two
+            points).
+        self.exponent_r2 (float): The coefficient of determination of the power law.
+        self.base (float): The base b of the exponential (None if fewer than two points).
+        self.base_r2 (float): The coefficient of determination of the exponential.
+    """
+
+    def __init__(self, name, parameter, values, measurements, truncated=False):
+        """
+        Builds the result of a sweep and fits the complexity models.
+
+        Args:
+            name (str): The name of the sweep.
+            parameter (str): The name of the swept parameter.
+            values (list[float]): The values of the parameter that were measured.
+            measurements (list[Measurement]): The measurements, for each value.
+            truncated (bool): If the sweep was stopped before its last value.
+        """
+        self.name = name
+        self.parameter = parameter
+        self.values = list(values)
+        self.measurements = list(measurements)
+        self.truncated = truncated
+
+        points = [(x, m.median) for x, m in zip(self.values, self.measurements)
+                  if m.status == "ok" and x > 0 and m.median > 0]
+        self.exponent, self.exponent_r2 = fit([math.log(x) for x, t in points], [math.log(t) for x, t in points])
+        slope, self.base_r2 = fit([x for x, t in points], [math.log(t) for x, t in points])
+        self.base = math.exp(slope) if slope != None else None
+
+    @property
+    def complexity(self):
+        """str -- The best fitted model, e.g. "O(n^2.01)" or "O(1.98^n)" (None if fewer than
+        two points)."""
+        if self.exponent == None:
+            return None
+        if self.base_r2 > self.exponent_r2 and self.base > 1:
+            return "O({:.2f}^{})".format(self.base, self.parameter)
+        return "O({}^{:.2f})".format(self.parameter, self.exponent)
+
+    def __str__(self):
+        """
+        Returns a one line summary of the sweep.
+
+        Returns:
+            str -- The name of the sweep, the fitted models and the time of the largest case.
+        """
+        name = "{:<50}".format(self.name if len(self.name) <= 50 else self.name[0:46] + "...)")
+        if self.exponent == None:
+            return name + ": not enough points"
+        last = self.measurements[-1]
+        return name + ": {:<14} (k={:.2f}, r²={:.3f}; b={:.3f}, r²={:.3f}) {}={} in {}{}".format(
+            self.complexity, self.exponent, self.exponent_r2, self.base, self.base_r2,
+            self.parameter, self.values[-1], harness.format_ns(last.median) if last.status == "ok" else last.status,
+            ", stopped" if self.truncated else ""
+        )
+
+
+################################################################################
+################################################################################
+################################################################################
+
+def fit(xs, ys):
+    """
+    Fits y = slope * x + intercept with the least squares method.
+
+    Args:
+        xs (list[float]): The abscissas.
+        ys (list[float]): The ordinates.
+    Returns:
+        tuple(float, float) -- The slope and the coefficient of determination r² (None,
+        None if there are fewer than two distinct abscissas).
+    """
+    n = len(xs)
+    if n < 2:
+        return None, None
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    sxx = sum((x - mean_x)**2 for x in xs)
+    if sxx == 0:
+        return None, None
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    syy = sum((y - mean_y)**2 for y in ys)
+    slope = sxy / sxx
+    r2 = sxy * sxy / (sxx * syy) if syy > 0 else 1.0
+    return slope, r2
+
+################################################################################
+
+def sweep(runner, name, parameter, values, build, params=None, max_time=1.0):
+    """
+    Measures a case for each value of a parameter, in increasing order. The sweep stops
+    as soon as a case takes longer than max_time per call: the next values would only
+    take longer.
+
+    Args:
+        runner (Runner): The runner measuring the cases.
+        name (str): The name of the sweep (the cases are named "name [parameter=value]").
+        parameter (str): The name of the swept parameter.
+        values (list[float]): The values of the parameter, in increasing order.
+        build (func): A function taking a value of the parameter and returning the
+            function to time and its arguments as a tuple (function, args); the building
+            itself is not timed.
+        params (dict{str:object}): The other parameters of the cases (fixed during the
+            sweep).
+        max_time (float): The time per call, in seconds, above which the sweep stops
+            (0 for no limit).
+    Returns:
+        SweepResult -- The result of the sweep.
+    """
+    measured = []
+    measurements = []
+    for value in values:
+        function, args = build(value)
+        case_params = dict(params) if params != None else {}
+        case_params[parameter] = value
+        measurement = runner.time_function(name + " [" + parameter + "=" + str(value) + "]", function, *args,
+                                           params=case_params)
+        measured.append(value)
+        measurements.append(measurement)
+        if measurement.status != "ok" or (max_time > 0 and measurement.median > max_time * 1e9):
+            break
+    return SweepResult(name, parameter, measured, measurements, len(measured) < len(values))
+
+################################################################################
+
+def write_csv(file, results):
+    """
+    Writes the points of several sweeps in CSV, one line per measured case, with the
+    fitted complexity of its sweep.
+
+    Args:
+        file (file object): The text file object in which to write (opened with
+            ``newline=""``).
+        results (list[SweepResult]): The results of the sweeps.
+    """
+    writer = csv.writer(file)
+    writer.writerow(["sweep", "parameter", "value", "status", "loops", "median_ns", "q1_ns", "q3_ns", "min_ns",
+                     "exponent", "exponent_r2", "base", "base_r2", "complexity"])
+    for result in results:
+        for value, m in zip(result.values, result.measurements):
+            quartiles = m.quartiles if m.quartiles != None else (None, None)
+            writer.writerow([result.name, result.parameter, value, m.status, m.loops, m.median, quartiles[0],
+                             quartiles[1], m.minimum, result.exponent, result.exponent_r2, result.base,
+                             result.base_r2, result.complexity])
@@ -1,5 +1,6 @@
 __all__ = [
     "frombeliefs.py",
     "fromrandomness.py",
-    "fromsensors.py"
+    "fromsensors.py",
+    "fromsensorstraining.py"
 ]
@@ -14,15 +14,20 @@
 # Main classes:                                                                #
 #   - DiscreteMassFunctionsFromBeliefsGenerator: A generator of discrete mass  #
 #     functions from mass functions defined on another frame of discernment.   #
+#   - EvidentialMappingChain: Transfers through a hierarchy of frames of dis-  #
+#     cernment with a single composed mapping.                                 #
 ################################################################################
 
 import thegame.element as element
 import thegame.massfunction as massfunction
-import thegame.utility.prettyxml as prettyxml
+import thegame.utility.xmlwriter as xmlwriter
 
 from enum import Enum
+from array import array
+from collections import OrderedDict
 
 import xml.etree.ElementTree as ET
+import xml.parsers.expat as expat
 import copy
 import os
 import shutil
@@ -76,7 +81,30 @@ class InvalidBeliefsFromBeliefsModelError(EvidentialMappingError):
         self.message = message
 
     def __str__(self):
-        return message
+        return self.message
+
+class MissingInformationError(EvidentialMappingError):
+    """
+    Raised when an invalid model is found: lacking a file, lacking certain data, etc.
+    """
+
+    def __init__(self, message):
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+class IncompatibleMappingsError(EvidentialMappingError):
+    """
+    Raised when evidential mappings cannot be chained because the recipient frame of
+    one is not the frame from which the next one transfers mass.
+    """
+
+    def __init__(self, message):
+        self.message = message
+
+    def __str__(self):
+        return self.message
  
 ################################################################################
 ################################################################################
@@ -149,7 +177,7 @@ class DiscreteMappingVector:
             MassFunction (invalid) -- The transferred mass in the form of a
             mass function (that should not be valid if the given mass wasn't 1).
         """
-        result = MassFunction()
+        result = massfunction.MassFunction()
         for element, factor in self.points.items():
             result.add_mass((element, mass * factor))
         return result
@@ -157,7 +185,7 @@ class DiscreteMappingVector:
     def is_valid(self):
         """
         Checks that the vector is valid (the sum of the recipient masses
-        equals 1).
+        equals 1, up to ``MassFunction.precision``).
 
         Returns:
             bool -- ``True`` if the vector is valid, ``False`` otherwise.
@@ -165,7 +193,197 @@ class DiscreteMappingVector:
         s = 0
         for element, factor in self.points.items():
             s += factor
-        return s == 1
+        return abs(s - 1) <= massfunction.MassFunction.precision
+
+
+################################################################################
+################################################################################
+################################################################################
+
+class CompiledEvidentialMapping:
+    """
+    An evidential mapping compiled into a sparse matrix in a CSR-like layout: the
+    recipient elements are numbered, and for each element from which mass is
+    transferred (a row), the indexes of its recipients and the transfer factors are
+    stored contiguously in typed arrays. A transfer is then a single sparse
+    matrix-vector product into an accumulator, without building intermediate mass
+    functions.
+
+    The mass on the empty set is transferred entirely to the empty set of the
+    recipient frame, which has its own column.
+
+    The rows of the elements without vector in a sparse mapping are derived on
+    demand (see ``DiscreteEvidentialMapping.derive()``) and kept in a bounded LRU
+    cache.
+
+    Attributes:
+        self.rows (dict{Element:int}): The row of each element from which mass is
+            transferred.
+        self.recipients (list[Element]): The recipient elements (the columns).
+        self.row_pointers (array[int]): The start of each row in ``self.columns`` and
+            ``self.factors`` (with the end of the last row appended).
+        self.columns (array[int]): The recipient indexes of the transfer points.
+        self.factors (array[float]): The transfer factors of the transfer points.
+        self.derived (OrderedDict{Element:list[tuple(int, float)]}): The derived rows
+            (recipient indexes and factors), the least recently used first.
+    """
+
+    def __init__(self, mapping):
+        """
+        Compiles the given evidential mapping.
+
+        Args:
+            mapping (DiscreteEvidentialMapping): The mapping to compile.
+        """
+        self.rows = {}
+        self.recipients = []
+        self.row_pointers = array('l', [0])
+        self.columns = array('l')
+        self.factors = array('d')
+        self.derived = OrderedDict()
+        self.__mapping = mapping
+        self.__indexes = {}
+
+        for element_from, vector in mapping.vectors.items():
+            self.rows[element_from] = len(self.row_pointers) - 1
+            for e, factor in vector.points.items():
+                self.columns.append(self.__get_index(e))
+                self.factors.append(factor)
+            self.row_pointers.append(len(self.columns))
+
+    def __get_index(self, recipient):
+        """
+        Gets the index of a recipient element, numbering it if it is new.
+
+        Args:
+            recipient (Element): The recipient element.
+        Returns:
+            int -- The index of the recipient element in ``self.recipients``.
+        """
+        index = self.__indexes.get(recipient)
+        if index == None:
+            index = self.__indexes[recipient] = len(self.recipients)
+            self.recipients.append(recipient)
+        return index
+
+    def __get_irregular_row(self, element_from):
+        """
+        Gets the row of an element without vector: the empty set, transferred entirely
+        to the empty set, or a derived row (cached).
+
+        Args:
+            element_from (Element): The element from which mass is transferred.
+        Returns:
+            list[tuple(int, float)] -- The recipient indexes and the transfer factors.
+        Raises:
+            KeyError: If the row cannot be derived.
+        """
+        row = self.derived.get(element_from)
+        if row != None:
+            self.derived.move_to_end(element_from)
+            return row
+        if element_from.is_empty():
+            if len(self.recipients) == 0:
+                raise KeyError(element_from)
+            return [(self.__get_index(self.recipients[0].get_compatible_empty_element()), 1.0)]
+
+        row = [(self.__get_index(e), factor) for e, factor in self.__mapping.derive(element_from)]
+        self.derived[element_from] = row
+        if len(self.derived) > self.__mapping.max_derived:
+            self.derived.popitem(last=False)
+        return row
+
+    def get_row(self, element_from):
+        """
+        Gets the transfer points of the given element, the empty set being transferred
+        entirely to the empty set.
+
+        Args:
+            element_from (Element): The element from which mass is transferred.
+        Returns:
+            list[tuple(Element, float)] -- The recipient elements and the transfer factors.
+        Raises:
+            KeyError: If there is no mapping vector for the given element and it cannot
+            be derived.
+        """
+        row = self.rows.get(element_from)
+        if row == None:
+            return [(self.recipients[i], factor) for i, factor in self.__get_irregular_row(element_from)]
+        return [(self.recipients[self.columns[k]], self.factors[k])
+                for k in range(self.row_pointers[row], self.row_pointers[row + 1])]
+
+    def __accumulate(self, mass_function, accumulator, touched):
+        """
+        Adds the transfer of the given mass function to the accumulator.
+
+        Args:
+            mass_function (MassFunction): The mass function to transfer.
+            accumulator (list[float]): The masses of the recipient elements (extended if
+                derived rows bring new recipients).
+            touched (set[int]): The indexes of the recipient elements that received mass.
+        Raises:
+            KeyError: If there is no mapping vector for a focal element of the mass function
+            and it cannot be derived.
+        """
+        rows = self.rows
+        pointers = self.row_pointers
+        columns = self.columns
+        factors = self.factors
+        for e, mass in mass_function.items():
+            row = rows.get(e)
+            if row == None:
+                irregular = self.__get_irregular_row(e)
+                if len(accumulator) < len(self.recipients):
+                    accumulator.extend([0.0] * (len(self.recipients) - len(accumulator)))
+                for column, factor in irregular:
+                    accumulator[column] += mass * factor
+                    touched.add(column)
+                continue
+            for k in range(pointers[row], pointers[row + 1]):
+                column = columns[k]
+                accumulator[column] += mass * factors[k]
+                touched.add(column)
+
+    def transfer(self, mass_function):
+        """
+        Transfers a mass function.
+
+        Args:
+            mass_function (MassFunction): The mass function to transfer.
+        Returns:
+            MassFunction -- A new mass function on the recipient frame.
+        Raises:
+            KeyError: If there is no mapping vector for a focal element of the mass function
+            and it cannot be derived.
+        """
+        return self.transfer_many([mass_function])[0]
+
+    def transfer_many(self, mass_functions):
+        """
+        Transfers several mass functions in one call, reusing the same accumulator.
+
+        Args:
+            mass_functions (iterable[MassFunction]): The mass functions to transfer.
+        Returns:
+            list[MassFunction] -- The new mass functions on the recipient frame, in the
+            same order.
+        Raises:
+            KeyError: If there is no mapping vector for a focal element of a mass function
+            and it cannot be derived.
+        """
+        results = []
+        recipients = self.recipients
+        accumulator = [0.0] * len(recipients)
+        touched = set()
+        for mass_function in mass_functions:
+            self.__accumulate(mass_function, accumulator, touched)
+            result = massfunction.MassFunction()
+            for i in sorted(touched):
+                result.focals[recipients[i]] = accumulator[i]
+                accumulator[i] = 0.0
+            touched.clear()
+            results.append(result)
+        return results
 
 
 ################################################################################
@@ -177,9 +395,38 @@ class DiscreteEvidentialMapping:
     An evidential mapping to transfer mass functions from one frame of discernment
     to another. For more details, please refer to "B. Pietropaoli et al., Propagation
     of Belief Functions through Frames of Discernment, 2013".
+
+    Attributes:
+        self.frame_name (str): The name of the frame of discernment from which mass
+            is transferred.
+        self.ref_list (list[object]): The states of the frame of discernment from which
+            mass is transferred.
+        self.vectors (dict{Element:DiscreteMappingVector}): The mapping vectors, with
+            the elements from which mass is transferred as keys.
+        self.compiled (CompiledEvidentialMapping): The compiled version of the mapping
+            used for the transfers, None until needed (see ``compile()``).
+        self.version (int): Incremented each time the mapping is modified.
+        self.derivation (Derivation): The rule used to derive the vectors that are not
+            given from the vectors of the atoms (None if all the vectors are given).
+        self.max_derived (int): The maximum number of derived vectors kept in memory.
+        self.chained (list[DiscreteEvidentialMapping]): The mappings this one was composed
+            from, through which its missing vectors are derived (None if not composed).
     """
 
-    def __init__(self, frame_name, ref_list, *mapping_vectors):
+    class Derivation(Enum):
+        """
+        The rules to derive the vector of an element from the vectors of its atoms, for
+        sparse mappings over large frames where only some vectors are given.
+        """
+
+        """The disjunctive combination of the vectors of the atoms: the mass goes to the
+        unions of one recipient of each atom, with the product of their factors (the
+        least committed transfer when any of the atoms can be the truth)."""
+        disjunctive = 1
+        """All the mass goes to the union of all the recipients of the atoms' vectors."""
+        union       = 2
+
+    def __init__(self, frame_name, ref_list, *mapping_vectors, derivation=None, max_derived=1024):
         """
         Builds a discrete evidential mapping.
 
@@ -189,10 +436,25 @@ class DiscreteEvidentialMapping:
             ref_list (list[object]): A list of objects representing the actual states
                 of the frame of discernment.
             mapping_vectors (*DiscreteMappingVector): The mapping vectors.
+            derivation (Derivation): The rule used to derive the vectors that are not
+                given (None to require all of them).
+            max_derived (int): The maximum number of derived vectors kept in memory.
+        Raises:
+            ValueError: If max_derived is not strictly positive.
         """
+        if max_derived <= 0:
+            raise ValueError(
+                "max_derived: " + str(max_derived) + "\n" +
+                "The number of derived vectors kept in memory should be strictly positive!"
+            )
         self.frame_name = frame_name
         self.ref_list = ref_list
         self.vectors = {}
+        self.compiled = None
+        self.version = 0
+        self.derivation = derivation
+        self.max_derived = max_derived
+        self.chained = None
         self.add_vectors(*mapping_vectors)
 
     def add_vector(self, vector):
@@ -210,6 +472,7 @@ class DiscreteEvidentialMapping:
             raise DuplicateMappingVectorError(self.frame_name, vector.element_from)
 
         self.vectors[vector.element_from] = vector
+        self.invalidate()
 
     def add_vectors(self, *vectors):
         """
@@ -225,6 +488,87 @@ class DiscreteEvidentialMapping:
             self.add_vector(vector)
 
 
+    def compile(self):
+        """
+        Gets the compiled version of the mapping used for the transfers (see
+        ``CompiledEvidentialMapping``). It is built on first call and kept until a
+        vector is added.
+
+        Remark: Modifying the points of a vector already in the mapping is not
+        detected, call ``invalidate()`` yourself if you do so.
+
+        Returns:
+            CompiledEvidentialMapping -- The compiled mapping.
+        """
+        if self.compiled == None:
+            self.compiled = CompiledEvidentialMapping(self)
+        return self.compiled
+
+    def invalidate(self):
+        """
+        Drops the compiled version of the mapping (it will be compiled again on the
+        next transfer) and increments its version, so that the compositions including
+        it are computed again (see ``EvidentialMappingChain``).
+        """
+        self.compiled = None
+        self.version += 1
+
+    def derive(self, element_from):
+        """
+        Derives the transfer points of an element without vector, with the derivation
+        rule of the mapping (see ``Derivation``) or, for a composed mapping, through the
+        mappings it was composed from.
+
+        Args:
+            element_from (DiscreteElement): The element from which mass is transferred.
+        Returns:
+            list[tuple(Element, float)] -- The recipient elements and the transfer factors.
+        Raises:
+            KeyError: If the vector cannot be derived (no derivation rule, or no vector
+            for one of the atoms of the element).
+        """
+        if self.chained != None:
+            points = self.chained[0].compile().get_row(element_from)
+            for mapping in self.chained[1:]:
+                compiled = mapping.compile()
+                accumulator = {}
+                for e, factor in points:
+                    for recipient, next_factor in compiled.get_row(e):
+                        accumulator[recipient] = accumulator.get(recipient, 0) + factor * next_factor
+                points = list(accumulator.items())
+            return points
+
+        if self.derivation == None:
+            raise KeyError(element_from)
+
+        size = element_from.size
+        number = element_from._number
+        vectors = []
+        for i in range(size):
+            if number >> i & 1:
+                atom = element.DiscreteElement.factory_constructor_unsafe(size, 1 << i)
+                if atom not in self.vectors:
+                    raise KeyError(element_from)
+                vectors.append(self.vectors[atom].points)
+
+        recipient_size = next(iter(vectors[0])).size
+        if self.derivation == DiscreteEvidentialMapping.Derivation.union:
+            union = 0
+            for points in vectors:
+                for e in points:
+                    union |= e._number
+            return [(element.DiscreteElement.factory_constructor_unsafe(recipient_size, union), 1.0)]
+
+        combined = dict((e._number, factor) for e, factor in vectors[0].items())
+        for points in vectors[1:]:
+            result = {}
+            for n1, f1 in combined.items():
+                for e, f2 in points.items():
+                    union = n1 | e._number
+                    result[union] = result.get(union, 0) + f1 * f2
+            combined = result
+        return [(element.DiscreteElement.factory_constructor_unsafe(recipient_size, n), f) for n, f in combined.items()]
+
     def get_evidence(self, mass_function):
         """
         Gets the belief from the given belief (belief transfer).
@@ -236,27 +580,93 @@ class DiscreteEvidentialMapping:
         Returns:
             MassFunction -- A new mass function corresponding to the given one
             transferred to another frame of discernment.
+        Raises:
+            KeyError: If there is no mapping vector for a focal element of the mass function.
         """
-        result = MassFunction()
-        for element, mass in mass_function.items():
-            if not element.is_empty():
-                transfer = self.vectors[element].get_transfered_mass(mass)
-                for e, v in transfer.items():
-                    result.add_mass(e, v)
-            else: #The mass on the empty set is transfered entirely
-                empty = element.get_compatible_empty_element()
-                result.add(empty, mass)
-        return result
+        return self.compile().transfer(mass_function)
+
+    def get_evidence_batch(self, mass_functions):
+        """
+        Transfers several mass functions in one call (see ``get_evidence()``).
+
+        Args:
+            mass_functions (iterable[MassFunction]): The mass functions to transfer.
+        Returns:
+            list[MassFunction] -- The transferred mass functions, in the same order.
+        Raises:
+            KeyError: If there is no mapping vector for a focal element of a mass function.
+        """
+        return self.compile().transfer_many(mass_functions)
+
+    @staticmethod
+    def compose(*mappings):
+        """
+        Composes chained mappings into a single equivalent one (the product of their
+        transfer matrices): mass is transferred by the first mapping, then the result by
+        the second one, etc. As transfers are linear, transferring with the composed
+        mapping gives the same result as transferring through each mapping in turn.
+
+        Args:
+            mappings (*DiscreteEvidentialMapping): The mappings, in the order in which mass
+                flows through them.
+        Returns:
+            DiscreteEvidentialMapping -- A new mapping from the frame of the first mapping
+            to the recipient frame of the last one.
+        Raises:
+            ValueError: If no mapping is given.
+            IncompatibleMappingsError: If the recipient elements of a mapping are not
+            defined on the frame from which the next mapping transfers mass.
+            KeyError: If a mapping does not have a vector for a recipient element of the
+            previous one.
+        """
+        if len(mappings) == 0:
+            raise ValueError("At least one mapping is required!")
+
+        composed = mappings[0]
+        for mapping in mappings[1:]:
+            size = len(mapping.ref_list)
+            nexts = mapping.compile()
+            vectors = []
+            for element_from, vector in composed.vectors.items():
+                accumulator = {}
+                for e, factor in vector.points.items():
+                    if e.size != size:
+                        raise IncompatibleMappingsError(
+                            "The mapping from the frame " + str(composed.frame_name) + " transfers mass to " +
+                            "elements of size " + str(e.size) + " but the next mapping transfers mass from " +
+                            "the frame " + str(mapping.frame_name) + " of size " + str(size) + "!"
+                        )
+                    for recipient, next_factor in nexts.get_row(e):
+                        accumulator[recipient] = accumulator.get(recipient, 0) + factor * next_factor
+                vectors.append(DiscreteMappingVector(element_from, *accumulator.items()))
+            composed = DiscreteEvidentialMapping(mappings[0].frame_name, mappings[0].ref_list, *vectors,
+                                                 max_derived=mappings[0].max_derived)
+        if len(mappings) > 1:
+            #The rows that are not given are derived through the chain:
+            composed.chained = list(mappings)
+        return composed
 
     def is_valid(self):
         """
         Checks that the current mapping is valid.
 
+        All the vectors should be given, except for sparse mappings, which only need the
+        vectors of the atoms (the others being derived), and for composed mappings, which
+        are valid if the mappings they were composed from are.
+
         Returns:
             bool -- ``True`` if the model is valid, ``False`` otherwise.
         """
-        if len(self.vectors) != 2**len(self.ref_list) - 1:
-            False
+        if self.chained != None:
+            if not all(mapping.is_valid() for mapping in self.chained):
+                return False
+        elif self.derivation != None:
+            size = len(self.ref_list)
+            for i in range(size):
+                if element.DiscreteElement.factory_constructor_unsafe(size, 1 << i) not in self.vectors:
+                    return False
+        elif sum(1 for e in self.vectors if not e.is_empty()) != 2**len(self.ref_list) - 1:
+            return False
 
         for e, vector in self.vectors.items():
             if not vector.is_valid():
@@ -280,7 +690,8 @@ class DiscreteMassFunctionsFromBeliefsGenerator:
         self.ref_list (list[object]): The list of references associated to the
             different possible states in the frame of discernment.
         self.mappings (dict{subframe_name:evidential_mapping}): The evidential
-            mappings from which mass can be transferred.
+            mappings from which mass can be transferred (only the ones already built
+            if the model was loaded lazily, see ``get_mapping()``).
     """
 
     class ModelFormat(Enum):
@@ -299,18 +710,32 @@ class DiscreteMassFunctionsFromBeliefsGenerator:
         self.frame_name = frame_name
         self.ref_list = []
         self.mappings = {}
+        self.__pending = {}
 
     ################################################################################
 
-    def load_model(self, path, model_format):
+    def load_model(self, path, model_format, lazy=False, derivation=None, max_derived=1024):
         """
         Loads a model from either an XML file or from a custom directory.
 
+        In lazy mode, only the frame of discernment and the names of the subframes are
+        read: the mapping of a subframe is built the first time it is needed (see
+        ``get_mapping()``), which keeps the loading time and the memory footprint low
+        for models with many (or large) subframes of which only some are used. An XML
+        file is scanned without building its tree, only the position of each mapping
+        in the file is kept, and the part of the file describing a mapping is parsed
+        when it is needed.
+
         Args:
             path (str): Either the complete path to the XML file, OR the path
                 to the directory containing the model (the name of the directory
                 is used as the name of the frame of discernment).
             model_format (ModelFormat): The format of the model to load.
+            lazy (bool): If the mappings should only be built when first needed.
+            derivation (DiscreteEvidentialMapping.Derivation): The rule used to derive
+                the vectors missing from the model (None if the model gives all of them).
+            max_derived (int): The maximum number of derived vectors kept in memory per
+                mapping.
         Raises:
             A lot of various errors to help understand what's wrong in your model.
         """   
@@ -339,6 +764,15 @@ class DiscreteMassFunctionsFromBeliefsGenerator:
             #Reset the current model:
             self.ref_list = []
             self.mappings = {}
+            self.__pending = {}
+
+            if lazy:
+                #Only index the file, the mappings are parsed when needed:
+                self.frame_name, self.ref_list, index, encoding = DiscreteMassFunctionsFromBeliefsGenerator.__index_xml(path)
+                for subframe_name, start, end in index:
+                    self.__pending[subframe_name] = (self.__load_xml_fragment, path, start, end, encoding,
+                                                     derivation, max_derived)
+                return
 
             #Parse the xml:
             root = ET.parse(path).getroot()
@@ -346,7 +780,7 @@ class DiscreteMassFunctionsFromBeliefsGenerator:
             #Load the frame of discernment:
             frame_element = root.findall("frame")
             if len(frame_element) != 1:
-                raise InvalidModelError(
+                raise InvalidBeliefsFromBeliefsModelError(
                     "File: " + str(path) + "\n" +
                     "This should contain exactly one <frame> tag!"
                 )
@@ -358,7 +792,7 @@ class DiscreteMassFunctionsFromBeliefsGenerator:
             #Load the mappings:
             mappings_element = root.findall("evidential-mappings")
             if len(mappings_element) != 1:
-                raise InvalidModelError(
+                raise InvalidBeliefsFromBeliefsModelError(
                     "File: " + str(path) + "\n" +
                     "This should contain exactly one <evidential-mappings> tag!"
                 )
@@ -367,35 +801,12 @@ class DiscreteMassFunctionsFromBeliefsGenerator:
                 #Get the subframe:
                 subframe_element = mapping.findall("subframe")
                 if len(subframe_element) != 1:
-                    raise InvalidModelError(
+                    raise InvalidBeliefsFromBeliefsModelError(
                         "File: " + str(path) + "\n" +
                         "This should contain exactly one <subframe> tag per <evidential-mapping>!"
                     )
-                subframe_element = subframe_element[0]
-                subframe_name = subframe_element.get("name")
-                subframe_ref_list = []
-                for state in subframe_element.iter("state"):
-                    subframe_ref_list.append(state.text)
-                    
-                #Get the vectors:
-                vectors = []
-                for vector_element in mapping.iter("mapping-vector"):
-                    from_element = vector_element.findall("from")
-                    if len(from_element) != 1:
-                        raise InvalidModelError(
-                            "File: " + str(path) + "\n" +
-                            "This should contain exactly one <from> tag per <mapping-vector>!"
-                        )
-                    from_element = from_element[0]
-                    element_from = element.DiscreteElement.factory_from_ref_list(subframe_ref_list, *from_element.get("element").split(" "))
-                    points = []
-                    for to_element in vector_element.iter("to"):
-                        e = element.DiscreteElement.factory_from_ref_list(self.ref_list, *to_element.get("element").split(" "))
-                        v = float(to_element.text)
-                        points.append((e, v))
-                    vectors.append(DiscreteMappingVector(element_from, *points))
-                    
-                self.mappings[subframe_name] = DiscreteEvidentialMapping(subframe_name, subframe_ref_list, *vectors)
+                subframe_name = subframe_element[0].get("name")
+                self.mappings[subframe_name] = self.__load_xml_mapping(path, mapping, derivation, max_derived)
 
         # *****************
         # CUSTOM DIRECTORY:
@@ -411,6 +822,7 @@ class DiscreteMassFunctionsFromBeliefsGenerator:
 
             #Reset the current model:
             self.mappings = {}
+            self.__pending = {}
             self.ref_list = []
 
             #Get the reference list for the elements:
@@ -423,61 +835,261 @@ class DiscreteMassFunctionsFromBeliefsGenerator:
             self.ref_list = [line.replace("\n", "") for line in f.readlines()]
             f.close()
 
-            #Load the subframe models:
-            subframesdirs = [x[0] for x in os.walk(path)] #Get the subframe directories
-            subframesdirs.remove(path)
-
+            #Load the subframe models (one directory per subframe):
+            subframesdirs = [os.path.join(path, d) for d in sorted(os.listdir(path))]
             for subframedir in subframesdirs:
+                if not os.path.isdir(subframedir):
+                    continue
                 subframe_name = os.path.basename(subframedir)
-                
-                #Get the reference list for the elements of the subframe:
-                reflistfile = os.path.join(subframedir, "values")
-                if not os.path.exists(reflistfile):
-                    raise MissingInformationError(
-                        "Invalid model: " + subframedir + " should contain a file called 'values'!"
+                loader = (self.__load_directory_mapping, subframedir, derivation, max_derived)
+                if lazy:
+                    self.__pending[subframe_name] = loader
+                else:
+                    self.mappings[subframe_name] = loader[0](*loader[1:])
+
+    ################################################################################
+
+    @staticmethod
+    def __index_xml(path):
+        """
+        Reads an XML model without building it: only the frame of discernment and the
+        position of each <evidential-mapping> node in the file are kept, thus the time
+        and the memory needed do not depend on the size of the mappings.
+
+        Args:
+            path (str): The path to the XML file.
+        Returns:
+            tuple(str, list[str], list[tuple(str, int, int)], str) -- The name of the
+            frame, its states, the subframe name, start and end byte offsets of each
+            <evidential-mapping> node (the end being the start of its closing tag), and
+            the encoding of the file (None if not declared).
+        Raises:
+            InvalidBeliefsFromBeliefsModelError: If the structure of the file is invalid.
+        """
+        parser = expat.ParserCreate()
+        stack = []
+        frames = []
+        states = []
+        index = []
+        counts = {"evidential-mappings": 0}
+        declaration = {"encoding": None}
+        current = {}
+
+        def start(name, attributes):
+            if len(stack) == 1 and name == "frame":
+                frames.append(attributes.get("name"))
+            elif len(stack) == 1 and name == "evidential-mappings":
+                counts["evidential-mappings"] += 1
+            elif name == "state" and len(stack) > 1 and stack[1] == "frame":
+                states.append("")
+            elif name == "evidential-mapping" and len(stack) > 1 and stack[1] == "evidential-mappings":
+                current["start"] = parser.CurrentByteIndex
+                current["subframes"] = []
+                current["depth"] = len(stack)
+            elif name == "subframe" and "depth" in current and len(stack) == current["depth"] + 1:
+                current["subframes"].append(attributes.get("name"))
+            stack.append(name)
+
+        def end(name):
+            stack.pop()
+            if name == "evidential-mapping" and current.get("depth") == len(stack):
+                if len(current["subframes"]) != 1:
+                    raise InvalidBeliefsFromBeliefsModelError(
+                        "File: " + str(path) + "\n" +
+                        "This should contain exactly one <subframe> tag per <evidential-mapping>!"
                     )
-                f = open(reflistfile, "r")
-                subframe_ref_list = []
-                subframe_ref_list = [line.replace("\n", "") for line in f.readlines()]
-                f.close()
+                index.append((current["subframes"][0], current["start"], parser.CurrentByteIndex))
+                current.clear()
+
+        def text(data):
+            if len(stack) > 2 and stack[-1] == "state" and stack[1] == "frame":
+                states[-1] += data
+
+        def xml_declaration(version, encoding, standalone):
+            declaration["encoding"] = encoding
+
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        parser.CharacterDataHandler = text
+        parser.XmlDeclHandler = xml_declaration
+        with open(path, "rb") as f:
+            try:
+                parser.ParseFile(f)
+            except expat.ExpatError as e:
+                raise InvalidBeliefsFromBeliefsModelError(
+                    "File: " + str(path) + "\n" +
+                    "This is not a valid XML file: " + str(e)
+                )
+
+        if len(frames) != 1:
+            raise InvalidBeliefsFromBeliefsModelError(
+                "File: " + str(path) + "\n" +
+                "This should contain exactly one <frame> tag!"
+            )
+        if counts["evidential-mappings"] != 1:
+            raise InvalidBeliefsFromBeliefsModelError(
+                "File: " + str(path) + "\n" +
+                "This should contain exactly one <evidential-mappings> tag!"
+            )
+        return frames[0], states, index, declaration["encoding"]
+
+    def __load_xml_fragment(self, path, start, end, encoding, derivation, max_derived):
+        """
+        Builds the mapping of a subframe from the position of its <evidential-mapping>
+        node in an XML file (see ``__index_xml()``): only this node is read and parsed.
+
+        Args:
+            path (str): The path to the XML file.
+            start (int): The byte offset of the node.
+            end (int): The byte offset of the closing tag of the node (or of the node
+                itself if it is empty).
+            encoding (str): The encoding of the file (None if not declared).
+            derivation (DiscreteEvidentialMapping.Derivation): The derivation rule.
+            max_derived (int): The maximum number of derived vectors kept in memory.
+        Returns:
+            DiscreteEvidentialMapping -- The mapping of the subframe.
+        """
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+            #Up to the end of the closing tag:
+            while True:
+                chunk = f.read(256)
+                data += chunk
+                if b">" in chunk or len(chunk) == 0:
+                    break
+        data = data[:data.index(b">", end - start) + 1]
+        if encoding != None:
+            data = ('<?xml version="1.0" encoding="' + encoding + '"?>').encode("ascii") + data
+        return self.__load_xml_mapping(path, ET.fromstring(data), derivation, max_derived)
+
+    def __load_xml_mapping(self, path, mapping, derivation, max_derived):
+        """
+        Builds the mapping of a subframe from its <evidential-mapping> node.
+
+        Args:
+            path (str): The path to the XML file (for the error messages).
+            mapping (xml.etree.ElementTree.Element): The <evidential-mapping> node.
+            derivation (DiscreteEvidentialMapping.Derivation): The derivation rule.
+            max_derived (int): The maximum number of derived vectors kept in memory.
+        Returns:
+            DiscreteEvidentialMapping -- The mapping of the subframe.
+        """
+        subframe_element = mapping.findall("subframe")[0]
+        subframe_name = subframe_element.get("name")
+        subframe_ref_list = []
+        for state in subframe_element.iter("state"):
+            subframe_ref_list.append(state.text)
+
+        #Get the vectors:
+        vectors = []
+        for vector_element in mapping.iter("mapping-vector"):
+            from_element = vector_element.findall("from")
+            if len(from_element) != 1:
+                raise InvalidBeliefsFromBeliefsModelError(
+                    "File: " + str(path) + "\n" +
+                    "This should contain exactly one <from> tag per <mapping-vector>!"
+                )
+            from_element = from_element[0]
+            element_from = element.DiscreteElement.factory_from_ref_list(subframe_ref_list, *from_element.get("element").split(" "))
+            points = []
+            for to_element in vector_element.iter("to"):
+                e = element.DiscreteElement.factory_from_ref_list(self.ref_list, *to_element.get("element").split(" "))
+                v = float(to_element.text)
+                points.append((e, v))
+            vectors.append(DiscreteMappingVector(element_from, *points))
+
+        return DiscreteEvidentialMapping(subframe_name, subframe_ref_list, *vectors,
+                                         derivation=derivation, max_derived=max_derived)
+
+    def __load_directory_mapping(self, subframedir, derivation, max_derived):
+        """
+        Builds the mapping of a subframe from its directory.
+
+        Args:
+            subframedir (str): The path to the directory of the subframe.
+            derivation (DiscreteEvidentialMapping.Derivation): The derivation rule.
+            max_derived (int): The maximum number of derived vectors kept in memory.
+        Returns:
+            DiscreteEvidentialMapping -- The mapping of the subframe.
+        """
+        subframe_name = os.path.basename(subframedir)
+
+        #Get the reference list for the elements of the subframe:
+        reflistfile = os.path.join(subframedir, "values")
+        if not os.path.exists(reflistfile):
+            raise MissingInformationError(
+                "Invalid model: " + subframedir + " should contain a file called 'values'!"
+            )
+        f = open(reflistfile, "r")
+        subframe_ref_list = [line.replace("\n", "") for line in f.readlines()]
+        f.close()
+
+        vectors = []
+        files = os.listdir(subframedir)
+        for file in files:
+            if file != "values":
+                try:
+                    f = open(os.path.join(subframedir, file))
+                    lines = [l.replace("\n", "") for l in f.readlines()]
+                    index = 0
+                    nbAtoms = int(lines[0].split(" ")[0])
+                    index += 1
+                    atoms = []
+                    for i in range(index, index + nbAtoms):
+                        atoms.append(lines[i])
+                        index +=1
+                    element_from = element.DiscreteElement.factory_from_ref_list(subframe_ref_list, *atoms)
+
+                    transfer_points = []
+                    nbConversions = int(lines[index].split(" ")[0])
+                    index += 1
+                    for i in range(nbConversions):
+                        nbAtoms = int(lines[index].split(" ")[0])
+                        index += 1
+                        atoms = []
+                        for i in range(index, index + nbAtoms):
+                            atoms.append(lines[i])
+                            index +=1
+                        element_to = element.DiscreteElement.factory_from_ref_list(self.ref_list, *atoms)
+                        transfer_factor = float(lines[index])
+                        index += 1
+                        transfer_points.append((element_to, transfer_factor))
+                    vectors.append(DiscreteMappingVector(element_from, *transfer_points))
+                    f.close()
+                except:
+                    raise InvalidBeliefsFromBeliefsModelError("The file '" + file + "' was not formatted as expected!")
+
+        return DiscreteEvidentialMapping(subframe_name, subframe_ref_list, *vectors,
+                                         derivation=derivation, max_derived=max_derived)
+
+    ################################################################################
+
+    def get_mapping(self, frame_name):
+        """
+        Gets the mapping of a subframe, building it first if the model was loaded lazily.
+
+        Args:
+            frame_name (str): The name of the subframe.
+        Returns:
+            DiscreteEvidentialMapping -- The mapping from the subframe.
+        Raises:
+            KeyError: If there is no mapping for the given subframe.
+        """
+        if frame_name not in self.mappings:
+            loader = self.__pending.pop(frame_name)
+            self.mappings[frame_name] = loader[0](*loader[1:])
+        return self.mappings[frame_name]
 
-                vectors = []
-                files = os.listdir(subframedir)
-                for file in files:
-                    if file != "values":
-                        try:
-                            f = open(os.path.join(subframedir, file))
-                            lines = [l.replace("\n", "") for l in f.readlines()]
-                            index = 0
-                            nbAtoms = int(lines[0].split(" ")[0])
-                            index += 1
-                            atoms = []
-                            for i in range(index, index + nbAtoms):
-                                atoms.append(lines[i])
-                                index +=1
-                            element_from = element.DiscreteElement.factory_from_ref_list(subframe_ref_list, *atoms)
-
-                            transfer_points = []
-                            nbConversions = int(lines[index].split(" ")[0])
-                            index += 1
-                            for i in range(nbConversions):
-                                nbAtoms = int(lines[index].split(" ")[0])
-                                index += 1
-                                atoms = []
-                                for i in range(index, index + nbAtoms):
-                                    atoms.append(lines[i])
-                                    index +=1
-                                element_to = element.DiscreteElement.factory_from_ref_list(self.ref_list, *atoms)
-                                transfer_factor = float(lines[index])
-                                index += 1
-                                transfer_points.append((element_to, transfer_factor))
-                            vectors.append(DiscreteMappingVector(element_from, *transfer_points))
-                            f.close()
-                        except:
-                            raise InvalidBeliefsFromBeliefsModelError("The file '" + file + "' was not formatted as expected!")
-
-                self.mappings[subframe_name] = DiscreteEvidentialMapping(subframe_name, subframe_ref_list, *vectors)
+    def get_mapping_names(self):
+        """
+        Gets the names of all the subframes of the model, including the ones of which
+        the mapping was not built yet.
 
+        Returns:
+            list[str] -- The names of the subframes.
+        """
+        return list(self.mappings) + [name for name in self.__pending if name not in self.mappings]
 
     ################################################################################
 
@@ -505,30 +1117,27 @@ class DiscreteMassFunctionsFromBeliefsGenerator:
         # XML FORMAT:
         # ***********
         if model_format == DiscreteMassFunctionsFromBeliefsGenerator.ModelFormat.XML:
-            root = ET.Element("belief-from-beliefs")
-            frame = ET.SubElement(root, "frame", {"name":self.frame_name})
-            
-            for ref in self.ref_list:
-                state = ET.SubElement(frame, "state", {})
-                state.text = str(ref)
-
-            evidential_mappings = ET.SubElement(root, "evidential-mappings")
-            for mapping_name, mapping in self.mappings.items():
-                mapping_element = ET.SubElement(evidential_mappings, "evidential-mapping")
-                subframe_element = ET.SubElement(mapping_element, "subframe", {"name":mapping.frame_name})
-                for ref in mapping.ref_list:
-                    state = ET.SubElement(subframe_element, "state")
-                    state.text = ref
-
-                for element_from, vector in mapping.vectors.items():
-                    vector_element = ET.SubElement(mapping_element, "mapping-vector")
-                    ET.SubElement(vector_element, "from", {"element":element_from.formatted_str(*mapping.ref_list)[1:-1].replace(" u ", " ")})
-                    for e, v in vector.points.items():
-                        element_to = ET.SubElement(vector_element, "to", {"element":e.formatted_str(*self.ref_list)[1:-1].replace(" u ", " ")})
-                        element_to.text = str(v)
-
             f = open(path, "w")
-            f.write(prettyxml.pretty_str(root))
+            writer = xmlwriter.XMLWriter(f)
+            with writer.node("belief-from-beliefs"):
+                with writer.node("frame", {"name":self.frame_name}):
+                    for ref in self.ref_list:
+                        writer.leaf("state", text=str(ref))
+
+                with writer.node("evidential-mappings"):
+                    for mapping_name in self.get_mapping_names():
+                        mapping = self.get_mapping(mapping_name)
+                        with writer.node("evidential-mapping"):
+                            with writer.node("subframe", {"name":mapping.frame_name}):
+                                for ref in mapping.ref_list:
+                                    writer.leaf("state", text=ref)
+
+                            for element_from, vector in mapping.vectors.items():
+                                with writer.node("mapping-vector"):
+                                    writer.leaf("from", {"element":element_from.formatted_str(*mapping.ref_list)[1:-1].replace(" u ", " ")})
+                                    for e, v in vector.points.items():
+                                        writer.leaf("to", {"element":e.formatted_str(*self.ref_list)[1:-1].replace(" u ", " ")}, str(v))
+            writer.close()
             f.close()
 
         # *****************
@@ -547,7 +1156,8 @@ class DiscreteMassFunctionsFromBeliefsGenerator:
                 f.write(ref + "\n")
             f.close()
 
-            for mapping_name, mapping in self.mappings.items():
+            for mapping_name in self.get_mapping_names():
+                mapping = self.get_mapping(mapping_name)
                 mapping_dir = os.path.join(real_path, mapping_name)
                 os.mkdir(mapping_dir)
 
@@ -573,13 +1183,13 @@ class DiscreteMassFunctionsFromBeliefsGenerator:
 
     def is_valid(self):
         """
-        Checks if all the models are valid.
+        Checks if all the models are valid (building the ones that were not yet).
 
         Returns:
             bool -- ``True`` if all the models are valid, ``False`` otherwise.
         """
-        for name, model in self.mappings.items():
-            if not model.is_valid():
+        for name in self.get_mapping_names():
+            if not self.get_mapping(name).is_valid():
                 return False
         return True
 
@@ -600,8 +1210,8 @@ class DiscreteMassFunctionsFromBeliefsGenerator:
         """
         results = {}
         for belief in beliefs:
-            if belief[0] in self.mappings:
-                results[belief[0]] = self.mappings[belief[0]].get_evidence(belief[1])
+            if belief[0] in self.mappings or belief[0] in self.__pending:
+                results[belief[0]] = self.get_mapping(belief[0]).get_evidence(belief[1])
             else:
                 results[belief[0]] = None
         return results
@@ -609,3 +1219,117 @@ class DiscreteMassFunctionsFromBeliefsGenerator:
 
 
             
+
+    ################################################################################
+
+    def get_evidence_batch(self, frame_name, mass_functions):
+        """
+        Transfers several mass functions defined on the same subframe in one call, e.g.
+        the successive beliefs of a room.
+
+        Args:
+            frame_name (str): The name of the subframe on which the mass functions are
+                defined.
+            mass_functions (iterable[MassFunction]): The mass functions to transfer.
+        Returns:
+            list[MassFunction] -- The transferred mass functions, in the same order.
+        Raises:
+            KeyError: If there is no mapping for the given subframe.
+        """
+        return self.get_mapping(frame_name).get_evidence_batch(mass_functions)
+
+
+################################################################################
+################################################################################
+################################################################################
+
+class EvidentialMappingChain:
+    """
+    A chain of belief transfers through a hierarchy of frames of discernment (e.g.
+    posture -> activity -> alarm), each level being handled by its own generator.
+    The mappings of the chain are composed into a single one (see
+    ``DiscreteEvidentialMapping.compose()``), thus propagating belief through the whole
+    hierarchy costs a single transfer.
+
+    The composed mapping is cached and computed again as soon as one of the links is
+    modified, i.e. when its generator loads a new model or when a vector is added to
+    its mapping.
+
+    Attributes:
+        self.links (list[tuple(DiscreteMassFunctionsFromBeliefsGenerator, str)]): The links
+            of the chain in the form (generator, subframe_name), in the order in which
+            mass flows through them.
+        self.nb_compositions (int): The number of times the mappings were composed.
+    """
+
+    def __init__(self, *links):
+        """
+        Builds the chain.
+
+        Args:
+            links (*tuple(DiscreteMassFunctionsFromBeliefsGenerator, str)): The links of
+                the chain in the form (generator, subframe_name), in the order in which
+                mass flows through them: the generator of a link should transfer mass
+                from the frame of the generator of the previous link.
+        Raises:
+            ValueError: If no link is given.
+        """
+        if len(links) == 0:
+            raise ValueError("A chain needs at least one link!")
+        self.links = list(links)
+        self.nb_compositions = 0
+        self.__composed = None
+        self.__stamps = None
+
+    def get_mapping(self):
+        """
+        Gets the mapping equivalent to the whole chain, composing the current mappings
+        of the links if one of them changed since the last call.
+
+        Returns:
+            DiscreteEvidentialMapping -- The composed mapping.
+        Raises:
+            KeyError: If the generator of a link has no mapping for its subframe, or if
+            a mapping does not have a vector for a recipient element of the previous one.
+            IncompatibleMappingsError: If the frame of a generator is not the frame from
+            which the next link transfers mass.
+        """
+        mappings = [generator.get_mapping(subframe_name) for generator, subframe_name in self.links]
+        stamps = [(mapping, mapping.version) for mapping in mappings]
+        if self.__stamps != None and all(m is n and v == w for (m, v), (n, w) in zip(stamps, self.__stamps)):
+            return self.__composed
+
+        for (generator, subframe_name), mapping in zip(self.links[:-1], mappings[1:]):
+            if list(generator.ref_list) != list(mapping.ref_list):
+                raise IncompatibleMappingsError(
+                    "The frame " + str(generator.frame_name) + " has the states " + str(generator.ref_list) +
+                    " but the next link transfers mass from the states " + str(mapping.ref_list) + "!"
+                )
+        self.__composed = DiscreteEvidentialMapping.compose(*mappings)
+        self.__stamps = stamps
+        self.nb_compositions += 1
+        return self.__composed
+
+    def get_evidence(self, mass_function):
+        """
+        Transfers a mass function through the whole chain.
+
+        Args:
+            mass_function (MassFunction): The mass function defined on the frame from which
+                the first link transfers mass.
+        Returns:
+            MassFunction -- A new mass function defined on the frame of the last link.
+        """
+        return self.get_mapping().get_evidence(mass_function)
+
+    def get_evidence_batch(self, mass_functions):
+        """
+        Transfers several mass functions through the whole chain.
+
+        Args:
+            mass_functions (iterable[MassFunction]): The mass functions defined on the frame
+                from which the first link transfers mass.
+        Returns:
+            list[MassFunction] -- The transferred mass functions, in the same order.
+        """
+        return self.get_mapping().get_evidence_batch(mass_functions)
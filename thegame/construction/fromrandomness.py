@@ -10,40 +10,179 @@
 # Main classes:                                                                #
 #   - RandomDiscreteMassFunctionsGenerator: A generator of random mass         #
 #     functions.                                                               #
+#   - PackedMassFunctions: A batch of random mass functions in flat arrays.    #
 ################################################################################
 
 import thegame.element as element
 import thegame.massfunction as massfunction
 
+from enum import Enum
+from array import array
+
 import random
+import sys
+
+class PackedMassFunctions:
+    """
+    A batch of random mass functions packed in flat arrays instead of ``MassFunction``
+    objects, e.g. to build load-test workloads of millions of mass functions. The focal
+    elements of the i-th mass function are ``numbers[offsets[i]:offsets[i+1]]`` (the
+    numbers encoding the discrete elements) with the masses
+    ``masses[offsets[i]:offsets[i+1]]``.
+
+    Attributes:
+        self.nb_states (int): The number of states in the frame of discernment.
+        self.offsets (array[int]): The start of each mass function in the other arrays
+            (with the end of the last one appended).
+        self.numbers (array[int] or list[int]): The numbers of the focal elements (a list
+            for frames of more than 64 states, whose numbers do not fit in a machine word).
+        self.masses (array[float]): The masses of the focal elements.
+    """
+
+    def __init__(self, nb_states):
+        """
+        Builds an empty batch.
+
+        Args:
+            nb_states (int): The number of states in the frame of discernment.
+        """
+        self.nb_states = nb_states
+        self.offsets = array("Q", [0])
+        self.numbers = array("Q") if nb_states <= 64 else []
+        self.masses = array("d")
+
+    def append(self, numbers, masses):
+        """
+        Adds a mass function to the batch.
+
+        Args:
+            numbers (iterable[int]): The numbers of the focal elements.
+            masses (iterable[float]): The masses of the focal elements, in the same order.
+        """
+        self.numbers.extend(numbers)
+        self.masses.extend(masses)
+        self.offsets.append(len(self.masses))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        """
+        Unpacks a mass function of the batch.
+
+        Args:
+            index (int): The index of the mass function in the batch.
+        Returns:
+            MassFunction -- A new mass function.
+        Raises:
+            IndexError: If the index is out of range.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("index: " + str(index) + "\nThe index is out of range!")
+        start, end = self.offsets[index], self.offsets[index + 1]
+        factory = element.DiscreteElement.factory_constructor_unsafe
+        return massfunction.MassFunction.factory_constructor_unsafe(
+            *[(factory(self.nb_states, n), m) for n, m in zip(self.numbers[start:end], self.masses[start:end])]
+        )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+################################################################################
+################################################################################
+################################################################################
 
 class RandomDiscreteMassFunctionsGenerator:
     """
     A generator of random discrete mass functions. You can customise the
     size of the frame of discernment and the number of focals you would like.
 
+    The focal elements are drawn as distinct numbers (directly with
+    ``random.sample()`` over the range of the numbers, or with Floyd's algorithm when
+    the range is too large for it), so the generation does not depend on the size of
+    the powerset and elements are only created when drawn.
+
+    Besides unstructured mass functions, the generator can produce the usual families
+    of mass functions (see ``Structure``), and groups of sources with a tunable level of
+    conflict between them (see ``build_sources()``), e.g. to benchmark combination rules
+    on realistic workloads.
+
     Attributes:
-        self.cache: If the elements should be cached or not (this can greatly
-            accelerates the speed of generation but it might also take too much
-            memory or be simply impossible to store (2^10000 elements should not
-            be cached for instance!)).
+        self.cache: If the elements drawn should be kept and reused for the next
+            mass functions (this accelerates the generation when the same elements
+            are drawn again, the memory growing with the number of distinct elements
+            drawn, not with the size of the powerset).
         self.nb_states: The number of states in the frame of discernment.
-        self.__cache: The cache containing all the elements in the powerset.
+        self.distribution (MassDistribution): How the masses are distributed among the
+            focal elements.
+        self.concentration (float): The concentration parameter of the Dirichlet and
+            stick-breaking distributions.
+        self.structure (Structure): The family of the generated mass functions.
+        self.additivity (int): The maximum cardinality of the focal elements of
+            k-additive mass functions.
+        self.random (random.Random): The source of randomness (the ``random`` module
+            itself if no seed was given).
+        self.__cache: The elements already drawn, by number.
         self.__max: The maximum value for the elements which is also the max number
             of focal elements that can be requested.
     """
 
-    def __init__(self, nb_states, cache=True):
+    class MassDistribution(Enum):
+        """
+        The different ways of distributing the masses among the focal elements.
+        """
+
+        """Integers drawn uniformly in [0, 100[ then normalised."""
+        uniform_integers = 1
+        """A draw of a symmetric Dirichlet distribution (uniform over the simplex for a
+        concentration of 1, sparser for lower concentrations)."""
+        dirichlet        = 2
+        """The stick-breaking (GEM) process: each focal takes a Beta(1, concentration)
+        fraction of the remaining mass, giving a few large masses and a long tail."""
+        stick_breaking   = 3
+
+    class Structure(Enum):
+        """
+        The different families of mass functions.
         """
-        Constructor of the generator. If cache is set to True, then all the possible
-        elements are stored within the cache. This might saturate your memory if you
-        ask for too many states.
+
+        """Any elements (the empty set included)."""
+        unstructured   = 1
+        """Only singletons (equivalent to a probability distribution)."""
+        bayesian       = 2
+        """Nested focal elements (equivalent to a possibility distribution)."""
+        consonant      = 3
+        """Exactly two focal elements: a random element and the whole frame."""
+        simple_support = 4
+        """Focal elements of cardinality at most ``additivity``."""
+        k_additive     = 5
+
+    def __init__(self, nb_states, cache=True, seed=None, distribution=MassDistribution.uniform_integers,
+                 concentration=1.0, structure=Structure.unstructured, additivity=2):
+        """
+        Constructor of the generator. If cache is set to True, then the elements are
+        kept once drawn and reused for the next mass functions. No element is created
+        before being drawn, whatever the size of the frame.
 
         Args:
             nb_states (int): The number of states in the frame of discernment.
             cache (bool): If the elements should be cached or not.
+            seed (object): The seed of the generator's own random stream, for reproducible
+                generations (None to use the global stream of the ``random`` module).
+            distribution (MassDistribution): How the masses are distributed among the
+                focal elements.
+            concentration (float): The concentration parameter of the Dirichlet and
+                stick-breaking distributions.
+            structure (Structure): The family of the generated mass functions.
+            additivity (int): The maximum cardinality of the focal elements of k-additive
+                mass functions.
         Raises:
-            ValueError: If the number of states given is null or negative.
+            ValueError: If the number of states given is null or negative, or if the
+            concentration or the additivity is not strictly positive.
         """
         if nb_states <= 0:
             raise ValueError(
@@ -51,16 +190,27 @@ class RandomDiscreteMassFunctionsGenerator:
                 "The number of states in your frame of discernment cannot " +
                 "be null or negative!"
             )
+        if concentration <= 0:
+            raise ValueError(
+                "concentration: " + str(concentration) + "\n" +
+                "The concentration should be strictly positive!"
+            )
+        if additivity <= 0:
+            raise ValueError(
+                "additivity: " + str(additivity) + "\n" +
+                "The additivity should be strictly positive!"
+            )
         
         self.cache = cache
         self.nb_states = nb_states
-        self.__cache = []
+        self.distribution = distribution
+        self.concentration = concentration
+        self.structure = structure
+        self.additivity = additivity
+        self.random = random if seed == None else random.Random(seed)
+        self.__cache = {}
         self.__max = 2**nb_states
 
-        if self.cache:
-            for e in element.DiscreteElement.iterator_powerset(nb_states):
-                self.__cache.append(e)
-
 
     def build_evidence(self, nb_focals):
         """
@@ -73,30 +223,387 @@ class RandomDiscreteMassFunctionsGenerator:
         Raises:
             ValueError: if the number of focal elements requested does not make sense.
         """
-        if not 0 < nb_focals <= self.__max:
+        numbers = self.draw_focals(nb_focals)
+        return self.__build(numbers, self.draw_masses(nb_focals))
+
+
+    def build_many(self, count, nb_focals):
+        """
+        Builds a batch of random mass functions packed in flat arrays, without creating
+        any element nor mass function (see ``PackedMassFunctions``).
+
+        Args:
+            count (int): The number of mass functions to build.
+            nb_focals (int): The number of focal elements of each mass function.
+        Returns:
+            PackedMassFunctions -- The random mass functions.
+        Raises:
+            ValueError: if the number of focal elements requested does not make sense.
+        """
+        result = PackedMassFunctions(self.nb_states)
+        for _ in range(count):
+            result.append(self.draw_focals(nb_focals), self.draw_masses(nb_focals))
+        return result
+
+
+    def build_sources(self, nb_sources, nb_focals, conflict=0.0):
+        """
+        Builds the mass functions of several sources with a tunable level of conflict
+        between them.
+
+        A random state is shared by all the sources, and the other states are split into
+        one private block per source. Each source is the mixture, weighted by the
+        conflict level, of a mass function whose focal elements all contain the shared
+        state (weight ``1 - conflict``) and of a mass function whose focal elements are
+        in its private block (weight ``conflict``). Both follow the structure of the
+        generator. Thus the conjunctive conflict between two sources is 0 for a conflict
+        level of 0, 1 for a conflict level of 1 (the case of highly conflicting sources)
+        and grows with it in between.
+
+        Each part has nb_focals focal elements, or fewer if the structure does not allow
+        that many (e.g. a Bayesian mass function has a single focal element containing the
+        shared state). Mixtures may thus have up to twice nb_focals focal elements.
+
+        Args:
+            nb_sources (int): The number of sources.
+            nb_focals (int): The number of focal elements of each part of the sources.
+            conflict (float): The conflict level, in [0, 1].
+        Returns:
+            list[MassFunction] -- The mass functions of the sources.
+        Raises:
+            ValueError: If the conflict level is not in [0, 1], or if the frame is too
+            small to give a private block to each source.
+        """
+        if not 0 <= conflict <= 1:
             raise ValueError(
-                "nb_focals: " + str(nb_focals) + "\n" +
-                "The number of focals cannot exceed the number of possible " +
-                "different elements in your frame of discernment. It also can't be " +
-                "null or negative."
+                "conflict: " + str(conflict) + "\n" +
+                "The conflict level should be in [0, 1]!"
             )
-        
+        if conflict > 0 and self.nb_states - 1 < nb_sources:
+            raise ValueError(
+                "nb_sources: " + str(nb_sources) + "\n" +
+                "Conflicting sources need at least one private state each besides the shared one!"
+            )
+
+        states = self.random.sample(range(self.nb_states), self.nb_states)
+        shared = states[0]
+        sources = []
+        for i in range(nb_sources):
+            numbers = []
+            masses = []
+            for domain, required, weight in ((states, shared, 1 - conflict), (states[1 + i::nb_sources], None, conflict)):
+                if weight == 0:
+                    continue
+                k = min(nb_focals, self.__count(len(domain) - (required != None), required != None))
+                numbers.extend(self.draw_focals(k, domain, required))
+                masses.extend(weight * m for m in self.draw_masses(k))
+            sources.append(self.__build(numbers, masses))
+        return sources
+
+
+    def write_many(self, file, count, nb_focals, nb_sources=1, conflict=0.0):
+        """
+        Writes random mass functions to a text file as they are generated, thus huge
+        workloads can be stored in constant memory. The file starts with a header giving
+        the number of states; then each line is a record of ``nb_sources`` mass functions
+        separated by " | ", each one being a space separated list of "number:mass" focal
+        elements (numbers in hexadecimal). See ``read_many()`` to read them back.
+
+        Args:
+            file (file object): The text file object in which the mass functions should be
+                written.
+            count (int): The number of records to write.
+            nb_focals (int): The number of focal elements of each mass function.
+            nb_sources (int): The number of mass functions per record. If more than one,
+                the records are built with ``build_sources()``.
+            conflict (float): The conflict level between the sources of a record.
+        Raises:
+            ValueError: if the number of focal elements requested does not make sense.
+        """
+        file.write("# nb_states: " + str(self.nb_states) + "\n")
+        for _ in range(count):
+            if nb_sources == 1:
+                numbers = self.draw_focals(nb_focals)
+                records = [zip(numbers, self.draw_masses(nb_focals))]
+            else:
+                records = [((e._number, m) for e, m in source.focals.items())
+                           for source in self.build_sources(nb_sources, nb_focals, conflict)]
+            file.write(" | ".join(" ".join(format(n, "x") + ":" + repr(m) for n, m in record) for record in records) + "\n")
+
+
+    @staticmethod
+    def read_many(file):
+        """
+        Reads mass functions written by ``write_many()``, one record at a time (the
+        lines starting with '#' are skipped).
+
+        Args:
+            file (file object): The text file object from which the mass functions should
+                be read.
+        Returns:
+            iterable[list[MassFunction]] -- The records, as lists of mass functions.
+        Raises:
+            ValueError: If the file does not start with the expected header.
+        """
+        header = file.readline()
+        if not header.startswith("# nb_states: "):
+            raise ValueError(
+                "header: " + header.rstrip("\n") + "\n" +
+                "The file should start with the number of states!"
+            )
+        nb_states = int(header[len("# nb_states: "):])
+        factory = element.DiscreteElement.factory_constructor_unsafe
+        for line in file:
+            line = line.rstrip("\n")
+            if line == "" or line.startswith("#"):
+                continue
+            record = []
+            for source in line.split(" | "):
+                focals = []
+                for focal in source.split(" "):
+                    n, m = focal.split(":")
+                    focals.append((factory(nb_states, int(n, 16)), float(m)))
+                record.append(massfunction.MassFunction.factory_constructor_unsafe(*focals))
+            yield record
+
+
+    def draw_focals(self, k, domain=None, required=None):
+        """
+        Draws the numbers of k distinct focal elements following the structure of the
+        generator.
+
+        Args:
+            k (int): The number of focal elements to draw.
+            domain (list[int]): The indexes of the states the focal elements can contain
+                (None for all the states).
+            required (int): The index of a state all the focal elements should contain
+                (None for no constraint), which must be in the domain.
+        Returns:
+            list[int] -- The numbers of the focal elements.
+        Raises:
+            ValueError: if the number of focal elements requested does not make sense.
+        """
+        Structure = RandomDiscreteMassFunctionsGenerator.Structure
+        if domain == None and required == None and self.structure == Structure.unstructured:
+            self.__check_nb_focals(k, self.__max)
+            return self.draw_numbers(k)
+
+        if domain == None:
+            domain = range(self.nb_states)
+        free = [i for i in domain if i != required]
+        base = 0 if required == None else 1 << required
+        r = self.random
+        if self.structure == Structure.simple_support and k != 2:
+            raise ValueError(
+                "nb_focals: " + str(k) + "\n" +
+                "Simple support mass functions have exactly two focal elements!"
+            )
+        self.__check_nb_focals(k, self.__count(len(free), required != None))
+
+        if self.structure == Structure.unstructured:
+            return [base | self.__spread(v, free) for v in self.__sample_range(1 - (required != None), 2**len(free), k)]
+
+        if self.structure == Structure.bayesian:
+            if required != None:
+                return [base]
+            return [1 << i for i in r.sample(free, k)]
+
+        if self.structure == Structure.consonant:
+            order = r.sample(free, len(free))
+            if required != None:
+                order.insert(0, required)
+            chain = [0]
+            for i in order:
+                chain.append(chain[-1] | 1 << i)
+            return [chain[size] for size in r.sample(range(1, len(order) + 1), k)]
+
+        if self.structure == Structure.simple_support:
+            whole = (1 << len(free)) - 1
+            v = self.__sample_range(1 - (required != None), whole, 1)[0]
+            return [base | self.__spread(v, free), base | self.__spread(whole, free)]
+
+        #k-additive:
+        lowest = 1 - (required != None)
+        sizes = range(lowest, min(self.additivity - (required != None), len(free)) + 1)
+        weights = [self.__binomials(len(free))[size] for size in sizes]
+        drawn = set()
+        numbers = []
+        while len(numbers) < k:
+            n = base
+            for i in r.sample(free, r.choices(sizes, weights)[0]):
+                n |= 1 << i
+            if n not in drawn:
+                drawn.add(n)
+                numbers.append(n)
+        return numbers
+
+
+    def draw_numbers(self, k):
+        """
+        Draws distinct numbers encoding discrete elements of the frame (the empty set
+        included), uniformly.
+
+        Args:
+            k (int): The number of numbers to draw (at most 2^nb_states).
+        Returns:
+            list[int] -- The drawn numbers.
+        """
+        return self.__sample_range(0, self.__max, k)
+
+
+    def draw_masses(self, k):
+        """
+        Draws k masses summing to 1 according to the distribution of the generator.
+
+        Args:
+            k (int): The number of masses to draw.
+        Returns:
+            list[float] -- The drawn masses.
+        """
+        r = self.random
+        if self.distribution == RandomDiscreteMassFunctionsGenerator.MassDistribution.stick_breaking:
+            masses = []
+            remaining = 1.0
+            for _ in range(k - 1):
+                mass = remaining * r.betavariate(1, self.concentration)
+                masses.append(mass)
+                remaining -= mass
+            masses.append(remaining)
+            return masses
+
+        total = 0
+        while total == 0:
+            if self.distribution == RandomDiscreteMassFunctionsGenerator.MassDistribution.dirichlet:
+                values = [r.gammavariate(self.concentration, 1) for _ in range(k)]
+            else:
+                values = [r.randrange(100) for _ in range(k)]
+            total = sum(values)
+        return [v / total for v in values]
+
+
+    def __build(self, numbers, masses):
+        """
+        Builds a mass function from the numbers of its focal elements and their masses.
+
+        Args:
+            numbers (list[int]): The numbers of the focal elements.
+            masses (list[float]): The masses of the focal elements.
+        Returns:
+            MassFunction -- A new mass function.
+        """
+        factory = element.DiscreteElement.factory_constructor_unsafe
         if self.cache:
-            elements = random.sample(self.__cache, nb_focals)
-        else:
             elements = []
-            for i in range(nb_focals):
-                e = element.DiscreteElement(self.nb_states, random.randint(0, self.__max - 1))
-                while e in elements:
-                    e = element.DiscreteElement(self.nb_states, random.randint(0, self.__max - 1))
+            for n in numbers:
+                e = self.__cache.get(n)
+                if e == None:
+                    e = self.__cache[n] = factory(self.nb_states, n)
                 elements.append(e)
+        else:
+            elements = [factory(self.nb_states, n) for n in numbers]
+        return massfunction.MassFunction.factory_constructor_unsafe(*zip(elements, masses))
 
-        numbers = range(100)
-        values = [random.choice(numbers) for _ in range(nb_focals)]
-        focals = [(focal, value) for focal, value in zip(elements, values)]
 
-        result = massfunction.MassFunction(*focals)
-        result.normalise()
-        return result
+    def __sample_range(self, start, stop, k):
+        """
+        Draws k distinct integers in [start, stop[, uniformly.
+
+        Args:
+            start (int): The lowest integer that can be drawn.
+            stop (int): The upper bound (excluded).
+            k (int): The number of integers to draw.
+        Returns:
+            list[int] -- The drawn integers.
+        """
+        if stop - start <= sys.maxsize:
+            return self.random.sample(range(start, stop), k)
+
+        #Floyd's algorithm, for ranges too large for random.sample():
+        drawn = set()
+        numbers = []
+        for j in range(stop - start - k, stop - start):
+            n = self.random.randrange(j + 1)
+            if n in drawn:
+                n = j
+            drawn.add(n)
+            numbers.append(start + n)
+        return numbers
+
+
+    @staticmethod
+    def __spread(value, states):
+        """
+        Spreads the bits of a value over the given states.
+
+        Args:
+            value (int): The value whose i-th bit tells if the i-th state is in the element.
+            states (list[int]): The indexes of the states.
+        Returns:
+            int -- The number of the element.
+        """
+        number = 0
+        for state in states:
+            if value & 1:
+                number |= 1 << state
+            value >>= 1
+        return number
 
 
+    def __count(self, nb_free, has_required):
+        """
+        Counts the focal elements allowed by the structure of the generator.
+
+        Args:
+            nb_free (int): The number of states that may or may not be in the focal elements.
+            has_required (bool): If a state is in all the focal elements.
+        Returns:
+            int -- The number of possible focal elements (for simple support mass functions,
+            2 if there is a possible pair, 0 otherwise).
+        """
+        Structure = RandomDiscreteMassFunctionsGenerator.Structure
+        if self.structure == Structure.unstructured:
+            return 2**nb_free - (not has_required)
+        if self.structure == Structure.bayesian:
+            return 1 if has_required else nb_free
+        if self.structure == Structure.consonant:
+            return nb_free + has_required
+        if self.structure == Structure.simple_support:
+            return 2 if 2**nb_free - 1 - (not has_required) > 0 else 0
+        lowest = 1 - has_required
+        binomials = self.__binomials(nb_free)
+        return sum(binomials[size] for size in range(lowest, min(self.additivity - has_required, nb_free) + 1))
+
+
+    @staticmethod
+    def __binomials(n):
+        """
+        Computes the binomial coefficients C(n, j) for j in [0, n].
+
+        Args:
+            n (int): The size of the set.
+        Returns:
+            list[int] -- The binomial coefficients.
+        """
+        binomials = [1]
+        for j in range(n):
+            binomials.append(binomials[-1] * (n - j) // (j + 1))
+        return binomials
+
+
+    def __check_nb_focals(self, nb_focals, maximum):
+        """
+        Checks the number of focal elements requested.
+
+        Args:
+            nb_focals (int): The number of focal elements.
+            maximum (int): The number of possible focal elements.
+        Raises:
+            ValueError: if the number of focal elements requested does not make sense.
+        """
+        if not 0 < nb_focals <= maximum:
+            raise ValueError(
+                "nb_focals: " + str(nb_focals) + "\n" +
+                "The number of focals cannot exceed the number of possible " +
+                "different elements in your frame of discernment. It also can't be " +
+                "null or negative."
+            )
@@ -13,19 +13,35 @@
 # Main classes:                                                                #
 #   - DiscreteMassFunctionsFromSensorsGenerator: A generator of discrete mass  #
 #     functions from sensor measurements.                                      #
+#   - ShardedDiscreteMassFunctionsFromSensorsGenerator: The same generator     #
+#     with sensors spread over several worker processes.                       #
+#   - AsyncSensorEvidenceStream: An asyncio front-end to the generator for     #
+#     streams of sensor measurements.                                          #
 ################################################################################
 
 import thegame.element as element
 import thegame.massfunction as massfunction
-import thegame.utility.prettyxml as prettyxml
+import thegame.utility.xmlwriter as xmlwriter
 
 from enum import Enum
+from collections import OrderedDict
+from array import array
 
 import xml.etree.ElementTree as ET
+import multiprocessing
+import asyncio
+import hashlib
+import struct
+import zlib
+import math
+import bisect
 import time
 import copy
 import os
 import shutil
+import tempfile
+import threading
+import contextlib
 
 ################################################################################
 ################################################################################
@@ -151,7 +167,7 @@ class MissingInformationError(SensorModelError):
         self.message = message
 
     def __str__(self):
-        return message
+        return self.message
 
 
 class InvalidBeliefsFromSensorsModelError(SensorModelError):
@@ -163,7 +179,7 @@ class InvalidBeliefsFromSensorsModelError(SensorModelError):
         self.message = message
 
     def __str__(self):
-        return message
+        return self.message
 
 ################################################################################
 ################################################################################
@@ -202,8 +218,8 @@ class DiscreteSensorModelOption:
 
     """The list of incompatible options."""
     incompatible = [
-        (2, 3),
-        (3, 2)
+        (Option.temporisation_specificity, Option.temporisation_fusion),
+        (Option.temporisation_fusion, Option.temporisation_specificity)
     ]
 
     def __init__(self, option_type, parameter):
@@ -215,10 +231,10 @@ class DiscreteSensorModelOption:
             parameter (float): A parameter to apply the option (a time or a number of
                 measurements to consider).
         Raises:
-            UnknownOptionError: If an unknown option type is given.
+            UnknownOptionType: If an unknown option type is given.
         """
-        if option_type not in DiscreteSensorModelOption.Option:
-            raise UnknownOptionError()
+        if not isinstance(option_type, DiscreteSensorModelOption.Option):
+            raise UnknownOptionType()
         
         self.option_type = option_type
         self.parameter = parameter
@@ -260,6 +276,100 @@ class DiscreteSensorModelOption:
         """
         self.data[1] = mass
 
+    def is_applied_before_projection(self):
+        """
+        Checks if the option applies to the sensor measurements (before their projection
+        on the sensor model) or to the resulting evidence.
+
+        Returns:
+            bool -- ``True`` if the option transforms sensor measurements, ``False`` if it
+            transforms the evidence obtained from them.
+        """
+        return self.option_type == DiscreteSensorModelOption.Option.variation
+
+    def get_stage(self):
+        """
+        Gets the stage applying this option, as used in the pipelines of
+        ``DiscreteSensorModelData``. The dispatch on the option type is thus
+        done once and for all instead of at every sensor measurement.
+
+        Returns:
+            func. -- A callable ``stage(sensor_measurement, evidence)`` returning the
+            tuple ``(sensor_measurement, evidence)`` once the option is applied.
+        """
+        if self.option_type == DiscreteSensorModelOption.Option.variation:
+            return self.apply_variation
+        elif self.option_type == DiscreteSensorModelOption.Option.temporisation_fusion:
+            return self.apply_temporisation_fusion
+        elif self.option_type == DiscreteSensorModelOption.Option.temporisation_specificity:
+            return self.apply_temporisation_specificity
+
+    def apply_variation(self, sensor_measurement, evidence):
+        """
+        Stage replacing the sensor measurement by its average variation over the
+        stored measurements. The measurement becomes None (no data) if nothing was
+        stored yet or if there is no measurement.
+
+        Args:
+            sensor_measurement (float): The measurement provided by the sensor.
+            evidence (MassFunction): The evidence so far (None before projection).
+        Returns:
+            tuple(float, MassFunction) -- The variation and the unchanged evidence.
+        """
+        if sensor_measurement == None:
+            self.add_measure(None)
+            return None, evidence
+        s = 0
+        nbMeasures = 0
+        for measure in self.data:
+            if measure != None:
+                s += sensor_measurement - measure
+                nbMeasures += 1
+        self.add_measure(sensor_measurement)
+        if nbMeasures != 0:
+            return s / nbMeasures, evidence
+        return None, evidence
+
+    def apply_temporisation_fusion(self, sensor_measurement, evidence):
+        """
+        Stage applying the temporisation based on fusion to the evidence
+        (see ``MassFunction.temporisation_fusion()``).
+
+        Args:
+            sensor_measurement (float): The measurement that led to the evidence
+                (None if there was no data).
+            evidence (MassFunction): The evidence to temporise.
+        Returns:
+            tuple(float, MassFunction) -- The unchanged measurement and the temporised
+            evidence.
+        """
+        evidence, old_time, old_mass = self.get_previous_mass().temporisation_fusion(
+            self.get_previous_time(), time.time(), self.parameter, evidence,
+            got_data=sensor_measurement != None)
+        self.set_previous_time(old_time)
+        self.set_previous_mass(old_mass)
+        return sensor_measurement, evidence
+
+    def apply_temporisation_specificity(self, sensor_measurement, evidence):
+        """
+        Stage applying the temporisation based on specificity to the evidence
+        (see ``MassFunction.temporisation_specificity()``).
+
+        Args:
+            sensor_measurement (float): The measurement that led to the evidence
+                (None if there was no data).
+            evidence (MassFunction): The evidence to temporise.
+        Returns:
+            tuple(float, MassFunction) -- The unchanged measurement and the temporised
+            evidence.
+        """
+        evidence, old_time, old_mass = self.get_previous_mass().temporisation_specificity(
+            self.get_previous_time(), time.time(), self.parameter, evidence,
+            got_data=sensor_measurement != None)
+        self.set_previous_time(old_time)
+        self.set_previous_mass(old_mass)
+        return sensor_measurement, evidence
+
     def __str__(self):
         """
         Overrides ``str()``.
@@ -316,6 +426,34 @@ class DiscreteSensorFocalBelief:
         self.points = []
         self.add_points(*points)
 
+    @staticmethod
+    def factory_from_arrays(element, sensor_measures, masses):
+        """
+        Builds the model for the given focal element from two parallel sequences
+        (e.g. lists or arrays) of key measurements and masses. The points are
+        sorted once, which is much faster than adding them one at a time for
+        models with thousands of key measurements.
+
+        Args:
+            element (Element): The focal element for which the model is stored.
+            sensor_measures (iterable[float]): The key sensor measurements.
+            masses (iterable[float]): The masses associated to the key measurements.
+        Returns:
+            DiscreteSensorFocalBelief -- The new focal model.
+        Raises:
+            ValueError: If both sequences do not have the same length.
+            DuplicateValueError: If the same key measurement is provided multiple
+            times.
+        """
+        sensor_measures = list(sensor_measures)
+        masses = list(masses)
+        if len(sensor_measures) != len(masses):
+            raise ValueError("As many masses as key measurements are required (" +
+                             str(len(sensor_measures)) + " != " + str(len(masses)) + ")!")
+        focal = DiscreteSensorFocalBelief(element)
+        focal.add_points(*zip(sensor_measures, masses))
+        return focal
+
     def add_point(self, sensor_measure, mass):
         """
         Adds the given key measurement to the model.
@@ -327,29 +465,41 @@ class DiscreteSensorFocalBelief:
             DuplicateValueError: If the given key sensor_measure is already in the
             model.
         """
-        if sensor_measure in [x[0] for x in self.points]:
+        i = bisect.bisect_left(self.points, (sensor_measure,))
+        if i < len(self.points) and self.points[i][0] == sensor_measure:
             raise DuplicateValueError(self.element, sensor_measure)
 
-        self.points.append((sensor_measure, mass))
-        self.points = sorted(self.points, key=lambda x: x[0])
+        self.points.insert(i, (sensor_measure, mass))
 
     def add_points(self, *points):
         """
-        Adds the given key measurements to the model.
+        Adds the given key measurements to the model. The points are sorted only
+        once and the duplicates are detected with a set, so adding n points costs
+        O(n log n) instead of n insertions.
 
         Args:
             points (tuple(float, float)): The points to add to the model under
                 the form of an iterable of tuples in the form (sensor_measure, mass).
         Raises:
             DuplicateValueError: If a key sensor measurement is given multiple times
-            or was already present in the model.
+            or was already present in the model. In this case, the model is left
+            unchanged.
         """
+        seen = set(x[0] for x in self.points)
+        new_points = []
         for point in points:
-            self.add_point(point[0], point[1])
+            if point[0] in seen:
+                raise DuplicateValueError(self.element, point[0])
+            seen.add(point[0])
+            new_points.append((point[0], point[1]))
+
+        self.points.extend(new_points)
+        self.points.sort(key=lambda x: x[0])
 
     def get_mass(self, sensor_measure):
         """
         Gets the mass for the given sensor measurement in the current model.
+        The two surrounding key measurements are found by binary search.
 
         Args:
             sensor_measure (float): The sensor measurement.
@@ -361,18 +511,169 @@ class DiscreteSensorFocalBelief:
         if len(self.points) == 0:
             raise EmptyFocalModelError(self.element)
 
-        if sensor_measure <= self.points[0]:
+        if sensor_measure <= self.points[0][0]:
             return self.points[0][1]
-        elif sensor_measure >= self.points[-1]:
+        elif sensor_measure >= self.points[-1][0]:
             return self.points[-1][1]
         else:
-            for i in range(len(self.points)-1):
-                if self.points[i] <= sensor_measure <= self.points[i+1]:
-                    return (self.points[i][1] +
-                            (self.points[i+1][1] - self.points[i][1]) *
-                            (sensor_measure - self.points[i][0]) /
-                            (self.points[i+1][0] - self.points[i][0]))
-                
+            #First point with a measure >= sensor_measure, the previous one is strictly lower:
+            i = bisect.bisect_left(self.points, (sensor_measure,))
+            return (self.points[i-1][1] +
+                    (self.points[i][1] - self.points[i-1][1]) *
+                    (sensor_measure - self.points[i-1][0]) /
+                    (self.points[i][0] - self.points[i-1][0]))
+
+
+################################################################################
+################################################################################
+################################################################################
+
+class EvidenceCache:
+    """
+    A bounded LRU cache of the evidence obtained from a sensor model. It is keyed by the
+    sensor measurements or, if a quantisation step is given, by the index of the quantum
+    they fall into (the evidence of a quantum is the one of its centre). When full, the
+    least recently used evidence is evicted.
+
+    The cached mass functions are immutable and shared by everything that gets them.
+    The cache can be used from several threads.
+
+    Attributes:
+        self.max_size (int): The maximum number of mass functions stored.
+        self.quantisation_step (float): The quantisation step of the measurements,
+            None if measurements are used as keys directly.
+        self.hits (int): The number of lookups that found the evidence in the cache.
+        self.misses (int): The number of lookups that did not.
+        self.evictions (int): The number of mass functions evicted so far.
+        self.entries (OrderedDict{key:ImmutableMassFunction}): The cached evidence,
+            from the least to the most recently used.
+    """
+
+    def __init__(self, max_size=1024, quantisation_step=None):
+        """
+        Builds an empty cache.
+
+        Args:
+            max_size (int): The maximum number of mass functions to store.
+            quantisation_step (float): The quantisation step of the measurements (None
+                to use measurements as keys without quantisation).
+        Raises:
+            ValueError: If max_size is not strictly positive or if quantisation_step is
+            given and not strictly positive.
+        """
+        if max_size <= 0:
+            raise ValueError(
+                "max_size: " + str(max_size) + "\n" +
+                "The size of the cache cannot be null nor negative!"
+            )
+        if quantisation_step != None and quantisation_step <= 0:
+            raise ValueError(
+                "quantisation_step: " + str(quantisation_step) + "\n" +
+                "The quantisation step cannot be null nor negative!"
+            )
+
+        self.max_size = max_size
+        self.quantisation_step = quantisation_step
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__lock = threading.Lock()
+
+    def get_key(self, sensor_measurement):
+        """
+        Gets the key under which the evidence of a measurement is stored.
+
+        Args:
+            sensor_measurement (float): The sensor measurement (can be None).
+        Returns:
+            object -- The key for the measurement.
+        """
+        if sensor_measurement == None or self.quantisation_step == None:
+            return sensor_measurement
+        return int(round(sensor_measurement / self.quantisation_step))
+
+    def get_measurement(self, key):
+        """
+        Gets the measurement from which the evidence stored under the given key is
+        computed (the centre of the quantum if quantisation is used).
+
+        Args:
+            key (object): A key given by ``get_key()``.
+        Returns:
+            float -- The measurement to project on the model.
+        """
+        if key == None or self.quantisation_step == None:
+            return key
+        return key * self.quantisation_step
+
+    def get(self, key):
+        """
+        Looks for the evidence stored under the given key, updates the statistics.
+
+        Args:
+            key (object): A key given by ``get_key()``.
+        Returns:
+            ImmutableMassFunction -- The cached evidence, None if it is not cached.
+        """
+        with self.__lock:
+            evidence = self.entries.get(key)
+            if evidence is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return evidence
+
+    def put(self, key, evidence):
+        """
+        Stores evidence under the given key, evicting the least recently used one
+        if the cache is full.
+
+        Args:
+            key (object): A key given by ``get_key()``.
+            evidence (ImmutableMassFunction): The evidence to store.
+        """
+        with self.__lock:
+            self.entries[key] = evidence
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Empties the cache (to use when the model changes). Statistics are kept.
+        """
+        with self.__lock:
+            self.entries.clear()
+
+    @property
+    def hit_rate(self):
+        """
+        Gets the proportion of lookups that found the evidence in the cache.
+
+        Returns:
+            float -- The hit rate, 0 if there was no lookup yet.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups != 0 else 0
+
+    def statistics(self):
+        """
+        Gets the statistics of the cache.
+
+        Returns:
+            dict{str:number} -- The size, maximum size, hits, misses, evictions and hit rate.
+        """
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate
+        }
 
 ################################################################################
 ################################################################################
@@ -389,6 +690,11 @@ class DiscreteSensorModel:
             moidel.
         self.focals (list[DiscreteSensorFocalBelief]): The masses associated to the
             focal elements and the sensor measurements key values.
+        self.stages (list[tuple(func., bool)]): The custom stages added to the model
+            in the form of tuples (stage_factory, before_projection).
+        self.cache (EvidenceCache): The cache of evidence, None if disabled (default).
+        self.state_store (SensorStateStore): The compact storage of the option data of
+            the sensors using this model, created on first use (see ``get_state_store()``).
     """
 
     def __init__(self, sensor_type, *focals):
@@ -402,9 +708,11 @@ class DiscreteSensorModel:
         """
         self.sensor_type = sensor_type
         self.options = []
+        self.stages = []
+        self.cache = None
+        self.state_store = None
         self.focals = []
-        for focal in focals:
-            self.add_focal(focal)
+        self.add_focals(*focals)
 
     def add_focal(self, focal):
         """
@@ -421,6 +729,8 @@ class DiscreteSensorModel:
                 raise DuplicateFocalElementError(self.sensor_type, focal.element)
 
         self.focals.append(focal)
+        if self.cache != None:
+            self.cache.clear()
 
     def add_focals(self, *focals):
         """
@@ -430,10 +740,18 @@ class DiscreteSensorModel:
             focals (*DiscreteSensorFocalBelief): The focal models to add.
         Raises:
             DuplicateFocalElementError: If one of the focal elements to which the focal models
-            are associated is already present in the sensor model.
+            are associated is already present in the sensor model (or given twice). In this
+            case, none of the focal models is added.
         """
+        elements = set(f.element for f in self.focals)
         for focal in focals:
-            self.add_focal(focal)
+            if focal.element in elements:
+                raise DuplicateFocalElementError(self.sensor_type, focal.element)
+            elements.add(focal.element)
+
+        self.focals.extend(focals)
+        if self.cache != None:
+            self.cache.clear()
 
     def add_option(self, option):
         """
@@ -448,11 +766,11 @@ class DiscreteSensorModel:
                 to the sensor model.
         """
         for o in self.options:
-            if (o, option) in DiscreteSensorModelOption.incompatible:
+            if (o.option_type, option.option_type) in DiscreteSensorModelOption.incompatible:
                 raise IncompatibleOptionsError(self.sensor_type, o, option)
 
         for o in self.options:
-            if o == option:
+            if o.option_type == option.option_type:
                 raise DuplicateOptionError(self.sensor_type, option)
 
         self.options.append(option)
@@ -472,23 +790,126 @@ class DiscreteSensorModel:
         for option in options:
             self.add_option(option)
 
+    def add_stage(self, stage_factory, before_projection=False):
+        """
+        Adds a custom stage (e.g. a median filter or an hysteresis) to the pipeline
+        applied to the sensors using this model. As each sensor needs its own data,
+        a factory is given and called once per sensor each time its pipeline is
+        compiled (i.e. when it is registered, updated or reset).
+
+        The stages applied before the projection come first, before the variation
+        option. The ones applied after come right after the projection, before the
+        temporisation options.
+
+        Remark: Custom stages are not saved with the model.
+
+        Args:
+            stage_factory (func.): A callable without arguments returning a new stage,
+                i.e. a callable ``stage(sensor_measurement, evidence)`` returning the
+                tuple ``(sensor_measurement, evidence)`` once the stage is applied.
+                The evidence is None for stages applied before the projection.
+            before_projection (bool): If the stage should be applied on the sensor
+                measurements instead of the evidence obtained from them.
+        """
+        self.stages.append((stage_factory, before_projection))
+
+    def enable_cache(self, max_size=1024, quantisation_step=None):
+        """
+        Enables the caching of the evidence obtained from the model (see ``EvidenceCache``).
+        Useful for sensors providing measurements from a small set of values (e.g. binary
+        contacts, integer lux, etc.) or measurements that can be quantised without loss.
+        If a cache was already enabled, it is replaced.
+
+        Remark: Modifying the points of a focal model already in the sensor model is not
+        detected, clear the cache yourself (``model.cache.clear()``) if you do so.
+
+        Args:
+            max_size (int): The maximum number of mass functions in the cache.
+            quantisation_step (float): The quantisation step of the measurements (None
+                to use measurements as keys without quantisation).
+        Raises:
+            ValueError: If max_size is not strictly positive or if quantisation_step is
+            given and not strictly positive.
+        """
+        self.cache = EvidenceCache(max_size, quantisation_step)
+
+    def disable_cache(self):
+        """
+        Disables the caching of the evidence obtained from the model.
+        """
+        self.cache = None
+
+    def is_equivalent(self, model):
+        """
+        Checks if the given model has the same sensor type, focal models and options
+        as this one (custom stages and caches are not considered).
+
+        Args:
+            model (DiscreteSensorModel): The model to compare with.
+        Returns:
+            bool -- ``True`` if both models give the same results, ``False`` otherwise.
+        """
+        if self.sensor_type != model.sensor_type:
+            return False
+        if (sorted((o.option_type.name, o.parameter) for o in self.options) !=
+            sorted((o.option_type.name, o.parameter) for o in model.options)):
+            return False
+        focals = dict((f.element, f.points) for f in self.focals)
+        return len(focals) == len(model.focals) and all(focals.get(f.element) == f.points for f in model.focals)
+
+    def get_state_store(self):
+        """
+        Gets the compact storage of the option data shared by all the sensors using
+        this model (see ``SensorStateStore``). It is created on first call, thus the
+        options should be added before.
+
+        Returns:
+            SensorStateStore -- The state store of the model.
+        """
+        if self.state_store == None:
+            self.state_store = SensorStateStore(self)
+        return self.state_store
+
     def get_evidence(self, sensor_measurement):
         """
         Gets a mass function given a sensor measurement and the current sensor model.
         Returns a vacuous mass function if sensor_measurement == None.
 
-        Remark: As the model might be used for multiple identical sensors, the effect
+        Remark 0: As the model might be used for multiple identical sensors, the effect
         of options is not applied here.
+        Remark 1: If the cache is enabled, the result is an ``ImmutableMassFunction``
+        shared with every other call that got the same measurement (or quantum).
 
         Args:
             sensor_measurement (float): The measurement provided by the sensor.
         Returns:
-            MassFunction -- A new mass function that corresponds to the projection
+            MassFunction -- A mass function that corresponds to the projection
             of the sensor measurement on the sensor model.
         """
         if len(self.focals) == 0:
-            raise EmptyModelError(self.sensor_type)
+            raise EmptyFocalError(self.sensor_type)
+
+        if self.cache != None:
+            key = self.cache.get_key(sensor_measurement)
+            evidence = self.cache.get(key)
+            if evidence is None:
+                evidence = self.project(self.cache.get_measurement(key))
+                evidence = massfunction.ImmutableMassFunction.factory_from_mass_function(evidence)
+                self.cache.put(key, evidence)
+            return evidence
+        return self.project(sensor_measurement)
 
+    def project(self, sensor_measurement):
+        """
+        Projects a sensor measurement on the model, without using the cache.
+        Returns a vacuous mass function if sensor_measurement == None.
+
+        Args:
+            sensor_measurement (float): The measurement provided by the sensor.
+        Returns:
+            MassFunction -- A new mass function that corresponds to the projection
+            of the sensor measurement on the sensor model.
+        """
         if sensor_measurement == None:
             complete = self.focals[0].element.get_compatible_complete_element()
             return massfunction.MassFunction((complete, 1)) #No measure = vacuous mass function
@@ -498,24 +919,83 @@ class DiscreteSensorModel:
                 result.add_mass((focal.element, focal.get_mass(sensor_measurement)))
             return result
 
-    def is_valid(self):
+    @staticmethod
+    def factory_from_table(sensor_type, sensor_measures, masses):
+        """
+        Builds a sensor model from a table of breakpoints, i.e. key measurements shared
+        by all the focal elements (e.g. auto-generated models).
+
+        Args:
+            sensor_type (str): The type of sensor to which this model is associated.
+            sensor_measures (iterable[float]): The key sensor measurements.
+            masses (dict{Element: iterable[float]}): The masses of each focal element,
+                one per key measurement.
+        Returns:
+            DiscreteSensorModel -- The new sensor model.
+        Raises:
+            ValueError: If the number of masses of a focal element does not match the
+            number of key measurements.
+            DuplicateValueError: If the same key measurement is provided multiple times.
         """
-        Checks that the model is valid.
+        sensor_measures = list(sensor_measures)
+        return DiscreteSensorModel(sensor_type, *[
+            DiscreteSensorFocalBelief.factory_from_arrays(e, sensor_measures, m) for e, m in masses.items()
+        ])
+
+    def compile_breakpoints(self):
+        """
+        Compiles the model into a table of breakpoints: the sorted union of the key
+        measurements of all the focal models, and for each focal model, the masses
+        it gives at each of these measurements. The table is built with a single
+        merge pass per focal model.
 
         Returns:
-            bool -- ``True`` if the model is valid, ``False`` otherwise.
+            tuple(list[float], list[array[float]]) -- The sorted key measurements and
+            the masses of each focal model (in the order of ``self.focals``).
+        Raises:
+            EmptyFocalModelError: If a focal model does not contain any key measurement
+            while the others do.
         """
-        values = []
+        values = sorted(set(point[0] for focal in self.focals for point in focal.points))
+        columns = []
         for focal in self.focals:
-            for point in focal.points:
-                if point[0] not in values:
-                    values.append(point[0])
+            points = focal.points
+            column = array('d', bytes(8 * len(values)))
+            if len(values) > 0 and len(points) == 0:
+                raise EmptyFocalModelError(focal.element)
+            j = 0
+            for i, value in enumerate(values):
+                if value <= points[0][0]:
+                    column[i] = points[0][1]
+                elif value >= points[-1][0]:
+                    column[i] = points[-1][1]
+                else:
+                    while points[j + 1][0] < value:
+                        j += 1
+                    column[i] = (points[j][1] + (points[j+1][1] - points[j][1]) *
+                                 (value - points[j][0]) / (points[j+1][0] - points[j][0]))
+            columns.append(column)
+        return values, columns
 
-        for value in values:
-            mass = self.get_evidence(value)
-            if not mass.is_valid():
-                return False
-        return True
+    def is_valid(self):
+        """
+        Checks that the model is valid, i.e. that the masses are between 0 and 1 and
+        sum to 1 at every key measurement (thus everywhere, as the masses are linearly
+        interpolated in between). The check is done in one pass over the compiled
+        breakpoint table (see ``compile_breakpoints()``).
+
+        Returns:
+            bool -- ``True`` if the model is valid, ``False`` otherwise.
+        """
+        values, columns = self.compile_breakpoints()
+        sums = array('d', bytes(8 * len(values)))
+        for column in columns:
+            for i, mass in enumerate(column):
+                if not (0 <= mass <= 1):
+                    return False
+                sums[i] += mass
+        precision = massfunction.MassFunction.precision
+        return all(1 - precision <= total <= 1 + precision for total in sums)
 
         
 ################################################################################
@@ -528,10 +1008,17 @@ class DiscreteSensorModelData:
     It stores option data specifically for the sensor to which it is associated.
     Thus, the same model can be applied to multiple sensors.
 
+    The options and custom stages of the model are compiled into a pipeline, an ordered
+    list of stages applied to every sensor measurement. It is rebuilt only when the model
+    is updated or the options reset.
+
     Attributes:
         self.sensor_name (str): The name of the sensor to which the model is associated.
         self.model (DiscreteSensorModel): The sensor model to apply to the sensor.
         self.options (list[DiscreteSensorModelOption]): The options with their data.
+        self.pipeline (list[func.]): The stages to apply to every sensor measurement,
+            in order. Each one is called as ``stage(sensor_measurement, evidence)`` and
+            returns the tuple ``(sensor_measurement, evidence)``.
     """
 
     def __init__(self, sensor_name, model):
@@ -544,9 +1031,7 @@ class DiscreteSensorModelData:
         """
         self.sensor_name = sensor_name
         self.model = model
-        self.options = []
-        for option in model.options:
-            self.options.append(DiscreteSensorModelOption(option.option_type, option.parameter))
+        self.reset_options()
 
     def update_model(self, model):
         """
@@ -559,91 +1044,125 @@ class DiscreteSensorModelData:
         self.model = model
         self.reset_options()
 
-    def reset_options(self):
+    def release(self):
         """
-        Resets the options by reseting their data.
+        Called when the sensor is unregistered. Nothing to release here as the option
+        data belongs to this object (see ``CompactSensorModelData``).
         """
-        self.options = []
-        for option in self.model.options:
-            self.options.append(DiscreteSensorModelOption(option.option_type, option.parameter))
+        pass
 
-    def get_evidence(self, sensor_measurement):
+    def get_state(self):
         """
-        Gets the mass function for the current sensor given the model associated to it and the provided
-        sensor measurement. It applies the options here (variation, temporisations...).
+        Gets the data of the options (see ``set_state()``).
 
-        Args:
-            sensor_measurement (float): The measurement provided by the sensor.
         Returns:
-            MassFunction -- A new mass function that is the projection of the sensor measurement
-            in the model + the application of various options if required (variation, temporisation).
+            list[tuple(DiscreteSensorModelOption.Option, float, object)] -- For each option,
+            its type, its parameter and its data: the stored measurements (most recent first)
+            for the variation, a tuple (previous_time, previous_mass) for the temporisations.
         """
-        newMeasure = sensor_measurement
-
-        #Check if "variation" applies:
-        variationOption = None
+        state = []
         for option in self.options:
             if option.option_type == DiscreteSensorModelOption.Option.variation:
-                variationOption = option
-                break
-
-        #Apply variation:
-        if variationOption != None:
-            s = 0
-            nbMeasures = 0
-            for measure in variationOption.data:
-                if measure != None:
-                    s += sensor_measurement - measure
-                    nbMeasures += 1
-            if nbMeasures != 0:
-                newMeasure = s / nbMeasures
+                state.append((option.option_type, option.parameter, list(option.data)))
             else:
-                newMeasure = None
-            variationOption.add_measure(sensor_measurement)
+                state.append((option.option_type, option.parameter, (option.get_previous_time(), option.get_previous_mass())))
+        return state
 
-        #Get the evidence:
-        evidence = self.model.get_evidence(newMeasure)
+    def set_state(self, state):
+        """
+        Sets the data of the options with the same type and parameter as in the given state
+        (see ``get_state()``). The other options are left untouched.
 
-        #Check if temporisation fusion applies:
-        tempoOption = None
-        for option in self.options:
-            if option.option_type == DiscreteSensorModelOption.Option.temporisation_fusion:
-                tempoOption = option
-                break
+        Args:
+            state (list[tuple(DiscreteSensorModelOption.Option, float, object)]): The state to set.
+        """
+        for option_type, parameter, data in state:
+            for option in self.options:
+                if option.option_type == option_type and option.parameter == parameter:
+                    if option_type == DiscreteSensorModelOption.Option.variation:
+                        option.data = list(data)[:max(0, int(parameter))]
+                    else:
+                        option.set_previous_time(data[0])
+                        option.set_previous_mass(data[1])
 
-        #Apply tempo fusion:
-        if tempoOption != None:
-            new_time = time.time()
-            old_time = tempoOption.get_previous_time()
-            old_mass_function = tempoOption.get_previous_mass()
+    def inherit_options(self, data):
+        """
+        Takes over the option data of another sensor model data (e.g. the one of the same sensor
+        with the previous version of its model), for the options with the same type and parameter.
+        The other options keep their fresh data.
 
-            evidence, new_old_time, new_old_mass= old_mass_function.temporisation_fusion(old_time, new_time,
-                                                                                         tempoOption.parameter,
-                                                                                         evidence, got_data=newMeasure!=None)
+        Args:
+            data (DiscreteSensorModelData): The sensor model data to take the option data from.
+        """
+        for i in range(len(self.options)):
+            for option in data.options:
+                if (option.option_type == self.options[i].option_type and
+                    option.parameter == self.options[i].parameter):
+                    self.options[i] = option
+        self.compile_pipeline()
 
-            tempoOption.set_previous_time(new_old_time)
-            tempoOption.set_previous_mass(new_old_mass)
+    def reset_options(self):
+        """
+        Resets the options by reseting their data. The pipeline is compiled again.
+        """
+        self.options = []
+        for option in self.model.options:
+            self.options.append(DiscreteSensorModelOption(option.option_type, option.parameter))
+        self.compile_pipeline()
 
-        #Check if temporisation specificity applies:
-        tempoOption = None
-        for option in self.options:
-            if option.option_type == DiscreteSensorModelOption.Option.temporisation_specificity:
-                tempoOption = option
-                break
+    def compile_pipeline(self):
+        """
+        Compiles the options and the custom stages of the model into the pipeline.
+        The order is: custom stages before projection, variation, projection on the
+        model, custom stages after projection, temporisation (fusion then specificity).
+        """
+        before = [option for option in self.options if option.is_applied_before_projection()]
+        after = [option for option in self.options if not option.is_applied_before_projection()]
+        #Keep the temporisation order of the previous versions (fusion first):
+        after.sort(key=lambda o: o.option_type != DiscreteSensorModelOption.Option.temporisation_fusion)
 
-        #Apply tempo specificity:
-        if tempoOption != None:
-            new_time = time.time()
-            old_time = tempoOption.get_previous_time()
-            old_mass_function = tempoOption.get_previous_mass()
+        self.pipeline = []
+        for stage_factory, before_projection in self.model.stages:
+            if before_projection:
+                self.pipeline.append(stage_factory())
+        for option in before:
+            self.pipeline.append(option.get_stage())
+        self.pipeline.append(self.project)
+        for stage_factory, before_projection in self.model.stages:
+            if not before_projection:
+                self.pipeline.append(stage_factory())
+        for option in after:
+            self.pipeline.append(option.get_stage())
+
+    def project(self, sensor_measurement, evidence):
+        """
+        Stage projecting the sensor measurement on the model.
 
-            evidence, new_old_time, new_old_mass= old_mass_function.temporisation_specificity(old_time, new_time,
-                                                                                              tempoOption.parameter,
-                                                                                              evidence, got_data=newMeasure!=None)
+        Args:
+            sensor_measurement (float): The measurement (None if there is no data).
+            evidence (MassFunction): Ignored, should be None.
+        Returns:
+            tuple(float, MassFunction) -- The unchanged measurement and the evidence
+            obtained from the model.
+        """
+        return sensor_measurement, self.model.get_evidence(sensor_measurement)
 
-            tempoOption.set_previous_time(new_old_time)
-            tempoOption.set_previous_mass(new_old_mass)
+    def get_evidence(self, sensor_measurement):
+        """
+        Gets the mass function for the current sensor given the model associated to it and the provided
+        sensor measurement. It applies the options here (variation, temporisations...).
 
+        Args:
+            sensor_measurement (float): The measurement provided by the sensor.
+        Returns:
+            MassFunction -- A mass function that is the projection of the sensor measurement
+            in the model + the application of various options if required (variation, temporisation).
+            If the model caches its evidence and no temporisation is applied, this is a shared
+            ``ImmutableMassFunction``.
+        """
+        evidence = None
+        for stage in self.pipeline:
+            sensor_measurement, evidence = stage(sensor_measurement, evidence)
         return evidence
                 
     
@@ -651,67 +1170,672 @@ class DiscreteSensorModelData:
 ################################################################################
 ################################################################################
 
-class DiscreteMassFunctionsFromSensorsGenerator:
+class SensorStateStore:
     """
-    A generator of mass functions from sensor measurements. For details on how it works,
-    please refer to "B. Pietropaoli, Stable context recognition in smart home, 2013" (French)
-    or "B. Pietropaoli et al., Belief Inference with Timed Evidence, 2012".
+    A compact storage of the option data of all the sensors sharing a given model, as an
+    alternative to the option objects of ``DiscreteSensorModelData``. The data is stored as
+    a structure of typed arrays indexed by slot (one slot per sensor):
+        - previous_times: The previous time of the temporisation.
+        - previous_masses: The previous mass of the temporisation as a dense row of
+          masses over self.elements (the focal elements met so far, shared by all sensors),
+          NaN for the elements that are not focal.
+        - window, window_heads: The circular buffers of the variation measurements
+          (NaN when empty or without data).
+    Thus, the memory needed per sensor is a few floats instead of several Python objects.
+    Operations touching the layout of the arrays (allocation of slots, new columns) and the
+    previous masses are done under self.lock, so different slots can be used concurrently.
+
+    The sensors use it through ``CompactSensorModelData``.
 
-    Args:
-        self.frame_name (str): The name of the frame of discernment (e.g. presence).
-        self.sensor_models (dict{sensor_type:DiscreteSensorModel}): The models currently
-            loaded in this generator.
-        self.current_sensors (dict{sensor_name:DiscreteSensorModelData}): The sensor
-            currently registered in this generator with their models associated.
+    Attributes:
+        self.model (DiscreteSensorModel): The model whose option data is stored.
+        self.variation (int): The number of measurements considered by the variation
+            option, None if the model does not use it.
+        self.temporisation (DiscreteSensorModelOption): The temporisation option of the
+            model, None if it does not use one.
+        self.elements (list[DiscreteElement]): The focal elements indexing the columns
+            of self.previous_masses.
+        self.nb_slots (int): The number of slots allocated (free or used).
     """
 
-    class ModelFormat(Enum):
+    def __init__(self, model):
         """
-        The different types of formats for the models.
-        """
-        XML = 1,
-        custom_directory = 2
-    
-    ################################################################################
+        Builds an empty store for the given model.
 
-    def __init__(self, frame_name=""):
+        Args:
+            model (DiscreteSensorModel): The model whose option data should be stored.
         """
-        Constructs the generator.
+        self.model = model
+        self.variation = None
+        self.temporisation = None
+        for option in model.options:
+            if option.option_type == DiscreteSensorModelOption.Option.variation:
+                self.variation = int(option.parameter)
+            else:
+                self.temporisation = option
+        self.__window_size = self.variation if self.variation != None else 0
+        self.elements = []
+        self.__columns = {}
+        self.nb_slots = 0
+        self.__free = []
+        self.previous_times = array("d")
+        self.previous_masses = array("d")
+        self.window = array("d")
+        self.window_heads = array("L")
+        self.stages = []
+        self.lock = threading.RLock()
+        for focal in model.focals:
+            self.__get_column(focal.element)
+
+    def acquire(self):
+        """
+        Gets a free slot, initialised as for a new sensor.
 
-        Args:
-            frame_name (str): The name of the frame of discernment.
+        Returns:
+            int -- The slot.
         """
-        self.frame_name = frame_name
-        self.sensor_models = {}
-        self.current_sensors = {}
-        self.ref_list = []
+        with self.lock:
+            return self.__acquire()
 
-    ################################################################################
+    def __acquire(self):
+        if len(self.__free) != 0:
+            slot = self.__free.pop()
+        else:
+            slot = self.nb_slots
+            self.nb_slots += 1
+            self.previous_times.append(-1)
+            self.previous_masses.extend(array("d", [math.nan]) * len(self.elements))
+            self.window.extend(array("d", [math.nan]) * self.__window_size)
+            self.window_heads.append(0)
+            self.stages.append(None)
+        self.__reset(slot)
+        return slot
 
-    def load_model(self, path, model_format):
+    def release(self, slot):
         """
-        Loads a model from either an XML file or from a custom directory.
+        Frees a slot so that it can be reused by another sensor.
 
         Args:
-            path (str): Either the complete path to the XML file, OR the path
-                to the directory containing the model (the name of the directory
-                is used as the name of the frame of discernment).
-            model_format (ModelFormat): The format of the model to load.
-        Raises:
-            A lot of various errors to help understand what's wrong in your model.
+            slot (int): The slot to free.
         """
-        if model_format not in DiscreteMassFunctionsFromSensorsGenerator.ModelFormat:
-            raise ValueError(
-                "model_format: " + str(model_format) + "\n" +
-                "The model format should be of the type ModelFormat!"
-            )
+        with self.lock:
+            self.stages[slot] = None
+            self.__free.append(slot)
 
-        if not os.path.exists(path):
-            raise ValueError(
+    def reset(self, slot):
+        """
+        Resets the option data of a slot, as in ``DiscreteSensorModelData.reset_options()``.
+
+        Args:
+            slot (int): The slot to reset.
+        """
+        with self.lock:
+            self.__reset(slot)
+
+    def __reset(self, slot):
+        self.previous_times[slot] = -1
+        width = len(self.elements)
+        self.previous_masses[slot * width:(slot + 1) * width] = array("d", [math.nan]) * width
+        size = self.__window_size
+        self.window[slot * size:(slot + 1) * size] = array("d", [math.nan]) * size
+        self.window_heads[slot] = 0
+        if len(self.model.stages) != 0:
+            self.stages[slot] = [(stage_factory(), before) for stage_factory, before in self.model.stages]
+
+    def get_state(self, slot):
+        """
+        Gets the data of the options of a slot (see ``DiscreteSensorModelData.get_state()``).
+
+        Args:
+            slot (int): The slot.
+        Returns:
+            list[tuple(DiscreteSensorModelOption.Option, float, object)] -- The state of the slot.
+        """
+        state = []
+        if self.variation != None:
+            size = self.variation
+            window = self.window[slot * size:(slot + 1) * size]
+            head = self.window_heads[slot]
+            measures = [window[(head - 1 - i) % size] for i in range(size)]
+            state.append((DiscreteSensorModelOption.Option.variation, self.variation,
+                          [None if math.isnan(m) else m for m in measures]))
+        if self.temporisation != None:
+            state.append((self.temporisation.option_type, self.temporisation.parameter,
+                          (self.previous_times[slot], self.get_previous_mass(slot))))
+        return state
+
+    def set_state(self, slot, state):
+        """
+        Sets the data of the options of a slot with the same type and parameter as in the
+        given state (see ``DiscreteSensorModelData.set_state()``).
+
+        Args:
+            slot (int): The slot.
+            state (list[tuple(DiscreteSensorModelOption.Option, float, object)]): The state to set.
+        """
+        for option_type, parameter, data in state:
+            if option_type == DiscreteSensorModelOption.Option.variation:
+                if self.variation != None and self.variation == int(parameter) and self.variation != 0:
+                    size = self.variation
+                    measures = list(data)[:size]
+                    measures.reverse()
+                    measures = [math.nan] * (size - len(measures)) + [math.nan if m == None else m for m in measures]
+                    self.window[slot * size:(slot + 1) * size] = array("d", measures)
+                    self.window_heads[slot] = 0
+            elif (self.temporisation != None and self.temporisation.option_type == option_type and
+                  self.temporisation.parameter == parameter):
+                self.previous_times[slot] = data[0]
+                self.set_previous_mass(slot, data[1])
+
+    def inherit(self, slot, store, other_slot):
+        """
+        Copies the option data of a slot of another store (e.g. the one of the previous
+        version of the model) for the options with the same type and parameter.
+
+        Args:
+            slot (int): The slot to copy the data to.
+            store (SensorStateStore): The store to copy the data from.
+            other_slot (int): The slot to copy the data from.
+        """
+        if (self.temporisation != None and store.temporisation != None and
+            self.temporisation.option_type == store.temporisation.option_type and
+            self.temporisation.parameter == store.temporisation.parameter):
+            self.previous_times[slot] = store.previous_times[other_slot]
+            self.set_previous_mass(slot, store.get_previous_mass(other_slot))
+        if self.variation != None and self.variation == store.variation:
+            size = self.variation
+            self.window[slot * size:(slot + 1) * size] = store.window[other_slot * size:(other_slot + 1) * size]
+            self.window_heads[slot] = store.window_heads[other_slot]
+
+    def __get_column(self, element):
+        """
+        Gets the column of a focal element in self.previous_masses, adding it (and
+        thus widening all the rows) if it was never met before.
+        """
+        column = self.__columns.get(element)
+        if column == None:
+            width = len(self.elements)
+            column = width
+            self.__columns[element] = column
+            self.elements.append(element)
+            if self.nb_slots != 0:
+                masses = array("d", [math.nan]) * ((width + 1) * self.nb_slots)
+                for slot in range(self.nb_slots):
+                    masses[slot * (width + 1):slot * (width + 1) + width] = self.previous_masses[slot * width:(slot + 1) * width]
+                self.previous_masses = masses
+        return column
+
+    def get_previous_mass(self, slot):
+        """
+        Gets the previous mass of the temporisation of a slot.
+
+        Args:
+            slot (int): The slot.
+        Returns:
+            MassFunction -- A new mass function with the focal elements of the slot.
+        """
+        with self.lock:
+            width = len(self.elements)
+            row = self.previous_masses[slot * width:(slot + 1) * width]
+        return massfunction.MassFunction.factory_constructor_unsafe(
+            *[(self.elements[i], row[i]) for i in range(width) if not math.isnan(row[i])]
+        )
+
+    def set_previous_mass(self, slot, mass_function):
+        """
+        Sets the previous mass of the temporisation of a slot.
+
+        Args:
+            slot (int): The slot.
+            mass_function (MassFunction): The mass function to store.
+        """
+        with self.lock:
+            columns = [(self.__get_column(focal), mass) for focal, mass in mass_function.items()]
+            width = len(self.elements)
+            row = array("d", [math.nan]) * width
+            for column, mass in columns:
+                row[column] = mass
+            self.previous_masses[slot * width:(slot + 1) * width] = row
+
+    def apply_variation(self, slot, sensor_measurement):
+        """
+        Replaces the sensor measurement by its average variation over the stored
+        measurements (see ``DiscreteSensorModelOption.apply_variation()``).
+
+        Args:
+            slot (int): The slot.
+            sensor_measurement (float): The measurement provided by the sensor.
+        Returns:
+            float -- The variation, None if nothing was stored yet.
+        """
+        size = self.__window_size
+        start = slot * size
+        stored = [m for m in self.window[start:start + size] if not math.isnan(m)]
+        if size != 0:
+            head = self.window_heads[slot]
+            self.window[start + head] = math.nan if sensor_measurement == None else sensor_measurement
+            self.window_heads[slot] = (head + 1) % size
+        if sensor_measurement == None or len(stored) == 0:
+            return None
+        return sensor_measurement - sum(stored) / len(stored)
+
+    def get_evidence(self, slot, sensor_measurement):
+        """
+        Gets the evidence for the sensor using a slot, applying the stages in the same
+        order as ``DiscreteSensorModelData.compile_pipeline()``.
+
+        Args:
+            slot (int): The slot.
+            sensor_measurement (float): The measurement provided by the sensor.
+        Returns:
+            MassFunction -- The evidence.
+        """
+        stages = self.stages[slot]
+        evidence = None
+        if stages != None:
+            for stage, before_projection in stages:
+                if before_projection:
+                    sensor_measurement, evidence = stage(sensor_measurement, evidence)
+        if self.variation != None:
+            sensor_measurement = self.apply_variation(slot, sensor_measurement)
+        evidence = self.model.get_evidence(sensor_measurement)
+        if stages != None:
+            for stage, before_projection in stages:
+                if not before_projection:
+                    sensor_measurement, evidence = stage(sensor_measurement, evidence)
+        if self.temporisation != None:
+            if self.temporisation.option_type == DiscreteSensorModelOption.Option.temporisation_fusion:
+                temporise = self.get_previous_mass(slot).temporisation_fusion
+            else:
+                temporise = self.get_previous_mass(slot).temporisation_specificity
+            evidence, old_time, old_mass = temporise(
+                self.previous_times[slot], time.time(), self.temporisation.parameter, evidence,
+                got_data=sensor_measurement != None)
+            self.previous_times[slot] = old_time
+            self.set_previous_mass(slot, old_mass)
+        return evidence
+
+
+class CompactSensorModelData:
+    """
+    A drop-in replacement for ``DiscreteSensorModelData`` storing the option data of the
+    sensor in the ``SensorStateStore`` of its model instead of option objects. Used by
+    the generators built with ``compact_state=True``.
+
+    Attributes:
+        self.sensor_name (str): The name of the sensor to which the model is associated.
+        self.model (DiscreteSensorModel): The sensor model to apply to the sensor.
+        self.slot (int): The slot of the sensor in the state store of the model.
+    """
+
+    __slots__ = ("sensor_name", "model", "slot")
+
+    def __init__(self, sensor_name, model):
+        """
+        Associate a model a given sensor.
+
+        Args:
+            sensor_name (str): The name of the sensor.
+            model (DiscreteSensorModel): The model to associate to the sensor.
+        """
+        self.sensor_name = sensor_name
+        self.model = model
+        self.slot = model.get_state_store().acquire()
+
+    def update_model(self, model):
+        """
+        Updates the current model with the given one. This resets the options.
+
+        Args:
+            model (DiscreteSensorModel): The new sensor model to associate to the current sensor.
+        """
+        self.release()
+        self.model = model
+        self.slot = model.get_state_store().acquire()
+
+    def release(self):
+        """
+        Frees the slot of the sensor in the state store. Called when the sensor is unregistered.
+        """
+        self.model.get_state_store().release(self.slot)
+
+    def reset_options(self):
+        """
+        Resets the options by reseting their data.
+        """
+        self.model.get_state_store().reset(self.slot)
+
+    def get_state(self):
+        """
+        Gets the data of the options (see ``DiscreteSensorModelData.get_state()``).
+
+        Returns:
+            list[tuple(DiscreteSensorModelOption.Option, float, object)] -- The state of the options.
+        """
+        return self.model.get_state_store().get_state(self.slot)
+
+    def set_state(self, state):
+        """
+        Sets the data of the options with the same type and parameter as in the given state
+        (see ``DiscreteSensorModelData.set_state()``).
+
+        Args:
+            state (list[tuple(DiscreteSensorModelOption.Option, float, object)]): The state to set.
+        """
+        self.model.get_state_store().set_state(self.slot, state)
+
+    def inherit_options(self, data):
+        """
+        Takes over the option data of another sensor model data for the options with the same
+        type and parameter (see ``DiscreteSensorModelData.inherit_options()``).
+
+        Args:
+            data (CompactSensorModelData): The sensor model data to take the option data from.
+        """
+        self.model.get_state_store().inherit(self.slot, data.model.get_state_store(), data.slot)
+
+    def get_evidence(self, sensor_measurement):
+        """
+        Gets the mass function for the current sensor given the model associated to it and the provided
+        sensor measurement (see ``DiscreteSensorModelData.get_evidence()``).
+
+        Args:
+            sensor_measurement (float): The measurement provided by the sensor.
+        Returns:
+            MassFunction -- The resulting mass function.
+        """
+        return self.model.state_store.get_evidence(self.slot, sensor_measurement)
+
+
+################################################################################
+################################################################################
+################################################################################
+
+class IncrementalFusion:
+    """
+    Keeps the last evidence of a set of sources (e.g. sensors) and their fusion with a given
+    combination rule. For associative rules (Dempster, Smets, disjunctive), the fusion is
+    stored as a binary reduction tree of partial combinations: when some sources change,
+    only the partial combinations on their path to the root are computed again, i.e.
+    O(log(n)) combinations per changed source instead of n. Other rules are recomputed
+    from all the stored evidence, but only when something changed.
+
+    Sources that did not provide evidence yet (or that were removed) are simply ignored.
+    It can be updated from several threads.
+
+    Attributes:
+        self.combination_rule (MassFunction.Combination): The combination rule to use.
+        self.slots (dict{source_name:int}): The leaf of the tree associated to each source.
+        self.tree (list[MassFunction]): The reduction tree (heap layout: node i has children
+            2i and 2i+1, the leaves are the last self.capacity nodes), None for an empty node.
+    """
+
+    """The combination rules for which the reduction tree is used."""
+    associative = [
+        massfunction.MassFunction.Combination.Dempster,
+        massfunction.MassFunction.Combination.Smets,
+        massfunction.MassFunction.Combination.Disjunctive
+    ]
+
+    def __init__(self, combination_rule=massfunction.MassFunction.Combination.Dempster):
+        """
+        Builds an empty fusion.
+
+        Args:
+            combination_rule (MassFunction.Combination): The combination rule to use.
+        Raises:
+            ValueError: If the combination rule is not recognised.
+        """
+        if not isinstance(combination_rule, massfunction.MassFunction.Combination):
+            raise ValueError(
+                "combination_rule: " + str(combination_rule) + "\n" +
+                "The combination rule should be of the type MassFunction.Combination!"
+            )
+        self.combination_rule = combination_rule
+        self.slots = {}
+        self.capacity = 1
+        self.tree = [None, None]
+        self.__free = [0]
+        self.__dirty = set()
+        self.__result = None
+        self.__lock = threading.Lock()
+
+    def update(self, source_name, mass_function):
+        """
+        Sets the last evidence provided by a source. Nothing is combined before the
+        next call to ``get_evidence()``.
+
+        Args:
+            source_name (object): The name of the source (e.g. the sensor name).
+            mass_function (MassFunction): Its evidence, it should not be modified afterwards.
+        """
+        with self.__lock:
+            if source_name not in self.slots:
+                if len(self.__free) == 0:
+                    self.__grow()
+                self.slots[source_name] = self.__free.pop()
+            leaf = self.capacity + self.slots[source_name]
+            self.tree[leaf] = mass_function
+            self.__dirty.add(leaf)
+
+    def remove(self, source_name):
+        """
+        Forgets about a source. Does nothing if the source is unknown.
+
+        Args:
+            source_name (object): The name of the source (e.g. the sensor name).
+        """
+        with self.__lock:
+            if source_name in self.slots:
+                slot = self.slots.pop(source_name)
+                self.tree[self.capacity + slot] = None
+                self.__dirty.add(self.capacity + slot)
+                self.__free.append(slot)
+
+    def get_evidence(self):
+        """
+        Gets the fusion of the last evidence of all the sources.
+
+        Returns:
+            ImmutableMassFunction -- The fused evidence, None if no source provided evidence.
+        """
+        with self.__lock:
+            if len(self.__dirty) != 0:
+                if self.combination_rule in IncrementalFusion.associative:
+                    self.__recompute_tree()
+                    root = self.tree[1]
+                else:
+                    root = self.__combine(*self.tree[self.capacity:])
+                self.__dirty = set()
+                self.__result = None
+                if root is not None:
+                    self.__result = massfunction.ImmutableMassFunction.factory_from_mass_function(root)
+            return self.__result
+
+    def __combine(self, *mass_functions):
+        """
+        Combines the given mass functions, ignoring None.
+        """
+        mass_functions = [m for m in mass_functions if m is not None]
+        if len(mass_functions) == 0:
+            return None
+        if len(mass_functions) == 1:
+            return mass_functions[0]
+        return mass_functions[0].combination_unsafe(self.combination_rule, *mass_functions[1:])
+
+    def __recompute_tree(self):
+        """
+        Computes again the partial combinations on the path of the modified leaves.
+        Parents always have smaller indices than their children, so going through
+        the nodes in decreasing order computes children first.
+        """
+        nodes = set()
+        for node in self.__dirty:
+            node //= 2
+            while node >= 1 and node not in nodes:
+                nodes.add(node)
+                node //= 2
+        for node in sorted(nodes, reverse=True):
+            self.tree[node] = self.__combine(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def __grow(self):
+        """
+        Doubles the number of leaves of the tree. All the partial combinations
+        will be computed again.
+        """
+        leaves = self.tree[self.capacity:]
+        self.capacity *= 2
+        self.tree = [None] * self.capacity + leaves + [None] * (self.capacity - len(leaves))
+        self.__free = list(range(self.capacity - 1, len(leaves) - 1, -1))
+        self.__dirty = set(self.capacity + i for i in range(len(leaves)) if leaves[i] is not None)
+
+    def __len__(self):
+        """
+        Overrides ``len()``, gets the number of sources currently stored.
+
+        Returns:
+            int -- The number of sources.
+        """
+        return len(self.slots)
+
+################################################################################
+################################################################################
+################################################################################
+
+def _pack_str(s):
+    """
+    Packs a string (length + UTF-8 bytes) for the binary formats of this module.
+    """
+    s = s.encode("utf-8")
+    return struct.pack("<I", len(s)) + s
+
+
+class _BinaryReader:
+    """
+    Reads the values packed in the binary formats of this module.
+
+    Attributes:
+        self.data (bytes): The data to read.
+        self.offset (int): The current position in the data.
+    """
+
+    def __init__(self, data, offset=0):
+        self.data = data
+        self.offset = offset
+
+    def unpack(self, fmt):
+        values = struct.unpack_from(fmt, self.data, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values
+
+    def unpack_str(self):
+        length = self.unpack("<I")[0]
+        self.offset += length
+        return self.data[self.offset - length:self.offset].decode("utf-8")
+
+    def unpack_int(self, nb_bytes):
+        self.offset += nb_bytes
+        return int.from_bytes(self.data[self.offset - nb_bytes:self.offset], "little")
+
+
+################################################################################
+################################################################################
+################################################################################
+
+class DiscreteMassFunctionsFromSensorsGenerator:
+    """
+    A generator of mass functions from sensor measurements. For details on how it works,
+    please refer to "B. Pietropaoli, Stable context recognition in smart home, 2013" (French)
+    or "B. Pietropaoli et al., Belief Inference with Timed Evidence, 2012".
+
+    Args:
+        self.frame_name (str): The name of the frame of discernment (e.g. presence).
+        self.sensor_models (dict{sensor_type:DiscreteSensorModel}): The models currently
+            loaded in this generator.
+        self.current_sensors (dict{sensor_name:DiscreteSensorModelData}): The sensor
+            currently registered in this generator with their models associated.
+        self.fusion (IncrementalFusion): The fusion of the last evidence of each sensor,
+            None if disabled.
+        self.compact_state (bool): If the option data of the sensors is stored in the
+            compact state stores of the models (see ``CompactSensorModelData``).
+        self.thread_safe (bool): If the generator can be used from several threads at once.
+
+    Thread-safe mode: ``get_evidence()`` never takes a global lock. Each sensor has its own
+    lock, taken while its evidence is computed, so different sensors are processed concurrently
+    and the readings of a given sensor are applied one at a time. Modifications of the models
+    (``load_model()``, ``reload_model()``, ...) are prepared on the side and swapped in
+    (read-copy-update): readers keep using the previous dictionaries until the swap and only
+    the sensors whose data is replaced wait for it. Registrations are serialised between them.
+    """
+
+    class ModelFormat(Enum):
+        """
+        The different types of formats for the models.
+        """
+        XML = 1,
+        custom_directory = 2
+    
+    ################################################################################
+
+    def __init__(self, frame_name="", compact_state=False, thread_safe=False):
+        """
+        Constructs the generator.
+
+        Args:
+            frame_name (str): The name of the frame of discernment.
+            compact_state (bool): If the option data of the sensors should be stored in
+                typed arrays shared per model (``CompactSensorModelData``) instead of option
+                objects per sensor (``DiscreteSensorModelData``). Much lighter for large numbers
+                of sensors.
+            thread_safe (bool): If the generator should be usable from several threads at once
+                (see the class documentation).
+        """
+        self.frame_name = frame_name
+        self.compact_state = compact_state
+        self.sensor_models = {}
+        self.current_sensors = {}
+        self.ref_list = []
+        self.fusion = None
+        self.__modified_sensors = set()
+        self.__snapshot_path = None
+        self.thread_safe = thread_safe
+        self.__writer_lock = threading.RLock()
+        self.__sensor_locks = {}
+        self.__modified_lock = threading.Lock()
+
+    ################################################################################
+
+    def load_model(self, path, model_format):
+        """
+        Loads a model from either an XML file or from a custom directory.
+
+        Args:
+            path (str): Either the complete path to the XML file, OR the path
+                to the directory containing the model (the name of the directory
+                is used as the name of the frame of discernment).
+            model_format (ModelFormat): The format of the model to load.
+        Raises:
+            A lot of various errors to help understand what's wrong in your model.
+        """
+        if model_format not in DiscreteMassFunctionsFromSensorsGenerator.ModelFormat:
+            raise ValueError(
+                "model_format: " + str(model_format) + "\n" +
+                "The model format should be of the type ModelFormat!"
+            )
+
+        if not os.path.exists(path):
+            raise ValueError(
                 "path: " + str(path) + "\n" +
                 "The given path is invalid!"
             )
 
+        if self.thread_safe:
+            parsed = DiscreteMassFunctionsFromSensorsGenerator()
+            parsed.load_model(path, model_format)
+            with self.__writer_lock:
+                self.__swap_models(parsed, False)
+            return
+
         # ***********
         # XML FORMAT:
         # ***********
@@ -732,7 +1856,7 @@ class DiscreteMassFunctionsFromSensorsGenerator:
             #Load the frame of discernment:
             frame_element = root.findall("frame")
             if len(frame_element) != 1:
-                raise InvalidModelError(
+                raise InvalidBeliefsFromSensorsModelError(
                     "File: " + str(path) + "\n" +
                     "This should contain exactly one <frame> tag!"
                 )
@@ -763,10 +1887,10 @@ class DiscreteMassFunctionsFromSensorsGenerator:
                             focals[states] = []
                         focals[states].append((sensor_measure, m))
                 
-                for states, points in focals.items():
-                    focal_element = element.DiscreteElement.factory_from_ref_list(self.ref_list, *(states.split(" ")))
-                    focal_belief = DiscreteSensorFocalBelief(focal_element, *points)
-                    model.add_focal(focal_belief)
+                model.add_focals(*[
+                    DiscreteSensorFocalBelief(element.DiscreteElement.factory_from_ref_list(self.ref_list, *(states.split(" "))), *points)
+                    for states, points in focals.items()
+                ])
 
                 options_element = sensor_belief.findall("options")
                 if len(options_element) > 1:
@@ -803,7 +1927,9 @@ class DiscreteMassFunctionsFromSensorsGenerator:
                 for sensor in sensors_element.iter("sensor"):
                     sensor_name = sensor.get("name")
                     sensor_model = sensor.get("belief")
-                    self.current_sensors[sensor_name] = DiscreteSensorModelData(sensor_name, self.sensor_models[sensor_model])
+                    if sensor_name in self.current_sensors:
+                        self.current_sensors[sensor_name].release()
+                    self.current_sensors[sensor_name] = self.__new_sensor_data(sensor_name, self.sensor_models[sensor_model])
             
         # *****************
         # CUSTOM DIRECTORY:
@@ -883,7 +2009,13 @@ class DiscreteMassFunctionsFromSensorsGenerator:
 
                 self.sensor_models[sensor_type] = model
 
-        #Update the models:
+        self.__update_sensors()
+
+    def __update_sensors(self):
+        """
+        Associates the registered sensors to the newly loaded models, or unregisters
+        them if their model is not there anymore.
+        """
         to_suppress = []
         for sensor_name, data in self.current_sensors.items():
             if data.model.sensor_type in self.sensor_models:
@@ -891,87 +2023,590 @@ class DiscreteMassFunctionsFromSensorsGenerator:
             else:
                 to_suppress.append(sensor_name)
         for sensor_name in to_suppress:
-            del self.current_sensors[sensor_name]
+            self.remove_sensor(sensor_name)
+        self.__mark_modified(*self.current_sensors)
 
     ################################################################################
 
-    def save_model(self, path, model_format):
+    """A context doing nothing, used instead of the locks when not in thread-safe mode."""
+    NO_LOCK = contextlib.nullcontext()
+
+    """The magic bytes and the version of the compiled model format (see ``compile_model()``)."""
+    COMPILED_MAGIC = b"THEGAME-BFS"
+    COMPILED_VERSION = 1
+
+    """The option types in the order of their codes in compiled models."""
+    COMPILED_OPTIONS = [
+        DiscreteSensorModelOption.Option.variation,
+        DiscreteSensorModelOption.Option.temporisation_specificity,
+        DiscreteSensorModelOption.Option.temporisation_fusion
+    ]
+
+    @staticmethod
+    def get_compiled_path(path):
         """
-        Saves the current model at the given path in the requested format.
+        Gets the default path of the compiled version of a model.
 
         Args:
-            path (str): The path to which the model will be saved. If it is an XML
-                file, the .xml extension won't be added, so put it in the path. If
-                it is a custom directory, then a new directory will be created with
-                name the frame of discernment's name. If it already exists, it is
-                erased first!
-            model_format (ModelFormat): The format to which the model should be saved.
-        Raises:
-            ValueError: If the format provided cannot be recognised.
+            path (str): The path to the XML file or the custom directory of the model.
+        Returns:
+            str -- The path of the compiled model (next to the source, with the extension '.tgc').
         """
-        if model_format not in DiscreteMassFunctionsFromSensorsGenerator.ModelFormat:
-            raise ValueError(
-                "model_format: " + str(model_format) + "\n" +
-                "The model format should be of the type ModelFormat!"
-            )
-        
-        # ***********
-        # XML FORMAT:
-        # ***********
-        if model_format == DiscreteMassFunctionsFromSensorsGenerator.ModelFormat.XML:
-            root = ET.Element("belief-from-sensors")
-            frame = ET.SubElement(root, "frame", {"name":self.frame_name})
-            
-            for ref in self.ref_list:
-                state = ET.SubElement(frame, "state", {})
-                state.text = str(ref)
-
-            sensor_beliefs = ET.SubElement(root, "sensor-beliefs")
-            for sensor_type, model in self.sensor_models.items():
-                model_node = ET.SubElement(sensor_beliefs, "sensor-belief", {"name":sensor_type})
-
-                #Options:
-                if len(model.options) > 0:
-                    options = ET.SubElement(model_node, "options")
-                    for o in model.options:
-                        if o.option_type == DiscreteSensorModelOption.Option.variation:
-                            option = ET.SubElement(options, "option", {"name":"variation"})
-                        elif o.option_type == DiscreteSensorModelOption.Option.temporisation_fusion:
-                            option = ET.SubElement(options, "option", {"name":"tempo-fusion"})
-                        elif o.option_type == DiscreteSensorModelOption.Option.temporisation_specificity:
-                            option = ET.SubElement(options, "option", {"name":"tempo-specificity"})
-                        option.text = str(o.parameter)
-                    
-                #Points:
-                points = {}
-                for focal in model.focals:
-                    for point in focal.points:
-                        if point[0] not in points:
-                            points[point[0]] = []
-                        s = focal.element.formatted_str(*self.ref_list)[1:-1].replace(" u ", " ")
-                        points[point[0]].append((s, point[1]))
-
-                for value, masses in points.items():
-                    point_node = ET.SubElement(model_node, "point")
-                    value_node = ET.SubElement(point_node, "value")
-                    value_node.text = str(value)
-                    for mass in masses:
-                        mass_node = ET.SubElement(point_node, "mass", {"set":mass[0]})
-                        mass_node.text = str(mass[1])
-
-            sensors_element = ET.SubElement(root, "sensors")
-            for sensor_name, model_data in self.current_sensors.items():
-                ET.SubElement(sensors_element, "sensor", {"name":sensor_name, "belief":model_data.model.sensor_type})
+        return os.path.normpath(path) + ".tgc"
 
-            f = open(path, "w")
-            f.write(prettyxml.pretty_str(root))
-            f.close()
+    @staticmethod
+    def get_model_stamps(path):
+        """
+        Gets the stamps used to check if a compiled model is up to date with its source:
+        a digest of the modification times and sizes of the source files (cheap) and a
+        digest of their content (only computed if the first one changed).
 
-        # *****************
-        # CUSTOM DIRECTORY:
-        # *****************
-        elif model_format == DiscreteMassFunctionsFromSensorsGenerator.ModelFormat.custom_directory:
-            real_path = os.path.join(path, self.frame_name)
+        Args:
+            path (str): The path to the XML file or the custom directory of the model.
+        Returns:
+            tuple(bytes, func.) -- The digest of the modification times and a callable
+            without arguments returning the digest of the content.
+        """
+        if os.path.isfile(path):
+            files = [(os.path.basename(path), path)]
+        else:
+            files = []
+            for directory, dirnames, filenames in os.walk(path):
+                for f in filenames:
+                    files.append((os.path.relpath(os.path.join(directory, f), path), os.path.join(directory, f)))
+            files.sort()
+
+        mtimes = hashlib.sha256()
+        for name, f in files:
+            stat = os.stat(f)
+            mtimes.update(("%s:%i:%i\n" % (name, stat.st_mtime_ns, stat.st_size)).encode("utf-8"))
+
+        def content():
+            digest = hashlib.sha256()
+            for name, f in files:
+                digest.update(name.encode("utf-8") + b"\0")
+                with open(f, "rb") as source:
+                    digest.update(source.read())
+            return digest.digest()
+
+        return mtimes.digest(), content
+
+    @staticmethod
+    def compile_model(path, model_format, compiled_path=None):
+        """
+        Compiles a model (XML file or custom directory) into a binary file that can be
+        loaded much faster with ``load_compiled_model()``: elements are stored as numbers
+        and the key measurements are stored already sorted and checked.
+
+        The file starts with a header (magic bytes, format version, stamps of the source),
+        followed by the frame, the sensor models and the registered sensors.
+
+        Args:
+            path (str): Either the complete path to the XML file, OR the path
+                to the directory containing the model.
+            model_format (ModelFormat): The format of the model to compile.
+            compiled_path (str): The path of the compiled model (default: see ``get_compiled_path()``).
+        Returns:
+            str -- The path of the compiled model.
+        Raises:
+            The same errors as ``load_model()``.
+        """
+        if compiled_path == None:
+            compiled_path = DiscreteMassFunctionsFromSensorsGenerator.get_compiled_path(path)
+
+        #Stamps first, so that a source modified during the compilation is detected as stale:
+        mtimes, content = DiscreteMassFunctionsFromSensorsGenerator.get_model_stamps(path)
+        content = content()
+        generator = DiscreteMassFunctionsFromSensorsGenerator()
+        generator.load_model(path, model_format)
+
+        size = len(generator.ref_list)
+        nb_bytes = (size + 7) // 8
+        chunks = [
+            struct.pack("<%isH" % len(DiscreteMassFunctionsFromSensorsGenerator.COMPILED_MAGIC),
+                        DiscreteMassFunctionsFromSensorsGenerator.COMPILED_MAGIC,
+                        DiscreteMassFunctionsFromSensorsGenerator.COMPILED_VERSION),
+            mtimes, content,
+            _pack_str(generator.frame_name),
+            struct.pack("<I", size)
+        ]
+        chunks.extend(_pack_str(state) for state in generator.ref_list)
+        chunks.append(struct.pack("<I", len(generator.sensor_models)))
+        for sensor_type, model in generator.sensor_models.items():
+            chunks.append(_pack_str(sensor_type))
+            chunks.append(struct.pack("<I", len(model.options)))
+            for option in model.options:
+                code = DiscreteMassFunctionsFromSensorsGenerator.COMPILED_OPTIONS.index(option.option_type)
+                chunks.append(struct.pack("<Bd", code, option.parameter))
+            chunks.append(struct.pack("<I", len(model.focals)))
+            for focal in model.focals:
+                chunks.append(focal.element._number.to_bytes(nb_bytes, "little"))
+                chunks.append(struct.pack("<I", len(focal.points)))
+                chunks.append(struct.pack("<%id" % (2 * len(focal.points)), *[x for point in focal.points for x in point]))
+        chunks.append(struct.pack("<I", len(generator.current_sensors)))
+        for sensor_name, data in generator.current_sensors.items():
+            chunks.append(_pack_str(sensor_name))
+            chunks.append(_pack_str(data.model.sensor_type))
+
+        #Write in a temporary file first so that a concurrent reader never sees half a model:
+        directory = os.path.dirname(os.path.abspath(compiled_path))
+        descriptor, temporary = tempfile.mkstemp(dir=directory)
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(b"".join(chunks))
+        os.replace(temporary, compiled_path)
+        return compiled_path
+
+    def load_compiled_model(self, path, model_format, compiled_path=None, recompile=True):
+        """
+        Loads a model from its compiled version (see ``compile_model()``) if it is up to date
+        with its source. Otherwise (missing, stale or from another version of the format),
+        the source is compiled again (if recompile) or simply loaded with ``load_model()``.
+
+        A compiled model is up to date if the modification times and sizes of its source
+        files did not change or, if they did, if their content did not change. In the latter
+        case, the stamp of the modification times is updated in the compiled model (if
+        recompile) so that the next loads do not need to read the whole source again.
+
+        Args:
+            path (str): Either the complete path to the XML file, OR the path
+                to the directory containing the model.
+            model_format (ModelFormat): The format of the model.
+            compiled_path (str): The path of the compiled model (default: see ``get_compiled_path()``).
+            recompile (bool): If the compiled model should be rewritten when it is not up to date.
+        Returns:
+            bool -- ``True`` if the compiled model was up to date, ``False`` otherwise.
+        Raises:
+            The same errors as ``load_model()``.
+        """
+        if self.thread_safe:
+            parsed = DiscreteMassFunctionsFromSensorsGenerator()
+            used_compiled = parsed.load_compiled_model(path, model_format, compiled_path, recompile)
+            with self.__writer_lock:
+                self.__swap_models(parsed, False)
+            return used_compiled
+
+        if compiled_path == None:
+            compiled_path = DiscreteMassFunctionsFromSensorsGenerator.get_compiled_path(path)
+
+        header = struct.Struct("<%isH" % len(DiscreteMassFunctionsFromSensorsGenerator.COMPILED_MAGIC))
+        data = None
+        if os.path.isfile(compiled_path) and os.path.exists(path):
+            with open(compiled_path, "rb") as f:
+                data = f.read()
+            if (data[:header.size] != header.pack(DiscreteMassFunctionsFromSensorsGenerator.COMPILED_MAGIC,
+                                                  DiscreteMassFunctionsFromSensorsGenerator.COMPILED_VERSION)):
+                data = None
+            else:
+                mtimes, content = DiscreteMassFunctionsFromSensorsGenerator.get_model_stamps(path)
+                if data[header.size:header.size + 32] != mtimes:
+                    if data[header.size + 32:header.size + 64] != content():
+                        data = None
+                    elif recompile:
+                        #Only touched (checkout, copy...): back to the fast path next time.
+                        try:
+                            with open(compiled_path, "r+b") as f:
+                                f.seek(header.size)
+                                f.write(mtimes)
+                        except OSError:
+                            pass #Read-only, the content will be checked again next time
+
+        if data == None:
+            if not recompile:
+                self.load_model(path, model_format)
+                return False
+            DiscreteMassFunctionsFromSensorsGenerator.compile_model(path, model_format, compiled_path)
+            with open(compiled_path, "rb") as f:
+                data = f.read()
+            used_compiled = False
+        else:
+            used_compiled = True
+
+        try:
+            self.__load_compiled(data, header.size + 64)
+        except (struct.error, IndexError, UnicodeDecodeError, KeyError):
+            raise InvalidBeliefsFromSensorsModelError(
+                "File: " + str(compiled_path) + "\n" +
+                "The compiled model is corrupted!"
+            )
+        return used_compiled
+
+    def __load_compiled(self, data, offset):
+        """
+        Loads the content of a compiled model (everything after its header).
+        """
+        reader = _BinaryReader(data, offset)
+        frame_name = reader.unpack_str()
+        size = reader.unpack("<I")[0]
+        ref_list = [reader.unpack_str() for i in range(size)]
+        nb_bytes = (size + 7) // 8
+        sensor_models = {}
+        for i in range(reader.unpack("<I")[0]):
+            model = DiscreteSensorModel(reader.unpack_str())
+            for j in range(reader.unpack("<I")[0]):
+                code, parameter = reader.unpack("<Bd")
+                model.options.append(DiscreteSensorModelOption(
+                    DiscreteMassFunctionsFromSensorsGenerator.COMPILED_OPTIONS[code], parameter))
+            for j in range(reader.unpack("<I")[0]):
+                number = reader.unpack_int(nb_bytes)
+                focal = DiscreteSensorFocalBelief(element.DiscreteElement.factory_constructor_unsafe(size, number))
+                nb_points = reader.unpack("<I")[0]
+                values = reader.unpack("<%id" % (2 * nb_points))
+                focal.points = list(zip(values[0::2], values[1::2]))
+                model.focals.append(focal)
+            sensor_models[model.sensor_type] = model
+        sensors = [(reader.unpack_str(), reader.unpack_str()) for i in range(reader.unpack("<I")[0])]
+
+        self.frame_name = frame_name
+        self.ref_list = ref_list
+        self.sensor_models = sensor_models
+        for sensor_name, sensor_type in sensors:
+            if sensor_name in self.current_sensors:
+                self.current_sensors[sensor_name].release()
+            self.current_sensors[sensor_name] = self.__new_sensor_data(sensor_name, sensor_models[sensor_type])
+        self.__update_sensors()
+
+    ################################################################################
+
+    def reload_model(self, path, model_format, use_compiled=False):
+        """
+        Loads a new version of the current model without disrupting the registered sensors,
+        contrary to ``load_model()`` which resets all of them:
+            - The sensor models which did not change are kept as they are.
+            - The sensors associated to a changed model keep the data of their options
+              which have the same type and parameter (e.g. the temporisation history).
+              The custom stages and the cache of the previous model are carried over.
+            - The sensors associated to a removed model are unregistered.
+        Everything is prepared on the side and then swapped, thus a failed reload leaves
+        the generator untouched. If the frame of discernment changed, no option data is kept.
+
+        Args:
+            path (str): Either the complete path to the XML file, OR the path
+                to the directory containing the model.
+            model_format (ModelFormat): The format of the model to load.
+            use_compiled (bool): If the model should be loaded through its compiled version
+                (see ``load_compiled_model()``).
+        Returns:
+            dict{str:list[str]} -- The sensor types "added", "removed", "changed" and "unchanged".
+        Raises:
+            The same errors as ``load_model()``.
+        """
+        parsed = DiscreteMassFunctionsFromSensorsGenerator()
+        if use_compiled:
+            parsed.load_compiled_model(path, model_format)
+        else:
+            parsed.load_model(path, model_format)
+        with self.__writer_lock:
+            return self.__swap_models(parsed, True)
+
+    def __swap_models(self, parsed, keep_state):
+        """
+        Replaces the current models by the ones of another generator (see ``reload_model()``).
+        If not keep_state, all the models are replaced and the sensors reset (as ``load_model()``).
+        The sensors whose data is replaced are locked during the swap in thread-safe mode.
+        """
+        same_frame = keep_state and parsed.ref_list == self.ref_list
+
+        summary = {"added": [], "removed": [], "changed": [], "unchanged": []}
+        sensor_models = {}
+        for sensor_type, model in parsed.sensor_models.items():
+            previous = self.sensor_models.get(sensor_type)
+            if previous == None:
+                summary["added"].append(sensor_type)
+            elif same_frame and previous.is_equivalent(model):
+                summary["unchanged"].append(sensor_type)
+                model = previous
+            else:
+                summary["changed"].append(sensor_type)
+                if keep_state:
+                    model.stages = list(previous.stages)
+                    if previous.cache != None:
+                        model.enable_cache(previous.cache.max_size, previous.cache.quantisation_step)
+            sensor_models[sensor_type] = model
+        summary["removed"] = [t for t in self.sensor_models if t not in sensor_models]
+
+        current_sensors = {}
+        replaced = []
+        for sensor_name, data in self.current_sensors.items():
+            model = sensor_models.get(data.model.sensor_type)
+            if model is data.model:
+                current_sensors[sensor_name] = data
+            else:
+                replaced.append((sensor_name, data))
+                if model != None:
+                    current_sensors[sensor_name] = self.__new_sensor_data(sensor_name, model)
+        for sensor_name, data in parsed.current_sensors.items():
+            if sensor_name not in current_sensors:
+                current_sensors[sensor_name] = self.__new_sensor_data(sensor_name, sensor_models[data.model.sensor_type])
+
+        #Swap:
+        locks = [self.__get_sensor_lock(sensor_name) for sensor_name, data in replaced] if self.thread_safe else []
+        for lock in locks:
+            lock.acquire()
+        try:
+            if same_frame:
+                for sensor_name, data in replaced:
+                    if sensor_name in current_sensors:
+                        current_sensors[sensor_name].inherit_options(data)
+            new_sensors = [name for name in current_sensors if name not in self.current_sensors]
+            self.frame_name = parsed.frame_name
+            self.ref_list = parsed.ref_list
+            self.sensor_models = sensor_models
+            self.current_sensors = current_sensors
+            for sensor_name, data in replaced:
+                if sensor_name not in current_sensors:
+                    self.__sensor_locks.pop(sensor_name, None)
+        finally:
+            for lock in locks:
+                lock.release()
+
+        for sensor_name, data in replaced:
+            data.release()
+            self.__mark_modified(sensor_name)
+            if sensor_name not in current_sensors and self.fusion != None:
+                self.fusion.remove(sensor_name)
+        self.__mark_modified(*new_sensors)
+        return summary
+
+    def watch_model(self, path, model_format, interval=1.0, use_compiled=False):
+        """
+        Starts watching the source files of a model and reloads it with ``reload_model()``
+        each time they change.
+
+        Args:
+            path (str): Either the complete path to the XML file, OR the path
+                to the directory containing the model.
+            model_format (ModelFormat): The format of the model.
+            interval (float): The time in seconds between two checks of the files.
+            use_compiled (bool): If the model should be reloaded through its compiled version.
+        Returns:
+            ModelWatcher -- The (started) watcher, call ``stop()`` on it to stop watching.
+        """
+        watcher = ModelWatcher(self, path, model_format, interval, use_compiled)
+        watcher.start()
+        return watcher
+
+    ################################################################################
+
+    """The magic bytes and the version of the snapshot format (see ``snapshot()``)."""
+    SNAPSHOT_MAGIC = b"THEGAME-BFS-STATE"
+    SNAPSHOT_VERSION = 1
+
+    def snapshot(self, path, incremental=True):
+        """
+        Saves the data of the options of the sensors (previous times and masses of the
+        temporisations, measurements of the variations) so that it can be restored after
+        a restart with ``restore()``.
+
+        The file is made of a header followed by frames. A full snapshot rewrites the file
+        with a single frame containing all the sensors. An incremental snapshot appends a frame
+        containing only the sensors whose data may have changed since the previous snapshot
+        (i.e. that got evidence, were added, removed or reset). Each frame is checksummed, so
+        a frame partially written because of a crash is simply ignored when restoring.
+        Incremental snapshots are only possible in the file of the previous snapshot, otherwise
+        a full one is done. Do a full snapshot from time to time to compact the file.
+
+        Args:
+            path (str): The path of the snapshot file.
+            incremental (bool): If only the sensors modified since the previous snapshot
+                should be appended to the file.
+        Returns:
+            int -- The number of sensors written.
+        """
+        full = not incremental or path != self.__snapshot_path or not os.path.isfile(path)
+        modified = self.__take_modified()
+        names = list(self.current_sensors) if full else list(modified)
+
+        size = len(self.ref_list)
+        nb_bytes = (size + 7) // 8
+        chunks = [struct.pack("<dII", time.time(), size, len(names))]
+        for sensor_name in names:
+            chunks.append(_pack_str(sensor_name))
+            with self.__locked_sensor(sensor_name) as data:
+                state = data.get_state() if data != None else None
+            if data == None:
+                chunks.append(struct.pack("<B", 0))
+                continue
+            chunks.append(struct.pack("<B", 1))
+            chunks.append(_pack_str(data.model.sensor_type))
+            chunks.append(struct.pack("<B", len(state)))
+            for option_type, parameter, option_data in state:
+                code = DiscreteMassFunctionsFromSensorsGenerator.COMPILED_OPTIONS.index(option_type)
+                chunks.append(struct.pack("<Bd", code, parameter))
+                if option_type == DiscreteSensorModelOption.Option.variation:
+                    measures = [math.nan if m == None else m for m in option_data]
+                    chunks.append(struct.pack("<I%id" % len(measures), len(measures), *measures))
+                else:
+                    previous_time, previous_mass = option_data
+                    focals = list(previous_mass.items())
+                    chunks.append(struct.pack("<dI", previous_time, len(focals)))
+                    for focal, mass in focals:
+                        chunks.append(focal._number.to_bytes(nb_bytes, "little"))
+                        chunks.append(struct.pack("<d", mass))
+        payload = b"".join(chunks)
+        frame = struct.pack("<4sII", b"SNAP", len(payload), zlib.crc32(payload)) + payload
+
+        if full:
+            header = struct.pack("<%isH" % len(DiscreteMassFunctionsFromSensorsGenerator.SNAPSHOT_MAGIC),
+                                 DiscreteMassFunctionsFromSensorsGenerator.SNAPSHOT_MAGIC,
+                                 DiscreteMassFunctionsFromSensorsGenerator.SNAPSHOT_VERSION)
+            descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(header + frame)
+            os.replace(temporary, path)
+        else:
+            with open(path, "ab") as f:
+                f.write(frame)
+        self.__snapshot_path = path
+        return len(names)
+
+    def restore(self, path):
+        """
+        Restores the data of the options of the registered sensors from a snapshot file
+        (see ``snapshot()``). For each sensor, the most recent data in the file is used, only
+        if the sensor is associated to a model of the same type, and only for the options
+        with the same type and parameter. The temporisation data is ignored if the size
+        of the frame of discernment changed. Later incremental snapshots are appended to the file.
+
+        Args:
+            path (str): The path of the snapshot file.
+        Returns:
+            int -- The number of sensors restored.
+        Raises:
+            InvalidBeliefsFromSensorsModelError: If the file is not a snapshot of this version.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        header = struct.Struct("<%isH" % len(DiscreteMassFunctionsFromSensorsGenerator.SNAPSHOT_MAGIC))
+        if data[:header.size] != header.pack(DiscreteMassFunctionsFromSensorsGenerator.SNAPSHOT_MAGIC,
+                                             DiscreteMassFunctionsFromSensorsGenerator.SNAPSHOT_VERSION):
+            raise InvalidBeliefsFromSensorsModelError(
+                "File: " + str(path) + "\n" +
+                "This is not a snapshot (or it was done with another version)!"
+            )
+
+        states = {}
+        offset = header.size
+        frame_header = struct.Struct("<4sII")
+        while offset + frame_header.size <= len(data):
+            tag, length, checksum = frame_header.unpack_from(data, offset)
+            payload = data[offset + frame_header.size:offset + frame_header.size + length]
+            if tag != b"SNAP" or len(payload) != length or zlib.crc32(payload) != checksum:
+                break #Partially written frame
+            offset += frame_header.size + length
+
+            reader = _BinaryReader(payload)
+            timestamp, size, nb_sensors = reader.unpack("<dII")
+            nb_bytes = (size + 7) // 8
+            for i in range(nb_sensors):
+                sensor_name = reader.unpack_str()
+                if reader.unpack("<B")[0] == 0:
+                    states[sensor_name] = None
+                    continue
+                sensor_type = reader.unpack_str()
+                state = []
+                for j in range(reader.unpack("<B")[0]):
+                    code, parameter = reader.unpack("<Bd")
+                    option_type = DiscreteMassFunctionsFromSensorsGenerator.COMPILED_OPTIONS[code]
+                    if option_type == DiscreteSensorModelOption.Option.variation:
+                        n = reader.unpack("<I")[0]
+                        measures = [None if math.isnan(m) else m for m in reader.unpack("<%id" % n)]
+                        state.append((option_type, parameter, measures))
+                    else:
+                        previous_time, nb_focals = reader.unpack("<dI")
+                        focals = []
+                        for k in range(nb_focals):
+                            focal = element.DiscreteElement.factory_constructor_unsafe(size, reader.unpack_int(nb_bytes))
+                            focals.append((focal, reader.unpack("<d")[0]))
+                        if size == len(self.ref_list):
+                            previous_mass = massfunction.MassFunction.factory_constructor_unsafe(*focals)
+                            state.append((option_type, parameter, (previous_time, previous_mass)))
+                states[sensor_name] = (sensor_type, state)
+
+        restored = 0
+        for sensor_name, saved in states.items():
+            if saved == None or sensor_name not in self.current_sensors:
+                continue
+            with self.__locked_sensor(sensor_name) as data:
+                if data != None and data.model.sensor_type == saved[0]:
+                    data.set_state(saved[1])
+                    restored += 1
+        self.__take_modified()
+        self.__snapshot_path = path
+        return restored
+
+    ################################################################################
+
+    def save_model(self, path, model_format):
+        """
+        Saves the current model at the given path in the requested format.
+
+        Args:
+            path (str): The path to which the model will be saved. If it is an XML
+                file, the .xml extension won't be added, so put it in the path. If
+                it is a custom directory, then a new directory will be created with
+                name the frame of discernment's name. If it already exists, it is
+                erased first!
+            model_format (ModelFormat): The format to which the model should be saved.
+        Raises:
+            ValueError: If the format provided cannot be recognised.
+        """
+        if model_format not in DiscreteMassFunctionsFromSensorsGenerator.ModelFormat:
+            raise ValueError(
+                "model_format: " + str(model_format) + "\n" +
+                "The model format should be of the type ModelFormat!"
+            )
+        
+        # ***********
+        # XML FORMAT:
+        # ***********
+        if model_format == DiscreteMassFunctionsFromSensorsGenerator.ModelFormat.XML:
+            option_names = {
+                DiscreteSensorModelOption.Option.variation: "variation",
+                DiscreteSensorModelOption.Option.temporisation_fusion: "tempo-fusion",
+                DiscreteSensorModelOption.Option.temporisation_specificity: "tempo-specificity",
+            }
+            f = open(path, "w")
+            writer = xmlwriter.XMLWriter(f)
+            with writer.node("belief-from-sensors"):
+                with writer.node("frame", {"name":self.frame_name}):
+                    for ref in self.ref_list:
+                        writer.leaf("state", text=str(ref))
+
+                with writer.node("sensor-beliefs"):
+                    for sensor_type, model in self.sensor_models.items():
+                        with writer.node("sensor-belief", {"name":sensor_type}):
+                            #Options:
+                            if len(model.options) > 0:
+                                with writer.node("options"):
+                                    for o in model.options:
+                                        writer.leaf("option", {"name":option_names[o.option_type]}, str(o.parameter))
+
+                            #Points (grouped by key measurement, one model at a time):
+                            points = {}
+                            for focal in model.focals:
+                                s = focal.element.formatted_str(*self.ref_list)[1:-1].replace(" u ", " ")
+                                for point in focal.points:
+                                    if point[0] not in points:
+                                        points[point[0]] = []
+                                    points[point[0]].append((s, point[1]))
+
+                            for value, masses in points.items():
+                                with writer.node("point"):
+                                    writer.leaf("value", text=str(value))
+                                    for mass in masses:
+                                        writer.leaf("mass", {"set":mass[0]}, str(mass[1]))
+
+                with writer.node("sensors"):
+                    for sensor_name, model_data in self.current_sensors.items():
+                        writer.leaf("sensor", {"name":sensor_name, "belief":model_data.model.sensor_type})
+            writer.close()
+            f.close()
+
+        # *****************
+        # CUSTOM DIRECTORY:
+        # *****************
+        elif model_format == DiscreteMassFunctionsFromSensorsGenerator.ModelFormat.custom_directory:
+            real_path = os.path.join(path, self.frame_name)
             #Suppress the existing directory:
             if os.path.exists(real_path):
                 shutil.rmtree(real_path)
@@ -1024,19 +2659,82 @@ class DiscreteMassFunctionsFromSensorsGenerator:
             ValueError: If the requested model is not found or if the provided
             sensor is already registered.
         """
-        if sensor_name in self.current_sensors:
-            raise ValueError(
-                "sensor_name: " + str(sensor_name) + "\n" +
-                "A sensor is already registered under this name!"
-            )
+        with self.__writer_lock:
+            if sensor_name in self.current_sensors:
+                raise ValueError(
+                    "sensor_name: " + str(sensor_name) + "\n" +
+                    "A sensor is already registered under this name!"
+                )
 
-        if model_name not in self.sensor_models:
-            raise ValueError(
-                "model_name: " + str(sensor_name) + "\n" +
-                "There is no model with this name!"
-            )
+            if model_name not in self.sensor_models:
+                raise ValueError(
+                    "model_name: " + str(sensor_name) + "\n" +
+                    "There is no model with this name!"
+                )
 
-        self.current_sensors[sensor_name] = self.sensor_models[model_name]
+            self.current_sensors[sensor_name] = self.__new_sensor_data(sensor_name, self.sensor_models[model_name])
+            self.__mark_modified(sensor_name)
+
+    def __get_sensor_lock(self, sensor_name):
+        """
+        Gets the lock of a sensor in thread-safe mode (a context doing nothing otherwise, or if
+        the sensor is not registered). A lock is only created for a registered sensor and is
+        removed with it, both under the writer lock, so that there are never more locks than
+        sensors.
+        """
+        if not self.thread_safe:
+            return DiscreteMassFunctionsFromSensorsGenerator.NO_LOCK
+        lock = self.__sensor_locks.get(sensor_name)
+        if lock == None:
+            with self.__writer_lock:
+                if sensor_name not in self.current_sensors:
+                    return DiscreteMassFunctionsFromSensorsGenerator.NO_LOCK
+                lock = self.__sensor_locks.setdefault(sensor_name, threading.Lock())
+        return lock
+
+    @contextlib.contextmanager
+    def __locked_sensor(self, sensor_name):
+        """
+        Gets the data of a sensor for the duration of a ``with`` block, during which the sensor
+        is locked in thread-safe mode (None if the sensor is not registered).
+        """
+        if not self.thread_safe:
+            yield self.current_sensors.get(sensor_name)
+            return
+        while True:
+            lock = self.__get_sensor_lock(sensor_name)
+            if lock is DiscreteMassFunctionsFromSensorsGenerator.NO_LOCK:
+                yield None
+                return
+            with lock:
+                #The sensor might have been removed (and added again) while waiting for the lock:
+                if self.__sensor_locks.get(sensor_name) is lock:
+                    yield self.current_sensors.get(sensor_name)
+                    return
+
+    def __mark_modified(self, *sensor_names):
+        """
+        Marks sensors as modified since the previous snapshot (see ``snapshot()``).
+        """
+        with self.__modified_lock if self.thread_safe else DiscreteMassFunctionsFromSensorsGenerator.NO_LOCK:
+            self.__modified_sensors.update(sensor_names)
+
+    def __take_modified(self):
+        """
+        Gets the sensors modified since the previous snapshot and starts a new set of them.
+        A sensor marked while a snapshot is written is thus kept for the next one.
+        """
+        with self.__modified_lock if self.thread_safe else DiscreteMassFunctionsFromSensorsGenerator.NO_LOCK:
+            modified, self.__modified_sensors = self.__modified_sensors, set()
+        return modified
+
+    def __new_sensor_data(self, sensor_name, model):
+        """
+        Associates a model to a sensor with the kind of data storage used by the generator.
+        """
+        if self.compact_state:
+            return CompactSensorModelData(sensor_name, model)
+        return DiscreteSensorModelData(sensor_name, model)
     
     ################################################################################
 
@@ -1047,8 +2745,26 @@ class DiscreteMassFunctionsFromSensorsGenerator:
         Args:
             sensor_name (str): The name of the sensors to unregister.
         """
-        if sensor_name in self.current_sensors:
-            del self.current_sensors[sensor_name]
+        with self.__writer_lock:
+            if sensor_name in self.current_sensors:
+                with self.__get_sensor_lock(sensor_name):
+                    self.current_sensors.pop(sensor_name).release()
+                    self.__sensor_locks.pop(sensor_name, None)
+                self.__mark_modified(sensor_name)
+            if self.fusion != None:
+                self.fusion.remove(sensor_name)
+
+    ################################################################################
+
+    def remove_sensors(self, *sensor_names):
+        """
+        Unregisters several sensors at once (see ``remove_sensor()``).
+
+        Args:
+            sensor_names (*str): The names of the sensors to unregister.
+        """
+        for sensor_name in sensor_names:
+            self.remove_sensor(sensor_name)
         
     ################################################################################
 
@@ -1062,13 +2778,39 @@ class DiscreteMassFunctionsFromSensorsGenerator:
                  should be reset.
         """
         if sensor_name == None:
-            for name, model in self.current_sensors.items():
-                model.reset_options()
+            for name in list(self.current_sensors):
+                with self.__locked_sensor(name) as data:
+                    if data != None:
+                        data.reset_options()
+            self.__mark_modified(*self.current_sensors)
         elif sensor_name in self.current_sensors:
-            self.current_sensors[sensor_name].reset_options()
+            with self.__locked_sensor(sensor_name) as data:
+                if data != None:
+                    data.reset_options()
+            self.__mark_modified(sensor_name)
         
     ################################################################################
 
+    def get_model_names(self):
+        """
+        Gets the names of the models currently loaded.
+
+        Returns:
+            list[str] -- The sorted names of the models.
+        """
+        return sorted(self.sensor_models)
+
+    def get_sensor_names(self):
+        """
+        Gets the names of the sensors currently registered.
+
+        Returns:
+            set[str] -- The names of the sensors.
+        """
+        return set(self.current_sensors)
+
+    ################################################################################
+
     def is_valid(self):
         """
         Checks if all the models are valid.
@@ -1098,9 +2840,534 @@ class DiscreteMassFunctionsFromSensorsGenerator:
         results = {}
         for measurement in sensor_measurements:
             if measurement[0] in self.current_sensors:
-                results[measurement[0]] = self.current_sensors[measurement[0]].get_evidence(measurement[1])
+                #Looked up under the lock: it might have been replaced while waiting for it.
+                with self.__locked_sensor(measurement[0]) as data:
+                    results[measurement[0]] = data.get_evidence(measurement[1]) if data != None else None
+                    if data != None and self.fusion != None:
+                        self.fusion.update(measurement[0], results[measurement[0]])
+                self.__mark_modified(measurement[0])
+            else:
+                results[measurement[0]] = None
+        return results
+
+    ################################################################################
+
+    def enable_fusion(self, combination_rule=massfunction.MassFunction.Combination.Dempster):
+        """
+        Starts keeping the last evidence of each sensor and their fusion. Each call to
+        ``get_evidence()`` then updates the fusion incrementally (see IncrementalFusion).
+
+        Args:
+            combination_rule (MassFunction.Combination): The combination rule to use.
+        Raises:
+            ValueError: If the combination rule is not recognised.
+        """
+        self.fusion = IncrementalFusion(combination_rule)
+
+    ################################################################################
+
+    def disable_fusion(self):
+        """
+        Stops keeping the last evidence of each sensor and their fusion.
+        """
+        self.fusion = None
+
+    ################################################################################
+
+    def get_fused_evidence(self, *sensor_measurements):
+        """
+        Gets the evidence from the given sensor measurements (if any) and returns the fusion
+        of the last evidence of all the sensors, including those that did not change.
+
+        Args:
+            sensor_measurements (*tuple(str, float)): The sensor measurements in the
+                form of tuples (sensor_name, measurement).
+        Returns:
+            ImmutableMassFunction -- The fused evidence, None if no sensor provided evidence yet.
+        Raises:
+            MissingInformationError: If the fusion is not enabled.
+        """
+        if self.fusion == None:
+            raise MissingInformationError("The fusion should be enabled first with enable_fusion()!")
+        self.get_evidence(*sensor_measurements)
+        return self.fusion.get_evidence()
+
+
+
+################################################################################
+################################################################################
+################################################################################
+
+class ModelWatcher:
+    """
+    Watches the source files of a model (modification times and sizes) and reloads it in
+    a generator with ``reload_model()`` when they change. The files can be checked manually
+    with ``check()`` or periodically by a background thread with ``start()``.
+
+    Attributes:
+        self.generator (DiscreteMassFunctionsFromSensorsGenerator): The generator to update.
+        self.path (str): The path to the XML file or the custom directory of the model.
+        self.model_format (ModelFormat): The format of the model.
+        self.interval (float): The time in seconds between two checks in the background.
+        self.use_compiled (bool): If the model is reloaded through its compiled version.
+        self.last_summary (dict): The summary of the last reload, None if none happened.
+        self.last_error (Exception): The error raised by the last reload attempt, None if it succeeded.
+    """
+
+    def __init__(self, generator, path, model_format, interval=1.0, use_compiled=False):
+        """
+        Builds a watcher, considering the current files as already loaded.
+
+        Args:
+            generator (DiscreteMassFunctionsFromSensorsGenerator): The generator to update.
+            path (str): The path to the XML file or the custom directory of the model.
+            model_format (ModelFormat): The format of the model.
+            interval (float): The time in seconds between two checks in the background.
+            use_compiled (bool): If the model should be reloaded through its compiled version.
+        """
+        self.generator = generator
+        self.path = path
+        self.model_format = model_format
+        self.interval = interval
+        self.use_compiled = use_compiled
+        self.last_summary = None
+        self.last_error = None
+        self.__stamp = DiscreteMassFunctionsFromSensorsGenerator.get_model_stamps(path)[0]
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    def check(self):
+        """
+        Reloads the model if its files changed since the last check.
+
+        Returns:
+            dict{str:list[str]} -- The summary of the reload (see ``reload_model()``), None if
+            nothing changed.
+        Raises:
+            The same errors as ``load_model()`` if the new model is invalid. It will be tried
+            again at the next check only if the files change again.
+        """
+        stamp = DiscreteMassFunctionsFromSensorsGenerator.get_model_stamps(self.path)[0]
+        if stamp == self.__stamp:
+            return None
+        self.__stamp = stamp
+        self.last_summary = self.generator.reload_model(self.path, self.model_format, self.use_compiled)
+        return self.last_summary
+
+    def start(self):
+        """
+        Starts checking the files periodically in a background (daemon) thread.
+        Errors are stored in self.last_error instead of being raised.
+        """
+        def run():
+            while not self.__stop.wait(self.interval):
+                try:
+                    self.check()
+                    self.last_error = None
+                except Exception as e:
+                    self.last_error = e
+
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=run, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Stops the background thread (if started).
+        """
+        self.__stop.set()
+        if self.__thread != None:
+            self.__thread.join()
+            self.__thread = None
+
+
+################################################################################
+################################################################################
+################################################################################
+
+def _shard_worker(connection, frame_name):
+    """
+    Main loop of a worker process of ShardedDiscreteMassFunctionsFromSensorsGenerator.
+    It owns a DiscreteMassFunctionsFromSensorsGenerator (thus the temporal state of its
+    sensors) and executes the requests it receives as tuples (method_name, args).
+    Each request is answered with a tuple (True, result) or (False, exception).
+
+    Args:
+        connection (multiprocessing.Connection): The connection to the front-end.
+        frame_name (str): The name of the frame of discernment.
+    """
+    generator = DiscreteMassFunctionsFromSensorsGenerator(frame_name)
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            break
+        if request == None:
+            break
+        try:
+            connection.send((True, getattr(generator, request[0])(*request[1])))
+        except Exception as e:
+            connection.send((False, e))
+    connection.close()
+
+
+class ShardedDiscreteMassFunctionsFromSensorsGenerator:
+    """
+    A front-end to DiscreteMassFunctionsFromSensorsGenerator that spreads the sensors
+    over several worker processes. Each sensor is always handled by the same worker
+    (chosen from a hash of its name), which owns its temporal state (options).
+    Measurements are routed to the workers in batches (one message per worker per call
+    to ``get_evidence()``) and the workers compute their evidence in parallel.
+
+    It should be closed with ``close()`` (or used as a context manager) to stop the workers.
+
+    Attributes:
+        self.frame_name (str): The name of the frame of discernment.
+        self.nb_shards (int): The number of worker processes.
+        self.sensor_models (list[str]): The names of the models currently loaded.
+        self.current_sensors (dict{sensor_name:int}): The sensors currently registered
+            with the index of the worker handling them.
+    """
+
+    def __init__(self, frame_name="", nb_shards=None):
+        """
+        Starts the worker processes.
+
+        Args:
+            frame_name (str): The name of the frame of discernment.
+            nb_shards (int): The number of worker processes, the number of CPUs by default.
+        Raises:
+            ValueError: If the number of shards is not strictly positive.
+        """
+        if nb_shards == None:
+            nb_shards = multiprocessing.cpu_count()
+        if nb_shards < 1:
+            raise ValueError(
+                "nb_shards: " + str(nb_shards) + "\n" +
+                "There should be at least one shard!"
+            )
+        self.frame_name = frame_name
+        self.nb_shards = nb_shards
+        self.sensor_models = []
+        self.current_sensors = {}
+        self.__connections = []
+        self.__processes = []
+        for i in range(nb_shards):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_shard_worker, args=(child, frame_name), daemon=True)
+            process.start()
+            child.close()
+            self.__connections.append(parent)
+            self.__processes.append(process)
+
+    ################################################################################
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    ################################################################################
+
+    def close(self):
+        """
+        Stops the worker processes. The generator cannot be used afterwards.
+        """
+        for connection in self.__connections:
+            try:
+                connection.send(None)
+                connection.close()
+            except (OSError, ValueError):
+                pass
+        for process in self.__processes:
+            process.join()
+        self.__connections = []
+        self.__processes = []
+
+    ################################################################################
+
+    def get_shard(self, sensor_name):
+        """
+        Gets the index of the worker handling the given sensor. It uses a stable hash
+        so that a sensor is always handled by the same worker.
+
+        Args:
+            sensor_name (str): The name of the sensor.
+        Returns:
+            int -- The index of the worker.
+        """
+        return zlib.crc32(str(sensor_name).encode("utf-8")) % self.nb_shards
+
+    ################################################################################
+
+    def __broadcast(self, requests):
+        """
+        Sends requests to several workers at once and gathers their answers.
+
+        Args:
+            requests (dict{shard:tuple(method_name, args)}): The requests to send.
+        Returns:
+            dict{shard:object} -- The results of the requests.
+        Raises:
+            Any exception raised by a worker (after all the answers were received).
+        """
+        for shard, request in requests.items():
+            self.__connections[shard].send(request)
+        results = {}
+        error = None
+        for shard in requests:
+            success, result = self.__connections[shard].recv()
+            if success:
+                results[shard] = result
+            elif error == None:
+                error = result
+        if error != None:
+            raise error
+        return results
+
+    ################################################################################
+
+    def load_model(self, path, model_format):
+        """
+        Loads a model in all the workers. See DiscreteMassFunctionsFromSensorsGenerator.load_model().
+
+        Args:
+            path (str): Either the complete path to the XML file, OR the path
+                to the directory containing the model.
+            model_format (DiscreteMassFunctionsFromSensorsGenerator.ModelFormat): The format of the model to load.
+        """
+        request = ("load_model", (path, model_format))
+        self.__broadcast(dict((shard, request) for shard in range(self.nb_shards)))
+        self.sensor_models = self.__broadcast({0: ("get_model_names", ())})[0]
+        #The sensors declared in the model are registered by all the workers,
+        #only the worker responsible for them keeps them:
+        request = ("get_sensor_names", ())
+        registered = self.__broadcast(dict((shard, request) for shard in range(self.nb_shards)))
+        self.current_sensors = {}
+        removed = {}
+        for shard, sensor_names in registered.items():
+            for sensor_name in sensor_names:
+                if self.get_shard(sensor_name) == shard:
+                    self.current_sensors[sensor_name] = shard
+                else:
+                    removed.setdefault(shard, []).append(sensor_name)
+        #One request per worker for all the sensors it does not keep:
+        self.__broadcast(dict((shard, ("remove_sensors", tuple(names))) for shard, names in removed.items()))
+
+    ################################################################################
+
+    def add_sensor(self, model_name, sensor_name):
+        """
+        Registers a sensors and associate it with a model.
+
+        Args:
+            model_name (str): The name of the model to which the sensor should be
+                associated.
+            sensor_name (str): The name of the sensor to register.
+        Raises:
+            ValueError: If the requested model is not found or if the provided
+            sensor is already registered.
+        """
+        shard = self.get_shard(sensor_name)
+        self.__broadcast({shard: ("add_sensor", (model_name, sensor_name))})
+        self.current_sensors[sensor_name] = shard
+
+    ################################################################################
+
+    def remove_sensor(self, sensor_name):
+        """
+        Unregisters a sensor.
+
+        Args:
+            sensor_name (str): The name of the sensors to unregister.
+        """
+        if sensor_name in self.current_sensors:
+            shard = self.current_sensors.pop(sensor_name)
+            self.__broadcast({shard: ("remove_sensor", (sensor_name,))})
+
+    ################################################################################
+
+    def reset_model(self, sensor_name=None):
+        """
+        Resets the sensor model data for the provided sensor. If set to None, then
+        it does it for all the models.
+
+        Args:
+            sensor_name (str): The name of the sensor for which the model data
+                should be reset.
+        """
+        if sensor_name == None:
+            request = ("reset_model", ())
+            self.__broadcast(dict((shard, request) for shard in range(self.nb_shards)))
+        elif sensor_name in self.current_sensors:
+            self.__broadcast({self.current_sensors[sensor_name]: ("reset_model", (sensor_name,))})
+
+    ################################################################################
+
+    def get_evidence(self, *sensor_measurements):
+        """
+        Gets the evidence from the given sensor measurements and the current models.
+        The measurements are sent in one batch per worker and processed in parallel.
+
+        Args:
+            sensor_measurements (*tuple(str, float)): The sensor measurements in the
+                form of tuples (sensor_name, measurement).
+        Returns:
+            dict{sensor_name:MassFunction} -- A dictionary with the name of sensors
+            as keys (in the order of the measurements) and the resulting mass functions
+            as values. The mass function is None if the sensor wasn't registered.
+        """
+        batches = {}
+        for measurement in sensor_measurements:
+            if measurement[0] in self.current_sensors:
+                batches.setdefault(self.current_sensors[measurement[0]], []).append(measurement)
+        answers = self.__broadcast(dict(
+            (shard, ("get_evidence", tuple(batch))) for shard, batch in batches.items()
+        ))
+        results = {}
+        for measurement in sensor_measurements:
+            if measurement[0] in self.current_sensors:
+                results[measurement[0]] = answers[self.current_sensors[measurement[0]]][measurement[0]]
             else:
                 results[measurement[0]] = None
         return results
 
 
+################################################################################
+################################################################################
+################################################################################
+
+class AsyncSensorEvidenceStream:
+    """
+    An asyncio front-end to DiscreteMassFunctionsFromSensorsGenerator. It consumes an
+    asynchronous iterator of sensor readings (sensor_name, value, timestamp) and is itself
+    an asynchronous iterator of tuples (timestamp, evidence), one per tick:
+
+        async for timestamp, evidence in AsyncSensorEvidenceStream(generator, readings, tick=0.5):
+            ...
+
+    How it works:
+        - The readings are pulled from the source into a bounded queue. When the queue is
+          full, the source is not pulled anymore until the processing catches up (backpressure).
+        - A tick gathers the readings waiting in the queue whose timestamps are within ``tick``
+          seconds of the first one. Several readings of the same sensor in a tick are coalesced:
+          only the last one is kept. Thus, the busier the stream, the more readings are coalesced.
+        - The evidence of a tick is computed in an executor (the default one of the event loop
+          if None is given), so the event loop is never blocked. Ticks are computed one at a
+          time, in order, so the generator does not need to be thread-safe.
+        - The evidence is a dict{sensor_name:MassFunction} (see ``get_evidence()``), or the
+          fusion of the last evidence of all the sensors if ``fused`` (see ``get_fused_evidence()``).
+    The timestamp of a tick is the one of its last reading. Remark: The timestamps are only used
+    to build the ticks, the temporisation options still use the time of processing.
+
+    Attributes:
+        self.generator (DiscreteMassFunctionsFromSensorsGenerator): The generator to feed.
+        self.tick (float): The maximum time span of the readings of a tick (0 to only coalesce
+            readings with the same timestamp).
+        self.fused (bool): If the fused evidence is produced instead of the evidence of each sensor.
+        self.nb_readings (int): The number of readings received so far.
+        self.nb_coalesced (int): The number of readings dropped because of coalescing.
+        self.nb_ticks (int): The number of ticks produced so far.
+    """
+
+    def __init__(self, generator, source, tick=0.0, max_queue_size=1024, fused=False,
+                 combination_rule=massfunction.MassFunction.Combination.Dempster, executor=None):
+        """
+        Builds the stream, nothing is read before the iteration starts.
+
+        Args:
+            generator (DiscreteMassFunctionsFromSensorsGenerator): The generator to feed.
+            source (async iterable): The readings as tuples (sensor_name, value, timestamp).
+            tick (float): The maximum time span of the readings of a tick.
+            max_queue_size (int): The maximum number of readings waiting to be processed.
+            fused (bool): If the fused evidence should be produced (the fusion of the generator
+                is enabled with the given combination rule if it was not already).
+            combination_rule (MassFunction.Combination): The combination rule for the fusion.
+            executor (concurrent.futures.Executor): The executor computing the evidence.
+        Raises:
+            ValueError: If tick is negative or max_queue_size is not strictly positive.
+        """
+        if tick < 0:
+            raise ValueError(
+                "tick: " + str(tick) + "\n" +
+                "The tick cannot be negative!"
+            )
+        if max_queue_size < 1:
+            raise ValueError(
+                "max_queue_size: " + str(max_queue_size) + "\n" +
+                "The queue should be able to contain at least one reading!"
+            )
+        self.generator = generator
+        self.source = source
+        self.tick = tick
+        self.max_queue_size = max_queue_size
+        self.fused = fused
+        self.executor = executor
+        if fused and generator.fusion == None:
+            generator.enable_fusion(combination_rule)
+        self.nb_readings = 0
+        self.nb_coalesced = 0
+        self.nb_ticks = 0
+
+    def __aiter__(self):
+        return self.__iterate()
+
+    async def __iterate(self):
+        """
+        The asynchronous generator of ticks.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.max_queue_size)
+        end = object()
+
+        async def pull():
+            try:
+                async for reading in self.source:
+                    await queue.put(reading)
+                await queue.put((end, None))
+            except Exception as e:
+                await queue.put((end, e))
+
+        reader = asyncio.ensure_future(pull())
+        try:
+            pending = None
+            while True:
+                #Build a tick:
+                reading = pending if pending != None else await queue.get()
+                pending = None
+                if reading[0] is end:
+                    if reading[1] != None:
+                        raise reading[1]
+                    break
+                start = reading[2]
+                readings = OrderedDict()
+                while True:
+                    self.nb_readings += 1
+                    if reading[0] in readings:
+                        self.nb_coalesced += 1
+                        del readings[reading[0]]
+                    readings[reading[0]] = reading
+                    if queue.empty():
+                        break
+                    reading = queue.get_nowait()
+                    if reading[0] is end or reading[2] - start > self.tick:
+                        pending = reading
+                        break
+
+                #Compute its evidence:
+                measurements = [(r[0], r[1]) for r in readings.values()]
+                if self.fused:
+                    evidence = await loop.run_in_executor(self.executor, self.__get_fused_evidence, measurements)
+                else:
+                    evidence = await loop.run_in_executor(self.executor, self.__get_evidence, measurements)
+                self.nb_ticks += 1
+                yield next(reversed(readings.values()))[2], evidence
+        finally:
+            reader.cancel()
+
+    def __get_evidence(self, measurements):
+        return self.generator.get_evidence(*measurements)
+
+    def __get_fused_evidence(self, measurements):
+        return self.generator.get_fused_evidence(*measurements)
@@ -0,0 +1,583 @@
+################################################################################
+# thegame.construction.fromsensorstraining.py                                  #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module contains the classes to fit the sensor models used by the mass   #
+# functions from sensors generator (see thegame.construction.fromsensors) from #
+# labelled measurement logs, in a single pass and with a bounded memory.       #
+# ---------------------------------------------------------------------------- #
+# Main classes:                                                                #
+#   - StreamingHistogram: A mergeable streaming histogram used as a quantile   #
+#     and density sketch.                                                      #
+#   - DiscreteSensorModelTrainer: Fits sensor models from labelled logs.       #
+################################################################################
+
+import thegame.element as element
+import thegame.construction.fromsensors as fromsensors
+
+from array import array
+
+import multiprocessing
+import bisect
+import heapq
+import zlib
+import csv
+
+################################################################################
+################################################################################
+################################################################################
+
+class StreamingHistogram:
+    """
+    A streaming histogram (Ben-Haim & Tom-Tov, A Streaming Parallel Decision Tree
+    Algorithm, 2010): the values are summarised by at most max_bins bins (centroid,
+    count), the two closest bins being merged when there are too many. The memory is
+    thus bounded whatever the number of values, and two histograms can be merged,
+    which allows to build them in parallel.
+
+    The values are buffered and inserted in batches, identical values being counted
+    only once, which makes discrete sensors (contacts, integer lux, etc.) very cheap.
+
+    The cumulative distribution is approximated by a piecewise linear function going
+    through (min, 0), the middle of each bin and (max, total).
+
+    Attributes:
+        self.max_bins (int): The maximum number of bins.
+        self.centroids (array[float]): The centroids of the bins, sorted.
+        self.counts (array[float]): The number of values in each bin.
+        self.minimum (float): The smallest value seen (None if empty).
+        self.maximum (float): The biggest value seen (None if empty).
+    """
+
+    def __init__(self, max_bins=256):
+        """
+        Builds an empty histogram.
+
+        Args:
+            max_bins (int): The maximum number of bins.
+        Raises:
+            ValueError: If max_bins is smaller than 2.
+        """
+        if max_bins < 2:
+            raise ValueError(
+                "max_bins: " + str(max_bins) + "\n" +
+                "A histogram needs at least 2 bins!"
+            )
+        self.max_bins = max_bins
+        self.centroids = array('d')
+        self.counts = array('d')
+        self.minimum = None
+        self.maximum = None
+        self.__buffer = []
+
+    def update(self, value):
+        """
+        Adds a value to the histogram.
+
+        Args:
+            value (float): The value to add.
+        """
+        self.__buffer.append(value)
+        if len(self.__buffer) >= 16 * self.max_bins:
+            self.__flush()
+
+    def update_many(self, values):
+        """
+        Adds values to the histogram.
+
+        Args:
+            values (iterable[float]): The values to add.
+        """
+        for value in values:
+            self.update(value)
+
+    def merge(self, histogram):
+        """
+        Merges another histogram into this one (the other one is left unchanged).
+
+        Args:
+            histogram (StreamingHistogram): The histogram to merge.
+        """
+        histogram.__flush()
+        self.__flush(list(zip(histogram.centroids, histogram.counts)))
+        if histogram.minimum != None:
+            self.minimum = histogram.minimum if self.minimum == None else min(self.minimum, histogram.minimum)
+            self.maximum = histogram.maximum if self.maximum == None else max(self.maximum, histogram.maximum)
+
+    def total(self):
+        """
+        Gets the number of values added to the histogram.
+
+        Returns:
+            float -- The number of values.
+        """
+        self.__flush()
+        return sum(self.counts)
+
+    def cdf(self, value):
+        """
+        Gets the approximated number of values smaller than or equal to the given one.
+
+        Args:
+            value (float): The value.
+        Returns:
+            float -- The approximated number of values <= value.
+        """
+        xs, ys = self.__get_cdf_points()
+        if len(xs) == 0 or value < xs[0]:
+            return 0.0
+        if value >= xs[-1]:
+            return ys[-1]
+        i = bisect.bisect_right(xs, value)
+        return ys[i-1] + (ys[i] - ys[i-1]) * (value - xs[i-1]) / (xs[i] - xs[i-1])
+
+    def quantile(self, q):
+        """
+        Gets the approximated q-quantile of the values.
+
+        Args:
+            q (float): The requested quantile, between 0 and 1.
+        Returns:
+            float -- The approximated quantile (None if the histogram is empty).
+        Raises:
+            ValueError: If q is not between 0 and 1.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError(
+                "q: " + str(q) + "\n" +
+                "A quantile should be between 0 and 1!"
+            )
+        xs, ys = self.__get_cdf_points()
+        if len(xs) == 0:
+            return None
+        target = q * ys[-1]
+        i = bisect.bisect_left(ys, target)
+        if i == 0:
+            return xs[0]
+        if ys[i] == ys[i-1]:
+            return xs[i]
+        return xs[i-1] + (xs[i] - xs[i-1]) * (target - ys[i-1]) / (ys[i] - ys[i-1])
+
+    def __get_cdf_points(self):
+        """
+        Gets the points of the piecewise linear approximation of the cumulative distribution.
+
+        Returns:
+            tuple(list[float], list[float]) -- The values and the cumulative counts.
+        """
+        self.__flush()
+        if self.minimum == None:
+            return [], []
+        xs = [self.minimum]
+        ys = [0.0]
+        cumulated = 0.0
+        for centroid, count in zip(self.centroids, self.counts):
+            if centroid > xs[-1]:
+                xs.append(centroid)
+                ys.append(cumulated + count / 2)
+            cumulated += count
+        if self.maximum > xs[-1]:
+            xs.append(self.maximum)
+            ys.append(cumulated)
+        else:
+            ys[-1] = cumulated
+        return xs, ys
+
+    def __flush(self, bins=None):
+        """
+        Inserts the buffered values (and the given bins) into the histogram, then merges
+        the closest bins until there are at most max_bins bins.
+
+        Args:
+            bins (list[tuple(float, float)]): Additional bins (centroid, count) to insert.
+        """
+        if len(self.__buffer) == 0 and not bins:
+            return
+        counter = {}
+        for value in self.__buffer:
+            counter[value] = counter.get(value, 0) + 1
+        if len(self.__buffer) > 0:
+            smallest = min(counter)
+            biggest = max(counter)
+            self.minimum = smallest if self.minimum == None else min(self.minimum, smallest)
+            self.maximum = biggest if self.maximum == None else max(self.maximum, biggest)
+        self.__buffer = []
+        for centroid, count in zip(self.centroids, self.counts):
+            counter[centroid] = counter.get(centroid, 0) + count
+        for centroid, count in (bins or []):
+            counter[centroid] = counter.get(centroid, 0) + count
+
+        values = sorted(counter)
+        counts = [counter[v] for v in values]
+        n = len(values)
+        if n > self.max_bins:
+            #Merge the closest neighbours with a heap of gaps (lazily invalidated):
+            nexts = list(range(1, n + 1))
+            prevs = list(range(-1, n - 1))
+            versions = [0] * n
+            heap = [(values[i+1] - values[i], i, 0, i + 1, 0) for i in range(n - 1)]
+            heapq.heapify(heap)
+            alive = n
+            while alive > self.max_bins:
+                gap, i, version_i, j, version_j = heapq.heappop(heap)
+                if counts[i] == 0 or counts[j] == 0 or versions[i] != version_i or versions[j] != version_j:
+                    continue
+                total = counts[i] + counts[j]
+                values[i] = (values[i] * counts[i] + values[j] * counts[j]) / total
+                counts[i] = total
+                counts[j] = 0
+                versions[i] += 1
+                nexts[i] = nexts[j]
+                if nexts[j] < n:
+                    prevs[nexts[j]] = i
+                    heapq.heappush(heap, (values[nexts[j]] - values[i], i, versions[i], nexts[j], versions[nexts[j]]))
+                if prevs[i] >= 0:
+                    heapq.heappush(heap, (values[i] - values[prevs[i]], prevs[i], versions[prevs[i]], i, versions[i]))
+                alive -= 1
+            kept = [i for i in range(n) if counts[i] > 0]
+            values = [values[i] for i in kept]
+            counts = [counts[i] for i in kept]
+        self.centroids = array('d', values)
+        self.counts = array('d', counts)
+
+    def __getstate__(self):
+        """
+        Flushes the buffer before pickling (e.g. to send the histogram to another process).
+        """
+        self.__flush()
+        return self.__dict__
+
+
+################################################################################
+################################################################################
+################################################################################
+
+def _read_log(path, delimiter=","):
+    """
+    Reads the labelled measurements of a CSV log (see
+    ``DiscreteSensorModelTrainer.update_from_log()``).
+
+    Args:
+        path (str): The path to the log.
+        delimiter (str): The delimiter of the columns.
+    Returns:
+        generator -- The rows (sensor_type, measurement, label).
+    Raises:
+        fromsensors.InvalidBeliefsFromSensorsModelError: If a row is not formatted as
+        expected.
+    """
+    with open(path, newline="") as f:
+        for number, row in enumerate(csv.reader(f, delimiter=delimiter), 1):
+            if len(row) == 0 or row[0].startswith("#"):
+                continue
+            try:
+                yield row[0], float(row[1]), row[2]
+            except (IndexError, ValueError):
+                raise fromsensors.InvalidBeliefsFromSensorsModelError(
+                    "File: " + str(path) + ", line " + str(number) + "\n" +
+                    "A row should be in the form 'sensor_type" + delimiter +
+                    "measurement" + delimiter + "label'!"
+                )
+
+
+def _fit_rows(settings, rows, results):
+    """
+    Main loop of a worker process of ``DiscreteSensorModelTrainer.update_from_logs()``:
+    fits a trainer on the batches of rows it receives until it receives None, then
+    sends the trainer back.
+
+    Args:
+        settings (tuple): The arguments to build the trainer.
+        rows (multiprocessing.Queue): The batches of rows (sensor_type, measurement, label).
+        results (multiprocessing.Queue): The queue in which to put the fitted trainer.
+    """
+    trainer = DiscreteSensorModelTrainer(*settings)
+    while True:
+        batch = rows.get()
+        if batch == None:
+            break
+        trainer.update_many(batch)
+    results.put(trainer)
+
+
+class DiscreteSensorModelTrainer:
+    """
+    Fits sensor models (``fromsensors.DiscreteSensorModel``) from labelled sensor
+    measurements, i.e. rows (sensor_type, measurement, label) where the label is the
+    set of states (space-separated, as in XML models) known to be true when the
+    measurement was taken.
+
+    The rows are summarised on the fly by one ``StreamingHistogram`` per sensor type
+    and label, thus the memory stays bounded whatever the size of the logs and a
+    single pass is enough. Trainers fitted on different parts of the logs can be merged,
+    which is used to parallelise the fitting over the sensor types.
+
+    The models are then built as follows for each sensor type:
+        - nb_breakpoints key measurements are taken at evenly spaced quantiles of the
+          measurements of all labels (duplicates removed). All the focal elements
+          share the same key measurements, thus the interpolated masses always sum to 1.
+        - Each key measurement stands for the cell reaching the middles of the
+          neighbouring key measurements. The mass of a label is the proportion of the
+          measurements in this cell having this label (each label being weighted by
+          the inverse of its number of measurements if uniform_priors is set).
+        - A proportion discount of each mass is transferred to the complete set to
+          account for the imperfection of the training data. If no measurement falls
+          in a cell, all the mass is given to the complete set.
+
+    Attributes:
+        self.nb_breakpoints (int): The number of key measurements per focal element.
+        self.max_bins (int): The number of bins of the histograms.
+        self.discount (float): The proportion of mass transferred to the complete set.
+        self.uniform_priors (bool): If all the labels should weigh the same regardless
+            of their number of measurements.
+        self.histograms (dict{str: dict{tuple(str): StreamingHistogram}}): The histograms
+            per sensor type and label (a label being a sorted tuple of states).
+    """
+
+    def __init__(self, nb_breakpoints=16, max_bins=256, discount=0.0, uniform_priors=False):
+        """
+        Builds an empty trainer.
+
+        Args:
+            nb_breakpoints (int): The number of key measurements per focal element.
+            max_bins (int): The number of bins of the histograms (the bigger, the more
+                precise but the more memory is used).
+            discount (float): The proportion of mass transferred to the complete set.
+            uniform_priors (bool): If all the labels should weigh the same regardless
+                of their number of measurements.
+        Raises:
+            ValueError: If nb_breakpoints is smaller than 2, if max_bins is smaller than
+            nb_breakpoints or if discount is not between 0 and 1.
+        """
+        if nb_breakpoints < 2:
+            raise ValueError(
+                "nb_breakpoints: " + str(nb_breakpoints) + "\n" +
+                "A sensor model needs at least 2 key measurements!"
+            )
+        if max_bins < nb_breakpoints:
+            raise ValueError(
+                "max_bins: " + str(max_bins) + "\n" +
+                "The histograms cannot have less bins than the requested number of key measurements!"
+            )
+        if not 0 <= discount <= 1:
+            raise ValueError(
+                "discount: " + str(discount) + "\n" +
+                "The discount should be between 0 and 1!"
+            )
+        self.nb_breakpoints = nb_breakpoints
+        self.max_bins = max_bins
+        self.discount = discount
+        self.uniform_priors = uniform_priors
+        self.histograms = {}
+
+    def update(self, sensor_type, measurement, label):
+        """
+        Adds a labelled measurement.
+
+        Args:
+            sensor_type (str): The type of the sensor that took the measurement.
+            measurement (float): The measurement.
+            label (str or iterable[str]): The states true when the measurement was taken,
+                either space-separated in a string or in an iterable.
+        """
+        if isinstance(label, str):
+            label = label.split()
+        label = tuple(sorted(set(label)))
+        histograms = self.histograms.setdefault(sensor_type, {})
+        histogram = histograms.get(label)
+        if histogram is None:
+            histogram = histograms[label] = StreamingHistogram(self.max_bins)
+        histogram.update(measurement)
+
+    def update_many(self, rows):
+        """
+        Adds labelled measurements.
+
+        Args:
+            rows (iterable[tuple(str, float, str)]): The rows (sensor_type, measurement, label).
+        """
+        for sensor_type, measurement, label in rows:
+            self.update(sensor_type, measurement, label)
+
+    def update_from_log(self, path, delimiter=","):
+        """
+        Adds the labelled measurements of a CSV log, one row per measurement with the
+        columns sensor_type, measurement and label (extra columns are ignored). Empty
+        lines and lines starting with '#' are skipped.
+
+        Args:
+            path (str): The path to the log.
+            delimiter (str): The delimiter of the columns.
+        Raises:
+            fromsensors.InvalidBeliefsFromSensorsModelError: If a row is not formatted as
+            expected.
+        """
+        self.update_many(_read_log(path, delimiter))
+
+    def update_from_logs(self, paths, nb_processes=None, delimiter=",", batch_size=10000):
+        """
+        Adds the labelled measurements of several CSV logs (see ``update_from_log()``),
+        the sensor types being split between nb_processes worker processes.
+
+        The logs are read by the current process, which sends the rows in batches to the
+        worker handling their sensor type (chosen from a stable hash of the type). Each
+        sensor type is thus fitted by a single worker, in the order of the logs, and the
+        result is the same as without worker processes, even if all the sensor types are
+        mixed in a single log. The queues of the workers are bounded, so the reading waits
+        for the slowest worker instead of filling the memory.
+
+        Args:
+            paths (list[str]): The paths to the logs.
+            nb_processes (int): The number of worker processes (default: the number of
+                CPUs). No process is started if it is 1.
+            delimiter (str): The delimiter of the columns.
+            batch_size (int): The number of rows sent to a worker at once.
+        Raises:
+            fromsensors.InvalidBeliefsFromSensorsModelError: If a row is not formatted as
+            expected (nothing is added in this case).
+        """
+        if nb_processes == None:
+            nb_processes = multiprocessing.cpu_count()
+        if nb_processes <= 1:
+            for path in paths:
+                self.update_from_log(path, delimiter)
+            return
+
+        settings = (self.nb_breakpoints, self.max_bins, self.discount, self.uniform_priors)
+        results = multiprocessing.Queue()
+        queues = [multiprocessing.Queue(8) for _ in range(nb_processes)]
+        workers = [multiprocessing.Process(target=_fit_rows, args=(settings, queue, results), daemon=True)
+                   for queue in queues]
+        for worker in workers:
+            worker.start()
+
+        shards = {}
+        batches = [[] for _ in range(nb_processes)]
+        try:
+            for path in paths:
+                for row in _read_log(path, delimiter):
+                    shard = shards.get(row[0])
+                    if shard == None:
+                        shard = shards[row[0]] = zlib.crc32(row[0].encode("utf-8")) % nb_processes
+                    batch = batches[shard]
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        queues[shard].put(batch)
+                        batches[shard] = []
+            for shard, batch in enumerate(batches):
+                if len(batch) > 0:
+                    queues[shard].put(batch)
+        finally:
+            for queue in queues:
+                queue.put(None)
+            #The trainers are received before joining so that the workers can flush their queue:
+            trainers = [results.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+        for trainer in trainers:
+            self.merge(trainer)
+
+    def merge(self, trainer):
+        """
+        Merges the measurements summarised by another trainer into this one.
+
+        Args:
+            trainer (DiscreteSensorModelTrainer): The trainer to merge.
+        """
+        for sensor_type, histograms in trainer.histograms.items():
+            mine = self.histograms.setdefault(sensor_type, {})
+            for label, histogram in histograms.items():
+                if label not in mine:
+                    mine[label] = StreamingHistogram(self.max_bins)
+                mine[label].merge(histogram)
+
+    def get_states(self):
+        """
+        Gets all the states appearing in the labels.
+
+        Returns:
+            list[str] -- The states, sorted.
+        """
+        return sorted(set(state for histograms in self.histograms.values() for label in histograms for state in label))
+
+    def fit_model(self, sensor_type, ref_list):
+        """
+        Fits the model of the given sensor type.
+
+        Args:
+            sensor_type (str): The type of sensor.
+            ref_list (list[str]): The states of the frame of discernment.
+        Returns:
+            fromsensors.DiscreteSensorModel -- The fitted model.
+        Raises:
+            fromsensors.MissingInformationError: If there is no measurement for this sensor type.
+        """
+        if sensor_type not in self.histograms:
+            raise fromsensors.MissingInformationError("No measurement for the sensor type '" + str(sensor_type) + "'!")
+        histograms = self.histograms[sensor_type]
+        labels = sorted(histograms)
+
+        pooled = StreamingHistogram(self.max_bins)
+        for label in labels:
+            pooled.merge(histograms[label])
+        values = sorted(set(pooled.quantile(i / (self.nb_breakpoints - 1)) for i in range(self.nb_breakpoints)))
+
+        #The cells around the key measurements:
+        bounds = [(values[i] + values[i+1]) / 2 for i in range(len(values) - 1)]
+        weights = dict((label, 1 / histograms[label].total() if self.uniform_priors else 1) for label in labels)
+        cumulated = {}
+        for label in labels:
+            cdf = histograms[label].cdf
+            cumulated[label] = [0.0] + [cdf(bound) for bound in bounds] + [histograms[label].total()]
+
+        elements = dict((label, element.DiscreteElement.factory_from_ref_list(ref_list, *label)) for label in labels)
+        complete = element.DiscreteElement.get_complete_element(len(ref_list))
+        masses = dict((e, []) for e in list(elements.values()) + [complete])
+        for i in range(len(values)):
+            counts = dict((label, weights[label] * (cumulated[label][i+1] - cumulated[label][i])) for label in labels)
+            total = sum(counts.values())
+            column = dict((e, 0.0) for e in masses)
+            if total <= 0:
+                column[complete] = 1.0
+            else:
+                for label in labels:
+                    column[elements[label]] += (1 - self.discount) * counts[label] / total
+                column[complete] += self.discount
+            for e, mass in column.items():
+                masses[e].append(mass)
+
+        #The complete set is only a focal element if it is needed:
+        if complete not in elements.values() and all(mass == 0 for mass in masses[complete]):
+            del masses[complete]
+        return fromsensors.DiscreteSensorModel.factory_from_table(sensor_type, values, masses)
+
+    def build_generator(self, frame_name="", ref_list=None, sensors=None):
+        """
+        Fits the models of all the sensor types and gathers them in a generator, which
+        can then be saved with ``save_model()`` and loaded back with ``load_model()``.
+
+        Args:
+            frame_name (str): The name of the frame of discernment.
+            ref_list (list[str]): The states of the frame of discernment (default: the
+                states appearing in the labels, sorted).
+            sensors (dict{str: str}): The sensors to register, as a dictionary with the
+                sensor names as keys and the sensor types as values.
+        Returns:
+            fromsensors.DiscreteMassFunctionsFromSensorsGenerator -- The generator
+            containing the fitted models.
+        Raises:
+            ValueError: If a label contains a state missing from the given ref_list or if
+            a sensor has a type without measurements.
+        """
+        if ref_list == None:
+            ref_list = self.get_states()
+        generator = fromsensors.DiscreteMassFunctionsFromSensorsGenerator(frame_name)
+        generator.ref_list = list(ref_list)
+        for sensor_type in sorted(self.histograms):
+            generator.sensor_models[sensor_type] = self.fit_model(sensor_type, generator.ref_list)
+        for sensor_name, sensor_type in (sensors or {}).items():
+            generator.add_sensor(sensor_type, sensor_name)
+        return generator
@@ -294,6 +294,19 @@ class DuplicateElementError(MassFunctionError):
                "contains duplicates!")
 
 
+class ImmutableMassFunctionError(MassFunctionError):
+    """
+    Raised when an attempt to modify an immutable mass function is made.
+    """
+
+    def __init__(self):
+        pass
+
+    def __str__(self):
+        return ("This mass function is immutable (it is probably shared), " +
+                "use copy.deepcopy() to get a modifiable copy!")
+
+
 ################################################################################
 ################################################################################
 ################################################################################
@@ -2465,3 +2478,89 @@ class MassFunction():
 ################################################################################
 
 
+###########################
+# IMMUTABLE MASS FUNCTION #
+###########################
+
+class ImmutableMassFunction(MassFunction):
+    """
+    A mass function that cannot be modified once built. Such mass functions can be
+    shared safely (e.g. by caches) without copying them. All the methods that do not
+    modify the mass function work as usual and return regular mass functions.
+
+    Remark: ``copy.copy()`` and ``copy.deepcopy()`` provide regular (mutable) mass
+        functions.
+    """
+
+    @classmethod
+    def factory_constructor_unsafe(cls, *focal_elements):
+        """
+        Constructs an immutable mass function given a list of focal elements.
+        See ``MassFunction.factory_constructor_unsafe()`` for details.
+
+        Args:
+            *focal_elements (*Element): A list of focal elements to initialise
+                the mass function with.
+        Returns:
+            ImmutableMassFunction -- A new immutable mass function.
+        """
+        result = cls()
+        for focal in focal_elements:
+            result.focals[focal[0]] = focal[1]
+        return result
+
+    ################################################################################
+
+    @classmethod
+    def factory_from_mass_function(cls, mass_function):
+        """
+        Constructs an immutable mass function with the same focal elements as the
+        given one. The given mass function is not modified.
+
+        Args:
+            mass_function (MassFunction): The mass function to copy.
+        Returns:
+            ImmutableMassFunction -- A new immutable mass function.
+        """
+        result = cls()
+        result.focals = dict(mass_function.focals)
+        return result
+
+    ################################################################################
+
+    def _raise(self, *args):
+        """
+        Replaces all the modifying methods.
+
+        Raises:
+            ImmutableMassFunctionError: Always.
+        """
+        raise ImmutableMassFunctionError()
+
+    add_mass = _raise
+    add_mass_unsafe = _raise
+    remove_mass = _raise
+    remove_mass_unsafe = _raise
+    clean = _raise
+    normalise = _raise
+    __setitem__ = _raise
+
+    ################################################################################
+
+    def __copy__(self):
+        """
+        Overrides ``copy.copy()``, provides a regular mass function.
+        """
+        return MassFunction.factory_constructor_unsafe(*self.items())
+
+    ################################################################################
+
+    def __deepcopy__(self, memo):
+        """
+        Overrides ``copy.deepcopy()``, provides a regular mass function.
+        """
+        return MassFunction.factory_constructor_unsafe(*[(copy.deepcopy(e, memo), v) for e, v in self.items()])
+
+################################################################################
+################################################################################
+################################################################################
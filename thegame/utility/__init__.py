@@ -1,3 +1,5 @@
 __all__ = [
-    "prettyxml"
+    "instrumentation",
+    "prettyxml",
+    "xmlwriter"
 ]
@@ -0,0 +1,354 @@
+################################################################################
+# thegame.utility.instrumentation.py                                           #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module provides an opt-in instrumentation of the library: counters of  #
+# element allocations, set operations, focal products of combinations and     #
+# cache hits, and timers of the validations and of the public methods of mass  #
+# functions and generators. When it is enabled, the methods of the classes are #
+# replaced by instrumented wrappers; when it is disabled, the original methods #
+# are put back, thus it costs nothing at all when it is not used.              #
+# ---------------------------------------------------------------------------- #
+# Example:                                                                     #
+#   with instrumentation.measure() as stats:                                   #
+#       m1.combination_dempster(m2)                                            #
+#   print(stats["counters"]["combination.focal_products"])                     #
+################################################################################
+
+import thegame.element as element
+import thegame.massfunction as massfunction
+import thegame.construction.fromsensors as fromsensors
+import thegame.construction.frombeliefs as frombeliefs
+import thegame.construction.fromrandomness as fromrandomness
+
+import contextlib
+import functools
+import threading
+import time
+
+
+"""The counters: {name: count}."""
+_counters = {}
+"""The timers: {name: [number of calls, total time in nanoseconds]}."""
+_timers = {}
+"""The original methods replaced by wrappers: [(class, name, original descriptor)]."""
+_patched = []
+"""The number of open measure() scopes, and if the first one enabled the instrumentation."""
+_scopes = 0
+_scopes_enabled = False
+"""The depth of the combinations being run in each thread (only the outermost is counted)."""
+_local = threading.local()
+_lock = threading.RLock()
+
+"""The classes whose public methods are timed."""
+TIMED_CLASSES = [
+    massfunction.MassFunction,
+    fromsensors.DiscreteMassFunctionsFromSensorsGenerator,
+    frombeliefs.DiscreteMassFunctionsFromBeliefsGenerator,
+    fromrandomness.RandomDiscreteMassFunctionsGenerator,
+]
+
+"""The classes whose validation methods are timed together under "validation"."""
+VALIDATED_CLASSES = [
+    massfunction.MassFunction,
+    fromsensors.DiscreteSensorModel,
+    fromsensors.DiscreteMassFunctionsFromSensorsGenerator,
+    frombeliefs.DiscreteMappingVector,
+    frombeliefs.DiscreteEvidentialMapping,
+    frombeliefs.DiscreteMassFunctionsFromBeliefsGenerator,
+]
+VALIDATION_METHODS = ["is_valid", "has_valid_sum", "has_valid_values"]
+
+"""The set operations counted for each type of element (the other ones rely on them)."""
+SET_OPERATIONS = ["opposite", "conjunction", "conjunction_unsafe", "disjunction", "disjunction_unsafe"]
+ELEMENT_CLASSES = [element.DiscreteElement, element.IntervalElement]
+
+
+################################################################################
+################################################################################
+################################################################################
+
+def is_enabled():
+    """
+    Checks if the instrumentation is enabled.
+
+    Returns:
+        bool -- True if the methods are currently instrumented.
+    """
+    return len(_patched) > 0
+
+################################################################################
+
+def enable():
+    """
+    Instruments the library: the methods of the classes are replaced by wrappers
+    updating the counters and timers. Does nothing if it is already enabled.
+
+    The counters are not locked (that would cost more than what they count): when
+    several threads run instrumented code at once, some increments might be lost.
+    The timers of nested calls overlap, e.g. the time of ``combination_smets()``
+    includes the one of the ``add_mass()`` calls it makes.
+    """
+    with _lock:
+        if is_enabled():
+            return
+
+        for cls in ELEMENT_CLASSES:
+            _patch(cls, "__init__", _counting("elements.allocated"))
+            for name in SET_OPERATIONS:
+                if name in cls.__dict__:
+                    _patch(cls, name, _counting("elements." + name.replace("_unsafe", "")))
+
+        for cls in TIMED_CLASSES:
+            for name, attribute in list(cls.__dict__.items()):
+                if name.startswith("_") or not _is_method(attribute):
+                    continue
+                if name.startswith("combination") and cls == massfunction.MassFunction:
+                    _patch(cls, name, _combination(cls.__name__ + "." + name))
+                else:
+                    _patch(cls, name, _timing(cls.__name__ + "." + name))
+
+        for cls in VALIDATED_CLASSES:
+            for name in VALIDATION_METHODS:
+                if name in cls.__dict__:
+                    _patch(cls, name, _timing("validation"))
+
+        _patch(fromsensors.EvidenceCache, "get", _cache_lookup("cache.evidence"))
+
+################################################################################
+
+def disable():
+    """
+    Puts the original methods back. The counters and timers are kept (see ``reset()``).
+    """
+    with _lock:
+        while len(_patched) > 0:
+            cls, name, original = _patched.pop()
+            setattr(cls, name, original)
+
+################################################################################
+
+def reset():
+    """
+    Sets all the counters and timers back to zero.
+    """
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+
+################################################################################
+
+def snapshot():
+    """
+    Gets the current values of the counters and timers.
+
+    Returns:
+        dict -- A dictionary {"enabled": bool, "counters": {name: count},
+        "timers": {name: {"calls": int, "total_ns": int}}} that can be dumped in JSON.
+    """
+    with _lock:
+        return {
+            "enabled" : is_enabled(),
+            "counters": dict(_counters),
+            "timers"  : dict((name, {"calls": t[0], "total_ns": t[1]}) for name, t in _timers.items()),
+        }
+
+################################################################################
+
+@contextlib.contextmanager
+def measure():
+    """
+    Measures what happens in a ``with`` block: the instrumentation is enabled for the
+    duration of the block (if it was not already, it is disabled again at the end of
+    the outermost block) and the dictionary given by the ``with`` statement is filled
+    at the end of the block with the difference between the snapshots taken before and
+    after it (same layout as ``snapshot()``, only the counters and timers that changed).
+
+    Example:
+        with instrumentation.measure() as stats:
+            generator.get_evidence(*measurements)
+        print(stats["timers"])
+    """
+    global _scopes, _scopes_enabled
+    with _lock:
+        if _scopes == 0:
+            _scopes_enabled = not is_enabled()
+        _scopes += 1
+        enable()
+    stats = {}
+    before = snapshot()
+    try:
+        yield stats
+    finally:
+        after = snapshot()
+        stats["enabled"] = True
+        stats["counters"] = dict(
+            (name, value - before["counters"].get(name, 0)) for name, value in after["counters"].items()
+            if value != before["counters"].get(name, 0)
+        )
+        stats["timers"] = {}
+        for name, t in after["timers"].items():
+            old = before["timers"].get(name, {"calls": 0, "total_ns": 0})
+            if t["calls"] != old["calls"]:
+                stats["timers"][name] = {"calls": t["calls"] - old["calls"], "total_ns": t["total_ns"] - old["total_ns"]}
+        with _lock:
+            _scopes -= 1
+            if _scopes == 0 and _scopes_enabled:
+                disable()
+
+################################################################################
+
+def count(name, n=1):
+    """
+    Increments a counter, e.g. to count events of the application along with the ones
+    of the library. Does nothing if the instrumentation is disabled.
+
+    Args:
+        name (str): The name of the counter.
+        n (int): The increment.
+    """
+    if is_enabled():
+        _counters[name] = _counters.get(name, 0) + n
+
+################################################################################
+
+@contextlib.contextmanager
+def timer(name):
+    """
+    Times a ``with`` block under the given name, e.g. to time a stage of the application
+    along with the methods of the library. Does nothing if the instrumentation is disabled.
+
+    Args:
+        name (str): The name of the timer.
+    """
+    if not is_enabled():
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        _add_time(name, time.perf_counter_ns() - start)
+
+
+################################################################################
+################################################################################
+################################################################################
+
+def _add_time(name, elapsed):
+    """
+    Adds a call to a timer.
+
+    Args:
+        name (str): The name of the timer.
+        elapsed (int): The time of the call, in nanoseconds.
+    """
+    t = _timers.get(name)
+    if t == None:
+        t = _timers.setdefault(name, [0, 0])
+    t[0] += 1
+    t[1] += elapsed
+
+def _is_method(attribute):
+    """
+    Checks if a class attribute is a method (static and class methods included).
+
+    Args:
+        attribute (object): The attribute, as found in the __dict__ of the class.
+    Returns:
+        bool -- True if it is a method.
+    """
+    return isinstance(attribute, (staticmethod, classmethod)) or (callable(attribute) and not isinstance(attribute, type))
+
+def _patch(cls, name, decorator):
+    """
+    Replaces a method by a wrapper and remembers the original one.
+
+    Args:
+        cls (type): The class of the method.
+        name (str): The name of the method.
+        decorator (func): A function taking the original function and returning the
+            wrapper.
+    """
+    original = cls.__dict__[name]
+    if isinstance(original, staticmethod):
+        wrapper = staticmethod(decorator(original.__func__))
+    elif isinstance(original, classmethod):
+        wrapper = classmethod(decorator(original.__func__))
+    else:
+        wrapper = decorator(original)
+    _patched.append((cls, name, original))
+    setattr(cls, name, wrapper)
+
+def _counting(name):
+    """
+    Gets a decorator counting the calls of a function.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            _counters[name] = _counters.get(name, 0) + 1
+            return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _timing(name):
+    """
+    Gets a decorator timing the calls of a function (exceptions included).
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _add_time(name, time.perf_counter_ns() - start)
+        return wrapper
+    return decorator
+
+def _combination(name):
+    """
+    Gets a decorator timing a combination and, for the outermost combination only (the
+    safe ones call the unsafe ones), counting the focal products (the conjunctions and
+    disjunctions of elements it ran) and the focal elements produced.
+    """
+    products = ["elements.conjunction", "elements.disjunction"]
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            depth = getattr(_local, "depth", 0)
+            _local.depth = depth + 1
+            before = sum(_counters.get(p, 0) for p in products)
+            start = time.perf_counter_ns()
+            try:
+                result = function(*args, **kwargs)
+            finally:
+                _add_time(name, time.perf_counter_ns() - start)
+                _local.depth = depth
+            if depth == 0:
+                _counters["combination.calls"] = _counters.get("combination.calls", 0) + 1
+                _counters["combination.focal_products"] = (_counters.get("combination.focal_products", 0) +
+                                                           sum(_counters.get(p, 0) for p in products) - before)
+                if isinstance(result, massfunction.MassFunction):
+                    _counters["combination.focals"] = _counters.get("combination.focals", 0) + len(result)
+            return result
+        return wrapper
+    return decorator
+
+def _cache_lookup(name):
+    """
+    Gets a decorator counting the hits (anything but None) and misses of a cache lookup.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            result = function(*args, **kwargs)
+            counter = name + (".misses" if result is None else ".hits")
+            _counters[counter] = _counters.get(counter, 0) + 1
+            return result
+        return wrapper
+    return decorator
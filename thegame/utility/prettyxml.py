@@ -9,11 +9,15 @@
 # external library. It uses only the standard xml.etree.ElementTree.           #
 # This is not a complete library, it just offers an equivalent for the func-   #
 # tion pretty_print() (called pretty_str() as it returns a string and does not #
-# print anything).                                                             #
+# print anything). The string is built with the incremental writer of         #
+# thegame.utility.xmlwriter, which can also write directly to a file.          #
 ################################################################################
 
 
+import thegame.utility.xmlwriter as xmlwriter
+
 import xml.etree.ElementTree as ET
+import io
 
 
 def pretty_str(element, encoding="us-ascii", xml_declaration=True, indent=4):
@@ -28,41 +32,8 @@ def pretty_str(element, encoding="us-ascii", xml_declaration=True, indent=4):
     Returns:
         str -- A pretty string ready to be written in a file.
     """
-    def print_node(nb_indents, node):
-        node_str = " " * indent * nb_indents
-
-        has_children = False
-        for element in list(node):
-            has_children = True
-        close_it = False
-        if (node.text == None or node.text == "") and not has_children:
-            close_it = True
-
-        node_str += "<" + str(node.tag)
-        for name, value in node.items():
-            node_str += " " + name + '="' + str(value) + '"'
-            
-        if close_it:
-            node_str += "/>\n"
-        elif not has_children:
-            node_str += ">" + str(node.text) + "</" + node.tag + ">\n"
-        else:
-            node_str += ">\n"
-            for element in list(node):
-                node_str += print_node(nb_indents + 1, element)
-            node_str += " " * indent * nb_indents + "</" + node.tag + ">\n"
-        return node_str
-    
-    result = ""
-
-    #xml declaration and encoding:
-    if xml_declaration == True:
-        result += "<?xml version='1.0'"
-        if encoding != None and encoding != "":
-            result += " encoding='us-ascii'"
-        result += "?>\n"
-
-    #Tree:
-    result += print_node(0, element)
-
-    return result
+    result = io.StringIO()
+    writer = xmlwriter.XMLWriter(result, encoding, xml_declaration, indent)
+    writer.write_element(element)
+    writer.close()
+    return result.getvalue()
@@ -0,0 +1,217 @@
+################################################################################
+# thegame.utility.xmlwriter.py                                                 #
+# ---------------------------------------------------------------------------- #
+# Author : Bastien Pietropaoli                                                 #
+# Contact: Bastien.Pietropaoli@insight-centre.org                              #
+#          Bastien.Pietropaoli@gmail.com                                       #
+# ---------------------------------------------------------------------------- #
+# This module contains an incremental XML writer producing the same output as  #
+# prettyxml.pretty_str() without building the document in memory: nodes are   #
+# written to a file object as soon as they are opened. It uses only the        #
+# standard library.                                                            #
+################################################################################
+
+import contextlib
+
+
+class XMLWriter:
+    """
+    An incremental XML writer. Nodes are written as soon as they are known, thus
+    very large documents are written in linear time and constant memory (only the
+    stack of opened nodes is kept). The indentation is the one of
+    ``prettyxml.pretty_str()``: one node per line, nodes without text nor children
+    are self-closed and texts are written inline. Mixed content (a text and
+    children in the same node) is not supported.
+
+    Texts and attribute values are escaped, and characters not supported by the
+    encoding are written as character references.
+
+    Example:
+        with open(path, "w") as f:
+            writer = XMLWriter(f)
+            with writer.node("frame", {"name": "Presence"}):
+                writer.leaf("state", text="Empty")
+            writer.close()
+
+    Attributes:
+        self.file (file object): The text file object in which the XML is written.
+        self.encoding (str): The encoding declared (and enforced) in the document.
+        self.indent (int): The number of spaces to use in the indentation.
+    """
+
+    def __init__(self, file, encoding="us-ascii", xml_declaration=True, indent=4):
+        """
+        Builds the writer and writes the XML declaration.
+
+        Args:
+            file (file object): The text file object in which the XML should be written
+                (anything with a method ``write(str)``).
+            encoding (str): The encoding of the XML document (None to skip it in the
+                declaration and write any character as is).
+            xml_declaration (bool): If the declaration line is required or not.
+            indent (int): The number of spaces to use in the indentation.
+        """
+        self.file = file
+        self.encoding = encoding if encoding != "" else None
+        self.indent = indent
+        self.__stack = []
+        self.__indents = [""]
+        self.__pending = False
+        self.__text = None
+
+        if xml_declaration:
+            declaration = "<?xml version='1.0'"
+            if self.encoding != None:
+                declaration += " encoding='" + self.encoding + "'"
+            self.file.write(declaration + "?>\n")
+
+    def start(self, tag, attributes=None):
+        """
+        Opens a node. It is written once its content is known, i.e. when a child is
+        opened or when it is closed.
+
+        Args:
+            tag (str): The tag of the node.
+            attributes (dict{str: object}): The attributes of the node.
+        Raises:
+            ValueError: If the current node already has a text.
+        """
+        if self.__pending:
+            if self.__text != None:
+                raise ValueError(
+                    "tag: " + str(tag) + "\n" +
+                    "A node with a text cannot have children!"
+                )
+            self.file.write(">\n")
+        depth = len(self.__stack)
+        if depth == len(self.__indents):
+            self.__indents.append(" " * self.indent * depth)
+        node = self.__indents[depth] + "<" + str(tag)
+        for name, value in (attributes or {}).items():
+            node += " " + name + '="' + self.__escape(str(value), True) + '"'
+        self.file.write(node)
+        self.__stack.append(str(tag))
+        self.__pending = True
+        self.__text = None
+
+    def data(self, text):
+        """
+        Sets the text of the node that has just been opened.
+
+        Args:
+            text (object): The text of the node (converted with ``str()``).
+        Raises:
+            ValueError: If no node is waiting for its content.
+        """
+        if not self.__pending:
+            raise ValueError("A text can only be given to a node without children!")
+        self.__text = None if text == None else str(text)
+
+    def end(self, tag=None):
+        """
+        Closes the current node.
+
+        Args:
+            tag (str): The tag of the node to close, to check the document is well formed
+                (optional).
+        Raises:
+            ValueError: If there is no node to close or if the given tag does not match.
+        """
+        if len(self.__stack) == 0:
+            raise ValueError("There is no node to close!")
+        if tag != None and str(tag) != self.__stack[-1]:
+            raise ValueError(
+                "tag: " + str(tag) + "\n" +
+                "The current node is '" + self.__stack[-1] + "'!"
+            )
+        current = self.__stack.pop()
+        if self.__pending:
+            if self.__text == None or self.__text == "":
+                self.file.write("/>\n")
+            else:
+                self.file.write(">" + self.__escape(self.__text) + "</" + current + ">\n")
+        else:
+            self.file.write(self.__indents[len(self.__stack)] + "</" + current + ">\n")
+        self.__pending = False
+        self.__text = None
+
+    def leaf(self, tag, attributes=None, text=None):
+        """
+        Writes a node without children.
+
+        Args:
+            tag (str): The tag of the node.
+            attributes (dict{str: object}): The attributes of the node.
+            text (object): The text of the node (None for a self-closed node).
+        """
+        self.start(tag, attributes)
+        self.data(text)
+        self.end()
+
+    @contextlib.contextmanager
+    def node(self, tag, attributes=None):
+        """
+        Opens a node for the duration of a ``with`` block.
+
+        Args:
+            tag (str): The tag of the node.
+            attributes (dict{str: object}): The attributes of the node.
+        """
+        self.start(tag, attributes)
+        yield self
+        self.end(tag)
+
+    def write_element(self, element):
+        """
+        Writes a whole ``xml.etree.ElementTree.Element`` (texts of nodes having children
+        are ignored, as in ``prettyxml.pretty_str()``).
+
+        Args:
+            element (xml.etree.ElementTree.Element): The element to write.
+        """
+        #Iterative depth-first walk, to support arbitrarily deep trees:
+        stack = [(element, False)]
+        while len(stack) > 0:
+            node, closing = stack.pop()
+            if closing:
+                self.end()
+                continue
+            self.start(node.tag, dict(node.items()))
+            children = list(node)
+            if len(children) == 0:
+                self.data(node.text)
+            stack.append((node, True))
+            for child in reversed(children):
+                stack.append((child, False))
+
+    def close(self):
+        """
+        Checks that all the nodes were closed (the file itself is not closed).
+
+        Raises:
+            ValueError: If some nodes are still opened.
+        """
+        if len(self.__stack) > 0:
+            raise ValueError("Some nodes are still opened: " + ", ".join(self.__stack) + "!")
+
+    def __escape(self, text, attribute=False):
+        """
+        Escapes a text or an attribute value.
+
+        Args:
+            text (str): The text to escape.
+            attribute (bool): If the text is an attribute value.
+        Returns:
+            str -- The escaped text.
+        """
+        if "&" in text:
+            text = text.replace("&", "&amp;")
+        if "<" in text:
+            text = text.replace("<", "&lt;")
+        if ">" in text:
+            text = text.replace(">", "&gt;")
+        if attribute and '"' in text:
+            text = text.replace('"', "&quot;")
+        if self.encoding != None and not text.isascii():
+            text = text.encode(self.encoding, "xmlcharrefreplace").decode(self.encoding)
+        return text